@@ -0,0 +1,28 @@
+"""Ticket queue rank
+
+Revision ID: 003
+Revises: 002
+Create Date: 2025-01-20 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+# Doit rester égal à app.models.ticket.QUEUE_RANK_GAP
+QUEUE_RANK_GAP = 1024.0
+
+
+def upgrade() -> None:
+    # Clé d'ordre fractionnaire : déplacer un ticket ne réécrit qu'une ligne
+    op.add_column('tickets', sa.Column('queue_rank', sa.Float(), nullable=True))
+    op.execute(f"UPDATE tickets SET queue_rank = position_in_queue * {QUEUE_RANK_GAP}")
+
+
+def downgrade() -> None:
+    op.drop_column('tickets', 'queue_rank')
@@ -0,0 +1,68 @@
+"""Ticket native timestamps
+
+Revision ID: 004
+Revises: 003
+Create Date: 2025-01-22 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+TIMESTAMP_COLUMNS = ('called_at', 'started_at', 'completed_at')
+
+
+def upgrade() -> None:
+    # Timestamps ISO (String) -> DateTime natifs, indexés
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'sqlite':
+        # Normalise "2025-01-15T08:30:00.123456" au format DateTime de SQLAlchemy
+        for column in TIMESTAMP_COLUMNS:
+            op.execute(
+                f"UPDATE tickets SET {column} = datetime({column}) WHERE {column} IS NOT NULL"
+            )
+
+        with op.batch_alter_table('tickets') as batch_op:
+            for column in TIMESTAMP_COLUMNS:
+                batch_op.alter_column(column, type_=sa.DateTime(), existing_type=sa.String(), existing_nullable=True)
+    else:
+        for column in TIMESTAMP_COLUMNS:
+            op.alter_column(
+                'tickets',
+                column,
+                type_=sa.DateTime(),
+                existing_type=sa.String(),
+                existing_nullable=True,
+                postgresql_using=f"NULLIF({column}, '')::timestamp"
+            )
+
+    for column in TIMESTAMP_COLUMNS:
+        op.create_index(op.f(f'ix_tickets_{column}'), 'tickets', [column])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    for column in TIMESTAMP_COLUMNS:
+        op.drop_index(op.f(f'ix_tickets_{column}'), table_name='tickets')
+
+    if bind.dialect.name == 'sqlite':
+        with op.batch_alter_table('tickets') as batch_op:
+            for column in TIMESTAMP_COLUMNS:
+                batch_op.alter_column(column, type_=sa.String(), existing_type=sa.DateTime(), existing_nullable=True)
+    else:
+        for column in TIMESTAMP_COLUMNS:
+            op.alter_column(
+                'tickets',
+                column,
+                type_=sa.String(),
+                existing_type=sa.DateTime(),
+                existing_nullable=True,
+                postgresql_using=f"to_char({column}, 'YYYY-MM-DD\"T\"HH24:MI:SS.US')"
+            )
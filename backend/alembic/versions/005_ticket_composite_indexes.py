@@ -0,0 +1,52 @@
+"""Ticket composite indexes
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-01-24 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+# Statuts actifs : libellés du type Postgres `ticketstatus` créé par 001
+ACTIVE_STATUSES_SQL = "status IN ('en_attente', 'appelé', 'en_service')"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # File active d'un service, triée par rang
+    if bind.dialect.name == 'postgresql':
+        op.create_index(
+            'ix_tickets_active_queue',
+            'tickets',
+            ['service_id', 'queue_rank', 'created_at'],
+            postgresql_where=sa.text(ACTIVE_STATUSES_SQL)
+        )
+    else:
+        op.create_index('ix_tickets_service_status_rank', 'tickets', ['service_id', 'status', 'queue_rank', 'created_at'])
+
+    op.create_index('ix_tickets_service_created', 'tickets', ['service_id', 'created_at'])
+    op.create_index('ix_tickets_user_created', 'tickets', ['user_id', 'created_at'])
+    op.create_index('ix_tickets_counter_status', 'tickets', ['counter_id', 'status'])
+    op.create_index('ix_tickets_status_created', 'tickets', ['status', 'created_at'])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    op.drop_index('ix_tickets_status_created', table_name='tickets')
+    op.drop_index('ix_tickets_counter_status', table_name='tickets')
+    op.drop_index('ix_tickets_user_created', table_name='tickets')
+    op.drop_index('ix_tickets_service_created', table_name='tickets')
+
+    if bind.dialect.name == 'postgresql':
+        op.drop_index('ix_tickets_active_queue', table_name='tickets')
+    else:
+        op.drop_index('ix_tickets_service_status_rank', table_name='tickets')
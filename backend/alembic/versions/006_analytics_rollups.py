@@ -0,0 +1,63 @@
+"""Analytics rollups
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-01-27 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+ROLLUP_COLUMNS = (
+    ('wait_time_total', sa.Float(), '0'),
+    ('wait_time_samples', sa.Integer(), '0'),
+    ('service_time_total', sa.Float(), '0'),
+    ('service_time_samples', sa.Integer(), '0'),
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # La table analytics est créée par create_all : rien à migrer si absente
+    if not sa.inspect(bind).has_table('analytics'):
+        return
+
+    # Sommes nécessaires aux moyennes incrémentales
+    with op.batch_alter_table('analytics') as batch_op:
+        for name, type_, default in ROLLUP_COLUMNS:
+            batch_op.add_column(sa.Column(name, type_, nullable=False, server_default=default))
+
+    # Reprise des sommes depuis les moyennes existantes (approximation)
+    op.execute(
+        "UPDATE analytics SET "
+        "wait_time_samples = completed_tickets, "
+        "wait_time_total = average_wait_time * completed_tickets, "
+        "service_time_samples = completed_tickets, "
+        "service_time_total = average_service_time * completed_tickets"
+    )
+
+    # Une ligne par (service, jour) : les doublons éventuels sont supprimés
+    op.execute(
+        "DELETE FROM analytics WHERE id NOT IN ("
+        "SELECT MIN(id) FROM analytics GROUP BY service_id, date)"
+    )
+    op.create_index('ux_analytics_service_date', 'analytics', ['service_id', 'date'], unique=True)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    if not sa.inspect(bind).has_table('analytics'):
+        return
+
+    op.drop_index('ux_analytics_service_date', table_name='analytics')
+    with op.batch_alter_table('analytics') as batch_op:
+        for name, _, _ in reversed(ROLLUP_COLUMNS):
+            batch_op.drop_column(name)
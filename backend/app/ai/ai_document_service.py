@@ -3,12 +3,12 @@ Service IA d'analyse de documents requis
 Génère checklists intelligentes, détecte documents manquants, alerte expirations
 """
 
-import google.generativeai as genai
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 import json
 import logging
-from app.core.config import settings
+from app.ai.llm_cache import llm_response_cache
+from app.ai.llm_client import llm_client
 
 logger = logging.getLogger(__name__)
 
@@ -17,31 +17,27 @@ class AIDocumentService:
     """Service d'analyse intelligente des documents avec Gemini AI"""
     
     def __init__(self):
-        self.enabled = False
-        if settings.GEMINI_API_KEY:
-            try:
-                genai.configure(api_key=settings.GEMINI_API_KEY)
-                self.model = genai.GenerativeModel(
-                    'gemini-flash-latest',
-                    generation_config={
-                        'temperature': 0.2,  # Très précis pour documents
-                        'top_p': 0.9,
-                        'top_k': 40,
-                        'max_output_tokens': 1000,
-                    },
-                    safety_settings={
-                        'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
-                        'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
-                        'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
-                        'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE',
-                    }
-                )
-                self.enabled = True
-                logger.info("✅ AI Document Service activé")
-            except Exception as e:
-                logger.error(f"❌ Erreur initialisation AI Document: {str(e)}")
-        else:
-            logger.warning("⚠️ GEMINI_API_KEY non configurée pour AI Document")
+        # Appels via le client LLM partagé (async, timeout, disjoncteur)
+        self.model = llm_client.model(
+            'gemini-flash-latest',
+            generation_config={
+                'temperature': 0.2,  # Très précis pour documents
+                'top_p': 0.9,
+                'top_k': 40,
+                'max_output_tokens': 1000,
+            },
+            safety_settings={
+                'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
+                'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
+                'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
+                'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE',
+            }
+        )
+    
+    @property
+    def enabled(self) -> bool:
+        """IA utilisable : fournisseur configuré et disjoncteur fermé"""
+        return self.model.available
     
     async def generate_checklist(
         self,
@@ -138,17 +134,26 @@ Réponds UNIQUEMENT en JSON valide:
   "additional_info": "<info utile>"
 }}"""
             
-            response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
-            
-            # Nettoyage JSON
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
+            async def generate() -> Dict[str, Any]:
+                response = await self.model.generate_content(prompt)
+                result_text = response.text.strip()
+                
+                # Nettoyage JSON
+                if "```json" in result_text:
+                    result_text = result_text.split("```json")[1].split("```")[0].strip()
+                elif "```" in result_text:
+                    result_text = result_text.split("```")[1].split("```")[0].strip()
+                
+                result_text = result_text.replace('\n', '').replace('\r', '')
+                return json.loads(result_text)
             
-            result_text = result_text.replace('\n', '').replace('\r', '')
-            result = json.loads(result_text)
+            # Même demande (et même contexte utilisateur) : réponse en cache
+            result = await llm_response_cache.get_or_generate(
+                "documents.checklist",
+                self.model,
+                (service_type, request_type, user_context),
+                generate
+            )
             
             # Ajouter vérifications d'expiration si user_info fourni
             if user_info and user_info.get('cni_expiry_date'):
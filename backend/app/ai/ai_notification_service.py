@@ -3,12 +3,11 @@ Service IA de notifications intelligentes
 Génère des notifications contextuelles et prédictives
 """
 
-import google.generativeai as genai
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import json
 import logging
-from app.core.config import settings
+from app.ai.llm_client import llm_client
 
 logger = logging.getLogger(__name__)
 
@@ -17,31 +16,27 @@ class AINotificationService:
     """Service de notifications intelligentes avec Gemini AI"""
     
     def __init__(self):
-        self.enabled = False
-        if settings.GEMINI_API_KEY:
-            try:
-                genai.configure(api_key=settings.GEMINI_API_KEY)
-                self.model = genai.GenerativeModel(
-                    'gemini-flash-latest',
-                    generation_config={
-                        'temperature': 0.6,
-                        'top_p': 0.9,
-                        'top_k': 40,
-                        'max_output_tokens': 300,
-                    },
-                    safety_settings={
-                        'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
-                        'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
-                        'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
-                        'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE',
-                    }
-                )
-                self.enabled = True
-                logger.info("✅ AI Notification Service activé")
-            except Exception as e:
-                logger.error(f"❌ Erreur initialisation AI Notification: {str(e)}")
-        else:
-            logger.warning("⚠️ GEMINI_API_KEY non configurée pour AI Notification")
+        # Appels via le client LLM partagé (async, timeout, disjoncteur)
+        self.model = llm_client.model(
+            'gemini-flash-latest',
+            generation_config={
+                'temperature': 0.6,
+                'top_p': 0.9,
+                'top_k': 40,
+                'max_output_tokens': 300,
+            },
+            safety_settings={
+                'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
+                'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
+                'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
+                'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE',
+            }
+        )
+    
+    @property
+    def enabled(self) -> bool:
+        """IA utilisable : fournisseur configuré et disjoncteur fermé"""
+        return self.model.available
     
     async def generate_smart_notification(
         self,
@@ -105,7 +100,7 @@ Réponds en JSON:
   "sound": true|false
 }}"""
             
-            response = self.model.generate_content(prompt)
+            response = await self.model.generate_content(prompt)
             result_text = response.text.strip()
             
             if "```json" in result_text:
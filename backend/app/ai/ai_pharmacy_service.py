@@ -2,13 +2,17 @@ import json
 import logging
 from typing import List, Dict, Any, Optional
 from app.ai.gemini_service import gemini_service
+from app.ai.llm_cache import llm_response_cache
 
 logger = logging.getLogger(__name__)
 
 class AIPharmacyService:
     def __init__(self):
         self.model = gemini_service.model
-        self.enabled = gemini_service.enabled
+
+    @property
+    def enabled(self) -> bool:
+        return self.model.available
 
     async def find_alternatives(self, medicine_name: str, dosage: str, context: str = "") -> Dict[str, Any]:
         """
@@ -48,15 +52,23 @@ class AIPharmacyService:
             }}
             """
             
-            response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
-            
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0]
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0]
+            async def generate() -> Dict[str, Any]:
+                response = await self.model.generate_content(prompt)
+                result_text = response.text.strip()
                 
-            return json.loads(result_text)
+                if "```json" in result_text:
+                    result_text = result_text.split("```json")[1].split("```")[0]
+                elif "```" in result_text:
+                    result_text = result_text.split("```")[1].split("```")[0]
+                    
+                return json.loads(result_text)
+            
+            return await llm_response_cache.get_or_generate(
+                "pharmacy.alternatives",
+                self.model,
+                (medicine_name, dosage, context),
+                generate
+            )
             
         except Exception as e:
             logger.error(f"Erreur AI Pharmacy: {str(e)}")
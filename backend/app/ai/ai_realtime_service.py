@@ -3,12 +3,11 @@ Service IA pour prédictions en temps réel
 Analyse l'affluence, prédit les temps d'attente, recommande les meilleurs moments
 """
 
-import google.generativeai as genai
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 import json
 import logging
-from app.core.config import settings
+from app.ai.llm_client import llm_client
 
 logger = logging.getLogger(__name__)
 
@@ -17,31 +16,27 @@ class AIRealtimeService:
     """Service de prédictions en temps réel avec Gemini AI"""
     
     def __init__(self):
-        self.enabled = False
-        if settings.GEMINI_API_KEY:
-            try:
-                genai.configure(api_key=settings.GEMINI_API_KEY)
-                self.model = genai.GenerativeModel(
-                    'gemini-flash-latest',
-                    generation_config={
-                        'temperature': 0.5,  # Plus déterministe pour prédictions
-                        'top_p': 0.8,
-                        'top_k': 40,
-                        'max_output_tokens': 800,
-                    },
-                    safety_settings={
-                        'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
-                        'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
-                        'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
-                        'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE',
-                    }
-                )
-                self.enabled = True
-                logger.info("✅ AI Realtime Service activé")
-            except Exception as e:
-                logger.error(f"❌ Erreur initialisation AI Realtime: {str(e)}")
-        else:
-            logger.warning("⚠️ GEMINI_API_KEY non configurée pour AI Realtime")
+        # Appels via le client LLM partagé (async, timeout, disjoncteur)
+        self.model = llm_client.model(
+            'gemini-flash-latest',
+            generation_config={
+                'temperature': 0.5,  # Plus déterministe pour prédictions
+                'top_p': 0.8,
+                'top_k': 40,
+                'max_output_tokens': 800,
+            },
+            safety_settings={
+                'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
+                'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
+                'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
+                'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE',
+            }
+        )
+    
+    @property
+    def enabled(self) -> bool:
+        """IA utilisable : fournisseur configuré et disjoncteur fermé"""
+        return self.model.available
     
     async def predict_affluence(self, service_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -115,7 +110,7 @@ Réponds UNIQUEMENT en JSON valide (pas de texte avant/après):
   "recommendation": "<conseil court et actionnable>"
 }}"""
             
-            response = self.model.generate_content(prompt)
+            response = await self.model.generate_content(prompt)
             result_text = response.text.strip()
             
             # Nettoyage du JSON
@@ -188,7 +183,7 @@ Réponds en JSON:
   ]
 }}"""
             
-            response = self.model.generate_content(prompt)
+            response = await self.model.generate_content(prompt)
             result_text = response.text.strip()
             
             if "```json" in result_text:
@@ -3,12 +3,11 @@ Service IA de triage médical pour urgences
 Analyse les symptômes, classifie l'urgence, recommande l'hôpital approprié
 """
 
-import google.generativeai as genai
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import json
 import logging
-from app.core.config import settings
+from app.ai.llm_client import llm_client
 
 logger = logging.getLogger(__name__)
 
@@ -17,31 +16,27 @@ class AITriageService:
     """Service de triage médical intelligent avec Gemini AI"""
     
     def __init__(self):
-        self.enabled = False
-        if settings.GEMINI_API_KEY:
-            try:
-                genai.configure(api_key=settings.GEMINI_API_KEY)
-                self.model = genai.GenerativeModel(
-                    'gemini-flash-latest',
-                    generation_config={
-                        'temperature': 0.3,  # Très déterministe pour médical
-                        'top_p': 0.9,
-                        'top_k': 40,
-                        'max_output_tokens': 1000,
-                    },
-                    safety_settings={
-                        'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
-                        'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
-                        'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
-                        'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE',
-                    }
-                )
-                self.enabled = True
-                logger.info("✅ AI Triage Service activé")
-            except Exception as e:
-                logger.error(f"❌ Erreur initialisation AI Triage: {str(e)}")
-        else:
-            logger.warning("⚠️ GEMINI_API_KEY non configurée pour AI Triage")
+        # Appels via le client LLM partagé (async, timeout, disjoncteur)
+        self.model = llm_client.model(
+            'gemini-flash-latest',
+            generation_config={
+                'temperature': 0.3,  # Très déterministe pour médical
+                'top_p': 0.9,
+                'top_k': 40,
+                'max_output_tokens': 1000,
+            },
+            safety_settings={
+                'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
+                'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
+                'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
+                'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE',
+            }
+        )
+    
+    @property
+    def enabled(self) -> bool:
+        """IA utilisable : fournisseur configuré et disjoncteur fermé"""
+        return self.model.available
     
     async def analyze_symptoms(
         self, 
@@ -148,7 +143,7 @@ Réponds UNIQUEMENT en JSON valide:
 
 RAPPEL: En cas de doute, privilégie toujours la sécurité du patient."""
             
-            response = self.model.generate_content(prompt)
+            response = await self.model.generate_content(prompt)
             result_text = response.text.strip()
             
             # Nettoyage JSON
@@ -3,7 +3,6 @@ Fichier: backend/app/ai/gemini_service.py (VERSION CORRIGÉE)
 Service IA avec Gemini Flash optimisé pour ViteviteApp
 """
 
-import google.generativeai as genai
 import os
 from typing import Optional, Dict, Any
 from datetime import datetime
@@ -11,41 +10,34 @@ import json
 from app.models import AffluenceLevel
 import logging
 
-from app.core.config import settings
+from app.ai.llm_client import llm_client
 
 logger = logging.getLogger(__name__)
 
 class GeminiService:
     def __init__(self):
-        api_key = settings.GEMINI_API_KEY
-        if api_key:
-            try:
-                genai.configure(api_key=api_key)
-                # ✅ CORRECTION: Utilisation du modèle Gemini 2.0 Flash (disponible)
-                self.model = genai.GenerativeModel(
-                    'gemini-2.0-flash',
-                    generation_config={
-                        'temperature': 0.7,
-                        'top_p': 0.8,
-                        'top_k': 40,
-                        'max_output_tokens': 500,
-                    },
-                    # ✅ AJOUT: Safety settings pour production
-                    safety_settings={
-                        'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
-                        'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
-                        'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
-                        'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE',
-                    }
-                )
-                self.enabled = True
-                logger.info("✅ Gemini AI activé (gemini-2.0-flash-exp)")
-            except Exception as e:
-                self.enabled = False
-                logger.error(f"❌ Erreur initialisation Gemini: {str(e)}")
-        else:
-            self.enabled = False
-            logger.warning("⚠️  GEMINI_API_KEY non configurée")
+        # Appels via le client LLM partagé (async, timeout, disjoncteur)
+        self.model = llm_client.model(
+            'gemini-2.0-flash',
+            generation_config={
+                'temperature': 0.7,
+                'top_p': 0.8,
+                'top_k': 40,
+                'max_output_tokens': 500,
+            },
+            # ✅ AJOUT: Safety settings pour production
+            safety_settings={
+                'HARM_CATEGORY_HATE_SPEECH': 'BLOCK_NONE',
+                'HARM_CATEGORY_HARASSMENT': 'BLOCK_NONE',
+                'HARM_CATEGORY_SEXUALLY_EXPLICIT': 'BLOCK_NONE',
+                'HARM_CATEGORY_DANGEROUS_CONTENT': 'BLOCK_NONE',
+            }
+        )
+    
+    @property
+    def enabled(self) -> bool:
+        """IA utilisable : fournisseur configuré et disjoncteur fermé"""
+        return self.model.available
     
     async def predict_wait_time(self, service_data: dict, historical_data: list = None) -> dict:
         """Prédit le temps d'attente pour un service"""
@@ -84,7 +76,7 @@ Réponds UNIQUEMENT en JSON (pas de texte avant/après) :
   "best_time_to_visit": "<meilleur créneau>"
 }}"""
             
-            response = self.model.generate_content(prompt)
+            response = await self.model.generate_content(prompt)
             result_text = response.text.strip()
             
             # ✅ AMÉLIORATION: Nettoyage robuste du JSON
@@ -199,7 +191,7 @@ MESSAGE: {user_message}
 
 Réponds naturellement, chaleureusement, concisément. Si incertain, oriente vers les bonnes ressources."""
             
-            response = self.model.generate_content(prompt)
+            response = await self.model.generate_content(prompt)
             response_text = response.text.strip()
             
             # ✅ Limitation longueur
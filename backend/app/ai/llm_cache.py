@@ -0,0 +1,236 @@
+"""
+ViteviteApp - Cache des réponses LLM
+Réponses du modèle réutilisées pour des entrées identiques
+
+Plusieurs appels sont déterministes en pratique : checklist de documents par
+(service, type de demande), alternatives d'un médicament par (nom, dosage).
+La clé combine :
+- l'espace de noms de l'appel (ex. "documents.checklist")
+- le modèle et sa configuration (nom, generation_config, safety_settings)
+- LLM_CACHE_VERSION (à incrémenter quand un prompt change)
+- les entrées normalisées (casse, espaces, accents conservés)
+
+Seules les réponses valides sont stockées : un fallback n'est jamais mis en
+cache. Entrées à TTL (LLM_CACHE_TTL_SECONDS), LRU borné (LLM_CACHE_MAX_ENTRIES)
+et, si LLM_CACHE_PATH est défini, persistées dans un fichier SQLite pour
+survivre aux redémarrages. Le fichier est partagé entre workers en écriture ;
+chaque worker charge les entrées valides au premier accès.
+"""
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from app.ai.llm_client import LLMModel
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(value: Any) -> Any:
+    """Forme canonique d'une entrée (chaînes : minuscules, espaces réduits)"""
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+class LLMResponseCache:
+    """Cache LRU à TTL des réponses JSON du modèle, persistance SQLite optionnelle"""
+
+    def __init__(
+        self,
+        maxsize: int = 2048,
+        ttl: float = 86400,
+        path: Optional[str] = None,
+        version: str = "1",
+        enabled: bool = True,
+        clock: Callable[[], float] = time.time
+    ):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.path = path
+        self.version = version
+        self.enabled = enabled and ttl > 0
+        self._clock = clock
+        # clé -> (espace de noms, expiration, JSON)
+        self._entries: "OrderedDict[str, Tuple[str, float, str]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._loaded = path is None
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    # ========== CLÉS ==========
+    def make_key(self, namespace: str, model: LLMModel, *inputs: Any) -> str:
+        payload = json.dumps(
+            {
+                "namespace": namespace,
+                "version": self.version,
+                "model": model.name,
+                "generation_config": model.generation_config,
+                "safety_settings": model.safety_settings,
+                "inputs": _normalize(list(inputs)),
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    # ========== LECTURE / ÉCRITURE ==========
+    async def get_or_generate(
+        self,
+        namespace: str,
+        model: LLMModel,
+        inputs: tuple,
+        generate: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None
+    ) -> Any:
+        """
+        Retourne la réponse en cache, sinon appelle `generate()` et la stocke
+
+        Chaque appel reçoit une copie (JSON relu) : l'appelant peut la modifier.
+        Les exceptions de `generate()` sont propagées, rien n'est stocké.
+        """
+        if not self.enabled:
+            return await generate()
+
+        await self._ensure_loaded()
+        key = self.make_key(namespace, model, *inputs)
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > self._clock():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return json.loads(entry[2])
+
+        self.misses += 1
+        value = await generate()
+        await self._store(key, namespace, value, ttl or self.ttl)
+        return value
+
+    async def _store(self, key: str, namespace: str, value: Any, ttl: float) -> None:
+        expires_at = self._clock() + ttl
+        text = json.dumps(value, ensure_ascii=False, default=str)
+        self._entries[key] = (namespace, expires_at, text)
+        self._entries.move_to_end(key)
+        self.stores += 1
+
+        evicted = []
+        while len(self._entries) > self.maxsize:
+            evicted.append(self._entries.popitem(last=False)[0])
+        self.evictions += len(evicted)
+
+        if self.path:
+            await self._run_db(self._write_rows, (key, namespace, expires_at, text), evicted)
+
+    async def purge(self, namespace: Optional[str] = None) -> int:
+        """Supprime les entrées (toutes, ou celles d'un espace de noms)"""
+        await self._ensure_loaded()
+        keys = [
+            key for key, entry in self._entries.items()
+            if namespace is None or entry[0] == namespace
+        ]
+        for key in keys:
+            del self._entries[key]
+        if self.path:
+            await self._run_db(self._delete_namespace, namespace)
+        logger.info(f"🧹 Cache LLM purgé ({namespace or 'tout'}) : {len(keys)} entrées")
+        return len(keys)
+
+    # ========== PERSISTANCE ==========
+    async def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            rows = await self._run_db(self._load_rows)
+        except Exception as e:
+            logger.error(f"❌ Cache LLM persistant illisible ({self.path}): {e}")
+            self.path = None
+            return
+        for key, namespace, expires_at, text in rows:
+            self._entries[key] = (namespace, expires_at, text)
+        logger.info(f"✅ Cache LLM chargé : {len(rows)} entrées ({self.path})")
+
+    async def _run_db(self, func, *args):
+        return await asyncio.to_thread(self._locked, func, *args)
+
+    def _locked(self, func, *args):
+        with self._db_lock:
+            if self._db is None:
+                self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_responses ("
+                    "key TEXT PRIMARY KEY, namespace TEXT NOT NULL, "
+                    "expires_at REAL NOT NULL, value TEXT NOT NULL, accessed_at REAL NOT NULL)"
+                )
+            with self._db:
+                return func(self._db, *args)
+
+    def _load_rows(self, db: sqlite3.Connection):
+        now = self._clock()
+        db.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,))
+        # Les plus récentes en dernier (ordre LRU)
+        return db.execute(
+            "SELECT key, namespace, expires_at, value FROM ("
+            "SELECT * FROM llm_responses ORDER BY accessed_at DESC LIMIT ?"
+            ") ORDER BY accessed_at",
+            (self.maxsize,)
+        ).fetchall()
+
+    def _write_rows(self, db: sqlite3.Connection, row: tuple, evicted: list) -> None:
+        db.execute(
+            "INSERT OR REPLACE INTO llm_responses (key, namespace, expires_at, value, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (*row, self._clock())
+        )
+        if evicted:
+            db.executemany("DELETE FROM llm_responses WHERE key = ?", [(key,) for key in evicted])
+
+    def _delete_namespace(self, db: sqlite3.Connection, namespace: Optional[str]) -> None:
+        if namespace is None:
+            db.execute("DELETE FROM llm_responses")
+        else:
+            db.execute("DELETE FROM llm_responses WHERE namespace = ?", (namespace,))
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "persistent": bool(self.path),
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
+
+
+# Instance globale
+llm_response_cache = LLMResponseCache(
+    maxsize=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl=settings.LLM_CACHE_TTL_SECONDS,
+    path=settings.LLM_CACHE_PATH,
+    version=settings.LLM_CACHE_VERSION
+)
@@ -0,0 +1,321 @@
+"""
+ViteviteApp - Client LLM partagé
+Point d'accès unique aux modèles génératifs pour tous les services IA
+
+Les services appelaient `model.generate_content()` (synchrone) dans des
+fonctions async : une réponse lente du modèle gelait la boucle asyncio pour
+tous les utilisateurs. Le client partagé :
+- appelle le fournisseur en async natif (`generate_content_async` pour Gemini)
+- borne chaque appel (LLM_TIMEOUT_SECONDS, attente du sémaphore comprise)
+- limite les appels simultanés du worker (LLM_MAX_CONCURRENCY)
+- réessaie avec backoff exponentiel (LLM_MAX_RETRIES)
+- ouvre un disjoncteur après LLM_BREAKER_FAILURE_THRESHOLD échecs
+  consécutifs : `available` devient faux et les services passent
+  immédiatement par leurs chemins `_fallback_*` ; un appel d'essai est
+  autorisé après LLM_BREAKER_RESET_SECONDS
+
+`FakeLLMProvider` remplace le fournisseur dans les tests (LLM_PROVIDER=fake).
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import json
+import logging
+import random
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailable(Exception):
+    """Aucun fournisseur configuré, ou disjoncteur ouvert"""
+
+
+class LLMResponse:
+    """Réponse texte (même accès `.text` que le SDK Gemini)"""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+# ========== FOURNISSEURS ==========
+class GeminiProvider:
+    """Google Gemini via google-generativeai (appels async natifs)"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self._genai = genai
+        self._models: Dict[str, Any] = {}
+
+    def _model(self, model: str, generation_config: Optional[dict], safety_settings: Optional[dict]):
+        key = json.dumps([model, generation_config, safety_settings], sort_keys=True)
+        instance = self._models.get(key)
+        if instance is None:
+            instance = self._genai.GenerativeModel(
+                model,
+                generation_config=generation_config,
+                safety_settings=safety_settings
+            )
+            self._models[key] = instance
+        return instance
+
+    async def generate(
+        self,
+        prompt: str,
+        model: str,
+        generation_config: Optional[dict] = None,
+        safety_settings: Optional[dict] = None
+    ) -> str:
+        response = await self._model(model, generation_config, safety_settings).generate_content_async(prompt)
+        return response.text
+
+
+class FakeLLMProvider:
+    """Fournisseur local : réponses programmées, latence et pannes simulées"""
+
+    name = "fake"
+
+    def __init__(self, responder: Optional[Callable[[str], str]] = None, delay: float = 0.0):
+        self.responder = responder or (lambda prompt: "{}")
+        self.delay = delay
+        self.fail_next = 0  # Nombre d'appels suivants en échec
+        self.calls: List[str] = []
+
+    async def generate(self, prompt: str, model: str = "", **options) -> str:
+        self.calls.append(prompt)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            raise RuntimeError("Panne simulée du fournisseur")
+        return self.responder(prompt)
+
+
+# ========== DISJONCTEUR ==========
+class CircuitBreaker:
+    """
+    Fermé : appels autorisés. Ouvert après `failure_threshold` échecs
+    consécutifs : appels refusés pendant `reset_timeout` secondes, puis un
+    seul appel d'essai (demi-ouvert) qui referme ou rouvre le circuit.
+    Un essai interrompu sans résultat (annulation) est rendu : le circuit
+    repasse ouvert et le prochain appel refait l'essai.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+
+    @property
+    def available(self) -> bool:
+        if self.state == self.OPEN:
+            return self._clock() - self.opened_at >= self.reset_timeout
+        return self.state == self.CLOSED
+
+    def allow(self) -> bool:
+        """Réserve un appel (l'appel d'essai en demi-ouvert)"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and self._clock() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            return True
+        return False
+
+    def release(self) -> None:
+        """Appel réservé abandonné sans résultat (annulation)"""
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+                logger.warning(f"⚠️ Disjoncteur LLM ouvert ({self.consecutive_failures} échecs)")
+            self.state = self.OPEN
+            self.opened_at = self._clock()
+
+
+# ========== CLIENT ==========
+class LLMModel:
+    """Modèle nommé et sa configuration, appelé via le client partagé"""
+
+    def __init__(
+        self,
+        client: "LLMClient",
+        name: str,
+        generation_config: Optional[dict] = None,
+        safety_settings: Optional[dict] = None
+    ):
+        self._client = client
+        self.name = name
+        self.generation_config = generation_config
+        self.safety_settings = safety_settings
+
+    @property
+    def available(self) -> bool:
+        return self._client.available
+
+    async def generate_content(self, prompt: str) -> LLMResponse:
+        text = await self._client.generate(
+            prompt,
+            model=self.name,
+            generation_config=self.generation_config,
+            safety_settings=self.safety_settings
+        )
+        return LLMResponse(text)
+
+
+class LLMClient:
+    """Client partagé : timeout, concurrence bornée, retries, disjoncteur"""
+
+    def __init__(
+        self,
+        provider=None,
+        timeout: float = 8.0,
+        max_concurrency: int = 8,
+        retries: int = 1,
+        backoff: float = 0.5,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.provider = provider
+        self.timeout = timeout
+        self.max_concurrency = max(1, max_concurrency)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.provider is not None
+
+    @property
+    def available(self) -> bool:
+        """Fournisseur configuré et disjoncteur fermé (sinon : fallback)"""
+        return self.enabled and self.breaker.available
+
+    def model(self, name: str, generation_config: Optional[dict] = None, safety_settings: Optional[dict] = None) -> LLMModel:
+        return LLMModel(self, name, generation_config, safety_settings)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Un sémaphore par boucle (tests : une boucle par test)
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _call(self, prompt: str, options: dict) -> str:
+        async with self._get_semaphore():
+            return await self.provider.generate(prompt, **options)
+
+    async def generate(self, prompt: str, **options) -> str:
+        """
+        Génère une réponse texte
+
+        Raises:
+            LLMUnavailable: pas de fournisseur, ou disjoncteur ouvert
+            Exception: dernière erreur du fournisseur après les retries
+        """
+        if not self.enabled:
+            raise LLMUnavailable("Aucun fournisseur LLM configuré")
+
+        last_error: Optional[Exception] = None
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                self.rejected += 1
+                raise LLMUnavailable("Disjoncteur LLM ouvert") from last_error
+            trial = self.breaker.state == CircuitBreaker.HALF_OPEN
+
+            self.calls += 1
+            try:
+                text = await asyncio.wait_for(self._call(prompt, options), timeout=self.timeout)
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                self.failures += 1
+                self.breaker.record_failure()
+                last_error = e
+                logger.warning(f"⚠️ Appel LLM en échec (essai {attempt + 1}): {e!r}")
+                if attempt < self.retries:
+                    await asyncio.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+                continue
+            except BaseException:
+                # Annulation (client déconnecté, timeout externe, arrêt)
+                if trial:
+                    self.breaker.release()
+                raise
+
+            self.breaker.record_success()
+            return text
+
+        raise last_error
+
+    def metrics(self) -> dict:
+        return {
+            "provider": self.provider.name if self.provider else None,
+            "available": self.available,
+            "breaker_state": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+        }
+
+
+def create_llm_provider(name: str):
+    """Instancie le fournisseur configuré (`LLM_PROVIDER`), None si IA désactivée"""
+    if name == "fake":
+        return FakeLLMProvider()
+    if not settings.gemini_enabled:
+        logger.warning("⚠️  GEMINI_API_KEY non configurée : services IA en mode secours")
+        return None
+    try:
+        provider = GeminiProvider(settings.GEMINI_API_KEY)
+        logger.info("✅ Client LLM Gemini initialisé")
+        return provider
+    except Exception as e:
+        logger.error(f"❌ Erreur initialisation Gemini: {e}")
+        return None
+
+
+# Instance globale
+llm_client = LLMClient(
+    create_llm_provider(settings.LLM_PROVIDER),
+    timeout=settings.LLM_TIMEOUT_SECONDS,
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    retries=settings.LLM_MAX_RETRIES,
+    backoff=settings.LLM_RETRY_BACKOFF_SECONDS,
+    breaker=CircuitBreaker(
+        failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=settings.LLM_BREAKER_RESET_SECONDS
+    )
+)
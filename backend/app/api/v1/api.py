@@ -3,6 +3,8 @@ ViteviteApp - API Router v1
 """
 from fastapi import APIRouter
 
+from app.services.model_registry import model_registry
+
 from app.api.v1.endpoints import (
     services,
     tickets,
@@ -25,6 +27,7 @@ from app.api.v1.endpoints import (
     administrations,
     # admin_dashboard,  # Remplacé par le nouveau endpoint admin
     seed,
+    live,
 )
 api_router = APIRouter()
 api_router.include_router(services.router, prefix="/services", tags=["services"])
@@ -47,9 +50,10 @@ api_router.include_router(analytics.router, prefix="/analytics", tags=["analytic
 api_router.include_router(administrations.router, prefix="/administrations", tags=["administrations"])
 # api_router.include_router(admin_dashboard.router, prefix="/admin/dashboard", tags=["admin-dashboard"])
 api_router.include_router(seed.router, prefix="/seed", tags=["seed"])
+api_router.include_router(live.router, prefix="/live", tags=["live"])
 
 
 @api_router.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "version": "1.0.0"}
\ No newline at end of file
+    """Health check endpoint (`ml_model.ready` : modèle ML chargé et préchauffé)"""
+    return {"status": "healthy", "version": "1.0.0", "ml_model": model_registry.status()}
\ No newline at end of file
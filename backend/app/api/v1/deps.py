@@ -10,16 +10,26 @@ import uuid
 from app.core.database import get_db
 from app.core.security import decode_token
 from app.models.user import User, UserRole
+from app.services.principal_cache import Principal, principal_cache
+from app.services.queue_engine import QueueEngine, queue_engine
 
 security = HTTPBearer()
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
-) -> User:
+) -> Principal:
     """Récupère l'utilisateur connecté depuis le token JWT"""
+    return await authenticate_token(credentials.credentials, db)
+
+
+async def authenticate_token(token: str, db: AsyncSession) -> Principal:
+    """
+    Valide un token JWT brut (header Bearer, query WebSocket/SSE)
+    L'utilisateur est lu en base au plus une fois par TTL du cache
+    """
     try:
-        payload = decode_token(credentials.credentials)
+        payload = decode_token(token)
         user_id = payload.get("sub")
         if not user_id:
             raise HTTPException(
@@ -27,6 +37,10 @@ async def get_current_user(
                 detail="Token invalide"
             )
 
+        principal = principal_cache.get(user_id)
+        if principal is not None:
+            return principal
+
         # conversion UUID si nécessaire
         try:
             user_uuid = uuid.UUID(user_id)
@@ -45,7 +59,9 @@ async def get_current_user(
                 detail="Utilisateur non trouvé ou inactif"
             )
 
-        return user
+        principal = Principal.from_user(user)
+        principal_cache.set(user_id, principal)
+        return principal
 
     except HTTPException:
         raise
@@ -57,8 +73,8 @@ async def get_current_user(
 
 
 async def get_current_admin(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     """Vérifie que l'utilisateur est admin"""
     if current_user.role not in [UserRole.ADMIN]:
         raise HTTPException(
@@ -66,3 +82,8 @@ async def get_current_admin(
             detail="Accès réservé aux administrateurs"
         )
     return current_user
+
+
+def get_queue_engine() -> QueueEngine:
+    """Moteur de files d'attente (remplaçable via dependency_overrides)"""
+    return queue_engine
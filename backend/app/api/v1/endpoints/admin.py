@@ -7,49 +7,93 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, desc
 from datetime import datetime, timedelta
 
-from app.core.database import get_db
-from app.models.ticket import Ticket, TicketStatus
+from app.core.database import get_db, pool_metrics
+from app.models.ticket import Ticket
 from app.models.service import Service
-from app.models.user import User
-from app.api.v1.deps import get_current_admin
+from app.api.v1.deps import Principal, get_current_admin
 from app.services.smart_prediction import smart_prediction_service
+from app.services.job_runner import job_runner
+from app.services.group_commit import group_commit_writer
+from app.services.response_cache import response_cache
+from app.services.principal_cache import principal_cache
+from app.ai.llm_cache import llm_response_cache
+from app.services.ticket_stats import ServiceTicketStats, ticket_stats_service
 
 router = APIRouter()
 
 
-from typing import Optional
+from typing import Dict, List, Optional
+
+def _service_alerts(services, stats: Dict[str, ServiceTicketStats], with_actions: bool = False) -> List[dict]:
+    """Alertes surcharge / lenteur à partir des agrégats par service"""
+    alerts = []
+    services = list(services)
+    queue_sizes = [
+        (stats.get(service.id) or ServiceTicketStats(service.id)).queue_size
+        for service in services
+    ]
+    
+    # Lenteur avec SmartPrediction : tous les services en un seul passage
+    predictions = smart_prediction_service.predict_many([
+        {
+            "id": service.id,
+            "name": service.name,
+            "type": service.category,
+            "total_queue_size": queue_size,
+            "total_active_counters": service.active_counters,
+            "is_open": True
+        }
+        for service, queue_size in zip(services, queue_sizes)
+    ])
+    
+    for service, queue_size, prediction in zip(services, queue_sizes, predictions):
+        # Check surcharge
+        if queue_size > 20:
+            alert = {
+                "type": "surcharge",
+                "level": "high",
+                "message": f"Forte affluence : {service.name} ({queue_size} en attente)",
+                "service_id": service.id
+            }
+            if with_actions:
+                alert["action"] = "Renforcer l'équipe"
+            alerts.append(alert)
+        
+        # Check lenteur (si temps d'attente estimé > 60 min)
+        if prediction["predicted_wait_time"] > 60:
+            alert = {
+                "type": "lenteur",
+                "level": "medium",
+                "message": f"Temps d'attente élevé : {service.name} (~{prediction['predicted_wait_time']} min)",
+                "service_id": service.id
+            }
+            if with_actions:
+                alert["action"] = "Ouvrir un guichet supplémentaire"
+            alerts.append(alert)
+    
+    return alerts
+
 
 @router.get("/dashboard/stats", response_model=dict)
 async def get_dashboard_stats(
     service_id: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """
     Récupère les statistiques complètes pour le dashboard admin (Step A & E)
     Peut être filtré par service_id
     """
-    today = datetime.utcnow().date()
+    # 1. Vue d'ensemble (Step A) : agrégats par service en une requête
+    stats = await ticket_stats_service.by_service(db, service_id)
+    totals = ticket_stats_service.totals(stats)
     
-    # 1. Vue d'ensemble (Step A)
-    # Tickets en attente
-    waiting_query = select(func.count(Ticket.id)).where(Ticket.status.in_([TicketStatus.WAITING, TicketStatus.PENDING_VALIDATION]))
-    if service_id:
-        waiting_query = waiting_query.where(Ticket.service_id == service_id)
-    
-    waiting_result = await db.execute(waiting_query)
-    waiting_count = waiting_result.scalar()
+    # Tickets en attente / passés aujourd'hui
+    waiting_count = totals.queue_size
+    completed_count = totals.served_today
     
-    # Tickets passés aujourd'hui
-    completed_query = select(func.count(Ticket.id)).where(Ticket.status == TicketStatus.COMPLETED).where(func.date(Ticket.created_at) == today)
-    if service_id:
-        completed_query = completed_query.where(Ticket.service_id == service_id)
-        
-    completed_result = await db.execute(completed_query)
-    completed_count = completed_result.scalar()
-    
-    # Temps d'attente moyen (basé sur les tickets terminés aujourd'hui)
-    avg_wait_time = 15  # Valeur par défaut
+    # Temps d'attente moyen (tickets appelés aujourd'hui)
+    avg_wait_time = round(totals.average_wait_time) if totals.average_wait_time is not None else 15  # Valeur par défaut
     
     # Agents actifs (ceux qui ont traité un ticket dans la dernière heure)
     one_hour_ago = datetime.utcnow() - timedelta(hours=1)
@@ -68,36 +112,7 @@ async def get_dashboard_stats(
     services_result = await db.execute(services_query)
     services = services_result.scalars().all()
     
-    alerts = []
-    
-    for service in services:
-        # Check surcharge
-        if service.current_queue_size > 20:
-            alerts.append({
-                "type": "surcharge",
-                "level": "high",
-                "message": f"Forte affluence : {service.name} ({service.current_queue_size} en attente)",
-                "service_id": service.id
-            })
-        
-        # Check lenteur (si temps d'attente estimé > 60 min)
-        service_data = {
-            "id": service.id,
-            "name": service.name,
-            "type": service.category,
-            "total_queue_size": service.current_queue_size,
-            "total_active_counters": service.active_counters,
-            "is_open": True
-        }
-        prediction = smart_prediction_service.predict_wait_time(service_data)
-        
-        if prediction["predicted_wait_time"] > 60:
-            alerts.append({
-                "type": "lenteur",
-                "level": "medium",
-                "message": f"Temps d'attente élevé : {service.name} (~{prediction['predicted_wait_time']} min)",
-                "service_id": service.id
-            })
+    alerts = _service_alerts(services, stats)
 
     return {
         "success": True,
@@ -113,8 +128,8 @@ async def get_dashboard_stats(
             {
                 "id": s.id,
                 "name": s.name,
-                "queue_size": s.current_queue_size,
-                "status": "active" if s.current_queue_size > 0 else "idle"
+                "queue_size": stats[s.id].queue_size if s.id in stats else 0,
+                "status": "active" if s.id in stats and stats[s.id].queue_size > 0 else "idle"
             }
             for s in services
         ]
@@ -125,7 +140,7 @@ async def get_dashboard_stats(
 async def get_admin_alerts(
     service_id: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """
     Récupère les alertes intelligentes (Step C)
@@ -138,41 +153,73 @@ async def get_admin_alerts(
     services_result = await db.execute(services_query)
     services = services_result.scalars().all()
     
-    alerts = []
-    
-    for service in services:
-        # Check surcharge
-        if service.current_queue_size > 20:
-            alerts.append({
-                "type": "surcharge",
-                "level": "high",
-                "message": f"Forte affluence : {service.name} ({service.current_queue_size} en attente)",
-                "service_id": service.id,
-                "action": "Renforcer l'équipe"
-            })
-        
-        # Check lenteur avec SmartPrediction
-        service_data = {
-            "id": service.id,
-            "name": service.name,
-            "type": service.category,
-            "total_queue_size": service.current_queue_size,
-            "total_active_counters": service.active_counters,
-            "is_open": True
-        }
-        prediction = smart_prediction_service.predict_wait_time(service_data)
-        
-        if prediction["predicted_wait_time"] > 60:
-            alerts.append({
-                "type": "lenteur",
-                "level": "medium",
-                "message": f"Temps d'attente élevé : {service.name} (~{prediction['predicted_wait_time']} min)",
-                "service_id": service.id,
-                "action": "Ouvrir un guichet supplémentaire"
-            })
+    stats = await ticket_stats_service.by_service(db, service_id)
+    alerts = _service_alerts(services, stats, with_actions=True)
             
     return {
         "success": True,
         "total": len(alerts),
         "alerts": alerts
     }
+
+
+@router.get("/jobs", response_model=dict)
+async def get_jobs_status(
+    current_user: Principal = Depends(get_current_admin)
+):
+    """
+    État des tâches de fond du worker : tâches périodiques (exécutions,
+    durées, erreurs) et group commit des écritures
+    """
+    return {
+        "success": True,
+        **job_runner.metrics(),
+        "group_commit": group_commit_writer.metrics()
+    }
+
+
+@router.get("/database", response_model=dict)
+async def get_database_pool_status(
+    current_user: Principal = Depends(get_current_admin)
+):
+    """
+    Pool de connexions du worker : occupation et attente au checkout
+    (pour dimensionner le pool selon la concurrence réelle)
+    """
+    return {
+        "success": True,
+        **pool_metrics()
+    }
+
+
+@router.get("/cache", response_model=dict)
+async def get_cache_status(
+    current_user: Principal = Depends(get_current_admin)
+):
+    """
+    Cache des réponses publiques : backend, taux de succès, invalidations
+    (compteurs du worker), cache des utilisateurs authentifiés et des
+    réponses LLM
+    """
+    return {
+        "success": True,
+        **response_cache.metrics(),
+        "principals": principal_cache.metrics(),
+        "llm_responses": llm_response_cache.metrics()
+    }
+
+
+@router.delete("/cache/llm", response_model=dict)
+async def purge_llm_cache(
+    namespace: Optional[str] = None,
+    current_user: Principal = Depends(get_current_admin)
+):
+    """
+    Purge le cache des réponses LLM (tout, ou un espace de noms :
+    "documents.checklist", "pharmacy.alternatives")
+    """
+    purged = await llm_response_cache.purge(namespace)
+    return {
+        "success": True,
+        "purged": purged
+    }
@@ -11,11 +11,15 @@ from typing import List, Optional, Dict
 from datetime import datetime, timedelta
 
 from app.core.database import get_db
-from app.api.v1.deps import get_current_admin
-from app.models.user import User
+from app.api.v1.deps import Principal, get_current_admin, get_queue_engine
 from app.models.ticket import Ticket, TicketStatus
-from app.models.counter import Counter
+from app.models.counter import Counter, CounterStatus
 from app.models.service import Service
+from app.services.analytics_rollup import analytics_rollup, TicketEvent
+from app.services.queue_engine import QueueEngine
+from app.services.response_cache import response_cache, service_tags
+from app.services.ticket_sequence import ticket_sequence_allocator
+from app.services.ticket_stats import ServiceTicketStats, ticket_stats_service
 
 router = APIRouter()
 
@@ -48,58 +52,33 @@ class CompleteTicket(BaseModel):
 async def get_dashboard_overview(
     service_id: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Vue d'ensemble du dashboard admin
     Statistiques globales ou par service
     """
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    # Attente, servis et temps d'attente par service (une requête GROUP BY)
+    stats = await ticket_stats_service.by_service(db, service_id)
+    totals = ticket_stats_service.totals(stats)
     
-    # Base query
-    base_query = select(Ticket)
-    if service_id:
-        base_query = base_query.where(Ticket.service_id == service_id)
-    
-    # Total en attente
-    waiting_query = base_query.where(Ticket.status == TicketStatus.WAITING)
-    result = await db.execute(waiting_query)
-    total_waiting = len(result.scalars().all())
-    
-    # Servis aujourd'hui
-    served_today_query = base_query.where(
-        and_(
-            Ticket.status == TicketStatus.COMPLETED,
-            Ticket.completed_at >= today_start
-        )
-    )
-    result = await db.execute(served_today_query)
-    served_today = len(result.scalars().all())
-    
-    # Temps d'attente moyen
-    completed_today_query = base_query.where(
-        and_(
-            Ticket.status == TicketStatus.COMPLETED,
-            Ticket.completed_at >= today_start,
-            Ticket.estimated_wait_time.isnot(None)
-        )
-    )
-    result = await db.execute(completed_today_query)
-    completed_tickets = result.scalars().all()
-    
-    avg_wait_time = 0
-    if completed_tickets:
-        total_wait = sum(t.estimated_wait_time or 0 for t in completed_tickets)
-        avg_wait_time = total_wait // len(completed_tickets)
+    total_waiting = totals.waiting
+    served_today = totals.served_today
+    avg_wait_time = round(totals.average_wait_time or 0)
     
     # Guichets actifs
-    counters_query = select(Counter)
+    counters_query = select(Counter.status, Counter.is_active, func.count(Counter.id))
     if service_id:
         counters_query = counters_query.where(Counter.service_id == service_id)
+    counters_query = counters_query.group_by(Counter.status, Counter.is_active)
     
     result = await db.execute(counters_query)
-    all_counters = result.scalars().all()
-    active_counters = len([c for c in all_counters if c.is_open])
+    total_counters = 0
+    active_counters = 0
+    for counter_status, is_active, count in result.all():
+        total_counters += count
+        if counter_status == CounterStatus.OPEN and is_active:
+            active_counters += count
     
     # Statistiques par service
     services_query = select(Service)
@@ -111,33 +90,15 @@ async def get_dashboard_overview(
     
     service_stats = []
     for service in services:
-        # Tickets en attente pour ce service
-        waiting_stmt = select(Ticket).where(
-            and_(
-                Ticket.service_id == service.id,
-                Ticket.status == TicketStatus.WAITING
-            )
-        )
-        result = await db.execute(waiting_stmt)
-        service_waiting = len(result.scalars().all())
-        
-        # Servis aujourd'hui pour ce service
-        served_stmt = select(Ticket).where(
-            and_(
-                Ticket.service_id == service.id,
-                Ticket.status == TicketStatus.COMPLETED,
-                Ticket.completed_at >= today_start
-            )
-        )
-        result = await db.execute(served_stmt)
-        service_served = len(result.scalars().all())
+        stats_for_service = stats.get(service.id) or ServiceTicketStats(service.id)
+        average_wait = stats_for_service.average_wait_time
         
         service_stats.append({
             "service_id": service.id,
             "service_name": service.name,
-            "waiting": service_waiting,
-            "served_today": service_served,
-            "avg_wait_time": service.estimated_wait_time or 0,
+            "waiting": stats_for_service.waiting,
+            "served_today": stats_for_service.served_today,
+            "avg_wait_time": round(average_wait) if average_wait is not None else (service.estimated_wait_time or 0),
             "active_counters": service.active_counters or 0
         })
     
@@ -148,7 +109,7 @@ async def get_dashboard_overview(
             "served_today": served_today,
             "avg_wait_time": avg_wait_time,
             "active_counters": active_counters,
-            "total_counters": len(all_counters)
+            "total_counters": total_counters
         },
         "services": service_stats,
         "timestamp": datetime.utcnow().isoformat()
@@ -160,7 +121,8 @@ async def get_dashboard_overview(
 async def create_walkin_ticket(
     ticket_data: WalkInTicketCreate,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin),
+    queue: QueueEngine = Depends(get_queue_engine)
 ):
     """
     Créer un ticket pour un usager qui arrive sur place
@@ -177,28 +139,13 @@ async def create_walkin_ticket(
     if service.status != "ouvert":
         raise HTTPException(status_code=400, detail="Le service est fermé")
     
-    # Générer le numéro de ticket
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    stmt = select(func.count(Ticket.id)).where(
-        and_(
-            Ticket.service_id == ticket_data.service_id,
-            Ticket.created_at >= today_start
-        )
-    )
-    result = await db.execute(stmt)
-    count = result.scalar() or 0
-    
-    ticket_number = f"{service.name[:3].upper()}{count + 1:03d}"
+    # Générer le numéro de ticket (séquence journalière du service)
+    number = await ticket_sequence_allocator.next_number(db, ticket_data.service_id)
+    ticket_number = f"{service.name[:3].upper()}{number:03d}"
     
-    # Calculer la position dans la file
-    stmt = select(func.count(Ticket.id)).where(
-        and_(
-            Ticket.service_id == ticket_data.service_id,
-            Ticket.status == TicketStatus.WAITING
-        )
-    )
-    result = await db.execute(stmt)
-    position = (result.scalar() or 0) + 1
+    # Calculer la position et le rang dans la file
+    position = await queue.tail_position(db, ticket_data.service_id)
+    queue_rank = await queue.next_rank(db, ticket_data.service_id)
     
     # Créer le ticket
     new_ticket = Ticket(
@@ -208,6 +155,7 @@ async def create_walkin_ticket(
         user_phone=ticket_data.user_phone,
         status=TicketStatus.WAITING,
         position_in_queue=position,
+        queue_rank=queue_rank,
         estimated_wait_time=service.estimated_wait_time or 15,
         reservation_type="on_site",
         notes=ticket_data.notes,
@@ -216,10 +164,13 @@ async def create_walkin_ticket(
     )
     
     db.add(new_ticket)
+    queue.track(db, new_ticket)
+    analytics_rollup.record(db, TicketEvent.ISSUED, new_ticket)
     
     # Mettre à jour le service
     service.current_queue_size = (service.current_queue_size or 0) + 1
     service.updated_at = datetime.utcnow()
+    response_cache.invalidate_on_commit(db, *service_tags(service.id))
     
     await db.commit()
     await db.refresh(new_ticket)
@@ -243,7 +194,8 @@ async def create_walkin_ticket(
 async def call_next_ticket(
     counter_id: str,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin),
+    queue: QueueEngine = Depends(get_queue_engine)
 ):
     """
     Appeler automatiquement le prochain ticket dans la file
@@ -261,15 +213,7 @@ async def call_next_ticket(
         raise HTTPException(status_code=400, detail="Le guichet est fermé")
     
     # Trouver le prochain ticket en attente
-    stmt = select(Ticket).where(
-        and_(
-            Ticket.service_id == counter.service_id,
-            Ticket.status == TicketStatus.WAITING
-        )
-    ).order_by(Ticket.position_in_queue).limit(1)
-    
-    result = await db.execute(stmt)
-    next_ticket = result.scalar_one_or_none()
+    next_ticket = await queue.next_waiting(db, counter.service_id)
     
     if not next_ticket:
         return {
@@ -283,6 +227,8 @@ async def call_next_ticket(
     next_ticket.counter_id = counter_id
     next_ticket.called_at = datetime.utcnow()
     next_ticket.updated_at = datetime.utcnow()
+    queue.track(db, next_ticket)
+    analytics_rollup.record(db, TicketEvent.CALLED, next_ticket, TicketStatus.WAITING)
     
     # Mettre à jour le guichet
     counter.current_ticket_id = next_ticket.id
@@ -309,7 +255,8 @@ async def call_next_ticket(
 async def complete_ticket(
     complete_data: CompleteTicket,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin),
+    queue: QueueEngine = Depends(get_queue_engine)
 ):
     """
     Marquer un ticket comme terminé
@@ -330,9 +277,12 @@ async def complete_ticket(
         )
     
     # Marquer comme terminé
+    previous_status = ticket.status
     ticket.status = TicketStatus.COMPLETED
     ticket.completed_at = datetime.utcnow()
     ticket.updated_at = datetime.utcnow()
+    queue.track(db, ticket)
+    analytics_rollup.record(db, TicketEvent.COMPLETED, ticket, previous_status)
     
     if complete_data.notes:
         ticket.notes = (ticket.notes or "") + f"\nAgent: {complete_data.notes}"
@@ -345,6 +295,7 @@ async def complete_ticket(
     if service:
         service.current_queue_size = max(0, (service.current_queue_size or 0) - 1)
         service.updated_at = datetime.utcnow()
+        response_cache.invalidate_on_commit(db, *service_tags(service.id))
     
     # Libérer le guichet
     if ticket.counter_id:
@@ -375,7 +326,7 @@ async def get_daily_statistics(
     service_id: Optional[str] = None,
     date: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Statistiques détaillées de la journée
@@ -447,7 +398,7 @@ async def get_daily_statistics(
 async def get_agent_performance(
     date: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Performance des agents/guichets
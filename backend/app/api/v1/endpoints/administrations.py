@@ -4,6 +4,8 @@ Gestion des administrations (mairies, préfectures, etc.)
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,10 +13,13 @@ from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
+from app.crud.service import merge_live_fields, service_crud
 from app.models import Administration, Service
-from app.api.v1.deps import get_current_admin
-from app.models.user import User
+from app.api.v1.deps import Principal, get_current_admin
+from app.services.response_cache import (
+    response_cache, SERVICES_TAG, ADMINISTRATIONS_TAG, administration_tag, service_tag
+)
 
 router = APIRouter()
 
@@ -72,7 +77,7 @@ class AdministrationResponse(AdministrationBase):
 
 @router.get("/", response_model=dict)
 async def get_administrations(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     type: Optional[str] = Query(None, description="Filter by type (mairie, prefecture, etc.)"),
     is_open: Optional[bool] = Query(None, description="Filter by open status"),
     search: Optional[str] = Query(None, description="Search by name"),
@@ -81,40 +86,55 @@ async def get_administrations(
 ):
     """
     Récupère la liste des administrations avec filtres
+    (en cache, sauf recherche libre)
     """
-    query = select(Administration)
+    async def load():
+        query = select(Administration)
+        
+        # Filtres
+        if type:
+            query = query.filter(Administration.type == type)
+        if is_open is not None:
+            query = query.filter(Administration.is_open == is_open)
+        if search:
+            query = query.filter(Administration.name.ilike(f"%{search}%"))
+        
+        # Pagination
+        # Count total
+        count_query = select(func.count()).select_from(query.subquery())
+        total_result = await db.execute(count_query)
+        total = total_result.scalar_one()
+
+        # Get items
+        result = await db.execute(query.offset(offset).limit(limit))
+        administrations = result.scalars().all()
+        
+        return {
+            "success": True,
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "administrations": [
+                AdministrationResponse.model_validate(admin).model_dump(mode="json")
+                for admin in administrations
+            ]
+        }
     
-    # Filtres
-    if type:
-        query = query.filter(Administration.type == type)
-    if is_open is not None:
-        query = query.filter(Administration.is_open == is_open)
     if search:
-        query = query.filter(Administration.name.ilike(f"%{search}%"))
-    
-    # Pagination
-    # Count total
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar_one()
-
-    # Get items
-    result = await db.execute(query.offset(offset).limit(limit))
-    administrations = result.scalars().all()
+        return JSONResponse(await load())
     
-    return {
-        "success": True,
-        "total": total,
-        "limit": limit,
-        "offset": offset,
-        "administrations": [AdministrationResponse.model_validate(admin) for admin in administrations]
-    }
+    payload = await response_cache.get_or_load(
+        f"administrations:list:{type}:{is_open}:{limit}:{offset}",
+        load,
+        tags=(ADMINISTRATIONS_TAG,)
+    )
+    return JSONResponse(payload)
 
 
 @router.get("/{administration_id}", response_model=dict)
 async def get_administration(
     administration_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Récupère les détails d'une administration
@@ -141,29 +161,49 @@ async def get_administration(
 @router.get("/{administration_id}/services", response_model=dict)
 async def get_administration_services(
     administration_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Récupère tous les services d'une administration
+    (en cache, sauf l'état des files relu à chaque requête)
     """
-    result = await db.execute(select(Administration).filter(Administration.id == administration_id))
-    administration = result.scalars().first()
+    tags = {SERVICES_TAG, ADMINISTRATIONS_TAG, administration_tag(administration_id)}
     
-    if not administration:
+    async def load():
+        result = await db.execute(select(Administration).filter(Administration.id == administration_id))
+        administration = result.scalars().first()
+        
+        if not administration:
+            return None
+        
+        services = []
+        if administration.service_ids:
+            services_result = await db.execute(select(Service).filter(Service.id.in_(administration.service_ids)))
+            services = services_result.scalars().all()
+        tags.update(service_tag(service.id) for service in services)
+        
+        return {
+            "success": True,
+            "administration_id": administration_id,
+            "administration_name": administration.name,
+            "total_services": len(services),
+            "services": jsonable_encoder(services)
+        }
+    
+    payload = await response_cache.get_or_load(
+        f"administrations:{administration_id}:services",
+        load,
+        tags=tags
+    )
+    
+    if not payload:
         raise HTTPException(status_code=404, detail="Administration non trouvée")
     
-    services = []
-    if administration.service_ids:
-        services_result = await db.execute(select(Service).filter(Service.id.in_(administration.service_ids)))
-        services = services_result.scalars().all()
+    # État des files relu en base (le cache peut dater d'un autre worker)
+    live = await service_crud.get_live_fields(db, service_ids=[s["id"] for s in payload["services"]])
+    services = [merge_live_fields(s, live.get(s["id"])) for s in payload["services"] if s["id"] in live]
     
-    return {
-        "success": True,
-        "administration_id": administration_id,
-        "administration_name": administration.name,
-        "total_services": len(services),
-        "services": services
-    }
+    return JSONResponse({**payload, "total_services": len(services), "services": services})
 
 
 from app.services.smart_prediction import smart_prediction_service
@@ -171,7 +211,7 @@ from app.services.smart_prediction import smart_prediction_service
 @router.get("/{administration_id}/queue-status", response_model=dict)
 async def get_administration_queue_status(
     administration_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Récupère le statut en temps réel des files d'attente d'une administration
@@ -188,10 +228,9 @@ async def get_administration_queue_status(
         services_result = await db.execute(select(Service).filter(Service.id.in_(administration.service_ids)))
         services = services_result.scalars().all()
     
-    queue_details = []
-    for service in services:
-        # Préparer les données pour la prédiction intelligente
-        service_data = {
+    # Prédictions intelligentes de tous les services en un seul passage
+    predictions = smart_prediction_service.predict_many([
+        {
             "id": service.id,
             "name": service.name,
             "type": service.category,
@@ -199,10 +238,11 @@ async def get_administration_queue_status(
             "total_active_counters": service.active_counters,
             "is_open": service.status.value == "ouvert"
         }
-        
-        # Obtenir la prédiction
-        prediction = smart_prediction_service.predict_wait_time(service_data)
-        
+        for service in services
+    ])
+    
+    queue_details = []
+    for service, prediction in zip(services, predictions):
         queue_details.append({
             "service_id": service.id,
             "service_name": service.name,
@@ -231,7 +271,7 @@ async def get_administration_queue_status(
 async def create_administration(
     data: AdministrationCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """
     Crée une nouvelle administration (admin only)
@@ -257,6 +297,7 @@ async def create_administration(
     )
     
     db.add(administration)
+    response_cache.invalidate_on_commit(db, ADMINISTRATIONS_TAG)
     await db.commit()
     await db.refresh(administration)
     
@@ -272,7 +313,7 @@ async def update_administration(
     administration_id: str,
     data: AdministrationUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """
     Met à jour une administration (admin only)
@@ -288,6 +329,7 @@ async def update_administration(
     for field, value in update_data.items():
         setattr(administration, field, value)
     
+    response_cache.invalidate_on_commit(db, ADMINISTRATIONS_TAG)
     await db.commit()
     await db.refresh(administration)
     
@@ -302,7 +344,7 @@ async def update_administration(
 async def delete_administration(
     administration_id: str,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """
     Supprime une administration (admin only)
@@ -314,6 +356,7 @@ async def delete_administration(
         raise HTTPException(status_code=404, detail="Administration non trouvée")
     
     await db.delete(administration)
+    response_cache.invalidate_on_commit(db, ADMINISTRATIONS_TAG)
     await db.commit()
     
     return {
@@ -11,7 +11,10 @@ from app.ai.ai_realtime_service import ai_realtime_service
 from app.ai.ai_triage_service import ai_triage_service
 from app.ai.ai_document_service import ai_document_service
 from app.ai.ai_notification_service import ai_notification_service
+from app.ai.llm_client import llm_client
 from app.database import db
+from app.services.rolling_stats import rolling_stats
+from app.services.single_flight import single_flight, time_bucket
 
 router = APIRouter(prefix="/ai", tags=["AI"])
 
@@ -47,6 +50,14 @@ class SmartNotificationRequest(BaseModel):
 
 # ========== ENDPOINTS ==========
 
+def _shared_affluence_prediction(service_id: str, service: Dict[str, Any]):
+    """Prédiction d'affluence, un seul appel IA par service et tranche de temps"""
+    return single_flight.run(
+        ("ai.predict_affluence", service_id, time_bucket()),
+        lambda: ai_realtime_service.predict_affluence(service)
+    )
+
+
 @router.post("/predict-affluence")
 async def predict_affluence(request: AffluencePredictionRequest):
     """
@@ -66,8 +77,8 @@ async def predict_affluence(request: AffluencePredictionRequest):
         if not service:
             raise HTTPException(status_code=404, detail="Service non trouvé")
         
-        # Prédiction IA
-        prediction = await ai_realtime_service.predict_affluence(service)
+        # Prédiction IA (partagée entre requêtes concurrentes du même service)
+        prediction = await _shared_affluence_prediction(request.service_id, service)
         
         return {
             "success": True,
@@ -314,7 +325,7 @@ async def get_best_time(service_id: str):
         if not service:
             raise HTTPException(status_code=404, detail="Service non trouvé")
         
-        prediction = await ai_realtime_service.predict_affluence(service)
+        prediction = await _shared_affluence_prediction(service_id, service)
         
         return {
             "success": True,
@@ -346,5 +357,8 @@ async def ai_health_check():
             "documents": ai_document_service.enabled,
             "notifications": ai_notification_service.enabled
         },
+        "llm": llm_client.metrics(),
+        "single_flight": single_flight.metrics(),
+        "rolling_stats": rolling_stats.metrics(),
         "timestamp": datetime.now().isoformat()
     }
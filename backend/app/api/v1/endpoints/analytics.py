@@ -5,17 +5,19 @@ API pour les statistiques et analytics détaillées
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, and_, func, case
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 
-from app.core.database import get_db
-from app.api.v1.deps import get_current_admin
-from app.models.user import User
+from app.core.database import get_db, get_read_db
+from app.api.v1.deps import Principal, get_current_admin
 from app.models.analytics import Analytics
 from app.models.service import Service
 from app.models.ticket import Ticket, TicketStatus
 from app.models.counter import Counter
+from app.crud.ticket import ticket_crud, service_minutes_expression, wait_minutes_expression
+from app.services.analytics_rollup import analytics_rollup, peak_hours_from
+from app.utils.time_windows import hour_of_day, local_today, on_day
 from app.schemas.analytics import (
     AnalyticsResponse,
     AnalyticsSummary,
@@ -34,12 +36,17 @@ async def get_daily_analytics(
     service_id: str,
     date_str: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Récupérer les analytics journalières d'un service
+    (cumuls incrémentaux, sans recalcul)
     """
-    target_date = datetime.fromisoformat(date_str).date() if date_str else datetime.now().date()
+    target_date = datetime.fromisoformat(date_str).date() if date_str else local_today()
+    
+    # Appliquer les événements de tickets encore en attente (puis relire
+    # sur le primaire : ces endpoints restent sur get_db)
+    await analytics_rollup.flush()
     
     stmt = select(Analytics).where(
         and_(
@@ -66,7 +73,7 @@ async def get_weekly_analytics(
     service_id: str,
     week_start: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Récupérer les analytics hebdomadaires d'un service
@@ -75,9 +82,11 @@ async def get_weekly_analytics(
         start_date = datetime.fromisoformat(week_start).date()
     else:
         # Début de la semaine actuelle (lundi)
-        today = datetime.now().date()
+        today = local_today()
         start_date = today - timedelta(days=today.weekday())
     
+    await analytics_rollup.flush()
+    
     end_date = start_date + timedelta(days=6)
     
     # Récupérer les analytics de la semaine
@@ -93,7 +102,13 @@ async def get_weekly_analytics(
     
     # Calculer les totaux
     total_tickets = sum(a.total_tickets for a in weekly_analytics)
-    avg_wait_time = sum(a.average_wait_time for a in weekly_analytics) / len(weekly_analytics) if weekly_analytics else 0
+    
+    # Moyenne pondérée par le nombre de tickets appelés chaque jour
+    wait_samples = sum(a.wait_time_samples for a in weekly_analytics)
+    if wait_samples:
+        avg_wait_time = sum(a.wait_time_total for a in weekly_analytics) / wait_samples
+    else:
+        avg_wait_time = sum(a.average_wait_time for a in weekly_analytics) / len(weekly_analytics) if weekly_analytics else 0
     
     # Trouver le jour le plus chargé
     busiest_day = max(weekly_analytics, key=lambda a: a.total_tickets).date.isoformat() if weekly_analytics else None
@@ -128,8 +143,8 @@ async def get_monthly_analytics(
     service_id: str,
     month: int = None,
     year: int = None,
-    db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_read_db),
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Récupérer les analytics mensuelles d'un service
@@ -181,8 +196,8 @@ async def get_monthly_analytics(
 async def get_performance_metrics(
     service_id: str,
     date_str: Optional[str] = None,
-    db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_read_db),
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Récupérer les métriques de performance d'un service
@@ -220,12 +235,14 @@ async def get_peak_hours(
     service_id: str,
     date_str: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Récupérer les heures de pointe d'un service
     """
-    target_date = datetime.fromisoformat(date_str).date() if date_str else datetime.now().date()
+    target_date = datetime.fromisoformat(date_str).date() if date_str else local_today()
+    
+    await analytics_rollup.flush()
     
     stmt = select(Analytics).where(
         and_(
@@ -261,8 +278,8 @@ async def get_satisfaction_rate(
     service_id: str,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_read_db),
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Récupérer le taux de satisfaction d'un service sur une période
@@ -315,8 +332,8 @@ async def get_satisfaction_rate(
 @router.get("/recommendations/{service_id}")
 async def get_recommendations(
     service_id: str,
-    db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_read_db),
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Récupérer les recommandations d'optimisation pour un service
@@ -385,13 +402,18 @@ async def get_recommendations(
 async def update_analytics(
     service_id: str,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Mettre à jour les analytics d'un service pour aujourd'hui
-    (Calculer automatiquement à partir des tickets et guichets)
+    (Recalcul complet à partir des tickets et guichets ; les cumuls
+    incrémentaux repartent ensuite de ces valeurs)
     """
-    today = datetime.now().date()
+    today = local_today()
+    dialect = db.get_bind().dialect.name
+    
+    # Les événements déjà en attente sont inclus dans le recalcul
+    await analytics_rollup.flush()
     
     # Récupérer ou créer l'entrée analytics
     stmt = select(Analytics).where(
@@ -407,29 +429,89 @@ async def update_analytics(
         analytics = Analytics.create_daily_analytics(service_id, today)
         db.add(analytics)
     
-    # Compter les tickets
-    stmt = select(Ticket).where(
-        and_(
-            Ticket.service_id == service_id,
-            func.date(Ticket.created_at) == today
+    # Compter les tickets (par statut, en SQL)
+    stmt = (
+        select(Ticket.status, func.count(Ticket.id))
+        .where(
+            and_(
+                Ticket.service_id == service_id,
+                on_day(Ticket.created_at, today)
+            )
+        )
+        .group_by(Ticket.status)
+    )
+    result = await db.execute(stmt)
+    status_counts = {ticket_status: count for ticket_status, count in result.all()}
+    
+    analytics.total_tickets = sum(status_counts.values())
+    analytics.completed_tickets = status_counts.get(TicketStatus.COMPLETED, 0)
+    analytics.cancelled_tickets = status_counts.get(TicketStatus.CANCELLED, 0)
+    analytics.no_show_tickets = status_counts.get(TicketStatus.NO_SHOW, 0)
+    analytics.pending_tickets = status_counts.get(TicketStatus.WAITING, 0)
+    analytics.rejected_documents_count = status_counts.get(TicketStatus.REJECTED, 0)
+    
+    # Calculer les temps d'attente (agrégats SQL)
+    wait_stats = await ticket_crud.get_wait_time_stats(db, day=today, service_id=service_id)
+    if wait_stats["count"]:
+        analytics.average_wait_time = wait_stats["average"]
+        analytics.min_wait_time = wait_stats["min"]
+        analytics.max_wait_time = wait_stats["max"]
+        analytics.median_wait_time = wait_stats["median"]
+    analytics.wait_time_total = wait_stats["average"] * wait_stats["count"]
+    analytics.wait_time_samples = wait_stats["count"]
+    
+    # Temps de traitement des tickets terminés
+    duration = service_minutes_expression(dialect)
+    stmt = (
+        select(func.count(duration), func.sum(duration), func.min(duration), func.max(duration))
+        .where(
+            and_(
+                Ticket.service_id == service_id,
+                Ticket.status == TicketStatus.COMPLETED,
+                on_day(Ticket.created_at, today)
+            )
         )
     )
     result = await db.execute(stmt)
-    all_tickets = result.scalars().all()
-    
-    analytics.total_tickets = len(all_tickets)
-    analytics.completed_tickets = len([t for t in all_tickets if t.status == TicketStatus.COMPLETED])
-    analytics.cancelled_tickets = len([t for t in all_tickets if t.status == TicketStatus.CANCELLED])
-    analytics.no_show_tickets = len([t for t in all_tickets if t.status == TicketStatus.NO_SHOW])
-    analytics.pending_tickets = len([t for t in all_tickets if t.status == TicketStatus.WAITING])
-    
-    # Calculer les temps d'attente
-    wait_times = [t.actual_wait_time for t in all_tickets if t.actual_wait_time]
-    if wait_times:
-        analytics.average_wait_time = sum(wait_times) / len(wait_times)
-        analytics.min_wait_time = min(wait_times)
-        analytics.max_wait_time = max(wait_times)
-        analytics.median_wait_time = sorted(wait_times)[len(wait_times) // 2]
+    service_samples, service_total, service_min, service_max = result.one()
+    analytics.service_time_samples = service_samples or 0
+    analytics.service_time_total = float(service_total or 0.0)
+    if service_samples:
+        analytics.average_service_time = analytics.service_time_total / service_samples
+        analytics.min_service_time = float(service_min)
+        analytics.max_service_time = float(service_max)
+    
+    # Distribution horaire (heure locale)
+    hour = hour_of_day(Ticket.created_at, dialect).label("hour")
+    wait = wait_minutes_expression(dialect)
+    stmt = (
+        select(
+            hour,
+            func.count(Ticket.id),
+            func.sum(case((Ticket.called_at.isnot(None), wait))),
+            func.count(Ticket.called_at)
+        )
+        .where(
+            and_(
+                Ticket.service_id == service_id,
+                on_day(Ticket.created_at, today)
+            )
+        )
+        .group_by(hour)
+        .order_by(hour)
+    )
+    result = await db.execute(stmt)
+    distribution = {}
+    for hour_value, count, wait_total, wait_samples in result.all():
+        wait_total = float(wait_total or 0.0)
+        distribution[f"{hour_value:02d}:00"] = {
+            "tickets": count,
+            "wait_total": wait_total,
+            "wait_samples": wait_samples,
+            "avg_wait": wait_total / wait_samples if wait_samples else 0.0
+        }
+    analytics.hourly_distribution = distribution
+    analytics.peak_hours = peak_hours_from(distribution)
     
     # Compter les guichets
     stmt = select(Counter).where(Counter.service_id == service_id)
@@ -6,8 +6,8 @@ from app.core.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, UserResponse, TokenResponse
 from app.core.security import (
-    get_password_hash,
-    verify_password,
+    hash_password_async,
+    verify_password_async,
     create_access_token,
     create_refresh_token,
 )
@@ -39,7 +39,7 @@ async def register(
     # Créer le nouvel utilisateur
     new_user = User(
         email=user_data.email,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await hash_password_async(user_data.password),
         full_name=user_data.full_name,
         phone=user_data.phone,
         role=user_data.role,
@@ -84,7 +84,11 @@ async def login(
     result = await db.execute(select(User).where(User.email == credentials.email))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    valid, new_hash = await verify_password_async(
+        credentials.password,
+        user.hashed_password if user else None
+    )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou mot de passe incorrect"
@@ -96,6 +100,11 @@ async def login(
             detail="Compte désactivé"
         )
 
+    # Coût bcrypt modifié depuis la création du hash : on le remplace
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+
     # Générer les tokens
     access_token = create_access_token(data={"sub": str(user.id), "role": user.role})
     refresh_token = create_refresh_token(data={"sub": str(user.id)})
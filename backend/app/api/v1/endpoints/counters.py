@@ -10,7 +10,7 @@ from typing import List
 from datetime import datetime
 
 from app.core.database import get_db
-from app.api.v1.deps import get_current_admin
+from app.api.v1.deps import Principal, get_current_admin
 from app.models.user import User
 from app.models.counter import Counter, CounterStatus
 from app.models.service import Service
@@ -23,16 +23,26 @@ from app.schemas.counter import (
     CounterWithAgent,
     CounterStats
 )
+from app.services.response_cache import response_cache, service_tags
+from app.services.rolling_stats import rolling_stats
 
 router = APIRouter()
 
 
+def _average_service_time(counter: Counter) -> int:
+    """Temps de service moyen mesuré du guichet (feature store), sinon la colonne"""
+    observed = rolling_stats.average_service_time(counter_id=counter.id)
+    if observed is None:
+        return counter.average_service_time
+    return max(1, round(observed))
+
+
 # ========== CREATE COUNTER ==========
 @router.post("/", response_model=CounterResponse, status_code=status.HTTP_201_CREATED)
 async def create_counter(
     counter_data: CounterCreate,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Créer un nouveau guichet pour un service
@@ -74,6 +84,7 @@ async def create_counter(
     # Mettre à jour le service
     service.total_counters += 1
     
+    response_cache.invalidate_on_commit(db, *service_tags(counter_data.service_id))
     await db.commit()
     await db.refresh(new_counter)
     
@@ -85,7 +96,7 @@ async def create_counter(
 async def get_service_counters(
     service_id: str,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Récupérer tous les guichets d'un service
@@ -97,6 +108,7 @@ async def get_service_counters(
     # Enrichir avec les informations de l'agent
     counters_with_agents = []
     for counter in counters:
+        average_service_time = _average_service_time(counter)
         counter_dict = {
             "id": counter.id,
             "service_id": counter.service_id,
@@ -108,7 +120,7 @@ async def get_service_counters(
             "priority_type": counter.priority_type,
             "tickets_processed_today": counter.tickets_processed_today,
             "total_tickets_processed": counter.total_tickets_processed,
-            "average_service_time": counter.average_service_time,
+            "average_service_time": average_service_time,
             "is_active": counter.is_active,
             "max_tickets_per_day": counter.max_tickets_per_day,
             "created_at": counter.created_at.isoformat(),
@@ -136,7 +148,7 @@ async def get_service_counters(
 async def get_counter(
     counter_id: str,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Récupérer un guichet par son ID
@@ -148,6 +160,7 @@ async def get_counter(
     if not counter:
         raise HTTPException(status_code=404, detail="Guichet non trouvé")
     
+    average_service_time = _average_service_time(counter)
     counter_dict = {
         "id": counter.id,
         "service_id": counter.service_id,
@@ -159,7 +172,7 @@ async def get_counter(
         "priority_type": counter.priority_type,
         "tickets_processed_today": counter.tickets_processed_today,
         "total_tickets_processed": counter.total_tickets_processed,
-        "average_service_time": counter.average_service_time,
+        "average_service_time": average_service_time,
         "is_active": counter.is_active,
         "max_tickets_per_day": counter.max_tickets_per_day,
         "created_at": counter.created_at.isoformat(),
@@ -186,7 +199,7 @@ async def update_counter_status(
     counter_id: str,
     status_data: CounterStatusUpdate,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Ouvrir/Fermer/Mettre en pause un guichet
@@ -225,6 +238,7 @@ async def update_counter_status(
         if service:
             service.active_counters = max(0, service.active_counters - 1)
     
+    response_cache.invalidate_on_commit(db, *service_tags(counter.service_id))
     await db.commit()
     await db.refresh(counter)
     
@@ -245,7 +259,7 @@ async def assign_agent_to_counter(
     counter_id: str,
     agent_data: CounterAgentAssign,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Assigner un agent à un guichet
@@ -286,6 +300,7 @@ async def assign_agent_to_counter(
     counter.agent_id = agent_data.agent_id
     counter.updated_at = datetime.utcnow()
     
+    response_cache.invalidate_on_commit(db, *service_tags(counter.service_id))
     await db.commit()
     await db.refresh(counter)
     
@@ -306,7 +321,7 @@ async def assign_agent_to_counter(
 async def remove_agent_from_counter(
     counter_id: str,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Retirer l'agent d'un guichet
@@ -334,6 +349,7 @@ async def remove_agent_from_counter(
     counter.agent_id = None
     counter.updated_at = datetime.utcnow()
     
+    response_cache.invalidate_on_commit(db, *service_tags(counter.service_id))
     await db.commit()
     await db.refresh(counter)
     
@@ -354,7 +370,7 @@ async def update_counter(
     counter_id: str,
     counter_data: CounterUpdate,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Mettre à jour un guichet
@@ -378,6 +394,7 @@ async def update_counter(
     
     counter.updated_at = datetime.utcnow()
     
+    response_cache.invalidate_on_commit(db, *service_tags(counter.service_id))
     await db.commit()
     await db.refresh(counter)
     
@@ -389,7 +406,7 @@ async def update_counter(
 async def delete_counter(
     counter_id: str,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Supprimer un guichet
@@ -421,6 +438,7 @@ async def delete_counter(
         if counter.status == CounterStatus.OPEN:
             service.active_counters = max(0, service.active_counters - 1)
     
+    response_cache.invalidate_on_commit(db, *service_tags(counter.service_id))
     await db.commit()
     
     return {
@@ -434,7 +452,7 @@ async def delete_counter(
 async def get_counter_stats(
     counter_id: str,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Récupérer les statistiques d'un guichet
@@ -447,11 +465,12 @@ async def get_counter_stats(
         raise HTTPException(status_code=404, detail="Guichet non trouvé")
     
     # Calculer le score d'efficacité
+    average_service_time = _average_service_time(counter)
     efficiency_score = 0.0
     if counter.total_tickets_processed > 0:
         # Score basé sur le nombre de tickets traités et le temps moyen
         tickets_score = min(counter.tickets_processed_today / 20 * 50, 50)  # Max 50 points
-        time_score = max(0, 50 - (counter.average_service_time - 10) * 2)  # Max 50 points
+        time_score = max(0, 50 - (average_service_time - 10) * 2)  # Max 50 points
         efficiency_score = tickets_score + time_score
     
     agent_name = None
@@ -467,7 +486,7 @@ async def get_counter_stats(
         "counter_number": counter.counter_number,
         "tickets_processed_today": counter.tickets_processed_today,
         "total_tickets_processed": counter.total_tickets_processed,
-        "average_service_time": counter.average_service_time,
+        "average_service_time": average_service_time,
         "current_status": counter.status,
         "agent_name": agent_name,
         "efficiency_score": efficiency_score
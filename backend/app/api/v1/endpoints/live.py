@@ -0,0 +1,162 @@
+"""
+ViteviteApp - Live Endpoints
+Push temps réel de l'état des files et des tickets (WebSocket + SSE)
+
+Alternative au polling de /queue/status et /tickets/{id} : le client reçoit
+un snapshot à l'abonnement puis uniquement des diffs. Les changements faits
+par les autres workers arrivent par le relais Redis, sinon après la
+relecture périodique (BROADCAST_RESYNC_SECONDS).
+EventSource/WebSocket ne permettant pas d'envoyer de header, le token admin
+des files de service est passé en paramètre `token`.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import AsyncGenerator, Optional
+import asyncio
+import json
+
+from app.core.database import get_db, AsyncSessionLocal
+from app.api.v1.deps import authenticate_token
+from app.models.user import UserRole
+from app.models.ticket import Ticket
+from app.models.service import Service
+from app.services.queue_broadcaster import Subscription, queue_broadcaster
+
+router = APIRouter()
+
+# Intervalle de keep-alive (secondes)
+KEEPALIVE_SECONDS = 15
+
+
+# ========== HELPERS ==========
+async def _require_admin(token: Optional[str], db: AsyncSession) -> None:
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token requis")
+
+    user = await authenticate_token(token, db)
+    if user.role not in [UserRole.ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Accès réservé aux administrateurs"
+        )
+
+
+async def _subscribe_service(service_id: str, token: Optional[str], db: AsyncSession) -> Subscription:
+    await _require_admin(token, db)
+
+    result = await db.execute(select(Service.id).where(Service.id == service_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Service non trouvé")
+
+    return await queue_broadcaster.subscribe_service(db, service_id)
+
+
+async def _subscribe_ticket(ticket_id: str, db: AsyncSession) -> Subscription:
+    ticket = await db.get(Ticket, ticket_id)
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Ticket non trouvé")
+
+    return await queue_broadcaster.subscribe_ticket(db, ticket)
+
+
+async def _stream_websocket(websocket: WebSocket, subscription: Subscription) -> None:
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                message = {"type": "ping"}
+            await websocket.send_json(message)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        queue_broadcaster.unsubscribe(subscription)
+
+
+async def _stream_sse(request: Request, subscription: Subscription) -> AsyncGenerator[str, None]:
+    try:
+        while not await request.is_disconnected():
+            try:
+                message = await asyncio.wait_for(subscription.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {message['type']}\ndata: {json.dumps(message, default=str)}\n\n"
+    finally:
+        queue_broadcaster.unsubscribe(subscription)
+
+
+def _sse_response(request: Request, subscription: Subscription) -> StreamingResponse:
+    return StreamingResponse(
+        _stream_sse(request, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# ========== WEBSOCKET ==========
+@router.websocket("/ws/services/{service_id}")
+async def service_queue_websocket(
+    websocket: WebSocket,
+    service_id: str,
+    token: Optional[str] = Query(None)
+):
+    """
+    Flux temps réel de la file d'un service (admin)
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            subscription = await _subscribe_service(service_id, token, db)
+        except HTTPException as e:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+            return
+
+    await websocket.accept()
+    await _stream_websocket(websocket, subscription)
+
+
+@router.websocket("/ws/tickets/{ticket_id}")
+async def ticket_websocket(websocket: WebSocket, ticket_id: str):
+    """
+    Flux temps réel du statut et de la position d'un ticket
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            subscription = await _subscribe_ticket(ticket_id, db)
+        except HTTPException as e:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+            return
+
+    await websocket.accept()
+    await _stream_websocket(websocket, subscription)
+
+
+# ========== SERVER-SENT EVENTS ==========
+@router.get("/sse/services/{service_id}")
+async def service_queue_events(
+    service_id: str,
+    request: Request,
+    token: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Flux SSE de la file d'un service (fallback WebSocket, admin)
+    """
+    subscription = await _subscribe_service(service_id, token, db)
+    return _sse_response(request, subscription)
+
+
+@router.get("/sse/tickets/{ticket_id}")
+async def ticket_events(
+    ticket_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Flux SSE du statut et de la position d'un ticket
+    """
+    subscription = await _subscribe_ticket(ticket_id, db)
+    return _sse_response(request, subscription)
@@ -10,7 +10,7 @@ from typing import List
 from datetime import datetime
 
 from app.core.database import get_db
-from app.api.v1.deps import get_current_admin
+from app.api.v1.deps import Principal, get_current_admin
 from app.models.user import User
 from app.models.notification import Notification, NotificationTarget
 from app.models.service import Service
@@ -33,7 +33,7 @@ router = APIRouter()
 async def send_broadcast_notification(
     notification_data: NotificationBroadcast,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Envoyer une notification globale à tous les usagers
@@ -73,7 +73,7 @@ async def send_broadcast_notification(
 async def send_targeted_notification(
     notification_data: NotificationTargeted,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Envoyer une notification ciblée à des usagers spécifiques
@@ -119,7 +119,7 @@ async def send_targeted_notification(
 async def send_individual_notification(
     notification_data: NotificationIndividual,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Envoyer une notification à un seul usager
@@ -166,7 +166,7 @@ async def notify_queue(
     notification_type: str = "info",
     channels: List[str] = ["push"],
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Notifier tous les usagers en file d'attente pour un service
@@ -222,7 +222,7 @@ async def notify_queue(
 # ========== GET NOTIFICATION TEMPLATES ==========
 @router.get("/templates", response_model=List[NotificationTemplate])
 async def get_notification_templates(
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Récupérer les templates de notifications prédéfinis
@@ -284,7 +284,7 @@ async def get_notification_history(
     service_id: str = None,
     limit: int = 50,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Récupérer l'historique des notifications
@@ -305,7 +305,7 @@ async def get_notification_history(
 async def get_notification_stats(
     notification_id: str,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Récupérer les statistiques d'une notification
@@ -8,6 +8,7 @@ from sqlalchemy import select
 from app.core.database import get_db
 from app.models.service import Service
 from app.services.ml_service import ml_service
+from app.services.single_flight import single_flight, time_bucket
 
 router = APIRouter()
 
@@ -27,11 +28,16 @@ async def get_prediction(service_id: str, db: AsyncSession = Depends(get_db)):
         "name": service.name,
         "category": service.category,
         "current_queue_size": service.current_queue_size,
+        "active_counters": service.active_counters,
         "affluence_level": service.affluence_level.value,
         "estimated_wait_time": service.estimated_wait_time
     }
     
-    prediction = await ml_service.predict_wait_time(service_dict)
+    # Requêtes concurrentes du même service : une seule prédiction
+    prediction = await single_flight.run(
+        ("predictions.wait_time", service.id, time_bucket()),
+        lambda: ml_service.predict_wait_time(service_dict)
+    )
     
     wait_time = prediction['predicted_wait_time']
     formatted_time = f"{wait_time} min"
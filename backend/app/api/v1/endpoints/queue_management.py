@@ -3,19 +3,29 @@ ViteviteApp - Queue Management Endpoints
 API pour la gestion dynamique des files d'attente
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 
-from app.core.database import get_db
-from app.api.v1.deps import get_current_admin
-from app.models.user import User
+from app.core.database import get_db, get_read_db
+from app.api.v1.deps import Principal, get_current_admin, get_queue_engine
 from app.models.ticket import Ticket, TicketStatus
 from app.models.counter import Counter
 from app.models.service import Service
+from app.services.queue_engine import (
+    QueueEngine,
+    RANK_REBALANCE_GAP,
+    dense_ranks,
+    pending_entries,
+    plan_ranks,
+    rebalance_queue,
+    with_pending,
+    write_ranks,
+)
+from app.services.response_cache import response_cache, service_tags
 
 router = APIRouter()
 
@@ -45,12 +55,42 @@ class QueueReorganize(BaseModel):
     ticket_order: List[str]  # Liste des IDs de tickets dans le nouvel ordre
 
 
+# ========== HELPERS ==========
+async def _apply_order(
+    db: AsyncSession,
+    queue: QueueEngine,
+    service_id: str,
+    new_order: List[str],
+    background_tasks: BackgroundTasks
+) -> int:
+    """
+    Applique un nouvel ordre de passage en écrivant le minimum de rangs
+
+    Returns:
+        Nombre de tickets réécrits
+    """
+    entries = {e.id: e for e in await queue.waiting_entries(db, service_id)}
+    order = [entries[t_id] for t_id in new_order]
+
+    ranks, min_gap = plan_ranks(order)
+    if ranks is None:
+        # Écarts épuisés : rééquilibrage immédiat de la file (tickets en
+        # attente de validation compris, pour qu'ils ne passent pas devant)
+        ranks = dense_ranks(with_pending(order, await pending_entries(db, service_id)))
+    elif min_gap < RANK_REBALANCE_GAP:
+        background_tasks.add_task(rebalance_queue, service_id, queue)
+
+    await write_ranks(db, queue, ranks)
+    return len(ranks)
+
+
 # ========== MOVE TICKET TO ANOTHER COUNTER ==========
 @router.post("/move")
 async def move_ticket_to_counter(
     move_data: TicketMove,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin),
+    queue: QueueEngine = Depends(get_queue_engine)
 ):
     """
     Déplacer un usager vers un autre guichet
@@ -91,6 +131,7 @@ async def move_ticket_to_counter(
     old_counter_id = ticket.counter_id
     ticket.counter_id = move_data.target_counter_id
     ticket.updated_at = datetime.utcnow()
+    queue.track(db, ticket)
     
     await db.commit()
     await db.refresh(ticket)
@@ -111,8 +152,10 @@ async def move_ticket_to_counter(
 @router.post("/prioritize")
 async def prioritize_ticket(
     prioritize_data: TicketPrioritize,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin),
+    queue: QueueEngine = Depends(get_queue_engine)
 ):
     """
     Prioriser un ticket urgent (femme enceinte, handicapé, etc.)
@@ -131,40 +174,22 @@ async def prioritize_ticket(
             detail="Seuls les tickets en attente peuvent être priorisés"
         )
     
-    # Récupérer tous les tickets en attente du même service
-    stmt = select(Ticket).where(
-        and_(
-            Ticket.service_id == ticket.service_id,
-            Ticket.status == TicketStatus.WAITING
-        )
-    ).order_by(Ticket.position_in_queue)
-    result = await db.execute(stmt)
-    waiting_tickets = result.scalars().all()
+    # Ordre actuel de la file (moteur de file)
+    waiting_ids = await queue.waiting_ids(db, ticket.service_id)
     
-    if prioritize_data.new_position < 1 or prioritize_data.new_position > len(waiting_tickets):
+    if prioritize_data.new_position < 1 or prioritize_data.new_position > len(waiting_ids):
         raise HTTPException(
             status_code=400,
-            detail=f"Position invalide. Doit être entre 1 et {len(waiting_tickets)}"
+            detail=f"Position invalide. Doit être entre 1 et {len(waiting_ids)}"
         )
     
-    # Réorganiser les positions
-    old_position = ticket.position_in_queue
+    old_position = waiting_ids.index(ticket.id) + 1 if ticket.id in waiting_ids else len(waiting_ids)
     new_position = prioritize_data.new_position
     
-    # Mettre à jour les positions
-    for t in waiting_tickets:
-        if t.id == ticket.id:
-            t.position_in_queue = new_position
-        elif old_position < new_position:
-            # Déplacer vers le bas
-            if old_position < t.position_in_queue <= new_position:
-                t.position_in_queue -= 1
-        else:
-            # Déplacer vers le haut
-            if new_position <= t.position_in_queue < old_position:
-                t.position_in_queue += 1
-        
-        t.updated_at = datetime.utcnow()
+    # Nouvel ordre : seul le rang du ticket déplacé est réécrit
+    new_order = [t_id for t_id in waiting_ids if t_id != ticket.id]
+    new_order.insert(new_position - 1, ticket.id)
+    await _apply_order(db, queue, ticket.service_id, new_order, background_tasks)
     
     await db.commit()
     
@@ -185,7 +210,8 @@ async def prioritize_ticket(
 async def merge_queues(
     merge_data: QueueMerge,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin),
+    queue: QueueEngine = Depends(get_queue_engine)
 ):
     """
     Fusionner deux files d'attente (déplacer tous les tickets d'un guichet vers un autre)
@@ -213,14 +239,17 @@ async def merge_queues(
         )
     
     # Récupérer tous les tickets en attente du guichet source
-    stmt = select(Ticket).where(
-        and_(
-            Ticket.counter_id == merge_data.source_counter_id,
-            Ticket.status.in_([TicketStatus.WAITING, TicketStatus.CALLED])
-        )
-    )
-    result = await db.execute(stmt)
-    tickets_to_move = result.scalars().all()
+    entries = await queue.active_entries(db, source_counter.service_id)
+    ids_to_move = [
+        e.id for e in entries
+        if e.counter_id == merge_data.source_counter_id
+        and e.status in [TicketStatus.WAITING, TicketStatus.CALLED]
+    ]
+    tickets_to_move = []
+    if ids_to_move:
+        stmt = select(Ticket).where(Ticket.id.in_(ids_to_move))
+        result = await db.execute(stmt)
+        tickets_to_move = result.scalars().all()
     
     if not tickets_to_move:
         return {
@@ -234,6 +263,7 @@ async def merge_queues(
     for ticket in tickets_to_move:
         ticket.counter_id = merge_data.target_counter_id
         ticket.updated_at = datetime.utcnow()
+        queue.track(db, ticket)
         tickets_moved += 1
     
     # Fermer le guichet source
@@ -246,6 +276,7 @@ async def merge_queues(
     service = result.scalar_one_or_none()
     if service:
         service.active_counters = max(0, service.active_counters - 1)
+        response_cache.invalidate_on_commit(db, *service_tags(service.id))
     
     await db.commit()
     
@@ -269,8 +300,10 @@ async def merge_queues(
 @router.post("/reorganize")
 async def reorganize_queue(
     reorganize_data: QueueReorganize,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin),
+    queue: QueueEngine = Depends(get_queue_engine)
 ):
     """
     Réorganiser complètement la file d'attente d'un service
@@ -284,45 +317,35 @@ async def reorganize_queue(
         raise HTTPException(status_code=404, detail="Service non trouvé")
     
     # Récupérer tous les tickets en attente
-    stmt = select(Ticket).where(
-        and_(
-            Ticket.service_id == reorganize_data.service_id,
-            Ticket.status == TicketStatus.WAITING
-        )
-    )
-    result = await db.execute(stmt)
-    waiting_tickets = result.scalars().all()
-    
-    # Créer un dictionnaire pour un accès rapide
-    tickets_dict = {str(t.id): t for t in waiting_tickets}
+    waiting_ids = set(await queue.waiting_ids(db, reorganize_data.service_id))
     
     # Vérifier que tous les IDs sont valides
     for ticket_id in reorganize_data.ticket_order:
-        if ticket_id not in tickets_dict:
+        if ticket_id not in waiting_ids:
             raise HTTPException(
                 status_code=400,
                 detail=f"Ticket {ticket_id} non trouvé ou pas en attente"
             )
     
     # Vérifier que tous les tickets sont inclus
-    if len(reorganize_data.ticket_order) != len(waiting_tickets):
+    if len(set(reorganize_data.ticket_order)) != len(waiting_ids) or len(reorganize_data.ticket_order) != len(waiting_ids):
         raise HTTPException(
             status_code=400,
             detail="Tous les tickets en attente doivent être inclus dans le nouvel ordre"
         )
     
-    # Réorganiser les positions
-    for new_position, ticket_id in enumerate(reorganize_data.ticket_order, start=1):
-        ticket = tickets_dict[ticket_id]
-        ticket.position_in_queue = new_position
-        ticket.updated_at = datetime.utcnow()
+    # Seuls les tickets sortis de l'ordre existant reçoivent un nouveau rang
+    tickets_updated = await _apply_order(
+        db, queue, reorganize_data.service_id, reorganize_data.ticket_order, background_tasks
+    )
     
     await db.commit()
     
     return {
         "success": True,
         "message": f"File d'attente réorganisée pour le service {service.name}",
-        "total_tickets": len(reorganize_data.ticket_order)
+        "total_tickets": len(reorganize_data.ticket_order),
+        "tickets_updated": tickets_updated
     }
 
 
@@ -330,8 +353,9 @@ async def reorganize_queue(
 @router.get("/status/{service_id}")
 async def get_queue_status(
     service_id: str,
-    db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_read_db),
+    admin: Principal = Depends(get_current_admin),
+    queue: QueueEngine = Depends(get_queue_engine)
 ):
     """
     Récupérer l'état actuel de la file d'attente d'un service
@@ -344,15 +368,16 @@ async def get_queue_status(
     if not service:
         raise HTTPException(status_code=404, detail="Service non trouvé")
     
-    # Récupérer tous les tickets actifs
-    stmt = select(Ticket).where(
-        and_(
-            Ticket.service_id == service_id,
-            Ticket.status.in_([TicketStatus.WAITING, TicketStatus.CALLED, TicketStatus.SERVING])
-        )
-    ).order_by(Ticket.position_in_queue)
-    result = await db.execute(stmt)
-    active_tickets = result.scalars().all()
+    # Tickets actifs (moteur de file), position dérivée du rang
+    active_tickets = await queue.active_entries(db, service_id)
+    tickets_data = []
+    rank = 0
+    for entry in active_tickets:
+        data = entry.to_dict()
+        if entry.status == TicketStatus.WAITING:
+            rank += 1
+            data["position_in_queue"] = rank
+        tickets_data.append(data)
     
     # Récupérer les guichets
     stmt = select(Counter).where(Counter.service_id == service_id)
@@ -377,17 +402,6 @@ async def get_queue_status(
             }
             for c in counters
         ],
-        "active_tickets": [
-            {
-                "id": t.id,
-                "ticket_number": t.ticket_number,
-                "user_name": t.user_name,
-                "status": t.status,
-                "position_in_queue": t.position_in_queue,
-                "counter_id": t.counter_id,
-                "estimated_wait_time": t.estimated_wait_time
-            }
-            for t in active_tickets
-        ],
+        "active_tickets": tickets_data,
         "total_active_tickets": len(active_tickets)
     }
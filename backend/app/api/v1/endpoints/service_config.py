@@ -10,8 +10,7 @@ from typing import List
 from datetime import datetime
 
 from app.core.database import get_db
-from app.api.v1.deps import get_current_admin
-from app.models.user import User
+from app.api.v1.deps import Principal, get_current_admin
 from app.models.service import Service
 from app.models.service_config import ServiceConfig
 from app.schemas.service_config import (
@@ -20,6 +19,7 @@ from app.schemas.service_config import (
     ServiceConfigResponse,
     DocumentRequired
 )
+from app.services.response_cache import response_cache, service_tags
 
 router = APIRouter()
 
@@ -30,7 +30,7 @@ async def create_or_update_service_config(
     service_id: str,
     config_data: ServiceConfigCreate,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Créer ou mettre à jour la configuration d'un service
@@ -55,6 +55,7 @@ async def create_or_update_service_config(
                 setattr(existing_config, key, value)
         
         existing_config.updated_at = datetime.utcnow()
+        response_cache.invalidate_on_commit(db, *service_tags(service_id))
         await db.commit()
         await db.refresh(existing_config)
         
@@ -63,6 +64,7 @@ async def create_or_update_service_config(
         # Créer une nouvelle config
         new_config = ServiceConfig(**config_data.dict())
         db.add(new_config)
+        response_cache.invalidate_on_commit(db, *service_tags(service_id))
         await db.commit()
         await db.refresh(new_config)
         
@@ -74,7 +76,7 @@ async def create_or_update_service_config(
 async def get_service_config(
     service_id: str,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Récupérer la configuration d'un service
@@ -95,7 +97,7 @@ async def update_service_config(
     service_id: str,
     config_data: ServiceConfigUpdate,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Mettre à jour partiellement la configuration d'un service
@@ -113,6 +115,7 @@ async def update_service_config(
     
     config.updated_at = datetime.utcnow()
     
+    response_cache.invalidate_on_commit(db, *service_tags(service_id))
     await db.commit()
     await db.refresh(config)
     
@@ -125,7 +128,7 @@ async def manage_required_documents(
     service_id: str,
     documents: List[DocumentRequired],
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Gérer les documents requis pour un service
@@ -143,6 +146,7 @@ async def manage_required_documents(
     config.required_documents = documents_list
     config.updated_at = datetime.utcnow()
     
+    response_cache.invalidate_on_commit(db, *service_tags(service_id))
     await db.commit()
     await db.refresh(config)
     
@@ -159,7 +163,7 @@ async def manage_opening_hours(
     service_id: str,
     opening_hours: dict,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Gérer les horaires d'ouverture d'un service
@@ -189,6 +193,7 @@ async def manage_opening_hours(
     config.opening_hours = opening_hours
     config.updated_at = datetime.utcnow()
     
+    response_cache.invalidate_on_commit(db, *service_tags(service_id))
     await db.commit()
     await db.refresh(config)
     
@@ -208,7 +213,7 @@ async def manage_pricing(
     currency: str = "FCFA",
     payment_methods: List[str] = [],
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Gérer les tarifs d'un service
@@ -226,6 +231,7 @@ async def manage_pricing(
     config.payment_methods = payment_methods
     config.updated_at = datetime.utcnow()
     
+    response_cache.invalidate_on_commit(db, *service_tags(service_id))
     await db.commit()
     await db.refresh(config)
     
@@ -249,7 +255,7 @@ async def manage_processing_time(
     min_processing_time: int = None,
     max_processing_time: int = None,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Définir les temps de traitement pour un service
@@ -278,6 +284,7 @@ async def manage_processing_time(
     if service:
         service.average_service_time = average_processing_time
     
+    response_cache.invalidate_on_commit(db, *service_tags(service_id))
     await db.commit()
     await db.refresh(config)
     
@@ -297,7 +304,7 @@ async def manage_processing_time(
 async def delete_service_config(
     service_id: str,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Supprimer la configuration d'un service
@@ -310,6 +317,7 @@ async def delete_service_config(
         raise HTTPException(status_code=404, detail="Configuration non trouvée")
     
     await db.delete(config)
+    response_cache.invalidate_on_commit(db, *service_tags(service_id))
     await db.commit()
     
     return {
@@ -2,14 +2,17 @@
 ViteviteApp - Services Endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import Optional
 
-from app.core.database import get_db
+from app.core.database import get_read_db
+from app.crud.service import merge_live_fields, service_crud
 from app.models.service import Service, ServiceStatus
 from app.schemas.service import ServicePublic, ServicesListResponse
 from app.services.smart_prediction import smart_prediction_service
+from app.services.response_cache import response_cache, SERVICES_TAG, SERVICES_LIST_TAG, service_tag
 
 router = APIRouter()
 
@@ -18,52 +21,81 @@ router = APIRouter()
 async def get_services(
     category: Optional[str] = None,
     status: Optional[str] = None,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Récupère tous les services"""
+    """
+    Récupère tous les services
+    Catalogue en cache (invalidé par les écritures) ; état des files
+    (statut, taille, attente, affluence) relu à chaque requête
+    """
     
-    query = select(Service)
+    async def load():
+        query = select(Service)
+        
+        if category:
+            query = query.where(Service.category == category)
+        
+        result = await db.execute(query)
+        services = result.scalars().all()
+        
+        return ServicesListResponse(
+            success=True,
+            total=len(services),
+            services=[ServicePublic.model_validate(s) for s in services]
+        ).model_dump(mode="json")
     
-    if category:
-        query = query.where(Service.category == category)
+    payload = await response_cache.get_or_load(
+        f"services:list:{category}",
+        load,
+        tags=(SERVICES_TAG, SERVICES_LIST_TAG)
+    )
     
+    live = await service_crud.get_live_fields(db, service_ids=[s["id"] for s in payload["services"]])
+    services = [merge_live_fields(s, live.get(s["id"])) for s in payload["services"] if s["id"] in live]
     if status:
-        query = query.where(Service.status == status)
-    
-    result = await db.execute(query)
-    services = result.scalars().all()
+        services = [s for s in services if s["status"] == status]
     
-    return ServicesListResponse(
-        success=True,
-        total=len(services),
-        services=[ServicePublic.model_validate(s) for s in services]
-    )
+    return JSONResponse({**payload, "total": len(services), "services": services})
 
 
 @router.get("/{service_id}", response_model=dict)
-async def get_service(service_id: str, db: AsyncSession = Depends(get_db)):
+async def get_service(service_id: str, db: AsyncSession = Depends(get_read_db)):
     """Récupère un service par ID"""
     
-    result = await db.execute(select(Service).where(Service.id == service_id))
-    service = result.scalar_one_or_none()
+    async def load():
+        result = await db.execute(select(Service).where(Service.id == service_id))
+        service = result.scalar_one_or_none()
+        if not service:
+            return None
+        return {"service": ServicePublic.model_validate(service).model_dump(mode="json")}
     
-    if not service:
+    cached = await response_cache.get_or_load(
+        f"services:{service_id}",
+        load,
+        tags=(SERVICES_TAG, service_tag(service_id))
+    )
+    
+    live = (await service_crud.get_live_fields(db, service_ids=[service_id])).get(service_id)
+    if not cached or not live:
         raise HTTPException(status_code=404, detail="Service non trouvé")
     
-    # Prédiction intelligente
+    # État de la file relu en base (le cache peut dater d'un autre worker)
+    service = merge_live_fields(cached["service"], live)
+    
+    # Prédiction intelligente (dépend de l'heure : jamais en cache)
     service_data = {
-        "id": service.id,
-        "name": service.name,
-        "type": service.category,
-        "total_queue_size": service.current_queue_size,
-        "total_active_counters": service.active_counters,
-        "is_open": service.status == ServiceStatus.OPEN
+        "id": service["id"],
+        "name": service["name"],
+        "type": service["category"],
+        "total_queue_size": service["current_queue_size"],
+        "total_active_counters": live["active_counters"],
+        "is_open": service["status"] == ServiceStatus.OPEN.value
     }
     
     prediction = smart_prediction_service.predict_wait_time(service_data)
     
     return {
         "success": True,
-        "service": ServicePublic.model_validate(service),
+        "service": service,
         "prediction": prediction
     }
\ No newline at end of file
@@ -6,12 +6,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from datetime import datetime
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db, is_replica_session, AsyncSessionLocal
 from app.models.ticket import Ticket, TicketStatus
 from app.models.service import Service
-from app.models.user import User
+from app.models.counter import Counter
 from app.schemas.ticket import TicketCreate, TicketPublic, TicketResponse
-from app.api.v1.deps import get_current_user, get_current_admin
+from app.api.v1.deps import Principal, get_current_user, get_current_admin, get_queue_engine
+from app.services.queue_engine import QueueEngine
+from app.services.analytics_rollup import analytics_rollup, TicketEvent
+from app.services.group_commit import run_write
+from app.services.response_cache import response_cache, service_tags
+from app.utils.time_windows import day_window, in_window
+from app.services.ticket_sequence import ticket_sequence_allocator
 
 router = APIRouter()
 
@@ -20,101 +26,123 @@ router = APIRouter()
 async def create_ticket(
     ticket_data: TicketCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user),
+    queue: QueueEngine = Depends(get_queue_engine)
 ):
     """Créer un nouveau ticket"""
     
-    # Vérifier que le service existe
-    result = await db.execute(select(Service).where(Service.id == ticket_data.service_id))
-    service = result.scalar_one_or_none()
-    
-    if not service:
-        raise HTTPException(status_code=404, detail="Service non trouvé")
-    
-    if service.status != "ouvert":
-        raise HTTPException(status_code=400, detail="Service fermé")
-    
-    # Compter les tickets actifs
-    count_result = await db.execute(
-        select(func.count(Ticket.id))
-        .where(Ticket.service_id == service.id)
-        .where(Ticket.status.in_([TicketStatus.WAITING, TicketStatus.CALLED, TicketStatus.SERVING]))
-    )
-    position = count_result.scalar() + 1
-    
-    # Générer le numéro de ticket
-    ticket_number = f"N-{position:03d}"
-    
-    # Calculer le temps d'attente avec SmartPredictionService
-    from app.services.smart_prediction import smart_prediction_service
-    
-    service_data = {
-        "id": service.id,
-        "name": service.name,
-        "type": service.category,
-        "total_queue_size": service.current_queue_size,
-        "total_active_counters": service.active_counters,
-        "is_open": service.status == "ouvert"
-    }
-    
-    prediction = smart_prediction_service.predict_wait_time(service_data)
-    estimated_wait_time = prediction["predicted_wait_time"]
-    
-    # Créer le ticket
-    new_ticket = Ticket(
-        service_id=service.id,
-        sub_service_id=ticket_data.sub_service_id,  # Nouveau
-        user_id=str(current_user.id),  # Convertir UUID en string pour SQLite
-        ticket_number=ticket_number,
-        position_in_queue=position,
-        status=TicketStatus.PENDING_VALIDATION,  # Nouveau: nécessite validation admin
-        user_name=ticket_data.user_name or current_user.full_name,
-        user_phone=ticket_data.user_phone or current_user.phone,
-        estimated_wait_time=estimated_wait_time,  # Utiliser la prédiction intelligente
-        notes=ticket_data.notes
-    )
-    
-    db.add(new_ticket)
-    
-    # Mettre à jour le service
-    service.current_queue_size += 1
-    
-    await db.commit()
-    await db.refresh(new_ticket)
+    async def issue(db: AsyncSession) -> TicketResponse:
+        # Vérifier que le service existe
+        result = await db.execute(select(Service).where(Service.id == ticket_data.service_id))
+        service = result.scalar_one_or_none()
+        
+        if not service:
+            raise HTTPException(status_code=404, detail="Service non trouvé")
+        
+        if service.status != "ouvert":
+            raise HTTPException(status_code=400, detail="Service fermé")
+        
+        # Nom / téléphone par défaut : ligne utilisateur complète
+        user_name, user_phone = ticket_data.user_name, ticket_data.user_phone
+        if not (user_name and user_phone):
+            user = await current_user.load(db)
+            user_name = user_name or user.full_name
+            user_phone = user_phone or user.phone
+        
+        # Générer le numéro de ticket (séquence journalière du service)
+        number = await ticket_sequence_allocator.next_number(db, service.id)
+        ticket_number = f"N-{number:03d}"
+        
+        # Calculer le temps d'attente avec SmartPredictionService
+        from app.services.smart_prediction import smart_prediction_service
+        
+        service_data = {
+            "id": service.id,
+            "name": service.name,
+            "type": service.category,
+            "total_queue_size": service.current_queue_size,
+            "total_active_counters": service.active_counters,
+            "is_open": service.status == "ouvert"
+        }
+        
+        prediction = smart_prediction_service.predict_wait_time(service_data)
+        estimated_wait_time = prediction["predicted_wait_time"]
+        
+        # Créer le ticket
+        new_ticket = Ticket(
+            service_id=service.id,
+            sub_service_id=ticket_data.sub_service_id,  # Nouveau
+            user_id=str(current_user.id),  # Convertir UUID en string pour SQLite
+            ticket_number=ticket_number,
+            position_in_queue=await queue.tail_position(db, service.id),
+            queue_rank=await queue.next_rank(db, service.id),
+            status=TicketStatus.PENDING_VALIDATION,  # Nouveau: nécessite validation admin
+            user_name=user_name,
+            user_phone=user_phone,
+            estimated_wait_time=estimated_wait_time,  # Utiliser la prédiction intelligente
+            notes=ticket_data.notes
+        )
+        
+        db.add(new_ticket)
+        analytics_rollup.record(db, TicketEvent.ISSUED, new_ticket)
+        
+        # Mettre à jour le service
+        service.current_queue_size += 1
+        response_cache.invalidate_on_commit(db, *service_tags(service.id))
+        
+        await db.flush()
+        await db.refresh(new_ticket)
+        
+        return TicketResponse(
+            success=True,
+            message="Ticket créé avec succès",
+            ticket=TicketPublic.model_validate(new_ticket)
+        )
     
-    return TicketResponse(
-        success=True,
-        message="Ticket créé avec succès",
-        ticket=TicketPublic.model_validate(new_ticket)
-    )
+    return await run_write(db, issue)
 
 
 @router.get("/{ticket_id}", response_model=dict)
-async def get_ticket(ticket_id: str, db: AsyncSession = Depends(get_db)):
+async def get_ticket(
+    ticket_id: str,
+    db: AsyncSession = Depends(get_read_db),
+    queue: QueueEngine = Depends(get_queue_engine)
+):
     """Récupère un ticket par ID"""
     
     result = await db.execute(select(Ticket).where(Ticket.id == ticket_id))
     ticket = result.scalar_one_or_none()
     
+    if not ticket and is_replica_session(db):
+        # Ticket tout juste émis : la réplique ne l'a peut-être pas encore
+        async with AsyncSessionLocal() as primary:
+            return await get_ticket(ticket_id, primary, queue)
+    
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket non trouvé")
     
+    # Position actuelle dérivée du rang dans la file
+    ticket_data = TicketPublic.model_validate(ticket)
+    position = await queue.position(db, ticket)
+    if position is not None:
+        ticket_data.position_in_queue = position
+    
     return {
         "success": True,
-        "ticket": TicketPublic.model_validate(ticket)
+        "ticket": ticket_data
     }
 
 
 @router.get("/user/me", response_model=dict)
 async def get_my_tickets(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Récupère les tickets de l'utilisateur connecté (sauf ceux en attente de validation)"""
     
     result = await db.execute(
         select(Ticket)
-        .where(Ticket.user_id == current_user.id)
+        .where(Ticket.user_id == str(current_user.id))
         .where(Ticket.status != TicketStatus.PENDING_VALIDATION)  # Filtrer les tickets non validés
         .order_by(Ticket.created_at.desc())
     )
@@ -131,7 +159,8 @@ async def get_my_tickets(
 async def cancel_ticket(
     ticket_id: str,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user),
+    queue: QueueEngine = Depends(get_queue_engine)
 ):
     """Annuler un ticket"""
     
@@ -141,20 +170,25 @@ async def cancel_ticket(
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket non trouvé")
     
-    if ticket.user_id != current_user.id and not current_user.is_admin:
+    # user_id est stocké en chaîne, l'ID du principal est un UUID
+    if ticket.user_id != str(current_user.id) and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Non autorisé")
     
     if ticket.status in [TicketStatus.COMPLETED, TicketStatus.CANCELLED]:
         raise HTTPException(status_code=400, detail="Ticket déjà terminé")
     
+    previous_status = ticket.status
     ticket.status = TicketStatus.CANCELLED
-    ticket.completed_at = datetime.utcnow().isoformat()
+    ticket.completed_at = datetime.utcnow()
+    queue.track(db, ticket)
+    analytics_rollup.record(db, TicketEvent.CANCELLED, ticket, previous_status)
     
     # Mettre à jour le service
     service_result = await db.execute(select(Service).where(Service.id == ticket.service_id))
     service = service_result.scalar_one_or_none()
     if service:
         service.current_queue_size = max(0, service.current_queue_size - 1)
+        response_cache.invalidate_on_commit(db, *service_tags(service.id))
     
     await db.commit()
     
@@ -170,7 +204,7 @@ async def get_all_tickets(
     status: Optional[str] = None,
     service_id: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Récupère tous les tickets (admin only) avec filtres"""
     
@@ -197,82 +231,114 @@ async def get_all_tickets(
 @router.post("/call-next/{service_id}")
 async def call_next_ticket(
     service_id: str,
+    counter_id: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin),
+    queue: QueueEngine = Depends(get_queue_engine)
 ):
-    """Appeler le prochain ticket (admin only)"""
-    
-    result = await db.execute(
-        select(Ticket)
-        .where(Ticket.service_id == service_id)
-        .where(Ticket.status == TicketStatus.WAITING)
-        .order_by(Ticket.created_at)
-    )
-    ticket = result.scalars().first()
-    
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Aucun ticket en attente")
-    
-    ticket.status = TicketStatus.CALLED
-    ticket.called_at = datetime.utcnow().isoformat()
-    
-    await db.commit()
-    await db.refresh(ticket)
+    """
+    Appeler le prochain ticket (admin only)
+    
+    `counter_id` (optionnel) rattache le ticket au guichet appelant : sans
+    guichet, le ticket ne compte que dans les statistiques du service.
+    """
+    
+    async def call_next(db: AsyncSession) -> dict:
+        counter = None
+        if counter_id:
+            counter = await db.get(Counter, counter_id)
+            if not counter or counter.service_id != service_id:
+                raise HTTPException(status_code=404, detail="Guichet non trouvé")
+            if not counter.is_open:
+                raise HTTPException(status_code=400, detail="Le guichet est fermé")
+        
+        ticket = await queue.next_waiting(db, service_id)
+        
+        if not ticket:
+            raise HTTPException(status_code=404, detail="Aucun ticket en attente")
+        
+        ticket.status = TicketStatus.CALLED
+        ticket.called_at = datetime.utcnow()
+        if counter:
+            ticket.counter_id = counter.id
+            counter.current_ticket_id = ticket.id
+            counter.updated_at = datetime.utcnow()
+        queue.track(db, ticket)
+        analytics_rollup.record(db, TicketEvent.CALLED, ticket, TicketStatus.WAITING)
+        
+        await db.flush()
+        await db.refresh(ticket)
+        
+        return {
+            "success": True,
+            "message": "Ticket appelé",
+            "ticket": TicketPublic.model_validate(ticket)
+        }
     
-    return {
-        "success": True,
-        "message": "Ticket appelé",
-        "ticket": TicketPublic.model_validate(ticket)
-    }
+    return await run_write(db, call_next)
 
 
 @router.post("/{ticket_id}/complete")
 async def complete_ticket(
     ticket_id: str,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin),
+    queue: QueueEngine = Depends(get_queue_engine)
 ):
     """Marquer un ticket comme terminé (admin only)"""
     
-    result = await db.execute(select(Ticket).where(Ticket.id == ticket_id))
-    ticket = result.scalar_one_or_none()
-    
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket non trouvé")
-    
-    ticket.status = TicketStatus.COMPLETED
-    ticket.completed_at = datetime.utcnow().isoformat()
-    
-    # Mettre à jour le service
-    service_result = await db.execute(select(Service).where(Service.id == ticket.service_id))
-    service = service_result.scalar_one_or_none()
-    if service:
-        service.current_queue_size = max(0, service.current_queue_size - 1)
-        service.total_tickets_served += 1
-    
-    await db.commit()
-    await db.refresh(ticket)
+    async def complete(db: AsyncSession) -> dict:
+        result = await db.execute(select(Ticket).where(Ticket.id == ticket_id))
+        ticket = result.scalar_one_or_none()
+        
+        if not ticket:
+            raise HTTPException(status_code=404, detail="Ticket non trouvé")
+        
+        if ticket.status in [TicketStatus.COMPLETED, TicketStatus.CANCELLED, TicketStatus.NO_SHOW, TicketStatus.REJECTED]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Impossible de terminer un ticket {ticket.status.value}"
+            )
+        
+        previous_status = ticket.status
+        ticket.status = TicketStatus.COMPLETED
+        ticket.completed_at = datetime.utcnow()
+        queue.track(db, ticket)
+        analytics_rollup.record(db, TicketEvent.COMPLETED, ticket, previous_status)
+        
+        # Mettre à jour le service
+        service_result = await db.execute(select(Service).where(Service.id == ticket.service_id))
+        service = service_result.scalar_one_or_none()
+        if service:
+            service.current_queue_size = max(0, service.current_queue_size - 1)
+            service.total_tickets_served += 1
+            response_cache.invalidate_on_commit(db, *service_tags(service.id))
+        
+        await db.flush()
+        await db.refresh(ticket)
+        
+        return {
+            "success": True,
+            "message": "Ticket terminé",
+            "ticket": TicketPublic.model_validate(ticket)
+        }
     
-    return {
-        "success": True,
-        "message": "Ticket terminé",
-        "ticket": TicketPublic.model_validate(ticket)
-    }
+    return await run_write(db, complete)
 
 
 @router.get("/stats/today")
 async def get_today_stats(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Statistiques du jour (admin only)"""
     
-    today = datetime.utcnow().date()
+    today = day_window()
     
     # Total tickets aujourd'hui
     total_result = await db.execute(
         select(func.count(Ticket.id))
-        .where(func.date(Ticket.created_at) == today)
+        .where(in_window(Ticket.created_at, today))
     )
     total_tickets = total_result.scalar()
     
@@ -287,7 +353,7 @@ async def get_today_stats(
     completed_result = await db.execute(
         select(func.count(Ticket.id))
         .where(Ticket.status == TicketStatus.COMPLETED)
-        .where(func.date(Ticket.created_at) == today)
+        .where(in_window(Ticket.created_at, today))
     )
     completed_tickets = completed_result.scalar()
     
@@ -310,7 +376,7 @@ async def get_today_stats(
 @router.get("/pending-validation")
 async def get_pending_tickets(
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin)
 ):
     """Récupère tous les tickets en attente de validation (admin only)"""
     
@@ -333,39 +399,47 @@ async def validate_ticket(
     ticket_id: str,
     action: str,  # "confirm" ou "reject"
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: Principal = Depends(get_current_admin),
+    queue: QueueEngine = Depends(get_queue_engine)
 ):
     """Valider ou rejeter un ticket (admin only)"""
     
-    result = await db.execute(select(Ticket).where(Ticket.id == ticket_id))
-    ticket = result.scalar_one_or_none()
-    
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket non trouvé")
-    
-    if ticket.status != TicketStatus.PENDING_VALIDATION:
-        raise HTTPException(status_code=400, detail="Ce ticket n'est pas en attente de validation")
-    
-    if action == "confirm":
-        ticket.status = TicketStatus.WAITING
-        message = "Ticket confirmé et ajouté à la file d'attente"
-    elif action == "reject":
-        ticket.status = TicketStatus.REJECTED
-        ticket.completed_at = datetime.utcnow().isoformat()
-        # Mettre à jour le service
-        service_result = await db.execute(select(Service).where(Service.id == ticket.service_id))
-        service = service_result.scalar_one_or_none()
-        if service:
-            service.current_queue_size = max(0, service.current_queue_size - 1)
-        message = "Ticket refusé"
-    else:
-        raise HTTPException(status_code=400, detail="Action invalide. Utilisez 'confirm' ou 'reject'")
-    
-    await db.commit()
-    await db.refresh(ticket)
+    async def validate(db: AsyncSession) -> dict:
+        result = await db.execute(select(Ticket).where(Ticket.id == ticket_id))
+        ticket = result.scalar_one_or_none()
+        
+        if not ticket:
+            raise HTTPException(status_code=404, detail="Ticket non trouvé")
+        
+        if ticket.status != TicketStatus.PENDING_VALIDATION:
+            raise HTTPException(status_code=400, detail="Ce ticket n'est pas en attente de validation")
+        
+        if action == "confirm":
+            ticket.status = TicketStatus.WAITING
+            analytics_rollup.record(db, TicketEvent.VALIDATED, ticket, TicketStatus.PENDING_VALIDATION)
+            message = "Ticket confirmé et ajouté à la file d'attente"
+        elif action == "reject":
+            ticket.status = TicketStatus.REJECTED
+            ticket.completed_at = datetime.utcnow()
+            analytics_rollup.record(db, TicketEvent.REJECTED, ticket, TicketStatus.PENDING_VALIDATION)
+            # Mettre à jour le service
+            service_result = await db.execute(select(Service).where(Service.id == ticket.service_id))
+            service = service_result.scalar_one_or_none()
+            if service:
+                service.current_queue_size = max(0, service.current_queue_size - 1)
+                response_cache.invalidate_on_commit(db, *service_tags(service.id))
+            message = "Ticket refusé"
+        else:
+            raise HTTPException(status_code=400, detail="Action invalide. Utilisez 'confirm' ou 'reject'")
+        
+        queue.track(db, ticket)
+        await db.flush()
+        await db.refresh(ticket)
+        
+        return {
+            "success": True,
+            "message": message,
+            "ticket": TicketPublic.model_validate(ticket)
+        }
     
-    return {
-        "success": True,
-        "message": message,
-        "ticket": TicketPublic.model_validate(ticket)
-    }
\ No newline at end of file
+    return await run_write(db, validate)
@@ -11,11 +11,12 @@ from typing import List, Optional
 from datetime import datetime
 
 from app.core.database import get_db
-from app.api.v1.deps import get_current_admin
+from app.api.v1.deps import Principal, get_current_admin, get_queue_engine
 from app.models.user import User
 from app.models.ticket import Ticket, TicketStatus
 from app.models.service import Service
 from app.models.service_config import ServiceConfig
+from app.services.queue_engine import QueueEngine
 
 router = APIRouter()
 
@@ -46,7 +47,8 @@ class TicketMarkStatus(BaseModel):
 async def scan_qr_code(
     scan_data: QRCodeScan,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin),
+    queue: QueueEngine = Depends(get_queue_engine)
 ):
     """
     Scanner et vérifier un QR code de ticket
@@ -120,18 +122,12 @@ async def scan_qr_code(
     
     # Vérifier si c'est bien le tour du ticket
     if can_proceed and ticket.status == TicketStatus.WAITING:
-        # Compter les tickets avant celui-ci
-        stmt = select(Ticket).where(
-            Ticket.service_id == ticket.service_id,
-            Ticket.status.in_([TicketStatus.WAITING, TicketStatus.CALLED]),
-            Ticket.position_in_queue < ticket.position_in_queue
-        )
-        result = await db.execute(stmt)
-        tickets_before = result.scalars().all()
+        # Compter les tickets avant celui-ci (moteur de file)
+        tickets_before = await queue.tickets_ahead(db, ticket)
         
-        if len(tickets_before) > 5:
+        if tickets_before > 5:
             validation_status = "🟡"
-            validation_message = f"Ticket valide mais {len(tickets_before)} personnes avant"
+            validation_message = f"Ticket valide mais {tickets_before} personnes avant"
     
     return {
         "success": True,
@@ -144,7 +140,7 @@ async def scan_qr_code(
             "user_name": ticket.user_name,
             "user_phone": ticket.user_phone,
             "status": ticket.status,
-            "position_in_queue": ticket.position_in_queue,
+            "position_in_queue": await queue.position(db, ticket) or ticket.position_in_queue,
             "is_paid": ticket.is_paid,
             "payment_status": ticket.payment_status,
             "documents_validated": ticket.documents_validated,
@@ -167,7 +163,7 @@ async def scan_qr_code(
 async def validate_documents(
     validation_data: DocumentValidation,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Valider les documents d'un usager
@@ -222,7 +218,7 @@ async def validate_documents(
 async def get_ticket_validation_status(
     ticket_id: str,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Récupérer le statut de validation d'un ticket
@@ -262,7 +258,7 @@ async def mark_ticket_status(
     ticket_id: str,
     mark_data: TicketMarkStatus,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Marquer un ticket comme valide/invalide/incomplet
@@ -323,7 +319,7 @@ async def mark_ticket_status(
 async def get_document_checklist(
     service_id: str,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: Principal = Depends(get_current_admin)
 ):
     """
     Récupérer la checklist des documents requis pour un service
@@ -1,10 +1,11 @@
 import json
+import os
 import secrets
 from typing import Optional, List
 from urllib.parse import quote_plus
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import field_validator, model_validator, ValidationInfo
+from pydantic import Field, field_validator, model_validator, ValidationInfo
 
 
 class Settings(BaseSettings):
@@ -36,7 +37,15 @@ class Settings(BaseSettings):
     HOST: str = "0.0.0.0"
     PORT: int = 8000
     RELOAD: bool = True
-    WORKERS: int = 1
+    # Process uvicorn : WORKERS, sinon WEB_CONCURRENCY (défaut de `uvicorn --workers`)
+    WORKERS: int = Field(default_factory=lambda: int(os.getenv("WEB_CONCURRENCY") or 1))
+
+    # Fuseau horaire des services (bornes de journée, heures de pointe)
+    TIMEZONE: str = "Africa/Abidjan"
+
+    # Calendrier des jours fériés (JSON, multi-annuel) pour les prédictions
+    # None = data/holidays_ci.json livré avec le backend
+    HOLIDAYS_FILE: Optional[str] = None
 
     # ---------------------------------------------------------
     # CORS
@@ -56,6 +65,16 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # 7 jours (pour "remember me")
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30  # 30 jours
 
+    # Hash des mots de passe (bcrypt) : calculé hors de la boucle asyncio
+    PASSWORD_BCRYPT_ROUNDS: int = 12  # Coût (2^n itérations)
+    PASSWORD_HASH_WORKERS: int = 2  # Threads bcrypt simultanés (0 = dans la boucle)
+    PASSWORD_REHASH_ON_LOGIN: bool = True  # Re-hash à la connexion si le coût a changé
+
+    # Cache des utilisateurs authentifiés (par worker) : délai maximal avant
+    # qu'une désactivation faite par un autre worker soit prise en compte
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0  # 0 = désactivé
+    PRINCIPAL_CACHE_SIZE: int = 10000
+
     # ---------------------------------------------------------
     # Base de données : SQLite par défaut
     DATABASE_URL: Optional[str] = "sqlite+aiosqlite:///./vitevite.db"
@@ -67,11 +86,84 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: Optional[str] = None
     POSTGRES_DB: Optional[str] = None
 
+    # Lectures : réplique (optionnelle) ; sans réplique, pool de lecture
+    # séparé sur le primaire qui reçoit READ_POOL_SHARE du budget
+    DATABASE_READ_URL: Optional[str] = None
+    READ_POOL_SHARE: float = 0.5
+
+    # Pool PostgreSQL : dimensionné par worker pour rester sous le budget de
+    # connexions du serveur (None = dérivé de WORKERS et POSTGRES_MAX_CONNECTIONS,
+    # WORKERS / WEB_CONCURRENCY doit donc refléter le nombre réel de process)
+    POSTGRES_MAX_CONNECTIONS: int = 100  # max_connections du serveur
+    POSTGRES_RESERVED_CONNECTIONS: int = 10  # Migrations, psql, supervision
+    POSTGRES_POOL_SIZE: Optional[int] = None
+    POSTGRES_MAX_OVERFLOW: Optional[int] = None
+    POSTGRES_POOL_TIMEOUT: float = 30.0
+    POSTGRES_POOL_RECYCLE: int = 1800  # Secondes (connexions coupées par un proxy/LB)
+    POSTGRES_POOL_PRE_PING: bool = True
+    POSTGRES_COMMAND_TIMEOUT: Optional[float] = 60.0
+    # Cache des requêtes préparées asyncpg (par connexion) ; 0 derrière
+    # PgBouncer en mode transaction
+    POSTGRES_STATEMENT_CACHE_SIZE: int = 500
+
+    # Profil SQLite : pool borné et PRAGMA appliqués à chaque connexion
+    SQLITE_POOL_SIZE: int = 5  # 0 = pas de pool (une connexion par session)
+    SQLITE_MAX_OVERFLOW: int = 5
+    SQLITE_POOL_TIMEOUT: float = 30.0
+    SQLITE_JOURNAL_MODE: str = "WAL"  # Lecteurs non bloqués par l'écrivain
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # Sûr en WAL, un fsync par checkpoint
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # Octets (0 = désactivé)
+    SQLITE_CACHE_SIZE: int = -64000  # Négatif = Kio (64 Mo)
+    SQLITE_TEMP_STORE: str = "MEMORY"
+
+    # Group commit : les écritures de tickets d'un court intervalle sont
+    # validées ensemble par une tâche unique (un COMMIT par lot)
+    GROUP_COMMIT_ENABLED: bool = False
+    GROUP_COMMIT_MAX_BATCH: int = 64
+    GROUP_COMMIT_WINDOW_MS: float = 0.0  # Attente max d'un lot (0 = unités déjà en file)
+
+    # ---------------------------------------------------------
+    # Moteur de files d'attente
+    # "sql" : lecture directe en base, correct avec plusieurs workers
+    # "memory" : état résident, uniquement si un seul process sert l'API
+    #            (uvicorn --workers 1) : les autres workers ne le voient pas
+    QUEUE_ENGINE_BACKEND: str = "sql"
+
+    # Diffusion temps réel entre workers (app/services/queue_broadcaster.py)
+    BROADCAST_RELAY: str = "auto"  # "auto" (Redis s'il répond), "redis" ou "none"
+    BROADCAST_RESYNC_SECONDS: float = 2.0  # Sans relais : relecture des files suivies (0 = désactivé)
+
+    # Numéros de ticket : taille des blocs réservés par worker
+    # (1 = réservation dans la transaction de création, sans trou)
+    TICKET_SEQUENCE_BLOCK_SIZE: int = 1
+
+    # Analytics incrémentales : les événements de tickets sont cumulés en
+    # mémoire puis écrits par lots (intervalle max, ou dès N événements)
+    ANALYTICS_ROLLUP_INTERVAL_SECONDS: float = 5.0
+    ANALYTICS_ROLLUP_BATCH_SIZE: int = 200
+
+    # ---------------------------------------------------------
+    # Tâches périodiques (un seul worker les exécute, via verrou de leader)
+    JOBS_ENABLED: bool = True
+    JOBS_JITTER_RATIO: float = 0.1  # Décalage aléatoire (fraction de l'intervalle)
+    JOBS_LOCK_FILE: Optional[str] = None  # Verrou de leader hors Postgres (tmp par défaut)
+    JOB_AFFLUENCE_INTERVAL_SECONDS: float = 60
+    JOB_ADMINISTRATION_TOTALS_INTERVAL_SECONDS: float = 60
+    JOB_BEST_VISIT_TIMES_INTERVAL_SECONDS: float = 3600
+    JOB_COUNTER_ROLLOVER_INTERVAL_SECONDS: float = 300
+
     # ---------------------------------------------------------
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     CACHE_EXPIRE_SECONDS: int = 300
 
+    # Cache des réponses publiques (catalogue, administrations)
+    # "auto" : Redis s'il répond au démarrage, sinon cache mémoire par worker
+    CACHE_ENABLED: bool = True
+    CACHE_BACKEND: str = "auto"  # "auto", "redis" ou "memory"
+    CACHE_MAX_ENTRIES: int = 1024  # Cache mémoire (LRU)
+
     # ---------------------------------------------------------
     # AI / Voice
     GEMINI_API_KEY: Optional[str] = None
@@ -79,6 +171,33 @@ class Settings(BaseSettings):
     ELEVENLABS_API_KEY: Optional[str] = None
     ELEVENLABS_VOICE_ID: str = "hgZie8MSRBRgVn6w8BzP"
 
+    # Client LLM partagé (app/ai/llm_client.py)
+    LLM_PROVIDER: str = "gemini"  # "gemini" ou "fake" (tests, dev hors ligne)
+    LLM_TIMEOUT_SECONDS: float = 8.0  # Par appel, attente du sémaphore comprise
+    LLM_MAX_CONCURRENCY: int = 8  # Appels simultanés par worker
+    LLM_MAX_RETRIES: int = 1
+    LLM_RETRY_BACKOFF_SECONDS: float = 0.5
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5  # Échecs consécutifs avant ouverture
+    LLM_BREAKER_RESET_SECONDS: float = 30.0  # Délai avant un appel d'essai
+
+    # Cache des réponses LLM (app/ai/llm_cache.py)
+    LLM_CACHE_TTL_SECONDS: float = 86400.0  # 0 = désactivé
+    LLM_CACHE_MAX_ENTRIES: int = 2048
+    LLM_CACHE_PATH: Optional[str] = None  # Fichier SQLite (persistance entre redémarrages)
+    LLM_CACHE_VERSION: str = "1"  # À incrémenter quand un prompt change
+
+    # Regroupement des prédictions identiques concurrentes (app/services/single_flight.py)
+    SINGLE_FLIGHT_BUCKET_SECONDS: float = 10.0
+
+    # Modèle ML (XGBoost) : chargé à la demande, préchauffé au démarrage
+    ML_MODEL_PATH: str = "models/queue_predictor.pkl"
+    ML_MODEL_WARMUP: bool = False  # Chargement en tâche de fond au démarrage (modèle pas encore utilisé par les endpoints)
+    ML_MODEL_MMAP: bool = True  # Tableaux NumPy du pickle (encodeurs) mappés en lecture ; le booster n'est pas partagé
+
+    # Taux glissants par service et guichet (app/services/rolling_stats.py)
+    STATS_MIN_SAMPLES: int = 3  # Tickets servis avant de remplacer les temps de référence
+    STATS_WEEKLY_WEIGHT: float = 0.3  # Poids de la dernière semaine (même créneau)
+
     ENABLE_AI: bool = True
     ENABLE_VOICE: bool = False
     ENABLE_MARKETPLACE: bool = True
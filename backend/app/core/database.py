@@ -3,7 +3,12 @@ ViteviteApp - Database Configuration
 SQLAlchemy 2.0 avec AsyncIO pour SQLite (par défaut)
 """
 
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Dict, Optional
+import time
+
+from fastapi import Request
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     create_async_engine,
@@ -11,7 +16,7 @@ from sqlalchemy.ext.asyncio import (
     AsyncEngine,
 )
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, StaticPool
 import logging
 
 from app.core.config import settings
@@ -21,31 +26,288 @@ logger = logging.getLogger(__name__)
 # ========== BASE MODEL ==========
 Base = declarative_base()
 
+# ========== POOL ==========
+class PoolMetrics:
+    """Attente au checkout et occupation du pool (par worker)"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.peak_checked_out = 0
+
+    def record(self, wait: float, checked_out: int) -> None:
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def snapshot(self, pool) -> dict:
+        size = pool.size() if hasattr(pool, "size") else None
+        checked_out = pool.checkedout() if hasattr(pool, "checkedout") else None
+        capacity = size + getattr(pool, "_max_overflow", 0) if size is not None else None
+        return {
+            "pool": type(pool).__name__,
+            "size": size,
+            "capacity": capacity,
+            "checked_out": checked_out,
+            "peak_checked_out": self.peak_checked_out,
+            "utilization": round(checked_out / capacity, 3) if capacity and checked_out is not None else None,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "average_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else None,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """Pool borné qui mesure l'attente d'une connexion libre"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        self.metrics.record(time.perf_counter() - start, self.checkedout())
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def pool_metrics(target: Optional[AsyncEngine] = None) -> dict:
+    """Métriques du pool du moteur (principal par défaut)"""
+    pool = (target or engine).pool
+    metrics = getattr(pool, "metrics", None) or PoolMetrics()
+    return metrics.snapshot(pool)
+
+
 # ========== ENGINE ==========
 
-# Forcer SQLite si DATABASE_URL n'est pas PostgreSQL
-DATABASE_URL = settings.DATABASE_URL
+def sqlite_pragmas() -> Dict[str, object]:
+    """PRAGMA du profil SQLite (configurables dans Settings)"""
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "temp_store": settings.SQLITE_TEMP_STORE,
+    }
 
-if DATABASE_URL.startswith("sqlite"):
-    # SQLite = pas de pool
-    engine: AsyncEngine = create_async_engine(
-        DATABASE_URL,
-        echo=settings.DEBUG,
+
+def create_sqlite_engine(
+    url: str,
+    pragmas: Optional[Dict[str, object]] = None,
+    echo: bool = False
+) -> AsyncEngine:
+    """
+    Moteur SQLite : pool borné de connexions aiosqlite réutilisées
+    (une connexion = un thread) et PRAGMA appliqués à l'ouverture
+
+    Args:
+        url: URL sqlite+aiosqlite
+        pragmas: PRAGMA à appliquer (profil de Settings par défaut)
+        echo: Journaliser le SQL
+    """
+    pragmas = sqlite_pragmas() if pragmas is None else pragmas
+
+    if ":memory:" in url or "mode=memory" in url:
+        # Base en mémoire : une seule connexion partagée, pas de WAL
+        pragmas = {k: v for k, v in pragmas.items() if k not in ("journal_mode", "mmap_size")}
+        pool_options = {"poolclass": StaticPool}
+    elif settings.SQLITE_POOL_SIZE <= 0:
+        # Pool désactivé : une connexion par session
+        pool_options = {"poolclass": NullPool}
+    else:
+        pool_options = {
+            "poolclass": MeteredQueuePool,
+            "pool_size": settings.SQLITE_POOL_SIZE,
+            "max_overflow": settings.SQLITE_MAX_OVERFLOW,
+            "pool_timeout": settings.SQLITE_POOL_TIMEOUT,
+        }
+
+    sqlite_engine = create_async_engine(
+        url,
+        echo=echo,
         future=True,
         connect_args={"check_same_thread": False},
-        poolclass=NullPool,
+        **pool_options,
+    )
+
+    @event.listens_for(sqlite_engine.sync_engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return sqlite_engine
+
+
+def postgres_pool_options(share: float = 1.0) -> Dict[str, object]:
+    """
+    Options du pool PostgreSQL (Settings)
+
+    Sans taille explicite, chaque worker reçoit une part égale du budget
+    de connexions du serveur (max_connections - réserve) : la moitié en
+    connexions permanentes, le reste en débordement (au plus autant).
+
+    Args:
+        share: Part du budget du worker attribuée à ce pool (pools lecture
+            et écriture sur le même serveur)
+    """
+    workers = max(1, settings.WORKERS)
+    available = settings.POSTGRES_MAX_CONNECTIONS - settings.POSTGRES_RESERVED_CONNECTIONS
+    budget = max(2, int(available * share) // workers)
+
+    pool_size = settings.POSTGRES_POOL_SIZE
+    if pool_size is None:
+        pool_size = max(1, min(20, budget // 2))
+
+    max_overflow = settings.POSTGRES_MAX_OVERFLOW
+    if max_overflow is None:
+        max_overflow = max(0, min(pool_size, budget - pool_size))
+
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.POSTGRES_POOL_TIMEOUT,
+        "pool_recycle": settings.POSTGRES_POOL_RECYCLE,
+        "pool_pre_ping": settings.POSTGRES_POOL_PRE_PING,
+    }
+
+
+def create_postgres_engine(
+    url: str,
+    echo: bool = False,
+    read_only: bool = False,
+    pool_share: float = 1.0
+) -> AsyncEngine:
+    """
+    Moteur PostgreSQL : pool dimensionné par worker et cache des requêtes
+    préparées asyncpg (côté driver et côté dialecte SQLAlchemy)
+
+    Args:
+        url: URL postgresql
+        echo: Journaliser le SQL
+        read_only: Transactions en lecture seule (pool de lecture)
+        pool_share: Part du budget de connexions (voir postgres_pool_options)
+    """
+    connect_args = {}
+    url = make_url(url)
+    if url.get_driver_name() == "asyncpg":
+        cache_size = settings.POSTGRES_STATEMENT_CACHE_SIZE
+        url = url.update_query_dict({"prepared_statement_cache_size": str(cache_size)})
+        connect_args["statement_cache_size"] = cache_size
+        if settings.POSTGRES_COMMAND_TIMEOUT:
+            connect_args["command_timeout"] = settings.POSTGRES_COMMAND_TIMEOUT
+
+    postgres_engine = create_async_engine(
+        url,
+        echo=echo,
+        future=True,
+        poolclass=MeteredQueuePool,
+        connect_args=connect_args,
+        **postgres_pool_options(pool_share),
     )
 
+    if read_only:
+        @event.listens_for(postgres_engine.sync_engine, "connect")
+        def _set_read_only(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+            cursor.close()
+
+    return postgres_engine
+
+
+# Forcer SQLite si DATABASE_URL n'est pas PostgreSQL
+DATABASE_URL = settings.DATABASE_URL
+
+if DATABASE_URL.startswith("sqlite"):
+    engine: AsyncEngine = create_sqlite_engine(DATABASE_URL, echo=settings.DEBUG)
+
 else:
     # PostgreSQL (optionnel - mais désactivé tant que tu n'es pas prêt)
-    engine: AsyncEngine = create_async_engine(
+    # Sans réplique, le pool de lecture partage le serveur : budget réparti
+    engine: AsyncEngine = create_postgres_engine(
         DATABASE_URL,
         echo=settings.DEBUG,
-        future=True,
-        pool_pre_ping=True,
+        pool_share=1.0 if settings.DATABASE_READ_URL else 1 - settings.READ_POOL_SHARE
+    )
+
+
+# ========== ENGINE DE LECTURE ==========
+# Réplique si DATABASE_READ_URL est défini, sinon pool séparé en lecture
+# seule sur le primaire : les lectures ne consomment pas les connexions
+# des écritures. Une réplique peut être en retard sur le primaire.
+def _create_read_engine() -> AsyncEngine:
+    url = settings.DATABASE_READ_URL or DATABASE_URL
+    if url.startswith("sqlite"):
+        if ":memory:" in url or "mode=memory" in url:
+            return engine
+        return create_sqlite_engine(url, pragmas={**sqlite_pragmas(), "query_only": "ON"}, echo=settings.DEBUG)
+
+    return create_postgres_engine(
+        url,
+        echo=settings.DEBUG,
+        read_only=True,
+        pool_share=1.0 if settings.DATABASE_READ_URL else settings.READ_POOL_SHARE
     )
 
 
+read_engine: AsyncEngine = _create_read_engine()
+
+
+def _pool_capacity(pool_engine: AsyncEngine) -> int:
+    pool = pool_engine.pool
+    return pool.size() + max(0, getattr(pool, "_max_overflow", 0))
+
+
+def check_pool_budget() -> Optional[Dict[str, int]]:
+    """
+    Connexions PostgreSQL ouvertes au plus par l'ensemble des workers sur le
+    primaire (pools écriture + lecture sans réplique), comparées au budget du
+    serveur ; journalise un avertissement en cas de dépassement
+
+    Returns:
+        {"workers", "per_worker", "total", "budget"} ; None hors PostgreSQL
+    """
+    if DATABASE_URL.startswith("sqlite"):
+        return None
+
+    per_worker = _pool_capacity(engine)
+    if read_engine is not engine and not settings.DATABASE_READ_URL:
+        per_worker += _pool_capacity(read_engine)
+
+    workers = max(1, settings.WORKERS)
+    report = {
+        "workers": workers,
+        "per_worker": per_worker,
+        "total": per_worker * workers,
+        "budget": settings.POSTGRES_MAX_CONNECTIONS - settings.POSTGRES_RESERVED_CONNECTIONS,
+    }
+    if report["total"] > report["budget"]:
+        logger.warning(
+            f"⚠️ Pools PostgreSQL: jusqu'à {report['total']} connexions "
+            f"({workers} workers x {per_worker}) pour un budget de {report['budget']} "
+            "(vérifier WORKERS / WEB_CONCURRENCY, POSTGRES_POOL_SIZE, POSTGRES_MAX_OVERFLOW)"
+        )
+    return report
+
+
 # ========== SESSION FACTORY ==========
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -55,6 +317,15 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+    info={"read_only": True},
+)
+
 
 # ========== DEPENDENCY FASTAPI ==========
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -69,6 +340,33 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+# Header client : lire ses propres écritures (primaire), ex. juste après
+# l'émission d'un ticket quand une réplique est configurée
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+
+
+def is_replica_session(db: AsyncSession) -> bool:
+    """Session servie par une réplique (potentiellement en retard)"""
+    return bool(settings.DATABASE_READ_URL) and bool(db.info.get("read_only"))
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session pour les endpoints en lecture seule (réplique ou pool de lecture)
+    Le header X-Read-Your-Writes route la requête vers le primaire.
+    """
+    factory = AsyncSessionLocal if request.headers.get(READ_YOUR_WRITES_HEADER) else ReadSessionLocal
+    async with factory() as session:
+        try:
+            yield session
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Database session error: {e}")
+            raise
+        finally:
+            await session.close()
+
+
 # ========== INIT DB (DEV ONLY) ==========
 async def init_db() -> None:
     """
@@ -76,7 +374,7 @@ async def init_db() -> None:
     À utiliser uniquement en dev ou pour tests.
     """
     async with engine.begin() as conn:
-        from app.models import user, service, ticket, counter, service_config, notification, analytics  # noqa
+        from app.models import user, service, ticket, ticket_sequence, counter, service_config, notification, analytics  # noqa
 
         if settings.is_development:
             await conn.run_sync(Base.metadata.drop_all)
@@ -88,6 +386,8 @@ async def init_db() -> None:
 
 # ========== CLOSE DB ==========
 async def close_db() -> None:
+    if read_engine is not engine:
+        await read_engine.dispose()
     await engine.dispose()
     logger.info("🔒 Database connection closed")
 
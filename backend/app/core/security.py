@@ -4,8 +4,10 @@ Gestion JWT, hashing passwords, permissions
 Version Async compatible FastAPI
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+import asyncio
 import secrets
 
 from jose import jwt, JWTError
@@ -20,7 +22,14 @@ from app.database import get_async_db  # fonction qui renvoie AsyncSession
 from app.models.user import User
 
 # ========= PASSWORD HASHING =========
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Coût imposé : un hash d'un autre coût est signalé par needs_update()
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -31,6 +40,56 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+# bcrypt (100-300 ms par appel) bloquerait la boucle asyncio : les endpoints
+# passent par un pool de threads dédié, dont la taille borne le nombre de
+# hash simultanés (les suivants attendent leur tour sans bloquer la boucle)
+_password_executor: Optional[ThreadPoolExecutor] = None
+
+
+async def _run_password_hashing(func, *args):
+    global _password_executor
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return func(*args)
+    if _password_executor is None:
+        _password_executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            thread_name_prefix="bcrypt"
+        )
+    return await asyncio.get_running_loop().run_in_executor(_password_executor, func, *args)
+
+
+async def hash_password_async(password: str) -> str:
+    """get_password_hash() hors de la boucle"""
+    return await _run_password_hashing(pwd_context.hash, password)
+
+
+async def verify_password_async(
+    plain_password: str,
+    hashed_password: Optional[str]
+) -> Tuple[bool, Optional[str]]:
+    """
+    verify_password() hors de la boucle
+
+    Returns:
+        (valide, nouveau hash si le coût configuré a changé, sinon None)
+        Sans hash (utilisateur inconnu), un hash factice est vérifié pour
+        que la durée ne révèle pas l'existence du compte.
+    """
+    if hashed_password is None:
+        await _run_password_hashing(pwd_context.dummy_verify)
+        return False, None
+    if not settings.PASSWORD_REHASH_ON_LOGIN:
+        return await _run_password_hashing(pwd_context.verify, plain_password, hashed_password), None
+    return await _run_password_hashing(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+def shutdown_password_hashing() -> None:
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False)
+        _password_executor = None
+
+
 # ========= JWT TOKENS =========
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
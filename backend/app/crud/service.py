@@ -3,7 +3,9 @@ ViteviteApp - Service CRUD
 Opérations CRUD spécifiques aux services
 """
 
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
+import enum
+
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -12,6 +14,18 @@ from app.models.service import Service, ServiceStatus, AffluenceLevel
 from app.schemas.service import ServiceCreate, ServiceUpdate
 
 
+# Colonnes modifiées à chaque ticket : relues en base, jamais servies depuis le
+# cache de réponses (un cache par worker sans Redis)
+LIVE_COLUMNS = ("status", "current_queue_size", "estimated_wait_time", "affluence_level", "active_counters")
+
+
+def merge_live_fields(service: Dict[str, Any], live: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Copie d'un service sérialisé (en cache) avec l'état courant de sa file"""
+    if not live:
+        return dict(service)
+    return {**service, **{name: value for name, value in live.items() if name in service}}
+
+
 class CRUDService(CRUDBase[Service, ServiceCreate, ServiceUpdate]):
     """CRUD operations pour Service"""
     
@@ -235,6 +249,34 @@ class CRUDService(CRUDBase[Service, ServiceCreate, ServiceUpdate]):
         )
         return result.scalar_one()
 
+    async def get_live_fields(
+        self,
+        db: AsyncSession,
+        *,
+        service_ids: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        État courant des files (quelques colonnes, une requête)
+        
+        Args:
+            db: Session database
+            service_ids: Services à lire (None = tous)
+        
+        Returns:
+            {service_id: {colonne: valeur JSON}}
+        """
+        query = select(Service.id, *(getattr(Service, name) for name in LIVE_COLUMNS))
+        if service_ids is not None:
+            query = query.where(Service.id.in_(service_ids))
+        result = await db.execute(query)
+        return {
+            row[0]: {
+                name: value.value if isinstance(value, enum.Enum) else value
+                for name, value in zip(LIVE_COLUMNS, row[1:])
+            }
+            for row in result.all()
+        }
+
 
 # ========== INSTANCE GLOBALE ==========
 service_crud = CRUDService(Service)
\ No newline at end of file
@@ -4,13 +4,17 @@ Opérations CRUD spécifiques aux tickets
 """
 
 from typing import Optional, List
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, and_, case
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime, date
+from datetime import date
 
 from app.crud.base import CRUDBase
 from app.models.ticket import Ticket, TicketStatus
 from app.schemas.ticket import TicketCreate, TicketUpdate
+from app.services.analytics_rollup import analytics_rollup, TicketEvent
+from app.services.queue_engine import queue_engine, rank_expression
+from app.services.ticket_sequence import ticket_sequence_allocator
+from app.utils.time_windows import local_today, on_day
 
 
 class CRUDTicket(CRUDBase[Ticket, TicketCreate, TicketUpdate]):
@@ -36,13 +40,13 @@ class CRUDTicket(CRUDBase[Ticket, TicketCreate, TicketUpdate]):
         Returns:
             Ticket créé
         """
-        # Génère le numéro de ticket
-        ticket_count = await self.count_for_service(db, service_id=service.id)
-        ticket_number = f"N-{ticket_count + 1:03d}"
+        # Génère le numéro de ticket (séquence journalière du service)
+        number = await ticket_sequence_allocator.next_number(db, service.id)
+        ticket_number = f"N-{number:03d}"
         
-        # Calcule la position dans la file
-        active_count = await self.count_active_for_service(db, service_id=service.id)
-        position = active_count + 1
+        # Calcule la position et le rang dans la file (moteur de file, sans COUNT)
+        position = await queue_engine.tail_position(db, service.id)
+        queue_rank = await queue_engine.next_rank(db, service.id)
         
         # Crée le ticket
         db_obj = Ticket(
@@ -50,6 +54,7 @@ class CRUDTicket(CRUDBase[Ticket, TicketCreate, TicketUpdate]):
             user_id=user_id,
             ticket_number=ticket_number,
             position_in_queue=position,
+            queue_rank=queue_rank,
             user_name=obj_in.user_name,
             user_phone=obj_in.user_phone,
             notes=obj_in.notes,
@@ -60,6 +65,8 @@ class CRUDTicket(CRUDBase[Ticket, TicketCreate, TicketUpdate]):
         db.add(db_obj)
         await db.flush()
         await db.refresh(db_obj)
+        queue_engine.track(db, db_obj)
+        analytics_rollup.record(db, TicketEvent.ISSUED, db_obj)
         
         return db_obj
     
@@ -120,7 +127,7 @@ class CRUDTicket(CRUDBase[Ticket, TicketCreate, TicketUpdate]):
                     ])
                 )
             )
-            .order_by(Ticket.position_in_queue)
+            .order_by(rank_expression, Ticket.created_at)
         )
         return list(result.scalars().all())
     
@@ -177,7 +184,7 @@ class CRUDTicket(CRUDBase[Ticket, TicketCreate, TicketUpdate]):
                     Ticket.status == TicketStatus.WAITING
                 )
             )
-            .order_by(Ticket.position_in_queue)
+            .order_by(rank_expression, Ticket.created_at)
             .limit(1)
         )
         return result.scalar_one_or_none()
@@ -247,11 +254,10 @@ class CRUDTicket(CRUDBase[Ticket, TicketCreate, TicketUpdate]):
         Returns:
             Nombre de tickets aujourd'hui
         """
-        today = date.today()
         result = await db.execute(
             select(func.count())
             .select_from(Ticket)
-            .where(func.date(Ticket.created_at) == today)
+            .where(on_day(Ticket.created_at))
         )
         return result.scalar_one()
     
@@ -265,13 +271,12 @@ class CRUDTicket(CRUDBase[Ticket, TicketCreate, TicketUpdate]):
         Returns:
             Nombre de tickets complétés
         """
-        today = date.today()
         result = await db.execute(
             select(func.count())
             .select_from(Ticket)
             .where(
                 and_(
-                    func.date(Ticket.created_at) == today,
+                    on_day(Ticket.created_at),
                     Ticket.status == TicketStatus.COMPLETED
                 )
             )
@@ -288,33 +293,92 @@ class CRUDTicket(CRUDBase[Ticket, TicketCreate, TicketUpdate]):
         Returns:
             Temps d'attente moyen en minutes
         """
-        today = date.today()
-        result = await db.execute(
-            select(Ticket)
-            .where(
-                and_(
-                    func.date(Ticket.created_at) == today,
-                    Ticket.status == TicketStatus.COMPLETED,
-                    Ticket.called_at.isnot(None)
-                )
-            )
+        stats = await self.get_wait_time_stats(
+            db,
+            day=local_today(),
+            statuses=[TicketStatus.COMPLETED]
         )
-        tickets = list(result.scalars().all())
+        return stats["average"]
+    
+    async def get_wait_time_stats(
+        self,
+        db: AsyncSession,
+        *,
+        day: date,
+        service_id: Optional[str] = None,
+        statuses: Optional[List[TicketStatus]] = None
+    ) -> dict:
+        """
+        Statistiques des temps d'attente (création -> appel) d'une journée
+        Moyenne, min, max et médiane calculés en SQL en une seule requête
         
-        if not tickets:
-            return 0.0
+        Args:
+            db: Session database
+            day: Jour (local) de création des tickets
+            service_id: Filtrer sur un service (optionnel)
+            statuses: Filtrer sur des statuts (optionnel)
         
-        wait_times = []
-        for ticket in tickets:
-            try:
-                created = datetime.fromisoformat(str(ticket.created_at).replace('Z', '+00:00'))
-                called = datetime.fromisoformat(ticket.called_at.replace('Z', '+00:00'))
-                wait_time = (called - created).total_seconds() / 60
-                wait_times.append(wait_time)
-            except:
-                continue
+        Returns:
+            {"count", "average", "min", "max", "median"} en minutes
+        """
+        wait = wait_minutes_expression(db.get_bind().dialect.name).label("wait")
         
-        return sum(wait_times) / len(wait_times) if wait_times else 0.0
+        filters = [
+            on_day(Ticket.created_at, day),
+            Ticket.called_at.isnot(None)
+        ]
+        if service_id:
+            filters.append(Ticket.service_id == service_id)
+        if statuses:
+            filters.append(Ticket.status.in_(statuses))
+        
+        ranked = (
+            select(
+                wait,
+                func.row_number().over(order_by=wait).label("rn"),
+                func.count().over().label("total")
+            )
+            .where(and_(*filters))
+            .subquery()
+        )
+        
+        # Médiane : élément central (ou moyenne des deux centraux)
+        is_middle = (ranked.c.rn * 2).in_([ranked.c.total, ranked.c.total + 1, ranked.c.total + 2])
+        result = await db.execute(
+            select(
+                func.count(ranked.c.wait),
+                func.avg(ranked.c.wait),
+                func.min(ranked.c.wait),
+                func.max(ranked.c.wait),
+                func.avg(case((is_middle, ranked.c.wait)))
+            )
+        )
+        count, average, minimum, maximum, median = result.one()
+        
+        return {
+            "count": count or 0,
+            "average": float(average or 0.0),
+            "min": float(minimum or 0.0),
+            "max": float(maximum or 0.0),
+            "median": float(median or 0.0)
+        }
+
+
+def minutes_between(start, end, dialect: str):
+    """Durée entre deux colonnes DateTime en minutes, calculée par la base"""
+    if dialect == "sqlite":
+        return (func.julianday(end) - func.julianday(start)) * 1440
+    return func.extract("epoch", end - start) / 60
+
+
+def wait_minutes_expression(dialect: str):
+    """Durée création -> appel en minutes, calculée par la base"""
+    return minutes_between(Ticket.created_at, Ticket.called_at, dialect)
+
+
+def service_minutes_expression(dialect: str):
+    """Durée de traitement (début ou appel -> fin) en minutes"""
+    return minutes_between(func.coalesce(Ticket.started_at, Ticket.called_at), Ticket.completed_at, dialect)
 
 
 # ========== INSTANCE GLOBALE ==========
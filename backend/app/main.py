@@ -14,7 +14,8 @@ import logging
 import time
 
 from app.core.config import settings
-from app.core.database import init_db, close_db, check_db_connection
+from app.core.database import init_db, close_db, check_db_connection, check_pool_budget
+from app.core.security import shutdown_password_hashing
 from app.api.v1.api import api_router
 
 
@@ -47,6 +48,9 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"❌ Erreur initialisation DB: {e}")
     
+    # Pools PostgreSQL de tous les workers sous le budget du serveur
+    check_pool_budget()
+    
     # Vérifier la connexion DB
     db_ok = await check_db_connection()
     if not db_ok:
@@ -61,12 +65,66 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"⚠️ Erreur lors du seeding automatique: {e}")
     
+    # Charger les files d'attente en mémoire
+    try:
+        from app.core.database import AsyncSessionLocal
+        from app.services.queue_engine import queue_engine
+        async with AsyncSessionLocal() as session:
+            await queue_engine.load(session)
+    except Exception as e:
+        logger.error(f"❌ Erreur chargement des files d'attente: {e}")
+    
+    # Écriture par lots des analytics incrémentales
+    from app.services.analytics_rollup import analytics_rollup
+    analytics_rollup.start()
+    
+    # Cache des réponses publiques (Redis si disponible)
+    from app.services.response_cache import response_cache
+    if settings.CACHE_ENABLED:
+        try:
+            await response_cache.connect(settings.CACHE_BACKEND, settings.REDIS_URL)
+        except Exception as e:
+            logger.error(f"❌ Cache Redis indisponible: {e}")
+    
+    # Diffusion temps réel : relais des changements entre workers
+    from app.services.queue_broadcaster import queue_broadcaster
+    try:
+        await queue_broadcaster.connect_relay(settings.BROADCAST_RELAY, settings.REDIS_URL)
+    except Exception as e:
+        logger.error(f"❌ Relais Redis des files indisponible: {e}")
+    
+    # Modèle ML : chargement en tâche de fond si activé (le worker sert déjà les requêtes)
+    from app.services.model_registry import model_registry
+    if settings.ML_MODEL_WARMUP:
+        model_registry.warm_up()
+    
+    # Group commit des écritures de tickets (SQLite)
+    from app.services.group_commit import group_commit_writer
+    if settings.GROUP_COMMIT_ENABLED:
+        group_commit_writer.start()
+    
+    # Tâches périodiques (matérialisations, remise à zéro journalière)
+    from app.services.job_runner import job_runner
+    if settings.JOBS_ENABLED:
+        from app.services.periodic_jobs import register_periodic_jobs
+        register_periodic_jobs(job_runner)
+        job_runner.start()
+    
     logger.info(f"✅ ViteviteApp API démarrée ({settings.ENVIRONMENT})")
     
     yield
     
     # ========== SHUTDOWN ==========
     logger.info("🔒 Arrêt de l'application...")
+    await job_runner.stop()
+    await queue_broadcaster.close()
+    await group_commit_writer.stop()
+    await analytics_rollup.stop()
+    await response_cache.close()
+    await model_registry.close()
+    from app.ai.llm_cache import llm_response_cache
+    llm_response_cache.close()
+    shutdown_password_hashing()
     await close_db()
     logger.info("✅ Connexions fermées proprement")
 
@@ -7,6 +7,7 @@ from app.models.base import BaseModel
 from app.models.user import User, UserRole
 from app.models.service import Service, ServiceStatus, AffluenceLevel
 from app.models.ticket import Ticket, TicketStatus
+from app.models.ticket_sequence import TicketSequence
 from app.models.pharmacy import Pharmacy
 from app.models.transport import (
     TransportRoute, 
@@ -37,6 +38,7 @@ __all__ = [
     "AffluenceLevel",
     "Ticket",
     "TicketStatus",
+    "TicketSequence",
     "Pharmacy",
     "TransportRoute",
     "TransportCompany",
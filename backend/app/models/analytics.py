@@ -3,7 +3,7 @@ ViteviteApp - Analytics Model
 Statistiques détaillées pour l'optimisation des services
 """
 
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, JSON, Date
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, JSON, Date, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, date
 
@@ -15,6 +15,10 @@ class Analytics(Base, BaseModel):
     """Model Analytics - Statistiques journalières par service"""
     
     __tablename__ = "analytics"
+    __table_args__ = (
+        # Une seule ligne par (service, jour) : cible des cumuls incrémentaux
+        Index("ux_analytics_service_date", "service_id", "date", unique=True),
+    )
     
     # ========== PRIMARY KEY ==========
     id = Column(String, primary_key=True, default=generate_uuid)
@@ -37,11 +41,15 @@ class Analytics(Base, BaseModel):
     min_wait_time = Column(Float, default=0.0, nullable=False)
     max_wait_time = Column(Float, default=0.0, nullable=False)
     median_wait_time = Column(Float, default=0.0, nullable=False)
+    wait_time_total = Column(Float, default=0.0, nullable=False)  # Somme des attentes (minutes)
+    wait_time_samples = Column(Integer, default=0, nullable=False)  # Tickets appelés
     
     # ========== SERVICE TIME STATISTICS ==========
     average_service_time = Column(Float, default=0.0, nullable=False)  # En minutes
     min_service_time = Column(Float, default=0.0, nullable=False)
     max_service_time = Column(Float, default=0.0, nullable=False)
+    service_time_total = Column(Float, default=0.0, nullable=False)  # Somme des durées (minutes)
+    service_time_samples = Column(Integer, default=0, nullable=False)  # Tickets terminés après appel
     
     # ========== PEAK HOURS (JSON) ==========
     # Format: [
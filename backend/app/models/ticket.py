@@ -3,7 +3,7 @@ ViteviteApp - Ticket Model
 Gestion des tickets virtuels
 """
 
-from sqlalchemy import Column, String, Integer, Enum as SQLEnum, ForeignKey, Boolean, JSON, Float
+from sqlalchemy import Column, String, Integer, Enum as SQLEnum, ForeignKey, Boolean, JSON, Float, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -12,6 +12,9 @@ from app.core.database import Base
 from app.models.base import BaseModel, generate_uuid
 
 
+# Écart entre deux rangs consécutifs (clés d'ordre clairsemées)
+QUEUE_RANK_GAP = 1024.0
+
 
 class TicketStatus(str, enum.Enum):
     """Statuts de ticket"""
@@ -30,6 +33,26 @@ class Ticket(Base, BaseModel):
     
     __tablename__ = "tickets"
     
+    # ========== INDEXES COMPOSITES ==========
+    # Les requêtes chaudes filtrent sur (service_id, status) et trient par rang
+    # ou par date. Sous Postgres la file active est un index partiel ; SQLite
+    # n'utilise pas d'index partiel avec des paramètres liés, on y indexe donc
+    # (service_id, status, queue_rank, created_at).
+    # Le prédicat reprend les libellés du type Postgres `ticketstatus`
+    # (migration 001), identique à la migration 005.
+    __table_args__ = (
+        Index(
+            "ix_tickets_active_queue",
+            "service_id", "queue_rank", "created_at",
+            postgresql_where="status IN ('en_attente', 'appelé', 'en_service')"
+        ).ddl_if(dialect="postgresql"),
+        Index("ix_tickets_service_status_rank", "service_id", "status", "queue_rank", "created_at").ddl_if(dialect="sqlite"),
+        Index("ix_tickets_service_created", "service_id", "created_at"),
+        Index("ix_tickets_user_created", "user_id", "created_at"),
+        Index("ix_tickets_counter_status", "counter_id", "status"),
+        Index("ix_tickets_status_created", "status", "created_at"),
+    )
+    
     # ========== PRIMARY KEY ==========
     id = Column(String, primary_key=True, default=generate_uuid)
     
@@ -41,7 +64,8 @@ class Ticket(Base, BaseModel):
     
     # ========== TICKET INFO ==========
     ticket_number = Column(String(20), nullable=False, index=True)  # Format: N-001
-    position_in_queue = Column(Integer, nullable=False)
+    position_in_queue = Column(Integer, nullable=False)  # Position à l'émission
+    queue_rank = Column(Float, nullable=True)  # Clé d'ordre fractionnaire (position dérivée du rang)
     
     # ========== STATUS ==========
     status = Column(SQLEnum(TicketStatus), default=TicketStatus.WAITING, nullable=False, index=True)
@@ -52,9 +76,9 @@ class Ticket(Base, BaseModel):
     
     # ========== TIME TRACKING ==========
     estimated_wait_time = Column(Integer, default=0, nullable=False)  # En minutes
-    called_at = Column(String, nullable=True)  # ISO timestamp
-    started_at = Column(String, nullable=True)  # ISO timestamp
-    completed_at = Column(String, nullable=True)  # ISO timestamp
+    called_at = Column(DateTime, nullable=True, index=True)
+    started_at = Column(DateTime, nullable=True, index=True)
+    completed_at = Column(DateTime, nullable=True, index=True)
     
     # ========== PAYMENT (for paid services) ==========
     is_paid = Column(Boolean, default=False, nullable=False)
@@ -110,40 +134,35 @@ class Ticket(Base, BaseModel):
     @property
     def actual_wait_time(self) -> int | None:
         """Calcule le temps d'attente réel en minutes"""
-        if not self.called_at:
+        if not self.called_at or not self.created_at:
             return None
         
-        try:
-            created = datetime.fromisoformat(self.created_at.replace('Z', '+00:00'))
-            called = datetime.fromisoformat(self.called_at.replace('Z', '+00:00'))
-            return int((called - created).total_seconds() / 60)
-        except:
-            return None
+        return int((self.called_at - self.created_at).total_seconds() / 60)
     
     def mark_as_called(self) -> None:
         """Marque le ticket comme appelé"""
         self.status = TicketStatus.CALLED
-        self.called_at = datetime.utcnow().isoformat()
+        self.called_at = datetime.utcnow()
     
     def mark_as_serving(self) -> None:
         """Marque le ticket en cours de service"""
         self.status = TicketStatus.SERVING
-        self.started_at = datetime.utcnow().isoformat()
+        self.started_at = datetime.utcnow()
     
     def mark_as_completed(self) -> None:
         """Marque le ticket comme terminé"""
         self.status = TicketStatus.COMPLETED
-        self.completed_at = datetime.utcnow().isoformat()
+        self.completed_at = datetime.utcnow()
     
     def mark_as_cancelled(self) -> None:
         """Marque le ticket comme annulé"""
         self.status = TicketStatus.CANCELLED
-        self.completed_at = datetime.utcnow().isoformat()
+        self.completed_at = datetime.utcnow()
     
     def mark_as_no_show(self) -> None:
         """Marque le ticket comme absent"""
         self.status = TicketStatus.NO_SHOW
-        self.completed_at = datetime.utcnow().isoformat()
+        self.completed_at = datetime.utcnow()
     
     def __repr__(self) -> str:
         return f"Ticket(id={self.id!r}, number={self.ticket_number!r}, status={self.status.value})"
\ No newline at end of file
@@ -0,0 +1,25 @@
+"""
+ViteviteApp - Ticket Sequence Model
+Compteur journalier des numéros de ticket par service
+"""
+
+from sqlalchemy import Column, String, Integer, Date, ForeignKey
+
+from app.core.database import Base
+from app.models.base import BaseModel
+
+
+class TicketSequence(Base, BaseModel):
+    """Model TicketSequence - Dernier numéro attribué pour (service, jour)"""
+    
+    __tablename__ = "ticket_sequences"
+    
+    # ========== PRIMARY KEY ==========
+    service_id = Column(String, ForeignKey("services.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    
+    # ========== SEQUENCE ==========
+    last_value = Column(Integer, default=0, nullable=False)
+    
+    def __repr__(self) -> str:
+        return f"TicketSequence(service_id={self.service_id!r}, day={self.day}, last_value={self.last_value})"
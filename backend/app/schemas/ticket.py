@@ -40,9 +40,9 @@ class TicketInDB(TicketBase):
     position_in_queue: int
     status: TicketStatus
     estimated_wait_time: int
-    called_at: Optional[str]
-    started_at: Optional[str]
-    completed_at: Optional[str]
+    called_at: Optional[datetime]
+    started_at: Optional[datetime]
+    completed_at: Optional[datetime]
     qr_code: Optional[str]
     created_at: datetime
     updated_at: datetime
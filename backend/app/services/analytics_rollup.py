@@ -0,0 +1,413 @@
+"""
+ViteviteApp - Analytics Rollup
+Cumuls journaliers incrémentaux des analytics à partir des événements de tickets
+
+Chaque transition de ticket (émission, validation, appel, fin, annulation,
+absence) est enregistrée par l'endpoint via `record()`. Comme pour le moteur
+de file, l'événement n'est retenu qu'après le COMMIT de la transaction : il
+est alors agrégé en mémoire dans un delta par (service, jour), puis les deltas
+sont appliqués aux lignes `Analytics` par lots :
+- toutes les ANALYTICS_ROLLUP_INTERVAL_SECONDS secondes
+- dès ANALYTICS_ROLLUP_BATCH_SIZE événements en attente
+- avant chaque lecture des analytics (`flush()`)
+
+Un ticket est rattaché au jour (local) de son émission, comme dans le
+recalcul complet de `POST /analytics/update/{service_id}`. La médiane n'est
+pas incrémentale : elle reste fournie par ce recalcul.
+"""
+
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import enum
+import logging
+
+from sqlalchemy import event, select, and_
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.analytics import Analytics
+from app.models.ticket import Ticket, TicketStatus
+from app.utils.time_windows import to_local
+
+logger = logging.getLogger(__name__)
+
+
+# Clé de session pour les événements à cumuler après COMMIT
+_PENDING_KEY = "analytics_rollup_pending"
+
+RollupKey = Tuple[str, date]
+
+
+class TicketEvent(str, enum.Enum):
+    """Transitions de ticket prises en compte par les analytics"""
+    ISSUED = "issued"
+    VALIDATED = "validated"
+    REJECTED = "rejected"
+    CALLED = "called"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+    NO_SHOW = "no_show"
+
+
+# Événements qui font sortir un ticket de la file d'attente
+_LEAVES_QUEUE = (TicketEvent.CALLED, TicketEvent.CANCELLED, TicketEvent.NO_SHOW)
+
+
+def _minutes(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+    if start is None or end is None:
+        return None
+    return max(0.0, (end - start).total_seconds() / 60)
+
+
+class DurationStats:
+    """Somme, nombre, min et max d'une série de durées (minutes)"""
+
+    __slots__ = ("total", "samples", "minimum", "maximum")
+
+    def __init__(self):
+        self.total = 0.0
+        self.samples = 0
+        self.minimum = 0.0
+        self.maximum = 0.0
+
+    def add(self, value: float) -> None:
+        self.minimum = value if not self.samples else min(self.minimum, value)
+        self.maximum = value if not self.samples else max(self.maximum, value)
+        self.total += value
+        self.samples += 1
+
+    def merge(self, other: "DurationStats") -> None:
+        if not other.samples:
+            return
+        self.minimum = other.minimum if not self.samples else min(self.minimum, other.minimum)
+        self.maximum = other.maximum if not self.samples else max(self.maximum, other.maximum)
+        self.total += other.total
+        self.samples += other.samples
+
+
+class RollupDelta:
+    """Incréments en attente pour une ligne Analytics (service, jour)"""
+
+    COUNTERS = (
+        "total_tickets", "completed_tickets", "cancelled_tickets", "no_show_tickets",
+        "pending_tickets", "validated_documents_count", "rejected_documents_count",
+    )
+
+    __slots__ = COUNTERS + ("events", "wait", "service", "hourly")
+
+    def __init__(self):
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.events = 0
+        self.wait = DurationStats()
+        self.service = DurationStats()
+        # "HH:00" -> [tickets, somme des attentes, tickets appelés]
+        self.hourly: Dict[str, List[float]] = {}
+
+    def _hour(self, created_at: datetime) -> List[float]:
+        hour = f"{to_local(created_at).hour:02d}:00"
+        slot = self.hourly.get(hour)
+        if slot is None:
+            slot = self.hourly[hour] = [0, 0.0, 0]
+        return slot
+
+    def add(self, ticket_event: TicketEvent, state: dict, previous_status: Optional[TicketStatus]) -> None:
+        """Cumule un événement (état du ticket après COMMIT)"""
+        self.events += 1
+        created_at = state.get("created_at") or datetime.utcnow()
+
+        if ticket_event == TicketEvent.ISSUED:
+            self.total_tickets += 1
+            self._hour(created_at)[0] += 1
+            if state.get("status") == TicketStatus.WAITING:
+                self.pending_tickets += 1
+
+        elif ticket_event == TicketEvent.VALIDATED:
+            self.validated_documents_count += 1
+            self.pending_tickets += 1
+
+        elif ticket_event == TicketEvent.REJECTED:
+            self.rejected_documents_count += 1
+
+        elif ticket_event == TicketEvent.CALLED:
+            wait = _minutes(created_at, state.get("called_at"))
+            if wait is not None:
+                self.wait.add(wait)
+                slot = self._hour(created_at)
+                slot[1] += wait
+                slot[2] += 1
+
+        elif ticket_event == TicketEvent.COMPLETED:
+            self.completed_tickets += 1
+            duration = _minutes(state.get("started_at") or state.get("called_at"), state.get("completed_at"))
+            if duration is not None:
+                self.service.add(duration)
+
+        elif ticket_event == TicketEvent.CANCELLED:
+            self.cancelled_tickets += 1
+
+        elif ticket_event == TicketEvent.NO_SHOW:
+            self.no_show_tickets += 1
+
+        if ticket_event in _LEAVES_QUEUE and previous_status == TicketStatus.WAITING:
+            self.pending_tickets -= 1
+
+    def merge(self, other: "RollupDelta") -> None:
+        for name in self.COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.events += other.events
+        self.wait.merge(other.wait)
+        self.service.merge(other.service)
+        for hour, (tickets, wait_total, wait_samples) in other.hourly.items():
+            slot = self.hourly.setdefault(hour, [0, 0.0, 0])
+            slot[0] += tickets
+            slot[1] += wait_total
+            slot[2] += wait_samples
+
+    def apply_to(self, analytics: Analytics) -> None:
+        """Ajoute les incréments à la ligne et recalcule les moyennes"""
+        for name in self.COUNTERS:
+            setattr(analytics, name, (getattr(analytics, name) or 0) + getattr(self, name))
+        analytics.pending_tickets = max(0, analytics.pending_tickets)
+
+        if self.wait.samples:
+            first = not analytics.wait_time_samples
+            analytics.min_wait_time = self.wait.minimum if first else min(analytics.min_wait_time, self.wait.minimum)
+            analytics.max_wait_time = self.wait.maximum if first else max(analytics.max_wait_time, self.wait.maximum)
+            analytics.wait_time_total = (analytics.wait_time_total or 0.0) + self.wait.total
+            analytics.wait_time_samples = (analytics.wait_time_samples or 0) + self.wait.samples
+            analytics.average_wait_time = analytics.wait_time_total / analytics.wait_time_samples
+
+        if self.service.samples:
+            first = not analytics.service_time_samples
+            analytics.min_service_time = self.service.minimum if first else min(analytics.min_service_time, self.service.minimum)
+            analytics.max_service_time = self.service.maximum if first else max(analytics.max_service_time, self.service.maximum)
+            analytics.service_time_total = (analytics.service_time_total or 0.0) + self.service.total
+            analytics.service_time_samples = (analytics.service_time_samples or 0) + self.service.samples
+            analytics.average_service_time = analytics.service_time_total / analytics.service_time_samples
+
+        if self.hourly:
+            # Nouveau dict : la colonne JSON n'est pas suivie en mutation
+            distribution = dict(analytics.hourly_distribution or {})
+            for hour, (tickets, wait_total, wait_samples) in self.hourly.items():
+                slot = dict(distribution.get(hour) or {})
+                slot["tickets"] = slot.get("tickets", 0) + tickets
+                slot["wait_total"] = slot.get("wait_total", 0.0) + wait_total
+                slot["wait_samples"] = slot.get("wait_samples", 0) + wait_samples
+                slot["avg_wait"] = slot["wait_total"] / slot["wait_samples"] if slot["wait_samples"] else 0.0
+                distribution[hour] = slot
+
+            analytics.hourly_distribution = distribution
+            analytics.peak_hours = peak_hours_from(distribution)
+
+        analytics.updated_at = datetime.utcnow()
+
+
+def peak_hours_from(distribution: Dict[str, dict]) -> List[dict]:
+    """Format `peak_hours` ([{"hour", "tickets"}]) depuis la distribution horaire"""
+    return [
+        {"hour": hour, "tickets": slot.get("tickets", 0)}
+        for hour, slot in sorted(distribution.items())
+        if slot.get("tickets")
+    ]
+
+
+class AnalyticsRollup:
+    """Tampon des événements de tickets, appliqué par lots aux analytics"""
+
+    def __init__(
+        self,
+        interval: float = 5.0,
+        batch_size: int = 200,
+        session_factory: Optional[Callable[[], AsyncSession]] = None
+    ):
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self._session_factory = session_factory
+        self._pending: Dict[RollupKey, RollupDelta] = {}
+        self._pending_events = 0
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Abonnés aux événements validés : listener(ticket_event, state, previous_status)
+        self.listeners: List[Callable[[TicketEvent, dict, Optional[TicketStatus]], None]] = []
+
+    @property
+    def pending_events(self) -> int:
+        return self._pending_events
+
+    def record(
+        self,
+        db: AsyncSession,
+        ticket_event: TicketEvent,
+        ticket: Ticket,
+        previous_status: Optional[TicketStatus] = None
+    ) -> None:
+        """
+        Enregistre une transition dans la transaction courante
+        L'événement n'est cumulé qu'au COMMIT de la session
+
+        Args:
+            db: Session de l'endpoint
+            ticket_event: Type d'événement
+            ticket: Ticket modifié
+            previous_status: Statut avant la transition
+        """
+        pending = db.sync_session.info.setdefault(_PENDING_KEY, [])
+        pending.append((self, ticket_event, ticket, previous_status))
+
+    def add(
+        self,
+        ticket_event: TicketEvent,
+        state: dict,
+        previous_status: Optional[TicketStatus] = None
+    ) -> None:
+        """Cumule un événement validé (état du ticket)"""
+        created_at = state.get("created_at") or datetime.utcnow()
+        key = (state["service_id"], to_local(created_at).date())
+
+        delta = self._pending.get(key)
+        if delta is None:
+            delta = self._pending[key] = RollupDelta()
+        delta.add(ticket_event, state, previous_status)
+
+        self._pending_events += 1
+        if self._pending_events >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """
+        Applique les deltas en attente (une transaction par service et jour)
+
+        Returns:
+            Nombre d'événements appliqués
+        """
+        if not self._pending:
+            return 0
+
+        async with self._lock:
+            batch, self._pending = self._pending, {}
+            self._pending_events = 0
+
+            session_factory = self._session_factory
+            if session_factory is None:
+                from app.core.database import AsyncSessionLocal
+                session_factory = AsyncSessionLocal
+
+            applied = 0
+            for key, delta in batch.items():
+                try:
+                    async with session_factory() as session:
+                        analytics = await self._daily_row(session, *key)
+                        delta.apply_to(analytics)
+                        await session.commit()
+                    applied += delta.events
+                except Exception as e:
+                    logger.error(f"Erreur cumul analytics {key[0]} ({key[1]}): {e}")
+                    self._restore(key, delta)
+
+            return applied
+
+    def _restore(self, key: RollupKey, delta: RollupDelta) -> None:
+        """Remet un delta non appliqué en attente (réessayé au prochain lot)"""
+        current = self._pending.get(key)
+        if current is not None:
+            delta.merge(current)
+        self._pending[key] = delta
+        self._pending_events += delta.events
+
+    async def _daily_row(self, db: AsyncSession, service_id: str, day: date) -> Analytics:
+        """Ligne (service, jour) verrouillée, créée si absente"""
+        stmt = (
+            select(Analytics)
+            .where(and_(Analytics.service_id == service_id, Analytics.date == day))
+            .with_for_update()
+        )
+        result = await db.execute(stmt)
+        analytics = result.scalar_one_or_none()
+        if analytics is not None:
+            return analytics
+
+        dialect = db.get_bind().dialect.name
+        if dialect not in ("sqlite", "postgresql"):
+            analytics = Analytics.create_daily_analytics(service_id, day)
+            db.add(analytics)
+            await db.flush()
+            return analytics
+
+        # Plusieurs workers peuvent créer la ligne en même temps
+        insert_fn = sqlite_insert if dialect == "sqlite" else pg_insert
+        await db.execute(
+            insert_fn(Analytics)
+            .values(service_id=service_id, date=day)
+            .on_conflict_do_nothing(index_elements=[Analytics.service_id, Analytics.date])
+        )
+        result = await db.execute(stmt)
+        return result.scalar_one()
+
+    # ========== TÂCHE DE FOND ==========
+    def start(self) -> None:
+        """Démarre l'écriture périodique des lots"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Arrête la tâche de fond et écrit le dernier lot"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Erreur écriture des analytics: {e}")
+
+
+# ========== SYNCHRONISATION TRANSACTIONNELLE ==========
+@event.listens_for(Session, "after_commit")
+def _apply_pending_analytics_events(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    for rollup, ticket_event, ticket, previous_status in pending:
+        state = dict(sa_inspect(ticket).dict)
+        try:
+            rollup.add(ticket_event, state, previous_status)
+        except Exception as e:
+            logger.error(f"Erreur cumul événement {ticket_event.value}: {e}")
+        for listener in rollup.listeners:
+            try:
+                listener(ticket_event, state, previous_status)
+            except Exception as e:
+                logger.error(f"Erreur abonné événement {ticket_event.value}: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_analytics_events(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+# Instance globale
+analytics_rollup = AnalyticsRollup(
+    interval=settings.ANALYTICS_ROLLUP_INTERVAL_SECONDS,
+    batch_size=settings.ANALYTICS_ROLLUP_BATCH_SIZE
+)
@@ -0,0 +1,232 @@
+"""
+ViteviteApp - Group Commit
+Regroupement des écritures de tickets dans une seule transaction (SQLite)
+
+SQLite n'a qu'un écrivain et chaque COMMIT coûte une synchronisation disque :
+avec une transaction par requête, le débit d'écriture plafonne vite. Quand
+GROUP_COMMIT_ENABLED est actif, les endpoints d'écriture (émission, appel,
+fin, validation) confient leur unité de travail à une tâche unique qui :
+- collecte les unités en attente (arrivées pendant le lot précédent), au
+  plus GROUP_COMMIT_MAX_BATCH, en attendant si besoin GROUP_COMMIT_WINDOW_MS
+- exécute chaque unité dans un SAVEPOINT de la même transaction : l'échec
+  d'une unité (404, 400...) n'annule que ses propres écritures
+- valide le lot en un seul COMMIT puis résout le futur de chaque appelant
+  avec son résultat, ou avec l'erreur (la sienne ou celle du COMMIT)
+
+Les notifications après COMMIT (moteur de file, analytics) partent donc une
+fois par lot. Désactivé, `run_write` exécute l'unité dans la session de la
+requête puis la valide, comme avant.
+"""
+
+from typing import Any, Awaitable, Callable, List, Optional, TypeVar
+import asyncio
+import copy
+import logging
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Unité de travail : écrit dans la session fournie, sans COMMIT
+WriteWork = Callable[[AsyncSession], Awaitable[T]]
+
+
+class _PendingWrite:
+    __slots__ = ("work", "future")
+
+    def __init__(self, work: WriteWork, future: asyncio.Future):
+        self.work = work
+        self.future = future
+
+
+class GroupCommitWriter:
+    """Écrivain unique : une transaction et un COMMIT par lot d'unités"""
+
+    def __init__(
+        self,
+        max_batch: int = 64,
+        window: float = 0.0,
+        session_factory: Optional[Callable[[], AsyncSession]] = None
+    ):
+        self.max_batch = max(1, max_batch)
+        self.window = max(0.0, window)
+        self._session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.batches = 0
+        self.writes = 0
+        self.failures = 0
+        self.commit_failures = 0
+        self.max_batch_size = 0
+        self.total_commit_duration = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    # ========== CYCLE DE VIE ==========
+    def start(self) -> None:
+        """Lance la tâche d'écriture (dans la boucle courante)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(), name="group-commit")
+        logger.info(
+            f"✅ Group commit actif (lots de {self.max_batch}, fenêtre {self.window * 1000:.1f} ms)"
+        )
+
+    async def stop(self) -> None:
+        """Termine les unités en attente puis arrête la tâche"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        try:
+            await self._task
+        finally:
+            self._task = None
+            self._queue = None
+
+    # ========== SOUMISSION ==========
+    async def submit(self, work: WriteWork) -> T:
+        """
+        Confie une unité de travail au prochain lot
+
+        Args:
+            work: Coroutine recevant la session du lot (sans COMMIT)
+
+        Returns:
+            Résultat de l'unité, une fois le lot validé
+        """
+        if not self.running:
+            raise RuntimeError("Group commit non démarré")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingWrite(work, future))
+        return await future
+
+    # ========== ÉCRITURE ==========
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                await self._commit_batch(batch)
+            except Exception as e:
+                logger.error(f"❌ Lot d'écritures en échec: {e}")
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+
+    async def _commit_batch(self, batch: List[_PendingWrite]) -> None:
+        session_factory = self._session_factory
+        if session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+
+        done: List[tuple] = []
+        start = time.perf_counter()
+        async with session_factory() as db:
+            if db.get_bind().dialect.name == "sqlite":
+                # pysqlite n'ouvre la transaction qu'au premier INSERT/UPDATE :
+                # sans BEGIN explicite, le premier SAVEPOINT la démarre et son
+                # RELEASE la validerait. IMMEDIATE prend le verrou d'écriture.
+                connection = await db.connection()
+                await connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+            for pending in batch:
+                if pending.future.cancelled():
+                    continue
+
+                # Les écritures différées (file, analytics) suivent le SAVEPOINT
+                info = {key: copy.copy(value) for key, value in db.sync_session.info.items()}
+                try:
+                    async with db.begin_nested():
+                        result = await pending.work(db)
+                except Exception as e:
+                    db.sync_session.info.clear()
+                    db.sync_session.info.update(info)
+                    self.failures += 1
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+                    continue
+                done.append((pending, result))
+
+            try:
+                await db.commit()
+            except Exception as e:
+                self.commit_failures += 1
+                logger.error(f"❌ COMMIT du lot ({len(done)} écritures): {e}")
+                for pending, _ in done:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+                return
+
+        self.batches += 1
+        self.writes += len(done)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+        self.total_commit_duration += time.perf_counter() - start
+        for pending, result in done:
+            if not pending.future.done():
+                pending.future.set_result(result)
+
+    def metrics(self) -> dict:
+        return {
+            "running": self.running,
+            "batches": self.batches,
+            "writes": self.writes,
+            "failures": self.failures,
+            "commit_failures": self.commit_failures,
+            "average_batch_size": self.writes / self.batches if self.batches else None,
+            "max_batch_size": self.max_batch_size,
+            "average_batch_duration": self.total_commit_duration / self.batches if self.batches else None,
+        }
+
+
+async def run_write(db: AsyncSession, work: WriteWork) -> Any:
+    """
+    Exécute une unité d'écriture d'endpoint
+
+    Via le group commit s'il tourne, sinon dans la session de la requête
+    suivie d'un COMMIT.
+    """
+    if group_commit_writer.running:
+        return await group_commit_writer.submit(work)
+
+    result = await work(db)
+    await db.commit()
+    return result
+
+
+# Instance globale
+group_commit_writer = GroupCommitWriter(
+    max_batch=settings.GROUP_COMMIT_MAX_BATCH,
+    window=settings.GROUP_COMMIT_WINDOW_MS / 1000
+)
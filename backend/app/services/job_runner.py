@@ -0,0 +1,336 @@
+"""
+ViteviteApp - Job Runner
+Exécution périodique de tâches de fond dans le process de l'API
+
+Chaque tâche a son intervalle, décalé d'un jitter aléatoire pour éviter que
+toutes les tâches (et tous les workers) ne frappent la base en même temps.
+Une tâche n'est jamais exécutée deux fois en parallèle : tant qu'un passage
+est en cours, les déclenchements suivants sont ignorés et comptés.
+
+Un verrou de leader garantit qu'un seul worker exécute les tâches partagées,
+quel que soit WORKERS (uvicorn --workers ou plusieurs process ne le
+renseignent pas forcément) :
+- Postgres : verrou consultatif (pg_try_advisory_lock) tenu par une connexion
+- autres bases : verrou de fichier (flock), workers sur la même machine
+Le verrou est retenté à chaque passage : si le leader s'arrête, un autre
+worker prend le relais.
+"""
+
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import text
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+# Clé du verrou consultatif Postgres (arbitraire, propre à l'application)
+JOBS_ADVISORY_LOCK_KEY = 7_245_001
+
+
+# ========== VERROUS DE LEADER ==========
+class LeaderLock:
+    """Toujours leader (process unique garanti, ex. tests)"""
+
+    async def acquire(self) -> bool:
+        return True
+
+    async def release(self) -> None:
+        pass
+
+
+class FileLeaderLock(LeaderLock):
+    """Verrou exclusif sur un fichier (workers d'une même machine)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._handle = None
+
+    async def acquire(self) -> bool:
+        if self._handle is not None:
+            return True
+        if fcntl is None:
+            return True
+
+        handle = open(self.path, "a+")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+
+        self._handle = handle
+        return True
+
+    async def release(self) -> None:
+        if self._handle is None:
+            return
+        fcntl.flock(self._handle, fcntl.LOCK_UN)
+        self._handle.close()
+        self._handle = None
+
+
+class AdvisoryLeaderLock(LeaderLock):
+    """Verrou consultatif Postgres, tenu tant que la connexion reste ouverte"""
+
+    def __init__(self, engine, key: int = JOBS_ADVISORY_LOCK_KEY):
+        self.engine = engine
+        self.key = key
+        self._connection = None
+        # Les boucles des tâches tentent le verrou en parallèle : une seule
+        # connexion doit être ouverte et tenir le verrou
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> bool:
+        async with self._lock:
+            return await self._acquire()
+
+    async def release(self) -> None:
+        async with self._lock:
+            await self._release()
+
+    async def _acquire(self) -> bool:
+        if self._connection is not None:
+            try:
+                await self._connection.execute(text("SELECT 1"))
+                await self._connection.commit()
+                return True
+            except Exception as e:
+                logger.warning(f"⚠️ Connexion du verrou de tâches perdue: {e}")
+                await self._close()
+
+        connection = await self.engine.connect()
+        try:
+            result = await connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}
+            )
+            acquired = bool(result.scalar())
+            await connection.commit()
+        except Exception:
+            await connection.close()
+            raise
+
+        if not acquired:
+            await connection.close()
+            return False
+
+        self._connection = connection
+        return True
+
+    async def _release(self) -> None:
+        if self._connection is None:
+            return
+        try:
+            await self._connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+            await self._connection.commit()
+        finally:
+            await self._close()
+
+    async def _close(self) -> None:
+        try:
+            await self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+
+
+def create_leader_lock() -> LeaderLock:
+    """Verrou adapté à la base (toujours actif, indépendamment de WORKERS)"""
+    from app.core.database import engine
+    if engine.dialect.name == "postgresql":
+        return AdvisoryLeaderLock(engine)
+
+    path = settings.JOBS_LOCK_FILE or os.path.join(tempfile.gettempdir(), "vitevite-jobs.lock")
+    return FileLeaderLock(path)
+
+
+# ========== TÂCHES ==========
+class PeriodicJob:
+    """Tâche périodique et ses métriques d'exécution"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[object]],
+        interval: float,
+        jitter: float = 0.0,
+        leader_only: bool = True
+    ):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.leader_only = leader_only
+
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_started_at: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+        self.last_error: Optional[str] = None
+
+    def next_delay(self) -> float:
+        """Intervalle ± jitter (fraction de l'intervalle)"""
+        spread = self.interval * self.jitter
+        return max(0.0, self.interval + random.uniform(-spread, spread))
+
+    async def run(self) -> bool:
+        """
+        Exécute la tâche sauf si un passage est déjà en cours
+
+        Returns:
+            True si la tâche a été exécutée
+        """
+        if self.running:
+            self.skipped += 1
+            return False
+
+        self.running = True
+        self.last_started_at = datetime.utcnow()
+        start = time.perf_counter()
+        try:
+            await self.func()
+            self.last_error = None
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.error(f"❌ Tâche {self.name} en échec: {e}")
+        finally:
+            duration = time.perf_counter() - start
+            self.runs += 1
+            self.last_duration = duration
+            self.total_duration += duration
+            self.max_duration = max(self.max_duration, duration)
+            self.running = False
+
+        return True
+
+    def metrics(self) -> dict:
+        return {
+            "interval": self.interval,
+            "leader_only": self.leader_only,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "last_started_at": self.last_started_at.isoformat() if self.last_started_at else None,
+            "last_duration": self.last_duration,
+            "average_duration": self.total_duration / self.runs if self.runs else None,
+            "max_duration": self.max_duration,
+            "last_error": self.last_error,
+        }
+
+
+class JobRunner:
+    """Planificateur asyncio des tâches périodiques"""
+
+    def __init__(self, leader_lock: Optional[LeaderLock] = None, jitter: float = 0.1):
+        self.jobs: Dict[str, PeriodicJob] = {}
+        self.jitter = jitter
+        self.is_leader = False
+        self._leader_lock = leader_lock
+        self._tasks: List[asyncio.Task] = []
+
+    def register(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[object]],
+        interval: float,
+        *,
+        leader_only: bool = True,
+        jitter: Optional[float] = None
+    ) -> PeriodicJob:
+        """
+        Déclare une tâche périodique
+
+        Args:
+            name: Nom unique de la tâche
+            func: Coroutine sans argument
+            interval: Intervalle en secondes
+            leader_only: Exécutée par un seul worker
+            jitter: Fraction aléatoire de l'intervalle (JOBS_JITTER_RATIO par défaut)
+        """
+        job = PeriodicJob(
+            name,
+            func,
+            interval,
+            jitter=self.jitter if jitter is None else jitter,
+            leader_only=leader_only
+        )
+        self.jobs[name] = job
+        return job
+
+    def start(self) -> None:
+        """Lance une boucle par tâche"""
+        if self._tasks:
+            return
+        if self._leader_lock is None:
+            self._leader_lock = create_leader_lock()
+
+        for job in self.jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job), name=f"job:{job.name}"))
+        logger.info(f"✅ {len(self.jobs)} tâches périodiques démarrées")
+
+    async def stop(self) -> None:
+        """Annule les boucles et libère le verrou de leader"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self._leader_lock is not None:
+            try:
+                await self._leader_lock.release()
+            except Exception as e:
+                logger.warning(f"⚠️ Libération du verrou de tâches: {e}")
+        self.is_leader = False
+
+    async def run_now(self, name: str) -> bool:
+        """Déclenche une tâche immédiatement (ignorée si déjà en cours)"""
+        return await self.jobs[name].run()
+
+    async def _acquire_leadership(self) -> bool:
+        try:
+            leader = await self._leader_lock.acquire()
+        except Exception as e:
+            logger.warning(f"⚠️ Verrou de tâches indisponible: {e}")
+            leader = False
+
+        if leader != self.is_leader:
+            logger.info("👑 Ce worker exécute les tâches périodiques" if leader else "Tâches périodiques déléguées")
+        self.is_leader = leader
+        return leader
+
+    async def _loop(self, job: PeriodicJob) -> None:
+        # Premier passage décalé : les tâches ne démarrent pas toutes ensemble
+        await asyncio.sleep(random.uniform(0, job.interval * job.jitter))
+        while True:
+            if not job.leader_only or await self._acquire_leadership():
+                await job.run()
+            await asyncio.sleep(job.next_delay())
+
+    def metrics(self) -> dict:
+        return {
+            "leader": self.is_leader,
+            "jobs": {name: job.metrics() for name, job in self.jobs.items()},
+        }
+
+
+# Instance globale
+job_runner = JobRunner(jitter=settings.JOBS_JITTER_RATIO)
@@ -8,33 +8,16 @@ from typing import Dict, Any
 import logging
 
 from app.core.config import settings
-from pathlib import Path
+from app.ai.llm_client import llm_client
+from app.services.rolling_stats import rolling_stats
 
 logger = logging.getLogger(__name__)
 
-# Tenter de charger le modèle ML entraîné
-try:
-    from app.services.ml_trainer import predictor as ml_predictor
-    ML_MODEL_AVAILABLE = Path("models/queue_predictor.pkl").exists()
-    if ML_MODEL_AVAILABLE:
-        ml_predictor.load_model()
-        logger.info("✅ Modèle ML chargé avec succès")
-except Exception as e:
-    ML_MODEL_AVAILABLE = False
-    ml_predictor = None
-    logger.warning(f"⚠️ Modèle ML non disponible: {e}")
+# Le modèle ML entraîné n'est plus chargé à l'import : voir
+# app/services/model_registry.py (chargement paresseux, préchauffage)
 
-# Import Gemini uniquement si configuré
-if settings.gemini_enabled:
-    try:
-        import google.generativeai as genai
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        gemini_model = genai.GenerativeModel('gemini-2.0-flash-exp')
-    except Exception as e:
-        logger.warning(f"Gemini non disponible: {e}")
-        gemini_model = None
-else:
-    gemini_model = None
+# Enrichissement Gemini via le client LLM partagé (disponible si configuré)
+gemini_model = llm_client.model('gemini-2.0-flash-exp')
 
 
 class MLService:
@@ -66,7 +49,7 @@ class MLService:
         base_prediction = self._heuristic_prediction(service_data)
         
         # Enrichir avec Gemini si disponible (optionnel)
-        if gemini_model and settings.ENABLE_AI:
+        if gemini_model.available and settings.ENABLE_AI:
             try:
                 ai_prediction = await self._gemini_prediction(service_data)
                 # Moyenne pondérée: 70% heuristique + 30% AI
@@ -89,8 +72,12 @@ class MLService:
         queue_size = service.get("current_queue_size", 0)
         category = service.get("category", "default")
         
-        # Temps de base par catégorie
-        base_time = self.BASE_TIMES.get(category, self.BASE_TIMES["default"])
+        # Temps de base : rythme mesuré du service (par guichet ouvert), sinon par catégorie
+        observed = rolling_stats.average_service_time(service_id=service.get("id"))
+        if observed is not None:
+            base_time = observed / max(1, service.get("active_counters") or 1)
+        else:
+            base_time = self.BASE_TIMES.get(category, self.BASE_TIMES["default"])
         
         # Calcul de base
         predicted_time = queue_size * base_time
@@ -170,7 +157,7 @@ Contexte ivoirien:
 Réponds UNIQUEMENT ce JSON (rien d'autre):
 {{"predicted_wait_time": <minutes>, "confidence": <0.0-1.0>, "recommendation": "<conseil court>"}}"""
         
-        response = gemini_model.generate_content(prompt)
+        response = await gemini_model.generate_content(prompt)
         text = response.text.strip()
         
         # Nettoyage
@@ -12,6 +12,7 @@ import joblib
 from pathlib import Path
 import logging
 from datetime import datetime
+from typing import Dict, List, Optional, Sequence
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +23,8 @@ class QueueTimePredictor:
         self.model_path = Path(model_path)
         self.model = None
         self.label_encoders = {}
+        # Codes des catégories (classe -> code), équivalent de LabelEncoder.transform
+        self.category_codes: Dict[str, Dict[str, int]] = {}
         self.feature_columns = [
             'queue_size', 'hour', 'day_of_week', 'day_of_month',
             'is_salary_day', 'is_start_of_month', 'is_peak_hour',
@@ -39,9 +42,15 @@ class QueueTimePredictor:
         - queue_size: Taille de la file
         - wait_time_minutes: Temps d'attente réel (TARGET)
         - affluence_level: Niveau d'affluence
+        
+        Le même format est produit depuis nos tickets par
+        app/services/training_dataset.py (CSV ou Parquet).
         """
         try:
-            df = pd.read_csv(csv_path)
+            if str(csv_path).endswith('.parquet'):
+                df = pd.read_parquet(csv_path)
+            else:
+                df = pd.read_csv(csv_path)
             
             # Convertir timestamp
             df['timestamp'] = pd.to_datetime(df['timestamp'])
@@ -96,13 +105,13 @@ class QueueTimePredictor:
             max_depth=5,
             learning_rate=0.1,
             random_state=42,
-            n_jobs=-1
+            n_jobs=-1,
+            early_stopping_rounds=10
         )
         
         self.model.fit(
             X_train, y_train,
             eval_set=[(X_test, y_test)],
-            early_stopping_rounds=10,
             verbose=False
         )
         
@@ -114,6 +123,8 @@ class QueueTimePredictor:
         logger.info(f"  - R² train: {train_score:.3f}")
         logger.info(f"  - R² test: {test_score:.3f}")
         
+        self._build_category_codes()
+        
         # Sauvegarder
         self.save_model()
         
@@ -137,76 +148,140 @@ class QueueTimePredictor:
         Returns:
             {'predicted_time': int, 'confidence': float}
         """
+        return self.predict_many([features])[0]
+    
+    def predict_many(self, features_list: Sequence[dict], now: Optional[datetime] = None) -> List[dict]:
+        """
+        Prédit le temps d'attente de plusieurs services en un seul appel
+        
+        Construit directement la matrice NumPy (float32, colonnes dans l'ordre
+        de `feature_columns`) sans DataFrame, encode les catégories par
+        dictionnaire et appelle `inplace_predict` du booster.
+        
+        Args:
+            features_list: liste de `features` (voir predict)
+            now: instant de référence (défaut : maintenant)
+        
+        Returns:
+            Une prédiction par service, dans le même ordre
+        """
         if self.model is None:
             self.load_model()
+        if not features_list:
+            return []
+        
+        n = len(features_list)
+        now = now or datetime.now()
+        queue_sizes = np.array([f.get('queue_size', 0) for f in features_list], dtype=np.float32)
         
-        # Préparer les features
-        now = datetime.now()
-        feature_vector = {
-            'queue_size': features.get('queue_size', 0),
-            'hour': now.hour,
-            'day_of_week': now.weekday(),
-            'day_of_month': now.day,
-            'is_salary_day': 1 if now.day in [1, 5, 10, 15, 20, 25] else 0,
-            'is_start_of_month': 1 if now.day <= 7 else 0,
-            'is_peak_hour': 1 if 9 <= now.hour <= 12 else 0,
+        # Features temporelles : communes à tout le lot
+        columns = {
+            'queue_size': queue_sizes,
+            'hour': np.full(n, now.hour, dtype=np.float32),
+            'day_of_week': np.full(n, now.weekday(), dtype=np.float32),
+            'day_of_month': np.full(n, now.day, dtype=np.float32),
+            'is_salary_day': np.full(n, 1 if now.day in [1, 5, 10, 15, 20, 25] else 0, dtype=np.float32),
+            'is_start_of_month': np.full(n, 1 if now.day <= 7 else 0, dtype=np.float32),
+            'is_peak_hour': np.full(n, 1 if 9 <= now.hour <= 12 else 0, dtype=np.float32),
         }
+        columns['service_category_encoded'], columns['affluence_level_encoded'] = self._encode_categories(features_list)
         
-        # Encoder catégories
-        try:
-            category = features.get('service_category', 'Administration')
-            affluence = features.get('affluence_level', 'modérée')
-            
-            if 'service_category' in self.label_encoders:
-                feature_vector['service_category_encoded'] = \
-                    self.label_encoders['service_category'].transform([category])[0]
-            else:
-                feature_vector['service_category_encoded'] = 0
-            
-            if 'affluence_level' in self.label_encoders:
-                feature_vector['affluence_level_encoded'] = \
-                    self.label_encoders['affluence_level'].transform([affluence])[0]
-            else:
-                feature_vector['affluence_level_encoded'] = 0
+        X = np.column_stack([columns[name] for name in self.feature_columns])
+        predictions = self.model.get_booster().inplace_predict(
+            X,
+            iteration_range=self._iteration_range(),
+            validate_features=False  # Colonnes déjà dans l'ordre d'entraînement
+        )
         
-        except Exception as e:
-            logger.warning(f"Erreur encodage: {e}, utilisation valeurs par défaut")
-            feature_vector['service_category_encoded'] = 0
-            feature_vector['affluence_level_encoded'] = 0
+        # Confidence basée sur la cohérence
+        confidences = np.where(queue_sizes > 0, 0.95, 0.75)
         
-        # Prédiction
-        X = pd.DataFrame([feature_vector])[self.feature_columns]
-        prediction = self.model.predict(X)[0]
+        return [
+            {
+                'predicted_time': int(max(5, prediction)),  # Min 5 minutes
+                'confidence': float(confidence)
+            }
+            for prediction, confidence in zip(predictions, confidences)
+        ]
+    
+    def _encode_categories(self, features_list: Sequence[dict]):
+        """Codes catégorie / affluence (0 pour les deux si une valeur est inconnue)"""
+        category_codes = self.category_codes.get('service_category')
+        affluence_codes = self.category_codes.get('affluence_level')
         
-        # Confidence basée sur la cohérence
-        confidence = min(0.95, 0.75 + (0.20 if features.get('queue_size', 0) > 0 else 0))
+        categories = np.zeros(len(features_list), dtype=np.float32)
+        affluences = np.zeros(len(features_list), dtype=np.float32)
+        for i, features in enumerate(features_list):
+            category = features.get('service_category', 'Administration')
+            affluence = features.get('affluence_level', 'modérée')
+            
+            category_code = category_codes.get(category) if category_codes is not None else 0
+            affluence_code = affluence_codes.get(affluence) if affluence_codes is not None else 0
+            # Comme l'ancien encodage par ligne : une valeur inconnue remet les deux à 0
+            if category_code is None or affluence_code is None:
+                continue
+            categories[i] = category_code
+            affluences[i] = affluence_code
         
-        return {
-            'predicted_time': int(max(5, prediction)),  # Min 5 minutes
-            'confidence': confidence
+        return categories, affluences
+    
+    def _iteration_range(self):
+        """Arbres utilisés par XGBRegressor.predict (meilleure itération si early stopping)"""
+        best_iteration = getattr(self.model, 'best_iteration', None)
+        return (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+    
+    def _build_category_codes(self):
+        """Tables classe -> code à partir des LabelEncoder (classes_ triées)"""
+        self.category_codes = {
+            col: {value: code for code, value in enumerate(encoder.classes_)}
+            for col, encoder in self.label_encoders.items()
         }
     
+    @property
+    def booster_path(self) -> Path:
+        """Booster au format natif XGBoost (UBJSON), à côté des métadonnées"""
+        return self.model_path.with_suffix('.ubj')
+    
     def save_model(self):
-        """Sauvegarde le modèle entraîné"""
+        """
+        Sauvegarde le modèle entraîné
+        
+        Le booster est écrit au format natif (rechargé sans désérialiser
+        d'objet Python) ; le pickle ne contient que les encodeurs et les
+        colonnes, sans compression pour pouvoir être mappé en mémoire.
+        """
         self.model_path.parent.mkdir(parents=True, exist_ok=True)
         
+        self.model.save_model(str(self.booster_path))
         joblib.dump({
-            'model': self.model,
+            'booster_file': self.booster_path.name,
             'label_encoders': self.label_encoders,
             'feature_columns': self.feature_columns
         }, self.model_path)
         
         logger.info(f"✅ Modèle sauvegardé: {self.model_path}")
     
-    def load_model(self):
-        """Charge le modèle depuis le disque"""
+    def load_model(self, mmap_mode: Optional[str] = None):
+        """
+        Charge le modèle depuis le disque
+        
+        Args:
+            mmap_mode: 'r' pour mapper en lecture les tableaux NumPy du
+                pickle (encodeurs) ; sans effet sur le booster
+        """
         if not self.model_path.exists():
             raise FileNotFoundError(f"Modèle non trouvé: {self.model_path}")
         
-        data = joblib.load(self.model_path)
-        self.model = data['model']
+        data = joblib.load(self.model_path, mmap_mode=mmap_mode)
+        if 'model' in data:
+            # Ancien format : XGBRegressor picklé avec les métadonnées
+            self.model = data['model']
+        else:
+            self.model = xgb.XGBRegressor()
+            self.model.load_model(str(self.model_path.parent / data['booster_file']))
         self.label_encoders = data['label_encoders']
         self.feature_columns = data['feature_columns']
+        self._build_category_codes()
         
         logger.info(f"✅ Modèle chargé: {self.model_path}")
 
@@ -229,7 +304,9 @@ if __name__ == "__main__":
     
     if not Path(csv_path).exists():
         print(f"❌ Fichier non trouvé: {csv_path}")
-        print("\n📥 Téléchargez un dataset Kaggle sur les files d'attente")
+        print("\n🗄️  Générez-le depuis les tickets :")
+        print(f"   python -m app.services.training_dataset --output {csv_path}")
+        print("\n📥 Ou téléchargez un dataset Kaggle sur les files d'attente")
         print("   Exemple: https://www.kaggle.com/datasets/queue-management")
         sys.exit(1)
     
@@ -239,4 +316,4 @@ if __name__ == "__main__":
     print(f"\n✅ Entraînement terminé:")
     print(f"   - Échantillons: {results['n_samples']}")
     print(f"   - R² test: {results['test_score']:.2%}")
-    print(f"\n💾 Modèle sauvegardé dans: models/queue_predictor.pkl")
\ No newline at end of file
+    print(f"\n💾 Modèle sauvegardé dans: models/queue_predictor.pkl (+ .ubj)")
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+ViteviteApp - Model Registry
+Chargement paresseux du modèle ML (QueueTimePredictor)
+
+`ml_service` chargeait le modèle à l'import : chaque worker importait pandas,
+scikit-learn et xgboost puis désérialisait le modèle avant de servir sa
+première requête. Le registre :
+- n'importe `ml_trainer` et ne charge le modèle qu'à la première prédiction
+  ou via `warm_up()` (tâche de fond au démarrage si ML_MODEL_WARMUP)
+- charge dans un thread, sans bloquer la boucle asyncio ; les appels
+  concurrents attendent le même chargement
+- lit le booster au format natif XGBoost ; avec ML_MODEL_MMAP, seuls les
+  tableaux NumPy du pickle (encodeurs) sont mappés en lecture, le booster
+  reste une copie privée de chaque worker
+- exécute une prédiction d'essai avant de se déclarer prêt
+
+Aucun endpoint ne prédit encore via le registre (`ml_service` reste sur ses
+heuristiques) : le préchauffage est désactivé par défaut pour ne pas charger
+xgboost dans chaque worker sans utilité.
+
+`status()` expose l'état ("absent", "cold", "loading", "ready", "failed")
+au health check.
+"""
+
+from typing import List, Optional
+from pathlib import Path
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Prédicteur de temps d'attente chargé à la demande"""
+
+    ABSENT = "absent"
+    COLD = "cold"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, model_path: str = "models/queue_predictor.pkl", mmap: bool = True):
+        self.model_path = Path(model_path)
+        self.mmap = mmap
+        self._predictor = None
+        self._task: Optional[asyncio.Task] = None
+        self._state = self.COLD
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self._state == self.COLD and not self.model_path.exists():
+            return self.ABSENT
+        return self._state
+
+    @property
+    def ready(self) -> bool:
+        return self._state == self.READY
+
+    def warm_up(self) -> Optional[asyncio.Task]:
+        """Lance le chargement en tâche de fond (sans effet si absent ou déjà lancé)"""
+        if self.state not in (self.COLD, self.LOADING):
+            return None
+        if self._task is None:
+            self._state = self.LOADING
+            self._task = asyncio.get_running_loop().create_task(self._load())
+        return self._task
+
+    async def get_predictor(self):
+        """Prédicteur chargé, ou None si le modèle est absent ou illisible"""
+        if self._state == self.READY:
+            return self._predictor
+        task = self.warm_up()
+        if task is not None:
+            await asyncio.shield(task)
+        return self._predictor
+
+    async def predict_many(self, features_list: List[dict]) -> Optional[List[dict]]:
+        """Prédictions par lot (voir QueueTimePredictor.predict_many), None sans modèle"""
+        predictor = await self.get_predictor()
+        if predictor is None:
+            return None
+        return predictor.predict_many(features_list)
+
+    async def _load(self) -> None:
+        start = time.perf_counter()
+        try:
+            self._predictor = await asyncio.to_thread(self._load_sync)
+        except Exception as e:
+            self._state = self.FAILED
+            self.error = str(e)
+            logger.warning(f"⚠️ Modèle ML non disponible: {e}")
+            return
+        self.load_seconds = round(time.perf_counter() - start, 3)
+        self._state = self.READY
+        logger.info(f"✅ Modèle ML chargé en {self.load_seconds}s ({self.model_path})")
+
+    def _load_sync(self):
+        # Import différé : pandas, scikit-learn et xgboost hors du démarrage
+        from app.services.ml_trainer import QueueTimePredictor
+
+        predictor = QueueTimePredictor(model_path=str(self.model_path))
+        predictor.load_model(mmap_mode="r" if self.mmap else None)
+        predictor.predict_many([{}])  # Prédiction d'essai (caches du booster)
+        return predictor
+
+    async def close(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "path": str(self.model_path),
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+
+
+# Instance globale
+model_registry = ModelRegistry(settings.ML_MODEL_PATH, mmap=settings.ML_MODEL_MMAP)
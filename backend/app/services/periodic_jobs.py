@@ -0,0 +1,302 @@
+"""
+ViteviteApp - Periodic Jobs
+Matérialisation périodique des champs dérivés (en SQL, par lots)
+
+- Service.affluence_level : niveau d'affluence selon la file courante
+- Service.best_visit_times : créneaux les plus calmes des dernières semaines
+- Administration.total_queue_size / average_wait_time / total_active_counters
+- Counter.tickets_processed_today : recompté depuis les tickets du jour,
+  ce qui remet aussi les compteurs à zéro au changement de journée
+"""
+
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import logging
+import re
+
+from sqlalchemy import select, update, func, case, and_, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.ticket import wait_minutes_expression
+from app.models.administration import Administration
+from app.models.counter import Counter, CounterStatus
+from app.models.service import Service, AffluenceLevel
+from app.models.ticket import Ticket, TicketStatus
+from app.services.job_runner import JobRunner
+from app.services.response_cache import response_cache, SERVICES_TAG, ADMINISTRATIONS_TAG
+from app.services.ticket_stats import ticket_stats_service
+from app.utils.time_windows import day_window, days_window, hour_of_day, in_window, local_today
+
+logger = logging.getLogger(__name__)
+
+
+# Tickets comptés dans la file d'un service
+QUEUED_STATUSES = (TicketStatus.WAITING, TicketStatus.PENDING_VALIDATION)
+
+# Historique utilisé pour les meilleurs créneaux
+BEST_VISIT_HISTORY_DAYS = 28
+BEST_VISIT_SLOTS = 3
+
+DEFAULT_OPENING_HOURS = (8, 17)
+
+
+# ========== AFFLUENCE ==========
+def _affluence(level: AffluenceLevel):
+    return literal(level, Service.affluence_level.type)
+
+
+async def refresh_affluence_levels(db: AsyncSession) -> int:
+    """
+    Recalcule le niveau d'affluence de tous les services en un UPDATE
+    Mêmes seuils que la file (taux de remplissage), ou taille absolue
+    si le service n'a pas de capacité maximale
+
+    Returns:
+        Nombre de services modifiés
+    """
+    queue_size = (
+        select(func.count(Ticket.id))
+        .where(and_(Ticket.service_id == Service.id, Ticket.status.in_(QUEUED_STATUSES)))
+        .scalar_subquery()
+    )
+    has_capacity = func.coalesce(Service.max_queue_size, 0) > 0
+    fill_rate = queue_size * 1.0 / Service.max_queue_size
+
+    level = case(
+        (and_(has_capacity, fill_rate >= 0.8), _affluence(AffluenceLevel.VERY_HIGH)),
+        (and_(has_capacity, fill_rate >= 0.6), _affluence(AffluenceLevel.HIGH)),
+        (and_(has_capacity, fill_rate >= 0.3), _affluence(AffluenceLevel.MODERATE)),
+        (has_capacity, _affluence(AffluenceLevel.LOW)),
+        (queue_size > 15, _affluence(AffluenceLevel.VERY_HIGH)),
+        (queue_size > 8, _affluence(AffluenceLevel.HIGH)),
+        (queue_size > 3, _affluence(AffluenceLevel.MODERATE)),
+        else_=_affluence(AffluenceLevel.LOW)
+    )
+
+    result = await db.execute(
+        update(Service)
+        .where(Service.affluence_level != level)
+        .values(affluence_level=level)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        response_cache.invalidate_on_commit(db, SERVICES_TAG)
+    return result.rowcount
+
+
+# ========== MEILLEURS CRÉNEAUX ==========
+def opening_hours_range(opening_hours: Optional[str]) -> Tuple[int, int]:
+    """"08:00 - 17:00" -> (8, 17) ; plage par défaut si illisible"""
+    hours = re.findall(r"(\d{1,2})[:h]\d{2}", opening_hours or "")
+    if len(hours) >= 2:
+        start, end = int(hours[0]), int(hours[1])
+        if 0 <= start < end <= 24:
+            return start, end
+    return DEFAULT_OPENING_HOURS
+
+
+def best_visit_slots(
+    hourly: Dict[int, Tuple[int, Optional[float]]],
+    opening_hours: Optional[str],
+    days: int
+) -> List[dict]:
+    """
+    Créneaux d'une heure les moins chargés pendant les heures d'ouverture
+
+    Args:
+        hourly: {heure: (tickets, attente moyenne)}
+        opening_hours: Horaires du service
+        days: Nombre de jours d'historique
+
+    Returns:
+        [{"hour": "14:00-15:00", "score": 0.9, "reason": "..."}]
+    """
+    start, end = opening_hours_range(opening_hours)
+    hours = list(range(start, end))
+    busiest = max((hourly.get(hour, (0, None))[0] for hour in hours), default=0) or 1
+
+    ranked = sorted(hours, key=lambda hour: (hourly.get(hour, (0, None))[0], hourly.get(hour, (0, None))[1] or 0.0))
+    slots = []
+    for hour in ranked[:BEST_VISIT_SLOTS]:
+        tickets, average_wait = hourly.get(hour, (0, None))
+        score = round(1 - tickets / busiest, 2)
+        reason = "Faible affluence" if score >= 0.7 else "Affluence modérée" if score >= 0.4 else "Affluence élevée"
+        reason += f" (~{tickets / days:.1f} tickets/h"
+        if average_wait is not None:
+            reason += f", attente moyenne {average_wait:.0f} min"
+        reason += ")"
+        slots.append({"hour": f"{hour:02d}:00-{hour + 1:02d}:00", "score": score, "reason": reason})
+    return slots
+
+
+async def refresh_best_visit_times(db: AsyncSession, days: int = BEST_VISIT_HISTORY_DAYS) -> int:
+    """
+    Recalcule les meilleurs créneaux de visite depuis l'historique récent
+    (une requête GROUP BY service, heure puis un UPDATE groupé)
+
+    Returns:
+        Nombre de services mis à jour
+    """
+    dialect = db.get_bind().dialect.name
+    today = local_today()
+    window = days_window(today - timedelta(days=days), today - timedelta(days=1))
+
+    hour = hour_of_day(Ticket.created_at, dialect).label("hour")
+    wait = wait_minutes_expression(dialect)
+    result = await db.execute(
+        select(
+            Ticket.service_id,
+            hour,
+            func.count(Ticket.id),
+            func.avg(case((Ticket.called_at.isnot(None), wait)))
+        )
+        .where(in_window(Ticket.created_at, window))
+        .group_by(Ticket.service_id, hour)
+    )
+
+    history: Dict[str, Dict[int, Tuple[int, Optional[float]]]] = {}
+    for service_id, hour_value, count, average_wait in result.all():
+        history.setdefault(service_id, {})[hour_value] = (
+            count,
+            float(average_wait) if average_wait is not None else None
+        )
+    if not history:
+        return 0
+
+    result = await db.execute(
+        select(Service.id, Service.opening_hours).where(Service.id.in_(history.keys()))
+    )
+    rows = [
+        {"id": service_id, "best_visit_times": best_visit_slots(history[service_id], opening_hours, days)}
+        for service_id, opening_hours in result.all()
+    ]
+    if rows:
+        await db.execute(update(Service), rows)
+        response_cache.invalidate_on_commit(db, SERVICES_TAG)
+    return len(rows)
+
+
+# ========== ADMINISTRATIONS ==========
+async def refresh_administration_totals(db: AsyncSession) -> int:
+    """
+    Recalcule les totaux agrégés des administrations
+    (agrégats par service en GROUP BY puis un UPDATE groupé)
+
+    Returns:
+        Nombre d'administrations mises à jour
+    """
+    result = await db.execute(select(Administration.id, Administration.service_ids))
+    administrations = result.all()
+    if not administrations:
+        return 0
+
+    stats = await ticket_stats_service.by_service(db)
+
+    result = await db.execute(
+        select(Counter.service_id, func.count(Counter.id))
+        .where(and_(Counter.status == CounterStatus.OPEN, Counter.is_active.is_(True)))
+        .group_by(Counter.service_id)
+    )
+    open_counters = dict(result.all())
+
+    result = await db.execute(select(Service.id, Service.estimated_wait_time))
+    estimated_waits = dict(result.all())
+
+    rows = []
+    for administration_id, service_ids in administrations:
+        service_ids = [s for s in (service_ids or []) if s in estimated_waits]
+
+        queue_size = sum(stats[s].queue_size for s in service_ids if s in stats)
+        wait_total = sum(stats[s].wait_total for s in service_ids if s in stats)
+        wait_samples = sum(stats[s].wait_samples for s in service_ids if s in stats)
+
+        if wait_samples:
+            average_wait = wait_total / wait_samples
+        elif service_ids:
+            # Pas encore d'appel aujourd'hui : estimation des services
+            average_wait = sum(estimated_waits[s] or 0 for s in service_ids) / len(service_ids)
+        else:
+            average_wait = 0
+
+        rows.append({
+            "id": administration_id,
+            "total_queue_size": queue_size,
+            "average_wait_time": int(round(average_wait)),
+            "total_active_counters": sum(open_counters.get(s, 0) for s in service_ids),
+        })
+
+    await db.execute(update(Administration), rows)
+    response_cache.invalidate_on_commit(db, ADMINISTRATIONS_TAG)
+    return len(rows)
+
+
+# ========== GUICHETS ==========
+async def rollover_counter_stats(db: AsyncSession) -> int:
+    """
+    Recompte `tickets_processed_today` depuis les tickets terminés du jour
+    (un UPDATE corrélé) : corrige les dérives et remet les compteurs à zéro
+    au changement de journée
+
+    Returns:
+        Nombre de guichets modifiés
+    """
+    processed_today = (
+        select(func.count(Ticket.id))
+        .where(
+            and_(
+                Ticket.counter_id == Counter.id,
+                Ticket.status == TicketStatus.COMPLETED,
+                in_window(Ticket.completed_at, day_window())
+            )
+        )
+        .scalar_subquery()
+    )
+
+    result = await db.execute(
+        update(Counter)
+        .where(Counter.tickets_processed_today != processed_today)
+        .values(tickets_processed_today=processed_today)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+# ========== ENREGISTREMENT ==========
+def _in_session(func: Callable[[AsyncSession], Awaitable[int]]) -> Callable[[], Awaitable[int]]:
+    """Exécute une matérialisation dans sa propre transaction"""
+    async def job() -> int:
+        from app.core.database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as session:
+            updated = await func(session)
+            await session.commit()
+        logger.debug(f"{func.__name__}: {updated} lignes mises à jour")
+        return updated
+
+    job.__name__ = func.__name__
+    return job
+
+
+def register_periodic_jobs(runner: JobRunner) -> None:
+    """Déclare les matérialisations périodiques"""
+    runner.register(
+        "affluence_levels",
+        _in_session(refresh_affluence_levels),
+        settings.JOB_AFFLUENCE_INTERVAL_SECONDS
+    )
+    runner.register(
+        "administration_totals",
+        _in_session(refresh_administration_totals),
+        settings.JOB_ADMINISTRATION_TOTALS_INTERVAL_SECONDS
+    )
+    runner.register(
+        "best_visit_times",
+        _in_session(refresh_best_visit_times),
+        settings.JOB_BEST_VISIT_TIMES_INTERVAL_SECONDS
+    )
+    runner.register(
+        "counter_rollover",
+        _in_session(rollover_counter_stats),
+        settings.JOB_COUNTER_ROLLOVER_INTERVAL_SECONDS
+    )
@@ -0,0 +1,122 @@
+"""
+ViteviteApp - Principal Cache
+Cache des utilisateurs authentifiés (sujet du token -> rôle, statut)
+
+Chaque requête authentifiée relisait la ligne `users` ; les pages admin
+interrogent plusieurs endpoints toutes les 5 secondes. Le cache (TTL court,
+LRU, par worker) garde le strict nécessaire aux contrôles d'accès ; les
+handlers qui ont besoin de la ligne complète la chargent via `load()`.
+
+Toute modification ou suppression d'un utilisateur par l'ORM l'invalide
+après COMMIT. Les autres workers (et les UPDATE en masse) attendent le TTL.
+"""
+
+from typing import Optional, Set
+import logging
+import uuid
+
+from cachetools import TTLCache
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+
+# Clé de session pour les utilisateurs à invalider après COMMIT
+_PENDING_KEY = "principal_cache_pending"
+
+
+class Principal:
+    """Utilisateur authentifié : identité et droits, sans la ligne complète"""
+
+    __slots__ = ("id", "email", "role", "is_active")
+
+    def __init__(self, id: uuid.UUID, email: str, role: str, is_active: bool):
+        self.id = id
+        self.email = email
+        self.role = role
+        self.is_active = is_active
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(user.id, user.email, user.role, bool(user.is_active))
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == UserRole.ADMIN
+
+    async def load(self, db: AsyncSession) -> Optional[User]:
+        """Charge la ligne `users` complète (nom, téléphone...)"""
+        return await db.get(User, self.id)
+
+
+class PrincipalCache:
+    """Cache LRU à TTL court des utilisateurs authentifiés"""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 30, enabled: bool = True):
+        self.enabled = enabled and ttl > 0
+        self._entries: TTLCache = TTLCache(maxsize=max(1, maxsize), ttl=max(ttl, 0.001))
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, subject: str) -> Optional[Principal]:
+        principal = self._entries.get(subject) if self.enabled else None
+        if principal is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return principal
+
+    def set(self, subject: str, principal: Principal) -> None:
+        if self.enabled:
+            self._entries[subject] = principal
+
+    def invalidate(self, *subjects: str) -> None:
+        for subject in subjects:
+            self._entries.pop(subject, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+
+# ========== SYNCHRONISATION TRANSACTIONNELLE ==========
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _track_user_change(mapper, connection, target: User) -> None:
+    session = object_session(target)
+    if session is not None and target.id is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(str(target.id))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    subjects: Optional[Set[str]] = session.info.pop(_PENDING_KEY, None)
+    if subjects:
+        principal_cache.invalidate(*subjects)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+# Instance globale
+principal_cache = PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,411 @@
+"""
+ViteviteApp - Queue Broadcaster
+Diffusion temps réel de l'état des files et des tickets (WebSocket / SSE)
+
+Un seul diffuseur par process : les changements validés par le moteur de
+file (après COMMIT) marquent les services concernés, puis un flush regroupé
+calcule l'état une seule fois par service et envoie le même diff à tous les
+abonnés. N abonnés coûtent donc un calcul, pas N requêtes.
+
+Avec plusieurs workers, un commit n'est vu que par le process qui l'a fait.
+Les services modifiés sont donc relayés entre workers :
+- relais Redis (pub/sub sur REDIS_URL) si Redis répond (BROADCAST_RELAY)
+- sinon relecture périodique des files suivies (BROADCAST_RESYNC_SECONDS) :
+  un diff n'est envoyé que si l'état a changé
+
+Topics :
+- service:{service_id} : tickets actifs de la file (ordre, statuts, tailles)
+- ticket:{ticket_id} : statut et position d'un ticket
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+import asyncio
+import json
+import logging
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.ticket import Ticket, TicketStatus
+from app.services.queue_engine import QueueEngine, QueueEntry, queue_engine
+
+logger = logging.getLogger(__name__)
+
+
+# Statuts définitifs : un ticket suivi dans cet état n'est plus relu
+TERMINAL_STATUSES = (TicketStatus.COMPLETED, TicketStatus.CANCELLED, TicketStatus.NO_SHOW, TicketStatus.REJECTED)
+
+
+class Subscription:
+    """Abonnement d'un client à un topic (file de messages bornée)"""
+
+    def __init__(self, topic: str, max_pending: int = 100):
+        self.topic = topic
+        self.messages: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+
+    def push(self, message: Dict[str, Any], snapshot: Dict[str, Any]) -> None:
+        """Ajoute un message ; un client trop lent est resynchronisé par snapshot"""
+        try:
+            self.messages.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.messages.empty():
+                self.messages.get_nowait()
+            self.messages.put_nowait(snapshot)
+
+    async def get(self) -> Dict[str, Any]:
+        return await self.messages.get()
+
+
+class RedisQueueRelay:
+    """Relais des services modifiés entre workers (pub/sub Redis)"""
+
+    CHANNEL = "vitevite:queue-changes"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url, socket_connect_timeout=1)
+        self._pubsub = None
+        self._listen_task: Optional[asyncio.Task] = None
+        self._publishing: Set[asyncio.Task] = set()
+        self.origin = uuid.uuid4().hex  # Messages de ce worker ignorés à la réception
+
+    async def connect(self, on_changes: Callable[[Iterable[str]], None]) -> None:
+        await self._client.ping()
+        self._pubsub = self._client.pubsub()
+        await self._pubsub.subscribe(self.CHANNEL)
+        self._listen_task = asyncio.get_running_loop().create_task(self._listen(on_changes))
+
+    def publish(self, service_ids: Iterable[str]) -> None:
+        """Publie sans bloquer le listener de commit"""
+        message = json.dumps({"origin": self.origin, "services": sorted(service_ids)})
+        task = asyncio.get_running_loop().create_task(self._client.publish(self.CHANNEL, message))
+        self._publishing.add(task)
+        task.add_done_callback(self._published)
+
+    def _published(self, task: asyncio.Task) -> None:
+        self._publishing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"⚠️ Relais des files indisponible: {task.exception()}")
+
+    async def _listen(self, on_changes: Callable[[Iterable[str]], None]) -> None:
+        async for message in self._pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            try:
+                data = json.loads(message["data"])
+            except (TypeError, ValueError):
+                continue
+            if data.get("origin") != self.origin:
+                on_changes(data.get("services", []))
+
+    async def close(self) -> None:
+        if self._listen_task is not None:
+            self._listen_task.cancel()
+            await asyncio.gather(self._listen_task, return_exceptions=True)
+        if self._publishing:
+            await asyncio.gather(*self._publishing, return_exceptions=True)
+        if self._pubsub is not None:
+            await self._pubsub.close()
+        await self._client.close()
+
+
+class QueueBroadcaster:
+    """Diffuseur unique en mémoire (par worker)"""
+
+    def __init__(
+        self,
+        engine: QueueEngine,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        resync_interval: float = 0.0
+    ):
+        self.engine = engine
+        self._session_factory = session_factory
+        self.resync_interval = resync_interval
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._tickets: Dict[str, QueueEntry] = {}  # Tickets suivis (topic ticket)
+        self._dirty_services: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._resync_task: Optional[asyncio.Task] = None
+        self._relay: Optional[RedisQueueRelay] = None
+        engine.add_listener(self._on_commit)
+
+    # ========== RELAIS ENTRE WORKERS ==========
+    async def connect_relay(self, mode: str = "auto", url: Optional[str] = None) -> None:
+        """
+        Relais Redis des changements entre workers
+
+        Args:
+            mode: "redis", "none" ou "auto" (Redis s'il répond, sinon
+                relecture périodique des files suivies)
+            url: URL Redis (REDIS_URL)
+        """
+        if mode == "none" or not url:
+            return
+        try:
+            relay = RedisQueueRelay(url)
+            await relay.connect(self.mark_dirty)
+        except Exception as e:
+            if mode == "redis":
+                raise
+            logger.warning(f"⚠️ Relais Redis des files indisponible ({e}), relecture périodique")
+            return
+        self._relay = relay
+        logger.info("✅ Relais Redis des files (pub/sub)")
+
+    def mark_dirty(self, service_ids: Iterable[str]) -> None:
+        """Services modifiés par un autre worker : état relu au prochain flush"""
+        self._dirty_services.update(service_ids)
+        self._schedule_flush()
+
+    # ========== ABONNEMENTS ==========
+    async def subscribe_service(self, db: AsyncSession, service_id: str) -> Subscription:
+        topic = f"service:{service_id}"
+        if topic not in self._states:
+            entries = await self.engine.active_entries(db, service_id)
+            self._states[topic] = self._service_state(service_id, entries)
+        return self._add(topic)
+
+    async def subscribe_ticket(self, db: AsyncSession, ticket: Ticket) -> Subscription:
+        topic = f"ticket:{ticket.id}"
+        if topic not in self._states:
+            entry = QueueEntry.from_ticket(ticket)
+            self._tickets[ticket.id] = entry
+            entries = await self.engine.active_entries(db, ticket.service_id)
+            self._states[topic] = self._ticket_state(entry, entries)
+        return self._add(topic)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        topic = subscription.topic
+        subscribers = self._subscribers.get(topic)
+        if subscribers is None:
+            return
+
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[topic]
+            self._states.pop(topic, None)
+            if topic.startswith("ticket:"):
+                self._tickets.pop(topic.split(":", 1)[1], None)
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        if topic:
+            return len(self._subscribers.get(topic, ()))
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def _add(self, topic: str) -> Subscription:
+        subscription = Subscription(topic)
+        self._subscribers.setdefault(topic, set()).add(subscription)
+        subscription.push(self._snapshot(topic), self._snapshot(topic))
+        self._start_resync()
+        return subscription
+
+    def _watched_services(self) -> Set[str]:
+        services = {topic.split(":", 1)[1] for topic in self._subscribers if topic.startswith("service:")}
+        services.update(entry.service_id for entry in self._tickets.values())
+        return services
+
+    def _start_resync(self) -> None:
+        """Relecture périodique, sans relais, tant qu'il reste des abonnés"""
+        if self.resync_interval <= 0 or self._relay is not None:
+            return
+        if self._resync_task is None or self._resync_task.done():
+            self._resync_task = asyncio.get_running_loop().create_task(self._resync_loop())
+
+    async def _resync_loop(self) -> None:
+        while self._subscribers:
+            await asyncio.sleep(self.resync_interval)
+            self.mark_dirty(self._watched_services())
+
+    # ========== CHANGEMENTS ==========
+    def _on_commit(self, entries: List[QueueEntry]) -> None:
+        """Listener du moteur de file : marque les services modifiés"""
+        service_ids = set()
+        for entry in entries:
+            if entry.id in self._tickets:
+                self._tickets[entry.id] = entry
+            service_ids.add(entry.service_id)
+
+        if self._relay is not None and service_ids:
+            try:
+                self._relay.publish(service_ids)
+            except RuntimeError:
+                pass  # Pas de boucle (scripts synchrones)
+
+        self._dirty_services.update(service_ids)
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if not self._subscribers:
+            self._dirty_services.clear()
+            return
+
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+            except RuntimeError:
+                # Pas de boucle (scripts synchrones) : rien à diffuser
+                self._dirty_services.clear()
+
+    async def flush(self) -> None:
+        """
+        Recalcule l'état une fois par service modifié et diffuse les diffs
+        Les commits arrivés pendant un passage sont traités au passage suivant
+        (le listener ne relance pas de flush tant que celui-ci tourne)
+        """
+        await asyncio.sleep(0)  # Regroupe les commits rapprochés
+        while self._dirty_services:
+            services, self._dirty_services = self._dirty_services, set()
+            await self._flush_services(services)
+
+    async def _flush_services(self, services: Set[str]) -> None:
+        watched_tickets: Dict[str, List[str]] = {}
+        for ticket_id, entry in self._tickets.items():
+            watched_tickets.setdefault(entry.service_id, []).append(ticket_id)
+
+        session_factory = self._session_factory
+        if session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+
+        async with session_factory() as db:
+            for service_id in services:
+                service_topic = f"service:{service_id}"
+                ticket_ids = watched_tickets.get(service_id, [])
+                if service_topic not in self._subscribers and not ticket_ids:
+                    continue
+
+                try:
+                    entries = await self.engine.active_entries(db, service_id)
+                except Exception as e:
+                    logger.error(f"Erreur diffusion file {service_id}: {e}")
+                    continue
+
+                if service_topic in self._subscribers:
+                    self._publish(service_topic, self._service_state(service_id, entries))
+
+                # Tickets suivis : état relu (ils ont pu changer dans un autre worker)
+                current = {entry.id: entry for entry in entries}
+                for ticket_id in ticket_ids:
+                    entry = current.get(ticket_id)
+                    if entry is None and self._tickets[ticket_id].status not in TERMINAL_STATUSES:
+                        ticket = await db.get(Ticket, ticket_id)
+                        entry = QueueEntry.from_ticket(ticket) if ticket is not None else None
+                    if entry is not None and ticket_id in self._tickets:
+                        self._tickets[ticket_id] = entry
+                    if ticket_id in self._tickets:
+                        self._publish(f"ticket:{ticket_id}", self._ticket_state(self._tickets[ticket_id], entries))
+
+    async def close(self) -> None:
+        """Attend la fin du flush en cours et ferme le relais (arrêt de l'application)"""
+        if self._resync_task is not None and not self._resync_task.done():
+            self._resync_task.cancel()
+            await asyncio.gather(self._resync_task, return_exceptions=True)
+        if self._flush_task is not None and not self._flush_task.done():
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        if self._relay is not None:
+            await self._relay.close()
+            self._relay = None
+
+    def _publish(self, topic: str, state: Dict[str, Any]) -> None:
+        old_state = self._states.get(topic, {})
+        self._states[topic] = state
+
+        changes = self._diff(old_state, state)
+        if not changes:
+            return
+
+        message = {"type": "diff", "topic": topic, "changes": changes}
+        snapshot = self._snapshot(topic)
+        for subscription in list(self._subscribers.get(topic, ())):
+            subscription.push(message, snapshot)
+
+    # ========== ÉTATS ==========
+    def _snapshot(self, topic: str) -> Dict[str, Any]:
+        return {"type": "snapshot", "topic": topic, "data": self._states.get(topic, {})}
+
+    def _service_state(self, service_id: str, entries: List[QueueEntry]) -> Dict[str, Any]:
+        tickets = []
+        rank = 0
+        for entry in entries:
+            ticket = self._serialize(entry)
+            if entry.status == TicketStatus.WAITING:
+                rank += 1
+                ticket["rank"] = rank
+            tickets.append(ticket)
+
+        return {
+            "service_id": service_id,
+            "total_active_tickets": len(entries),
+            "waiting_count": rank,
+            "tickets": tickets
+        }
+
+    def _ticket_state(self, entry: QueueEntry, entries: List[QueueEntry]) -> Dict[str, Any]:
+        state = self._serialize(entry)
+        state["service_id"] = entry.service_id
+        state["rank"] = None
+        state["tickets_ahead"] = 0
+
+        if entry.status == TicketStatus.WAITING:
+            called = 0
+            rank = 0
+            for other in entries:
+                if other.status == TicketStatus.CALLED:
+                    called += 1
+                elif other.status == TicketStatus.WAITING:
+                    rank += 1
+                    if other.id == entry.id:
+                        state["rank"] = rank
+                        state["tickets_ahead"] = rank - 1 + called
+                        break
+        return state
+
+    @staticmethod
+    def _serialize(entry: QueueEntry) -> Dict[str, Any]:
+        data = entry.to_dict()
+        status = data.get("status")
+        data["status"] = status.value if isinstance(status, TicketStatus) else status
+        return data
+
+    @staticmethod
+    def _diff(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+        """Diff d'état : champs modifiés, et pour les files ajouts/MAJ/retraits"""
+        changes = {}
+        for key, value in new.items():
+            if key == "tickets":
+                continue
+            if old.get(key) != value:
+                changes[key] = value
+
+        if "tickets" in new:
+            old_tickets = {t["id"]: t for t in old.get("tickets", [])}
+            new_tickets = {t["id"]: t for t in new["tickets"]}
+
+            added = [t for t_id, t in new_tickets.items() if t_id not in old_tickets]
+            updated = [
+                t for t_id, t in new_tickets.items()
+                if t_id in old_tickets and old_tickets[t_id] != t
+            ]
+            removed = [t_id for t_id in old_tickets if t_id not in new_tickets]
+
+            if added:
+                changes["added"] = added
+            if updated:
+                changes["updated"] = updated
+            if removed:
+                changes["removed"] = removed
+            if list(old_tickets) != list(new_tickets):
+                changes["order"] = list(new_tickets)
+
+        return changes
+
+
+# Instance globale
+# Relecture périodique utile seulement si d'autres workers écrivent
+queue_broadcaster = QueueBroadcaster(
+    queue_engine,
+    resync_interval=settings.BROADCAST_RESYNC_SECONDS if settings.WORKERS > 1 else 0.0
+)
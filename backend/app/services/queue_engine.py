@@ -0,0 +1,670 @@
+"""
+ViteviteApp - Queue Engine
+Moteur de files d'attente résident (une file ordonnée par service)
+
+Le moteur répond aux questions chaudes du cycle de vie des tickets
+(taille de file, position, prochain ticket) sans requête COUNT(*) :
+- MemoryQueueEngine : état chargé au démarrage puis maintenu en mémoire
+- SQLQueueEngine : lecture directe en base (déploiements multi-workers)
+
+Les modifications passent toujours par l'ORM : l'endpoint modifie le ticket,
+appelle `track()`, et l'état mémoire n'est appliqué qu'après le COMMIT de la
+même transaction (annulé en cas de ROLLBACK).
+
+L'ordre de passage repose sur une clé fractionnaire clairsemée (`queue_rank`) :
+déplacer un ticket n'écrit que sa propre ligne (rang pris entre ses nouveaux
+voisins). La position affichée est dérivée du rang, jamais stockée ; quand les
+écarts deviennent trop fins, la file est rééquilibrée en tâche de fond.
+"""
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+from sqlalchemy import event, select, func, and_, tuple_
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.ticket import Ticket, TicketStatus, QUEUE_RANK_GAP
+
+logger = logging.getLogger(__name__)
+
+
+ACTIVE_STATUSES = (TicketStatus.WAITING, TicketStatus.CALLED, TicketStatus.SERVING)
+
+# Écart minimal entre deux rangs voisins (en dessous : rééquilibrage immédiat)
+RANK_MIN_GAP = 1e-6
+# Écart à partir duquel un rééquilibrage est planifié en tâche de fond
+RANK_REBALANCE_GAP = 1e-2
+
+# Clé d'ordre SQL : colonne brute pour rester servie par les index de file
+# (le rang est attribué à l'émission et rétro-rempli par la migration 003)
+rank_expression = Ticket.queue_rank
+
+# Clé de session pour les tickets à synchroniser après COMMIT
+_PENDING_KEY = "queue_engine_pending"
+
+
+class QueueEntry:
+    """Instantané léger d'un ticket actif (pas d'objet ORM en mémoire)"""
+
+    __slots__ = (
+        "id", "service_id", "ticket_number", "status", "position_in_queue",
+        "queue_rank", "created_at", "counter_id", "user_name", "estimated_wait_time",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_ticket(cls, ticket: Ticket) -> "QueueEntry":
+        """Construit l'entrée depuis l'état chargé du ticket (sans lazy-load)"""
+        state = sa_inspect(ticket).dict
+        return cls(**{name: state.get(name) for name in cls.__slots__})
+
+    @property
+    def rank_key(self) -> float:
+        if self.queue_rank is not None:
+            return self.queue_rank
+        return (self.position_in_queue or 0) * QUEUE_RANK_GAP
+
+    @property
+    def sort_key(self) -> Tuple:
+        """Ordre de passage : rang, puis ancienneté, puis ID"""
+        return (
+            self.rank_key,
+            self.created_at or datetime.min,
+            self.id,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "ticket_number": self.ticket_number,
+            "user_name": self.user_name,
+            "status": self.status,
+            "position_in_queue": self.position_in_queue,
+            "counter_id": self.counter_id,
+            "estimated_wait_time": self.estimated_wait_time,
+        }
+
+
+class ServiceQueue:
+    """File ordonnée d'un service : tickets en attente, appelés et en service"""
+
+    def __init__(self, service_id: str):
+        self.service_id = service_id
+        self.entries: Dict[str, QueueEntry] = {}
+        self._waiting: List[Tuple] = []  # Clés triées des tickets en attente
+        self._max_rank = 0.0  # Plus grand rang attribué (croissant)
+
+    def upsert(self, entry: QueueEntry) -> None:
+        """Insère ou met à jour un ticket (le retire s'il n'est plus actif)"""
+        self.discard(entry.id)
+
+        if entry.status not in ACTIVE_STATUSES:
+            return
+
+        self.entries[entry.id] = entry
+        if entry.status == TicketStatus.WAITING:
+            insort(self._waiting, entry.sort_key)
+        self._max_rank = max(self._max_rank, entry.rank_key)
+
+    def discard(self, ticket_id: str) -> None:
+        """Retire un ticket de la file (O(log n) + décalage)"""
+        old = self.entries.pop(ticket_id, None)
+        if old is not None and old.status == TicketStatus.WAITING:
+            index = bisect_left(self._waiting, old.sort_key)
+            if index < len(self._waiting) and self._waiting[index] == old.sort_key:
+                del self._waiting[index]
+
+    @property
+    def size(self) -> int:
+        return len(self.entries)
+
+    @property
+    def waiting_count(self) -> int:
+        return len(self._waiting)
+
+    @property
+    def tail_position(self) -> int:
+        return len(self._waiting) + 1
+
+    def reserve_rank(self) -> float:
+        """Rang de fin de file pour un nouveau ticket"""
+        self._max_rank += QUEUE_RANK_GAP
+        return self._max_rank
+
+    def next_waiting_id(self) -> Optional[str]:
+        return self._waiting[0][-1] if self._waiting else None
+
+    def waiting_ids(self) -> List[str]:
+        return [key[-1] for key in self._waiting]
+
+    def waiting_entries(self) -> List[QueueEntry]:
+        return [self.entries[key[-1]] for key in self._waiting]
+
+    def rank(self, ticket_id: str) -> Optional[int]:
+        """Position (1-based) parmi les tickets en attente"""
+        entry = self.entries.get(ticket_id)
+        if entry is None or entry.status != TicketStatus.WAITING:
+            return None
+        return bisect_left(self._waiting, entry.sort_key) + 1
+
+    def ordered_entries(self) -> List[QueueEntry]:
+        """Appelés/en service d'abord, puis la file d'attente dans l'ordre"""
+        in_progress = sorted(
+            (e for e in self.entries.values() if e.status != TicketStatus.WAITING),
+            key=lambda e: e.sort_key,
+        )
+        return in_progress + [self.entries[ticket_id] for ticket_id in self.waiting_ids()]
+
+
+class QueueEngine(ABC):
+    """
+    Interface commune des moteurs de file
+
+    Toutes les lectures prennent la session courante pour que les backends
+    soient interchangeables (dépendance `get_queue_engine`).
+    """
+
+    def __init__(self):
+        self._listeners: List[Callable[[List[QueueEntry]], None]] = []
+
+    def add_listener(self, listener: Callable[[List[QueueEntry]], None]) -> None:
+        """Abonne un callback aux changements validés (ex: diffusion temps réel)"""
+        self._listeners.append(listener)
+
+    def notify(self, entries: List[QueueEntry]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(entries)
+            except Exception as e:
+                logger.error(f"Erreur listener de file: {e}")
+
+    async def load(self, db: AsyncSession) -> None:
+        """Charge l'état initial (au démarrage)"""
+
+    def apply(self, entry: QueueEntry) -> None:
+        """Applique un changement validé (appelé après COMMIT)"""
+
+    @abstractmethod
+    async def active_count(self, db: AsyncSession, service_id: str) -> int:
+        """Tickets actifs (en attente, appelés, en service) du service"""
+
+    @abstractmethod
+    async def waiting_count(self, db: AsyncSession, service_id: str) -> int:
+        """Tickets en attente du service"""
+
+    @abstractmethod
+    async def waiting_counts(self, db: AsyncSession) -> Dict[str, int]:
+        """Tickets en attente par service"""
+
+    @abstractmethod
+    async def tail_position(self, db: AsyncSession, service_id: str) -> int:
+        """Position attribuée au prochain ticket émis"""
+
+    @abstractmethod
+    async def next_rank(self, db: AsyncSession, service_id: str) -> float:
+        """Rang du prochain ticket émis (après tous les rangs réservés)"""
+
+    @abstractmethod
+    async def next_waiting_id(self, db: AsyncSession, service_id: str) -> Optional[str]:
+        """ID du prochain ticket en attente (None si file vide)"""
+
+    @abstractmethod
+    async def waiting_ids(self, db: AsyncSession, service_id: str) -> List[str]:
+        """IDs des tickets en attente dans l'ordre de passage"""
+
+    @abstractmethod
+    async def position(self, db: AsyncSession, ticket: Ticket) -> Optional[int]:
+        """Position (1-indexée) d'un ticket en attente, None sinon"""
+
+    @abstractmethod
+    async def active_entries(self, db: AsyncSession, service_id: str) -> List[QueueEntry]:
+        """Tickets actifs dans l'ordre (en cours puis en attente)"""
+
+    async def waiting_entries(self, db: AsyncSession, service_id: str) -> List[QueueEntry]:
+        """Tickets en attente dans l'ordre de passage"""
+        entries = await self.active_entries(db, service_id)
+        return [e for e in entries if e.status == TicketStatus.WAITING]
+
+    async def tickets_ahead(self, db: AsyncSession, ticket: Ticket) -> int:
+        """Nombre de tickets (en attente ou appelés) avant ce ticket"""
+        rank = await self.position(db, ticket)
+        if rank is None:
+            return 0
+        entries = await self.active_entries(db, ticket.service_id)
+        called = sum(1 for e in entries if e.status == TicketStatus.CALLED)
+        return rank - 1 + called
+
+    async def next_waiting(self, db: AsyncSession, service_id: str) -> Optional[Ticket]:
+        """Charge (par clé primaire) le prochain ticket en attente"""
+        while True:
+            ticket_id = await self.next_waiting_id(db, service_id)
+            if ticket_id is None:
+                return None
+
+            ticket = await db.get(Ticket, ticket_id)
+            if ticket is not None and ticket.status == TicketStatus.WAITING:
+                return ticket
+
+            # État mémoire périmé (modifié hors moteur) : on resynchronise
+            logger.warning(f"File {service_id}: ticket {ticket_id} désynchronisé, retiré")
+            self.forget(service_id, ticket_id)
+
+    def forget(self, service_id: str, ticket_id: str) -> None:
+        """Retire immédiatement un ticket de l'état du moteur"""
+
+    def track(self, db: AsyncSession, *tickets: Ticket) -> None:
+        """
+        Enregistre des tickets modifiés dans la transaction courante
+        L'état du moteur est mis à jour au COMMIT de la session
+        """
+        pending = db.sync_session.info.setdefault(_PENDING_KEY, {})
+        for ticket in tickets:
+            pending[id(ticket)] = (self, ticket)
+
+
+class MemoryQueueEngine(QueueEngine):
+    """Moteur résident : O(1) pour la taille, O(log n) pour la position"""
+
+    def __init__(self):
+        super().__init__()
+        self._queues: Dict[str, ServiceQueue] = {}
+        self.loaded = False
+
+    def _queue(self, service_id: str) -> ServiceQueue:
+        queue = self._queues.get(service_id)
+        if queue is None:
+            queue = self._queues[service_id] = ServiceQueue(service_id)
+        return queue
+
+    async def load(self, db: AsyncSession) -> None:
+        columns = [getattr(Ticket, name) for name in QueueEntry.__slots__]
+        result = await db.execute(
+            select(*columns).where(Ticket.status.in_(ACTIVE_STATUSES))
+        )
+
+        self._queues = {}
+        total = 0
+        for row in result.all():
+            self.apply(QueueEntry(**row._asdict()))
+            total += 1
+
+        # Les tickets en attente de validation ont déjà réservé leur rang
+        result = await db.execute(
+            select(Ticket.service_id, func.max(rank_expression))
+            .where(Ticket.status.in_(ACTIVE_STATUSES + (TicketStatus.PENDING_VALIDATION,)))
+            .group_by(Ticket.service_id)
+        )
+        for service_id, max_rank in result.all():
+            queue = self._queue(service_id)
+            queue._max_rank = max(queue._max_rank, max_rank or 0.0)
+
+        self.loaded = True
+        logger.info(f"✅ Moteur de files chargé ({total} tickets actifs, {len(self._queues)} services)")
+
+    def apply(self, entry: QueueEntry) -> None:
+        # Un ticket ne change pas de service, mais on reste défensif
+        for service_id, queue in self._queues.items():
+            if service_id != entry.service_id and entry.id in queue.entries:
+                queue.discard(entry.id)
+        self._queue(entry.service_id).upsert(entry)
+
+    def forget(self, service_id: str, ticket_id: str) -> None:
+        self._queue(service_id).discard(ticket_id)
+
+    async def active_count(self, db: AsyncSession, service_id: str) -> int:
+        return self._queue(service_id).size
+
+    async def waiting_count(self, db: AsyncSession, service_id: str) -> int:
+        return self._queue(service_id).waiting_count
+
+    async def waiting_counts(self, db: AsyncSession) -> Dict[str, int]:
+        return {
+            service_id: queue.waiting_count
+            for service_id, queue in self._queues.items()
+            if queue.waiting_count
+        }
+
+    async def tail_position(self, db: AsyncSession, service_id: str) -> int:
+        return self._queue(service_id).tail_position
+
+    async def next_rank(self, db: AsyncSession, service_id: str) -> float:
+        return self._queue(service_id).reserve_rank()
+
+    async def next_waiting_id(self, db: AsyncSession, service_id: str) -> Optional[str]:
+        return self._queue(service_id).next_waiting_id()
+
+    async def waiting_ids(self, db: AsyncSession, service_id: str) -> List[str]:
+        return self._queue(service_id).waiting_ids()
+
+    async def position(self, db: AsyncSession, ticket: Ticket) -> Optional[int]:
+        return self._queue(ticket.service_id).rank(ticket.id)
+
+    async def active_entries(self, db: AsyncSession, service_id: str) -> List[QueueEntry]:
+        return self._queue(service_id).ordered_entries()
+
+    async def waiting_entries(self, db: AsyncSession, service_id: str) -> List[QueueEntry]:
+        return self._queue(service_id).waiting_entries()
+
+
+class SQLQueueEngine(QueueEngine):
+    """Moteur sans état : chaque lecture interroge la base"""
+
+    def _active_filter(self, service_id: str):
+        return and_(
+            Ticket.service_id == service_id,
+            Ticket.status.in_(ACTIVE_STATUSES)
+        )
+
+    async def active_count(self, db: AsyncSession, service_id: str) -> int:
+        result = await db.execute(
+            select(func.count(Ticket.id)).where(self._active_filter(service_id))
+        )
+        return result.scalar() or 0
+
+    async def waiting_count(self, db: AsyncSession, service_id: str) -> int:
+        result = await db.execute(
+            select(func.count(Ticket.id)).where(
+                Ticket.service_id == service_id,
+                Ticket.status == TicketStatus.WAITING
+            )
+        )
+        return result.scalar() or 0
+
+    async def waiting_counts(self, db: AsyncSession) -> Dict[str, int]:
+        result = await db.execute(
+            select(Ticket.service_id, func.count(Ticket.id))
+            .where(Ticket.status == TicketStatus.WAITING)
+            .group_by(Ticket.service_id)
+        )
+        return {service_id: count for service_id, count in result.all()}
+
+    async def tail_position(self, db: AsyncSession, service_id: str) -> int:
+        return await self.waiting_count(db, service_id) + 1
+
+    async def next_rank(self, db: AsyncSession, service_id: str) -> float:
+        # Les tickets en attente de validation ont déjà réservé leur rang
+        result = await db.execute(
+            select(func.max(rank_expression)).where(
+                Ticket.service_id == service_id,
+                Ticket.status.in_(ACTIVE_STATUSES + (TicketStatus.PENDING_VALIDATION,))
+            )
+        )
+        return (result.scalar() or 0.0) + QUEUE_RANK_GAP
+
+    async def next_waiting_id(self, db: AsyncSession, service_id: str) -> Optional[str]:
+        ids = await self._waiting_ids(db, service_id, limit=1)
+        return ids[0] if ids else None
+
+    async def waiting_ids(self, db: AsyncSession, service_id: str) -> List[str]:
+        return await self._waiting_ids(db, service_id)
+
+    async def _waiting_ids(self, db: AsyncSession, service_id: str, limit: Optional[int] = None) -> List[str]:
+        stmt = (
+            select(Ticket.id)
+            .where(Ticket.service_id == service_id, Ticket.status == TicketStatus.WAITING)
+            .order_by(rank_expression, Ticket.created_at, Ticket.id)
+        )
+        if limit:
+            stmt = stmt.limit(limit)
+        result = await db.execute(stmt)
+        return list(result.scalars().all())
+
+    async def position(self, db: AsyncSession, ticket: Ticket) -> Optional[int]:
+        if ticket.status != TicketStatus.WAITING:
+            return None
+        if ticket.queue_rank is None or ticket.created_at is None:
+            ids = await self.waiting_ids(db, ticket.service_id)
+            return ids.index(ticket.id) + 1 if ticket.id in ids else None
+        # Tickets en attente devant celui-ci (même ordre que _waiting_ids)
+        result = await db.execute(
+            select(func.count(Ticket.id)).where(
+                Ticket.service_id == ticket.service_id,
+                Ticket.status == TicketStatus.WAITING,
+                tuple_(rank_expression, Ticket.created_at, Ticket.id)
+                < tuple_(ticket.queue_rank, ticket.created_at, ticket.id)
+            )
+        )
+        return (result.scalar() or 0) + 1
+
+    async def active_entries(self, db: AsyncSession, service_id: str) -> List[QueueEntry]:
+        columns = [getattr(Ticket, name) for name in QueueEntry.__slots__]
+        result = await db.execute(select(*columns).where(self._active_filter(service_id)))
+        queue = ServiceQueue(service_id)
+        for row in result.all():
+            queue.upsert(QueueEntry(**row._asdict()))
+        return queue.ordered_entries()
+
+
+# ========== CLÉS D'ORDRE ==========
+def plan_ranks(order: List[QueueEntry]) -> Tuple[Optional[Dict[str, float]], float]:
+    """
+    Calcule les rangs à réécrire pour obtenir un nouvel ordre de passage
+
+    La plus longue sous-suite déjà ordonnée garde ses rangs ; seuls les autres
+    tickets reçoivent un rang pris entre leurs voisins (un seul pour une
+    priorisation).
+
+    Args:
+        order: Tickets en attente dans le nouvel ordre souhaité
+
+    Returns:
+        (rangs à écrire par ID ou None si les écarts sont épuisés, plus petit écart utilisé)
+    """
+    keys = [entry.sort_key for entry in order]
+
+    # Plus longue sous-suite croissante (O(n log n))
+    tails: List[Tuple] = []
+    tail_indexes: List[int] = []
+    previous: List[int] = [-1] * len(order)
+    for index, key in enumerate(keys):
+        slot = bisect_left(tails, key)
+        if slot == len(tails):
+            tails.append(key)
+            tail_indexes.append(index)
+        else:
+            tails[slot] = key
+            tail_indexes[slot] = index
+        previous[index] = tail_indexes[slot - 1] if slot else -1
+
+    kept = set()
+    index = tail_indexes[-1] if tail_indexes else -1
+    while index != -1:
+        kept.add(index)
+        index = previous[index]
+
+    changes: Dict[str, float] = {}
+    min_gap = QUEUE_RANK_GAP
+    run: List[int] = []
+    lower: Optional[float] = None
+    for index in list(range(len(order))) + [len(order)]:
+        if index < len(order) and index not in kept:
+            run.append(index)
+            continue
+
+        upper = order[index].rank_key if index < len(order) else None
+        if run:
+            if lower is None and upper is None:
+                ranks = [QUEUE_RANK_GAP * (i + 1) for i in range(len(run))]
+            elif lower is None:
+                ranks = [upper - QUEUE_RANK_GAP * (len(run) - i) for i in range(len(run))]
+            elif upper is None:
+                ranks = [lower + QUEUE_RANK_GAP * (i + 1) for i in range(len(run))]
+            else:
+                step = (upper - lower) / (len(run) + 1)
+                if step < RANK_MIN_GAP:
+                    return None, 0.0
+                min_gap = min(min_gap, step)
+                ranks = [lower + step * (i + 1) for i in range(len(run))]
+
+            for run_index, rank in zip(run, ranks):
+                changes[order[run_index].id] = rank
+            run = []
+
+        if upper is not None:
+            lower = upper
+
+    return changes, min_gap
+
+
+def dense_ranks(order: List[QueueEntry]) -> Dict[str, float]:
+    """
+    Rangs régulièrement espacés (rééquilibrage), seuls les rangs modifiés
+
+    Les rangs descendent depuis le plus grand rang actuel : aucun ticket ne
+    dépasse un rang déjà réservé (tickets émis pendant le rééquilibrage).
+    `order` doit contenir les tickets en attente de validation de la file
+    (voir with_pending), sinon ils pourraient passer devant.
+    """
+    if not order:
+        return {}
+    top = max(entry.rank_key for entry in order)
+    last = len(order) - 1
+    ranks = {}
+    for index, entry in enumerate(order):
+        rank = top - QUEUE_RANK_GAP * (last - index)
+        if entry.queue_rank != rank:
+            ranks[entry.id] = rank
+    return ranks
+
+
+def with_pending(order: List[QueueEntry], pending: List[QueueEntry]) -> List[QueueEntry]:
+    """
+    Insère les tickets en attente de validation dans un ordre de passage
+
+    Chacun garde le même nombre de tickets en attente devant lui qu'avant
+    la réorganisation.
+    """
+    old_keys = sorted(entry.sort_key for entry in order)
+    slots: Dict[int, List[QueueEntry]] = {}
+    for entry in sorted(pending, key=lambda e: e.sort_key):
+        slots.setdefault(bisect_left(old_keys, entry.sort_key), []).append(entry)
+
+    merged: List[QueueEntry] = []
+    for index, entry in enumerate(order):
+        merged.extend(slots.get(index, ()))
+        merged.append(entry)
+    merged.extend(slots.get(len(order), ()))
+    return merged
+
+
+async def pending_entries(db: AsyncSession, service_id: str) -> List[QueueEntry]:
+    """Tickets en attente de validation (rang déjà réservé, hors moteur)"""
+    columns = [getattr(Ticket, name) for name in QueueEntry.__slots__]
+    result = await db.execute(
+        select(*columns).where(
+            Ticket.service_id == service_id,
+            Ticket.status == TicketStatus.PENDING_VALIDATION
+        )
+    )
+    return [QueueEntry(**row._asdict()) for row in result.all()]
+
+
+async def write_ranks(db: AsyncSession, engine: "QueueEngine", ranks: Dict[str, float]) -> None:
+    """Écrit les nouveaux rangs (une ligne par ticket déplacé)"""
+    if not ranks:
+        return
+
+    result = await db.execute(select(Ticket).where(Ticket.id.in_(list(ranks))))
+    now = datetime.utcnow()
+    for ticket in result.scalars().all():
+        ticket.queue_rank = ranks[ticket.id]
+        ticket.updated_at = now
+        engine.track(db, ticket)
+
+
+async def rebalance_queue(
+    service_id: str,
+    engine: Optional["QueueEngine"] = None,
+    session_factory: Optional[Callable[[], AsyncSession]] = None
+) -> int:
+    """
+    Réespace les rangs de la file d'un service (tâche de fond)
+
+    L'ordre est relu en base dans la transaction d'écriture, lignes
+    verrouillées (FOR UPDATE ; sous SQLite, un commit concurrent fait échouer
+    l'écriture) : une réorganisation validée entre-temps n'est pas écrasée.
+
+    Returns:
+        Nombre de tickets réécrits
+    """
+    if session_factory is None:
+        from app.core.database import AsyncSessionLocal
+        session_factory = AsyncSessionLocal
+
+    engine = engine or queue_engine
+    async with session_factory() as db:
+        try:
+            result = await db.execute(
+                select(Ticket)
+                .where(
+                    Ticket.service_id == service_id,
+                    Ticket.status.in_((TicketStatus.WAITING, TicketStatus.PENDING_VALIDATION))
+                )
+                .order_by(rank_expression, Ticket.created_at, Ticket.id)
+                .with_for_update()
+            )
+            tickets = result.scalars().all()
+            ranks = dense_ranks([QueueEntry.from_ticket(ticket) for ticket in tickets])
+
+            now = datetime.utcnow()
+            for ticket in tickets:
+                if ticket.id in ranks:
+                    ticket.queue_rank = ranks[ticket.id]
+                    ticket.updated_at = now
+                    engine.track(db, ticket)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Erreur rééquilibrage file {service_id}: {e}")
+            return 0
+
+    if ranks:
+        logger.info(f"File {service_id} rééquilibrée ({len(ranks)} tickets)")
+    return len(ranks)
+
+
+# ========== SYNCHRONISATION TRANSACTIONNELLE ==========
+@event.listens_for(Session, "after_commit")
+def _apply_pending_queue_changes(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    applied: Dict[int, Tuple[QueueEngine, List[QueueEntry]]] = {}
+    for engine, ticket in pending.values():
+        try:
+            entry = QueueEntry.from_ticket(ticket)
+            engine.apply(entry)
+            applied.setdefault(id(engine), (engine, []))[1].append(entry)
+        except Exception as e:
+            logger.error(f"Erreur synchronisation file: {e}")
+
+    for engine, entries in applied.values():
+        engine.notify(entries)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_queue_changes(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def create_queue_engine(backend: str) -> QueueEngine:
+    """Instancie le moteur configuré (`QUEUE_ENGINE_BACKEND`)"""
+    if backend == "sql":
+        return SQLQueueEngine()
+    if backend != "memory":
+        logger.warning(f"⚠️ Backend de file inconnu '{backend}', utilisation de 'memory'")
+    return MemoryQueueEngine()
+
+
+# Instance globale
+queue_engine = create_queue_engine(settings.QUEUE_ENGINE_BACKEND)
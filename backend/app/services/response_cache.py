@@ -0,0 +1,304 @@
+"""
+ViteviteApp - Response Cache
+Cache partagé des lectures publiques (catalogue des services, administrations)
+
+Les réponses sont mises en cache sous forme JSON, avec des tags :
+- backend Redis (REDIS_URL) partagé par tous les workers
+- repli en mémoire (TTL + LRU, cachetools) si Redis n'est pas installé ou
+  injoignable au démarrage : chaque worker a alors son propre cache et
+  n'est invalidé que par ses propres écritures (les autres attendent le TTL).
+  Les champs modifiés à chaque ticket (taille de file, attente, guichets)
+  ne sont donc pas servis depuis le cache : les endpoints du catalogue les
+  relisent en base (`service_crud.get_live_fields`)
+
+Les écritures (tickets, guichets, configuration, administrations) appellent
+`invalidate_on_commit(db, ...)` dans leur transaction : les tags ne sont
+invalidés qu'après le COMMIT, comme pour le moteur de file. Une lecture
+concurrente d'une écriture peut remettre en cache l'ancien état ; il expire
+au plus tard après le TTL.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+import asyncio
+import json
+import logging
+
+from cachetools import TLRUCache
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Clé de session pour les tags à invalider après COMMIT
+_PENDING_KEY = "response_cache_pending"
+
+# ========== TAGS ==========
+SERVICES_TAG = "services"  # Toute réponse dérivée des services
+SERVICES_LIST_TAG = "services:list"  # Liste du catalogue
+ADMINISTRATIONS_TAG = "administrations"  # Toute réponse dérivée des administrations
+
+
+def service_tag(service_id: str) -> str:
+    return f"service:{service_id}"
+
+
+def administration_tag(administration_id: str) -> str:
+    return f"administration:{administration_id}"
+
+
+def service_tags(*service_ids: str) -> List[str]:
+    """Tags à invalider quand des services changent (file, guichets, config)"""
+    return [SERVICES_LIST_TAG, *(service_tag(s) for s in service_ids)]
+
+
+# ========== BACKENDS ==========
+class MemoryCacheBackend:
+    """Cache du process : TTL par entrée, éviction LRU au-delà de maxsize"""
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = 1024):
+        # Valeur stockée : (ttl, payload) ; l'échéance est calculée à l'insertion
+        self._entries = TLRUCache(maxsize=maxsize, ttu=lambda key, value, now: now + value[0])
+        self._tags: Dict[str, Set[str]] = {}
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        return entry[1] if entry is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float, tags: Iterable[str]) -> None:
+        self._entries[key] = (ttl, value)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+    async def invalidate(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            for key in self._tags.pop(tag, ()):
+                self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+
+    async def close(self) -> None:
+        pass
+
+
+# Supprime atomiquement les clés de chaque tag puis le tag
+_INVALIDATE_SCRIPT = """
+for _, tag in ipairs(KEYS) do
+    local members = redis.call('SMEMBERS', tag)
+    for _, key in ipairs(members) do
+        redis.call('DEL', key)
+    end
+    redis.call('DEL', tag)
+end
+return 0
+"""
+
+
+class RedisCacheBackend:
+    """Cache partagé : une clé par réponse, un SET Redis de clés par tag"""
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "vitevite:cache:"):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url, socket_connect_timeout=1, socket_timeout=1)
+        self._prefix = prefix
+        self._invalidate = self._client.register_script(_INVALIDATE_SCRIPT)
+
+    def _key(self, key: str) -> str:
+        return f"{self._prefix}{key}"
+
+    def _tag(self, tag: str) -> str:
+        return f"{self._prefix}tag:{tag}"
+
+    async def ping(self) -> None:
+        await self._client.ping()
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._client.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float, tags: Iterable[str]) -> None:
+        seconds = max(1, int(ttl))
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.set(self._key(key), json.dumps(value), ex=seconds)
+            for tag in tags:
+                pipe.sadd(self._tag(tag), self._key(key))
+                pipe.expire(self._tag(tag), seconds)
+            await pipe.execute()
+
+    async def invalidate(self, tags: Iterable[str]) -> None:
+        keys = [self._tag(tag) for tag in tags]
+        if keys:
+            await self._invalidate(keys=keys)
+
+    async def clear(self) -> None:
+        async for key in self._client.scan_iter(match=f"{self._prefix}*"):
+            await self._client.delete(key)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+# ========== CACHE ==========
+class ResponseCache:
+    """
+    Cache de réponses JSON avec invalidation par tag
+    Les valeurs renvoyées sont partagées : ne pas les modifier.
+    """
+
+    def __init__(self, backend=None, ttl: float = 300, enabled: bool = True):
+        self.backend = backend or MemoryCacheBackend()
+        self.ttl = ttl
+        self.enabled = enabled
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.invalidations = 0
+
+    # ========== CYCLE DE VIE ==========
+    async def connect(self, backend: str = "auto", url: Optional[str] = None) -> None:
+        """
+        Choisit le backend au démarrage
+
+        Args:
+            backend: "redis", "memory" ou "auto" (Redis s'il répond, sinon mémoire)
+            url: URL Redis (REDIS_URL)
+        """
+        if backend == "memory" or not url:
+            logger.info("✅ Cache de réponses en mémoire")
+            return
+
+        try:
+            redis_backend = RedisCacheBackend(url)
+            await redis_backend.ping()
+        except Exception as e:
+            if backend == "redis":
+                raise
+            logger.warning(f"⚠️ Redis indisponible ({e}), cache de réponses en mémoire")
+            return
+
+        await self.backend.close()
+        self.backend = redis_backend
+        logger.info("✅ Cache de réponses Redis")
+
+    async def close(self) -> None:
+        await self.drain()
+        await self.backend.close()
+
+    async def drain(self) -> None:
+        """Attend les invalidations en cours"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    # ========== LECTURE ==========
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        tags: Iterable[str] = (),
+        ttl: Optional[float] = None
+    ) -> Any:
+        """
+        Renvoie la valeur en cache, sinon l'obtient via `loader` et la stocke
+
+        Args:
+            key: Clé de la réponse (paramètres compris)
+            loader: Coroutine produisant une valeur JSON (None = non mise en cache)
+            tags: Tags invalidant l'entrée
+            ttl: Durée de vie (CACHE_EXPIRE_SECONDS par défaut)
+        """
+        if not self.enabled:
+            return await loader()
+
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"⚠️ Lecture cache {key}: {e}")
+            value = None
+
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = await loader()
+        if value is not None:
+            try:
+                await self.backend.set(key, value, ttl or self.ttl, tags)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"⚠️ Écriture cache {key}: {e}")
+        return value
+
+    # ========== INVALIDATION ==========
+    def invalidate_on_commit(self, db: AsyncSession, *tags: str) -> None:
+        """Invalide les tags au COMMIT de la transaction courante"""
+        db.sync_session.info.setdefault(_PENDING_KEY, set()).update(tags)
+
+    async def invalidate(self, *tags: str) -> None:
+        if not tags:
+            return
+        self.invalidations += 1
+        try:
+            await self.backend.invalidate(tags)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"❌ Invalidation cache {sorted(tags)}: {e}")
+
+    def _schedule(self, tags: Iterable[str]) -> None:
+        """Lance l'invalidation depuis un listener synchrone (après COMMIT)"""
+        tags = tuple(tags)
+        if not tags or not self.enabled:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self.invalidate(*tags))
+        except RuntimeError:
+            # Pas de boucle (scripts synchrones) : rien en cache côté API
+            return
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "errors": self.errors,
+            "invalidations": self.invalidations,
+        }
+
+
+# ========== SYNCHRONISATION TRANSACTIONNELLE ==========
+@event.listens_for(Session, "after_commit")
+def _invalidate_pending_tags(session: Session) -> None:
+    tags = session.info.pop(_PENDING_KEY, None)
+    if tags:
+        response_cache._schedule(tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_tags(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+# Instance globale
+response_cache = ResponseCache(
+    MemoryCacheBackend(maxsize=settings.CACHE_MAX_ENTRIES),
+    ttl=settings.CACHE_EXPIRE_SECONDS,
+    enabled=settings.CACHE_ENABLED
+)
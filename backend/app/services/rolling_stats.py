@@ -0,0 +1,291 @@
+"""
+ViteviteApp - Rolling Stats (feature store)
+Rythme réel de chaque service et guichet sur fenêtres glissantes
+
+Les prédicteurs estimaient la vitesse d'un service avec des tables fixes
+(`BASE_TIMES`, `Service.average_service_time` à 10 par défaut). Le store suit,
+par service et par guichet :
+- arrivées / heure (tickets émis)
+- tickets servis / heure et temps de service moyen
+- taux d'absence (absents / (servis + absents))
+- guichets actifs (ayant appelé ou servi un ticket dans la fenêtre)
+sur 15 et 60 minutes glissantes, et pour le même créneau (jour de semaine,
+heure) des semaines précédentes (moyenne exponentielle, STATS_WEEKLY_WEIGHT).
+
+Il est alimenté par les événements de tickets validés (après COMMIT) publiés
+par `analytics_rollup` : aucune requête supplémentaire. Chaque événement met
+à jour O(1) cases de tampons circulaires (60 minutes, 7 x 24 heures).
+
+Les taux par guichet supposent un appel avec guichet (`counter_id` du
+tableau de bord ou de /tickets/call-next). Aucun endpoint ne marque encore
+un ticket absent : le taux d'absence reste vide tant que TicketEvent.NO_SHOW
+n'est pas émis.
+
+Le store est par worker : avec plusieurs workers, les compteurs (arrivées,
+servis / heure) ne voient qu'une part des événements ; les ratios (temps de
+service moyen, taux d'absence) utilisés par les prédicteurs restent justes.
+"""
+
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import time
+
+from app.core.config import settings
+from app.models.ticket import TicketStatus
+from app.services.analytics_rollup import TicketEvent, analytics_rollup
+from app.utils.time_windows import local_timezone
+
+
+WINDOWS_MINUTES = (15, 60)
+_MINUTE_SLOTS = 60
+_WEEK_SLOTS = 7 * 24
+
+
+def _minutes(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+    if start is None or end is None:
+        return None
+    return max(0.0, (end - start).total_seconds() / 60)
+
+
+class RateSlot:
+    """Compteurs d'une case (une minute, ou une heure d'un jour donné)"""
+
+    __slots__ = ("stamp", "arrivals", "served", "service_minutes", "no_shows", "counters")
+
+    def __init__(self):
+        self.stamp = -1
+        self.reset(-1)
+
+    def reset(self, stamp: int) -> None:
+        self.stamp = stamp
+        self.arrivals = 0.0
+        self.served = 0.0
+        self.service_minutes = 0.0
+        self.no_shows = 0.0
+        self.counters = set()
+
+
+class WeeklyAverage:
+    """Moyenne exponentielle des cases passées d'un même créneau hebdomadaire"""
+
+    __slots__ = ("arrivals", "served", "service_minutes", "no_shows", "counters", "weeks")
+
+    def __init__(self):
+        self.arrivals = 0.0
+        self.served = 0.0
+        self.service_minutes = 0.0
+        self.no_shows = 0.0
+        self.counters = 0.0
+        self.weeks = 0
+
+    def folded(self, slot: RateSlot, weight: float) -> "WeeklyAverage":
+        """Nouvelle moyenne incluant la case `slot` (sans modifier celle-ci)"""
+        average = WeeklyAverage()
+        keep = 0.0 if not self.weeks else 1 - weight
+        add = 1.0 if not self.weeks else weight
+        average.arrivals = self.arrivals * keep + slot.arrivals * add
+        average.served = self.served * keep + slot.served * add
+        average.service_minutes = self.service_minutes * keep + slot.service_minutes * add
+        average.no_shows = self.no_shows * keep + slot.no_shows * add
+        average.counters = self.counters * keep + len(slot.counters) * add
+        average.weeks = self.weeks + 1
+        return average
+
+
+def _rates(arrivals: float, served: float, service_minutes: float, no_shows: float, counters: float, minutes: float) -> dict:
+    resolved = served + no_shows
+    return {
+        "arrivals_per_hour": round(arrivals * 60 / minutes, 2),
+        "served_per_hour": round(served * 60 / minutes, 2),
+        "average_service_time": round(service_minutes / served, 2) if served else None,
+        "no_show_rate": round(no_shows / resolved, 3) if resolved else None,
+        "open_counters": round(counters, 1),
+        "samples": round(served, 1),
+    }
+
+
+class RollingRates:
+    """Tampons circulaires d'une entité (service ou guichet)"""
+
+    __slots__ = ("minutes", "hours", "history", "counters_seen")
+
+    def __init__(self):
+        self.minutes = [RateSlot() for _ in range(_MINUTE_SLOTS)]
+        self.hours = [RateSlot() for _ in range(_WEEK_SLOTS)]
+        self.history = [WeeklyAverage() for _ in range(_WEEK_SLOTS)]
+        # Guichet -> dernière activité (timestamp), pour les guichets actifs
+        self.counters_seen: Dict[str, float] = {}
+
+    def _minute_slot(self, ts: float) -> RateSlot:
+        stamp = int(ts // 60)
+        slot = self.minutes[stamp % _MINUTE_SLOTS]
+        if slot.stamp != stamp:
+            slot.reset(stamp)
+        return slot
+
+    def _hour_slot(self, local: datetime, weight: float) -> RateSlot:
+        index = local.weekday() * 24 + local.hour
+        stamp = local.toordinal() * 24 + local.hour
+        slot = self.hours[index]
+        if slot.stamp != stamp:
+            if slot.stamp >= 0:
+                self.history[index] = self.history[index].folded(slot, weight)
+            slot.reset(stamp)
+        return slot
+
+    def add(
+        self,
+        ts: float,
+        local: datetime,
+        weight: float,
+        arrivals: int = 0,
+        served: int = 0,
+        service_minutes: float = 0.0,
+        no_shows: int = 0,
+        counter_id: Optional[str] = None
+    ) -> None:
+        for slot in (self._minute_slot(ts), self._hour_slot(local, weight)):
+            slot.arrivals += arrivals
+            slot.served += served
+            slot.service_minutes += service_minutes
+            slot.no_shows += no_shows
+            if counter_id:
+                slot.counters.add(counter_id)
+        if counter_id:
+            self.counters_seen[counter_id] = ts
+
+    def window(self, ts: float, minutes: int) -> dict:
+        """Taux sur les `minutes` dernières minutes (minute courante comprise)"""
+        current = int(ts // 60)
+        arrivals = served = service_minutes = no_shows = 0.0
+        for stamp in range(current - minutes + 1, current + 1):
+            slot = self.minutes[stamp % _MINUTE_SLOTS]
+            if slot.stamp == stamp:
+                arrivals += slot.arrivals
+                served += slot.served
+                service_minutes += slot.service_minutes
+                no_shows += slot.no_shows
+        since = ts - minutes * 60
+        counters = sum(1 for seen in self.counters_seen.values() if seen > since)
+        return _rates(arrivals, served, service_minutes, no_shows, counters, minutes)
+
+    def same_weekday(self, local: datetime, weight: float) -> dict:
+        """Taux du même créneau (jour de semaine, heure) des semaines précédentes"""
+        index = local.weekday() * 24 + local.hour
+        stamp = local.toordinal() * 24 + local.hour
+        average = self.history[index]
+        slot = self.hours[index]
+        if 0 <= slot.stamp != stamp:
+            # Case d'une semaine passée pas encore intégrée à la moyenne
+            average = average.folded(slot, weight)
+        return _rates(average.arrivals, average.served, average.service_minutes,
+                      average.no_shows, average.counters, 60)
+
+
+class RollingStatsStore:
+    """Feature store en mémoire : taux glissants par service et par guichet"""
+
+    def __init__(self, weekly_weight: float = 0.3, min_samples: int = 3, clock: Callable[[], float] = time.time):
+        self.weekly_weight = weekly_weight
+        self.min_samples = max(1, min_samples)
+        self._clock = clock
+        self.services: Dict[str, RollingRates] = {}
+        self.counters: Dict[str, RollingRates] = {}
+        self.events = 0
+
+    def _now(self):
+        ts = self._clock()
+        return ts, datetime.fromtimestamp(ts, local_timezone()).replace(tzinfo=None)
+
+    @staticmethod
+    def _entity(entities: Dict[str, RollingRates], key: str) -> RollingRates:
+        rates = entities.get(key)
+        if rates is None:
+            rates = entities[key] = RollingRates()
+        return rates
+
+    # ========== ÉCRITURE ==========
+    def observe(self, ticket_event: TicketEvent, state: dict, previous_status: Optional[TicketStatus] = None) -> None:
+        """Intègre un événement de ticket validé (état du ticket après COMMIT)"""
+        service_id = state.get("service_id")
+        if not service_id:
+            return
+        counter_id = state.get("counter_id")
+
+        changes = {}
+        if ticket_event == TicketEvent.ISSUED:
+            changes = {"arrivals": 1}
+        elif ticket_event == TicketEvent.CALLED:
+            changes = {"counter_id": counter_id}
+        elif ticket_event == TicketEvent.COMPLETED:
+            duration = _minutes(state.get("started_at") or state.get("called_at"), state.get("completed_at"))
+            if duration is None:
+                return
+            changes = {"served": 1, "service_minutes": duration, "counter_id": counter_id}
+        elif ticket_event == TicketEvent.NO_SHOW:
+            changes = {"no_shows": 1, "counter_id": counter_id}
+        else:
+            return
+
+        ts, local = self._now()
+        self._entity(self.services, service_id).add(ts, local, self.weekly_weight, **changes)
+        if counter_id:
+            self._entity(self.counters, counter_id).add(ts, local, self.weekly_weight, **changes)
+        self.events += 1
+
+    # ========== LECTURE ==========
+    def snapshot(self, service_id: Optional[str] = None, counter_id: Optional[str] = None) -> Optional[dict]:
+        """
+        Taux d'un service (ou d'un guichet) : {"15m", "60m", "same_weekday"}
+        None si aucun événement n'a été observé
+        """
+        entities, key = (self.counters, counter_id) if counter_id else (self.services, service_id)
+        rates = entities.get(key)
+        if rates is None:
+            return None
+        ts, local = self._now()
+        snapshot = {f"{minutes}m": rates.window(ts, minutes) for minutes in WINDOWS_MINUTES}
+        snapshot["same_weekday"] = rates.same_weekday(local, self.weekly_weight)
+        return snapshot
+
+    def average_service_time(self, service_id: Optional[str] = None, counter_id: Optional[str] = None) -> Optional[float]:
+        """
+        Temps de service moyen observé (minutes par ticket et par guichet)
+
+        Dernière heure si elle compte au moins STATS_MIN_SAMPLES tickets
+        servis, sinon même créneau des semaines précédentes, sinon None
+        (l'appelant garde sa valeur de référence).
+        """
+        snapshot = self.snapshot(service_id, counter_id)
+        if snapshot is None:
+            return None
+        for window in ("60m", "same_weekday"):
+            rates = snapshot[window]
+            if rates["average_service_time"] is not None and rates["samples"] >= self.min_samples:
+                return rates["average_service_time"]
+        return None
+
+    def average_service_times(self, service_ids: List[Optional[str]]) -> List[Optional[float]]:
+        """average_service_time pour une liste de services (None si inconnu)"""
+        return [self.average_service_time(service_id) if service_id in self.services else None for service_id in service_ids]
+
+    def clear(self) -> None:
+        self.services.clear()
+        self.counters.clear()
+
+    def metrics(self) -> dict:
+        return {
+            "services": len(self.services),
+            "counters": len(self.counters),
+            "events": self.events,
+        }
+
+
+# Instance globale
+rolling_stats = RollingStatsStore(
+    weekly_weight=settings.STATS_WEEKLY_WEIGHT,
+    min_samples=settings.STATS_MIN_SAMPLES
+)
+
+# Alimenté par les événements de tickets validés
+analytics_rollup.listeners.append(rolling_stats.observe)
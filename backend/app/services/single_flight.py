@@ -0,0 +1,77 @@
+"""
+ViteviteApp - Single Flight
+Regroupe les calculs identiques lancés en même temps
+
+Quand une page de service populaire est ouverte sur des centaines de
+téléphones, chaque requête de prédiction déclenchait son propre aller-retour
+Gemini. Avec `single_flight.run(key, compute)`, le premier appelant lance le
+calcul ; les appels concurrents de même clé attendent ce calcul et partagent
+son résultat (ou son exception). Les appels en amont sont ainsi bornés à un
+par clé, quel que soit le nombre de clients.
+
+La clé inclut une tranche de temps (`time_bucket()`) : un appel arrivé dans
+une nouvelle tranche ne rejoint pas un calcul lancé dans la précédente.
+Le résultat partagé ne doit pas être modifié par les appelants.
+
+Le regroupement est par worker : avec N workers, au plus N calculs par clé.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def time_bucket(seconds: Optional[float] = None) -> int:
+    """Numéro de la tranche de temps courante (SINGLE_FLIGHT_BUCKET_SECONDS)"""
+    seconds = seconds or settings.SINGLE_FLIGHT_BUCKET_SECONDS
+    return int(time.time() // seconds)
+
+
+class SingleFlight:
+    """Calculs en cours par clé, partagés entre appelants concurrents"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+        self.executions = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Exécute `compute()` ou rejoint le calcul en cours pour `key`
+
+        Le calcul tourne dans sa propre tâche : l'annulation d'un appelant
+        (client déconnecté) n'interrompt pas les autres.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.get_running_loop().create_task(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Tous les appelants annulés : l'erreur est journalisée, pas perdue
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Calcul {key!r} en échec: {task.exception()!r}")
+
+    def metrics(self) -> dict:
+        return {
+            "inflight": len(self._inflight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
+
+
+# Instance globale
+single_flight = SingleFlight()
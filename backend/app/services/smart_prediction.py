@@ -1,19 +1,56 @@
 """
 ViteviteApp - Smart Prediction Service
 Prédictions intelligentes avec facteurs contextuels réels
+
+Les multiplicateurs (heure, jour de semaine, jour du mois, facteurs spéciaux)
+sont précalculés une fois dans des tables indexées par catégorie, jour de
+semaine, heure, jour du mois et veille de jour férié. Les jours fériés
+viennent d'un calendrier multi-annuel (HOLIDAYS_FILE, par défaut
+data/holidays_ci.json). `predict_many()` évalue une liste de services en un
+seul passage vectorisé : les boucles des endpoints ne recalculent plus les
+facteurs pour chaque service.
+
+Quand le feature store (app/services/rolling_stats.py) a observé assez de
+tickets servis, le temps de service mesuré remplace le temps de référence de
+la catégorie ; il inclut déjà le ralentissement de l'heure et du jour, les
+multiplicateurs contextuels ne sont alors pas réappliqués.
 """
 
-from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence
+import json
 import logging
-import calendar
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.rolling_stats import rolling_stats
+from app.utils.time_windows import local_now
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_HOLIDAYS_FILE = Path(__file__).resolve().parents[2] / "data" / "holidays_ci.json"
+
+
+def load_holidays(path: Optional[str] = None) -> FrozenSet[date]:
+    """Jours fériés du calendrier JSON ({"holidays": {"AAAA-MM-JJ": "nom"}})"""
+    path = Path(path or settings.HOLIDAYS_FILE or DEFAULT_HOLIDAYS_FILE)
+    try:
+        with open(path, encoding="utf-8") as f:
+            holidays = frozenset(date.fromisoformat(day) for day in json.load(f)["holidays"])
+    except Exception as e:
+        logger.error(f"❌ Calendrier des jours fériés illisible ({path}): {e}")
+        return frozenset()
+
+    if holidays and local_now().year > max(holidays).year:
+        logger.warning(f"⚠️  Calendrier des jours fériés à compléter ({path}, dernière année {max(holidays).year})")
+    return holidays
+
 
 class SmartPredictionService:
     """Service de prédiction intelligent avec facteurs contextuels ivoiriens"""
-    
+
     # Temps de base par catégorie (minutes par personne)
     BASE_TIMES = {
         "mairie": 12,
@@ -25,37 +62,114 @@ class SmartPredictionService:
         "banque": 12,
         "default": 10
     }
-    
+
     # Jours de salaire en Côte d'Ivoire
     SALARY_DAYS = [1, 5, 10, 15, 20, 25, 28]
-    
-    # Jours fériés 2025 (Côte d'Ivoire)
-    HOLIDAYS_2025 = [
-        (1, 1),   # Nouvel An
-        (4, 18),  # Vendredi Saint
-        (4, 21),  # Lundi de Pâques
-        (5, 1),   # Fête du Travail
-        (5, 29),  # Ascension
-        (6, 9),   # Lundi de Pentecôte
-        (8, 7),   # Indépendance
-        (8, 15),  # Assomption
-        (11, 1),  # Toussaint
-        (11, 15), # Journée Nationale de la Paix
-        (12, 25), # Noël
-    ]
-    
-    def predict_wait_time(self, service_data: Dict[str, Any]) -> Dict[str, Any]:
+
+    def __init__(self, holidays: Optional[FrozenSet[date]] = None):
+        self.holidays = load_holidays() if holidays is None else holidays
+        self._build_tables()
+
+    # ========== TABLES DE FACTEURS ==========
+    def _build_tables(self) -> None:
+        """Précalcule les multiplicateurs pour toutes les combinaisons"""
+        self.categories = list(self.BASE_TIMES)
+        self._category_index = {category: i for i, category in enumerate(self.categories)}
+        self._base_times = np.array([self.BASE_TIMES[c] for c in self.categories], dtype=float)
+
+        self.hour_factors = np.array([self._hour_factor(h) for h in range(24)])
+        self.weekday_factors = np.array([self._weekday_factor(d) for d in range(7)])
+
+        # [catégorie, jour du mois] (index 0 inutilisé)
+        self.month_day_factors = np.ones((len(self.categories), 32))
+        # [catégorie, mois, jour du mois, veille de jour férié]
+        self.special_factors = np.ones((len(self.categories), 13, 32, 2))
+
+        for c, category in enumerate(self.categories):
+            for day in range(1, 32):
+                self.month_day_factors[c, day] = self._month_day_factor(day, category)
+                for month in range(1, 13):
+                    for eve in (0, 1):
+                        self.special_factors[c, month, day, eve] = self._special_factor(month, day, bool(eve), category)
+
+        self.immediate_best_times = [self._get_immediate_best_time(h) for h in range(24)]
+
+    @staticmethod
+    def _hour_factor(hour: int) -> float:
+        if 8 <= hour < 10:
+            return 1.5  # Pic matinal
+        if 10 <= hour < 12:
+            return 1.3  # Matinée chargée
+        if 12 <= hour < 14:
+            return 0.7  # Pause déjeuner
+        if 14 <= hour < 16:
+            return 1.1  # Après-midi normal
+        if 16 <= hour < 18:
+            return 1.4  # Fin de journée
+        return 1.0
+
+    @staticmethod
+    def _weekday_factor(weekday: int) -> float:
+        if weekday == 0:  # Lundi
+            return 1.3
+        if weekday == 4:  # Vendredi
+            return 1.2
+        if weekday in (5, 6):  # Weekend
+            return 0.5  # Fermé ou très calme
+        return 1.0
+
+    def _month_day_factor(self, day: int, service_type: str) -> float:
+        if day in self.SALARY_DAYS:
+            # Jours de salaire - impact selon le service
+            if service_type in ["banque", "cnps"]:
+                return 2.5  # Très forte affluence
+            if service_type in ["mairie", "impots"]:
+                return 1.8
+            return 1.4
+
+        if day <= 5:  # Début de mois
+            return 1.6 if service_type in ["banque", "cnps", "impots"] else 1.2
+
+        if day >= 25:  # Fin de mois
+            return 2.0 if service_type in ["banque", "cnps"] else 1.3
+
+        return 1.0
+
+    @staticmethod
+    def _special_factor(month: int, day: int, before_holiday: bool, service_type: str) -> float:
+        factor = 1.0
+
+        # Veille de jour férié
+        if before_holiday:
+            factor = 1.5
+
+        # Rentrée scolaire (Septembre)
+        if month == 9 and day <= 15 and service_type in ["mairie", "prefecture"]:
+            factor = 1.7
+
+        # Période fiscale (Mars-Avril)
+        if month in [3, 4] and service_type == "impots":
+            factor = 2.0
+
+        return factor
+
+    def _is_before_holiday(self, day: date) -> bool:
+        """Vérifie si c'est la veille d'un jour férié"""
+        return day + timedelta(days=1) in self.holidays
+
+    # ========== PRÉDICTION ==========
+    def predict_wait_time(self, service_data: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
         """
         Prédit le temps d'attente avec facteurs contextuels réels
-        
+
         Args:
             service_data: {
-                id, name, type, 
-                total_queue_size, 
+                id, name, type,
+                total_queue_size,
                 total_active_counters,
                 is_open
             }
-        
+
         Returns:
             {
                 predicted_wait_time: int,
@@ -67,212 +181,137 @@ class SmartPredictionService:
                 alert: str (optional)
             }
         """
-        
-        queue_size = service_data.get("total_queue_size", 0)
-        active_counters = max(1, service_data.get("total_active_counters", 1))
-        service_type = service_data.get("type", "default")
-        is_open = service_data.get("is_open", True)
-        
-        if not is_open or queue_size == 0:
-            return self._empty_queue_prediction(service_data)
-        
-        # Temps de base
-        base_time_per_person = self.BASE_TIMES.get(service_type, self.BASE_TIMES["default"])
-        base_time = (queue_size * base_time_per_person) / active_counters
-        
-        # Facteurs contextuels
-        now = datetime.now()
-        factors = self._calculate_contextual_factors(now, service_type)
-        
+        return self.predict_many([service_data], now)[0]
+
+    def predict_many(self, services: Sequence[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Prédit le temps d'attente d'une liste de services en un seul passage
+
+        Args:
+            services: liste de `service_data` (voir predict_wait_time)
+            now: heure locale de référence (défaut : maintenant, TIMEZONE)
+
+        Returns:
+            Une prédiction par service, dans le même ordre
+        """
+        if not services:
+            return []
+
+        now = now or local_now().replace(tzinfo=None)
+        eve = int(self._is_before_holiday(now.date()))
+
+        queue_sizes = np.array([s.get("total_queue_size") or 0 for s in services], dtype=float)
+        counters = np.array([max(1, s.get("total_active_counters") or 1) for s in services], dtype=float)
+        categories = np.array([
+            self._category_index.get(s.get("type"), self._category_index["default"])
+            for s in services
+        ])
+
+        # Rythme mesuré (feature store), sinon temps de référence de la catégorie
+        observed = rolling_stats.average_service_times([s.get("id") for s in services])
+        live = np.array([value is not None for value in observed])
+        times_per_person = np.where(live, [value or 0.0 for value in observed], self._base_times[categories])
+
+        # Facteurs contextuels (lectures de tables)
+        hour_multiplier = self.hour_factors[now.hour]
+        day_multiplier = self.weekday_factors[now.weekday()]
+        month_multipliers = self.month_day_factors[categories, now.day]
+        special_multipliers = self.special_factors[categories, now.month, now.day, eve]
+
         # Temps final
-        final_multiplier = (
-            factors["hour_multiplier"] *
-            factors["day_multiplier"] *
-            factors["month_multiplier"] *
-            factors["special_multiplier"]
-        )
-        
-        predicted_time = int(base_time * final_multiplier)
-        predicted_time = max(5, predicted_time)  # Minimum 5 minutes
-        
-        # Confiance basée sur les facteurs
-        confidence = self._calculate_confidence(queue_size, factors)
-        
-        # Recommandation intelligente
-        recommendation = self._generate_smart_recommendation(
-            predicted_time, now, factors, service_type
+        base_times = (queue_sizes * times_per_person) / counters
+        final_multipliers = np.where(
+            live, 1.0, hour_multiplier * day_multiplier * month_multipliers * special_multipliers
         )
-        
-        # Meilleurs moments
-        best_times = self._get_best_times(now, service_type)
-        
-        # Comparaison avec moyenne
-        average_time = base_time
-        comparison = self._compare_with_average(predicted_time, average_time)
-        
-        # Alerte si nécessaire
-        alert = self._check_alerts(factors, predicted_time)
-        
-        result = {
-            "predicted_wait_time": predicted_time,
-            "confidence": confidence,
-            "factors": {
-                "base_time": int(base_time),
-                "hour_multiplier": factors["hour_multiplier"],
-                "day_multiplier": factors["day_multiplier"],
-                "month_multiplier": factors["month_multiplier"],
-                "special_multiplier": factors["special_multiplier"],
-                "final_multiplier": round(final_multiplier, 2)
-            },
-            "recommendation": recommendation,
-            "best_times": best_times,
-            "current_vs_average": comparison
-        }
-        
-        if alert:
-            result["alert"] = alert
-        
-        return result
-    
-    def _calculate_contextual_factors(self, now: datetime, service_type: str) -> Dict[str, float]:
-        """Calcule tous les facteurs contextuels"""
-        
-        hour = now.hour
-        day = now.day
-        weekday = now.weekday()  # 0=Lundi, 6=Dimanche
-        month = now.month
-        
-        factors = {
-            "hour_multiplier": 1.0,
-            "day_multiplier": 1.0,
-            "month_multiplier": 1.0,
-            "special_multiplier": 1.0
-        }
-        
-        # === FACTEUR HORAIRE ===
-        if 8 <= hour < 10:
-            factors["hour_multiplier"] = 1.5  # Pic matinal
-        elif 10 <= hour < 12:
-            factors["hour_multiplier"] = 1.3  # Matinée chargée
-        elif 12 <= hour < 14:
-            factors["hour_multiplier"] = 0.7  # Pause déjeuner
-        elif 14 <= hour < 16:
-            factors["hour_multiplier"] = 1.1  # Après-midi normal
-        elif 16 <= hour < 18:
-            factors["hour_multiplier"] = 1.4  # Fin de journée
-        
-        # === FACTEUR JOUR DE LA SEMAINE ===
-        if weekday == 0:  # Lundi
-            factors["day_multiplier"] = 1.3
-        elif weekday == 4:  # Vendredi
-            factors["day_multiplier"] = 1.2
-        elif weekday == 5 or weekday == 6:  # Weekend
-            factors["day_multiplier"] = 0.5  # Fermé ou très calme
-        
-        # === FACTEUR JOUR DU MOIS ===
-        if day in self.SALARY_DAYS:
-            # Jours de salaire - impact selon le service
-            if service_type in ["banque", "cnps"]:
-                factors["month_multiplier"] = 2.5  # Très forte affluence
-            elif service_type in ["mairie", "impots"]:
-                factors["month_multiplier"] = 1.8
-            else:
-                factors["month_multiplier"] = 1.4
-        
-        elif day <= 5:  # Début de mois
-            if service_type in ["banque", "cnps", "impots"]:
-                factors["month_multiplier"] = 1.6
-            else:
-                factors["month_multiplier"] = 1.2
-        
-        elif day >= 25:  # Fin de mois
-            if service_type in ["banque", "cnps"]:
-                factors["month_multiplier"] = 2.0
-            else:
-                factors["month_multiplier"] = 1.3
-        
-        # === FACTEURS SPÉCIAUX ===
-        # Veille de jour férié
-        if self._is_before_holiday(now):
-            factors["special_multiplier"] = 1.5
-        
-        # Rentrée scolaire (Septembre)
-        if month == 9 and day <= 15:
-            if service_type in ["mairie", "prefecture"]:
-                factors["special_multiplier"] = 1.7
-        
-        # Période fiscale (Mars-Avril)
-        if month in [3, 4] and service_type == "impots":
-            factors["special_multiplier"] = 2.0
-        
-        return factors
-    
-    def _is_before_holiday(self, date: datetime) -> bool:
-        """Vérifie si c'est la veille d'un jour férié"""
-        tomorrow = date + timedelta(days=1)
-        return (tomorrow.month, tomorrow.day) in self.HOLIDAYS_2025
-    
-    def _calculate_confidence(self, queue_size: int, factors: Dict[str, float]) -> float:
-        """Calcule le niveau de confiance de la prédiction"""
-        
-        base_confidence = 0.75
-        
-        # Plus de monde = plus de confiance
-        if queue_size > 10:
-            base_confidence += 0.10
-        elif queue_size > 5:
-            base_confidence += 0.05
-        
-        # Facteurs extrêmes = moins de confiance
-        total_multiplier = (
-            factors["hour_multiplier"] *
-            factors["day_multiplier"] *
-            factors["month_multiplier"] *
-            factors["special_multiplier"]
+        predicted_times = np.maximum(5, (base_times * final_multipliers).astype(int))  # Minimum 5 minutes
+
+        # Confiance : plus de monde = plus de confiance, facteurs extrêmes = moins
+        confidences = (
+            0.75
+            + np.where(queue_sizes > 10, 0.10, np.where(queue_sizes > 5, 0.05, 0.0))
+            - np.where(final_multipliers > 3.0, 0.10, np.where(final_multipliers > 2.0, 0.05, 0.0))
         )
-        
-        if total_multiplier > 3.0:
-            base_confidence -= 0.10
-        elif total_multiplier > 2.0:
-            base_confidence -= 0.05
-        
-        return min(0.95, max(0.60, base_confidence))
-    
+        confidences = np.clip(confidences, 0.60, 0.95)
+
+        # Communs à tous les services du lot
+        best_times = self._get_best_times(now)
+
+        results = []
+        for i, service_data in enumerate(services):
+            if not service_data.get("is_open", True) or queue_sizes[i] == 0:
+                results.append(self._empty_queue_prediction(service_data))
+                continue
+
+            service_type = service_data.get("type", "default")
+            predicted_time = int(predicted_times[i])
+            final_multiplier = float(final_multipliers[i])
+            month_multiplier = float(month_multipliers[i])
+
+            result = {
+                "predicted_wait_time": predicted_time,
+                "confidence": float(confidences[i]),
+                "factors": {
+                    "base_time": int(base_times[i]),
+                    "time_per_person": round(float(times_per_person[i]), 1),
+                    "pace": "live" if live[i] else "reference",
+                    "hour_multiplier": float(hour_multiplier),
+                    "day_multiplier": float(day_multiplier),
+                    "month_multiplier": month_multiplier,
+                    "special_multiplier": float(special_multipliers[i]),
+                    "final_multiplier": round(final_multiplier, 2)
+                },
+                "recommendation": self._generate_smart_recommendation(
+                    predicted_time, now, month_multiplier, service_type
+                ),
+                "best_times": list(best_times),
+                # Comparaison avec la moyenne (temps de base)
+                "current_vs_average": self._compare_with_average(predicted_time, base_times[i])
+            }
+
+            # Alerte si nécessaire
+            alert = self._check_alerts(final_multiplier, predicted_time)
+            if alert:
+                result["alert"] = alert
+
+            results.append(result)
+
+        return results
+
+    # ========== RECOMMANDATIONS ==========
     def _generate_smart_recommendation(
-        self, 
-        predicted_time: int, 
+        self,
+        predicted_time: int,
         now: datetime,
-        factors: Dict[str, float],
+        month_multiplier: float,
         service_type: str
     ) -> str:
         """Génère une recommandation intelligente et contextuelle"""
-        
-        hour = now.hour
+
         day = now.day
-        
+
         # Cas spéciaux
         if day in self.SALARY_DAYS and service_type in ["banque", "cnps"]:
             return f"⚠️ Jour de salaire - Très forte affluence ({predicted_time} min). Reportez si possible au jour {day + 2 if day < 28 else 2} du mois."
-        
-        if factors["month_multiplier"] >= 2.0:
+
+        if month_multiplier >= 2.0:
             next_best_day = self._get_next_calm_day(now)
             return f"⚠️ Fin de mois - Affluence exceptionnelle. Venez plutôt {next_best_day} pour éviter l'attente."
-        
+
         # Recommandations normales
         if predicted_time < 10:
             return f"✅ Excellent moment ! Attente minimale ({predicted_time} min)."
-        
+
         elif predicted_time < 30:
             return f"Temps d'attente raisonnable ({predicted_time} min). Préparez vos documents."
-        
+
         elif predicted_time < 60:
-            best_time = self._get_immediate_best_time(hour)
+            best_time = self.immediate_best_times[now.hour]
             return f"File modérée ({predicted_time} min). Meilleur moment : {best_time}."
-        
+
         else:
-            best_time = self._get_immediate_best_time(hour)
+            best_time = self.immediate_best_times[now.hour]
             return f"⚠️ Forte affluence ({predicted_time} min). Nous recommandons de venir {best_time}."
-    
+
     def _get_next_calm_day(self, now: datetime) -> str:
         """Trouve le prochain jour calme"""
         for i in range(1, 10):
@@ -280,8 +319,9 @@ class SmartPredictionService:
             if next_day.day not in self.SALARY_DAYS and next_day.weekday() not in [5, 6]:
                 return f"le {next_day.day}/{next_day.month}"
         return "en début de semaine prochaine"
-    
-    def _get_immediate_best_time(self, current_hour: int) -> str:
+
+    @staticmethod
+    def _get_immediate_best_time(current_hour: int) -> str:
         """Meilleur moment immédiat"""
         if current_hour < 8:
             return "à l'ouverture (8h)"
@@ -291,35 +331,35 @@ class SmartPredictionService:
             return "maintenant ou demain matin 8h"
         else:
             return "demain matin 8h-9h"
-    
-    def _get_best_times(self, now: datetime, service_type: str) -> List[str]:
+
+    def _get_best_times(self, now: datetime) -> List[str]:
         """Liste des meilleurs créneaux"""
-        
+
         best_times = []
         day = now.day
         hour = now.hour
-        
+
         # Éviter les jours de salaire
         if day not in self.SALARY_DAYS:
             if hour < 8:
                 best_times.append("Aujourd'hui 8h-9h")
             elif hour < 14:
                 best_times.append("Aujourd'hui 14h-15h")
-        
+
         # Milieu de semaine
         if now.weekday() in [1, 2, 3]:  # Mardi, Mercredi, Jeudi
             best_times.append("Milieu de semaine (Mar-Jeu)")
-        
+
         # Milieu de mois
         if 10 <= day <= 20 and day not in self.SALARY_DAYS:
             best_times.append("Milieu de mois (10-20)")
-        
+
         # Après-midi
         best_times.append("Après-midi 14h-16h")
-        
+
         return best_times[:3]  # Max 3 suggestions
-    
-    def _compare_with_average(self, predicted: int, average: int) -> str:
+
+    def _compare_with_average(self, predicted: int, average: float) -> str:
         """Compare avec la moyenne"""
         if predicted < average * 0.8:
             return "-20% (Moins chargé que d'habitude)"
@@ -329,24 +369,16 @@ class SmartPredictionService:
             return "+20% (Légèrement plus chargé)"
         else:
             return "Normal (Comme d'habitude)"
-    
-    def _check_alerts(self, factors: Dict[str, float], predicted_time: int) -> str:
+
+    def _check_alerts(self, total_multiplier: float, predicted_time: int) -> Optional[str]:
         """Vérifie s'il faut émettre une alerte"""
-        
-        total_multiplier = (
-            factors["hour_multiplier"] *
-            factors["day_multiplier"] *
-            factors["month_multiplier"] *
-            factors["special_multiplier"]
-        )
-        
         if total_multiplier >= 3.0:
             return "Affluence exceptionnelle - Reportez si possible"
         elif predicted_time >= 90:
             return "Temps d'attente très élevé"
-        
+
         return None
-    
+
     def _empty_queue_prediction(self, service_data: Dict[str, Any]) -> Dict[str, Any]:
         """Prédiction pour file vide"""
         return {
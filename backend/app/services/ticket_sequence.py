@@ -0,0 +1,143 @@
+"""
+ViteviteApp - Ticket Sequence Allocator
+Attribution atomique des numéros de ticket par service et par jour
+
+Chaque (service, jour) possède une ligne `ticket_sequences` incrémentée par
+un UPSERT ... RETURNING : aucun COUNT(*) et aucun doublon, même lorsque
+plusieurs requêtes (ou plusieurs workers) émettent des tickets en même temps.
+
+- TICKET_SEQUENCE_BLOCK_SIZE = 1 : le numéro est réservé dans la transaction
+  de l'appelant (pas de trou si la création échoue)
+- TICKET_SEQUENCE_BLOCK_SIZE > 1 : chaque worker réserve un bloc de numéros
+  dans une transaction courte et les distribue depuis la mémoire (des trous
+  sont possibles au redémarrage, jamais de doublons)
+"""
+
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.ticket_sequence import TicketSequence
+from app.utils.time_windows import local_today
+
+logger = logging.getLogger(__name__)
+
+
+class TicketSequenceAllocator:
+    """Distributeur de numéros de ticket (service, jour)"""
+
+    def __init__(self, block_size: int = 1, session_factory: Optional[Callable[[], AsyncSession]] = None):
+        self.block_size = max(1, block_size)
+        self._session_factory = session_factory
+        self._blocks: Dict[Tuple[str, date], List[int]] = {}  # [prochain, dernier]
+        self._locks: Dict[Tuple[str, date], asyncio.Lock] = {}
+        # SQLite n'a qu'un seul écrivain : on sérialise les réservations du process
+        self._sqlite_lock = asyncio.Lock()
+
+    async def next_number(self, db: AsyncSession, service_id: str, day: Optional[date] = None) -> int:
+        """
+        Retourne le prochain numéro de ticket du service pour la journée
+
+        Args:
+            db: Session de l'appelant
+            service_id: ID du service
+            day: Jour de la séquence (aujourd'hui en heure locale par défaut)
+
+        Returns:
+            Numéro (1, 2, 3...) unique pour (service, jour)
+        """
+        day = day or local_today()
+
+        if self.block_size == 1:
+            return await self._reserve(db, service_id, day, 1)
+
+        key = (service_id, day)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            block = self._blocks.get(key)
+            if block is None or block[0] > block[1]:
+                block = self._blocks[key] = await self._reserve_block(service_id, day)
+                self._purge_old_blocks(day)
+
+            number = block[0]
+            block[0] += 1
+            return number
+
+    async def _reserve_block(self, service_id: str, day: date) -> List[int]:
+        """Réserve un bloc de numéros dans une transaction dédiée"""
+        session_factory = self._session_factory
+        if session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+
+        async with session_factory() as session:
+            last = await self._reserve(session, service_id, day, self.block_size)
+            await session.commit()
+
+        return [last - self.block_size + 1, last]
+
+    async def _reserve(self, db: AsyncSession, service_id: str, day: date, count: int) -> int:
+        """Incrémente la séquence de `count` et retourne la nouvelle valeur"""
+        dialect = db.get_bind().dialect.name
+
+        if dialect == "sqlite":
+            async with self._sqlite_lock:
+                return await self._upsert(db, sqlite_insert, service_id, day, count)
+
+        if dialect == "postgresql":
+            return await self._upsert(db, pg_insert, service_id, day, count)
+
+        return await self._update_then_insert(db, service_id, day, count)
+
+    async def _upsert(self, db: AsyncSession, insert_fn, service_id: str, day: date, count: int) -> int:
+        now = datetime.utcnow()
+        stmt = insert_fn(TicketSequence).values(
+            service_id=service_id,
+            day=day,
+            last_value=count,
+            created_at=now,
+            updated_at=now
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TicketSequence.service_id, TicketSequence.day],
+            set_={
+                "last_value": TicketSequence.last_value + count,
+                "updated_at": now
+            }
+        ).returning(TicketSequence.last_value)
+
+        result = await db.execute(stmt)
+        return result.scalar_one()
+
+    async def _update_then_insert(self, db: AsyncSession, service_id: str, day: date, count: int) -> int:
+        """Chemin générique (autres SGBD) : UPDATE puis INSERT si absent"""
+        key_filter = (TicketSequence.service_id == service_id, TicketSequence.day == day)
+        result = await db.execute(
+            update(TicketSequence)
+            .where(*key_filter)
+            .values(last_value=TicketSequence.last_value + count, updated_at=datetime.utcnow())
+        )
+
+        if result.rowcount == 0:
+            db.add(TicketSequence(service_id=service_id, day=day, last_value=count))
+            await db.flush()
+            return count
+
+        result = await db.execute(select(TicketSequence.last_value).where(*key_filter))
+        return result.scalar_one()
+
+    def _purge_old_blocks(self, today: date) -> None:
+        for key in [k for k in self._blocks if k[1] < today]:
+            self._blocks.pop(key, None)
+            self._locks.pop(key, None)
+
+
+# Instance globale
+ticket_sequence_allocator = TicketSequenceAllocator(block_size=settings.TICKET_SEQUENCE_BLOCK_SIZE)
@@ -0,0 +1,139 @@
+"""
+ViteviteApp - Ticket Stats Service
+Agrégats des tickets par service pour les tableaux de bord admin
+
+Une seule requête `GROUP BY service_id, status` fournit, pour chaque service,
+les tickets en attente, servis aujourd'hui et le temps d'attente moyen du
+jour, au lieu de charger des tickets complets pour les compter service par
+service.
+"""
+
+from datetime import date
+from typing import Dict, Optional
+
+from sqlalchemy import select, func, case, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.ticket import wait_minutes_expression
+from app.models.ticket import Ticket, TicketStatus
+from app.utils.time_windows import day_window, in_window
+
+# Statuts toujours comptés (quelle que soit la date)
+OPEN_STATUSES = (
+    TicketStatus.PENDING_VALIDATION,
+    TicketStatus.WAITING,
+    TicketStatus.CALLED,
+    TicketStatus.SERVING,
+)
+
+
+class ServiceTicketStats:
+    """Compteurs d'un service pour la journée"""
+
+    __slots__ = (
+        "service_id", "pending_validation", "waiting", "called", "serving",
+        "served_today", "wait_total", "wait_samples",
+    )
+
+    def __init__(self, service_id: Optional[str] = None):
+        self.service_id = service_id
+        self.pending_validation = 0
+        self.waiting = 0
+        self.called = 0
+        self.serving = 0
+        self.served_today = 0
+        self.wait_total = 0.0
+        self.wait_samples = 0
+
+    @property
+    def queue_size(self) -> int:
+        """Usagers en file (en attente ou en attente de validation)"""
+        return self.waiting + self.pending_validation
+
+    @property
+    def average_wait_time(self) -> Optional[float]:
+        """Attente moyenne (création -> appel) des tickets appelés aujourd'hui"""
+        if not self.wait_samples:
+            return None
+        return self.wait_total / self.wait_samples
+
+    def add(self, other: "ServiceTicketStats") -> None:
+        for name in self.__slots__[1:]:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+
+class TicketStatsService:
+    """Calcul des agrégats de tableau de bord"""
+
+    async def by_service(
+        self,
+        db: AsyncSession,
+        service_id: Optional[str] = None,
+        day: Optional[date] = None
+    ) -> Dict[str, ServiceTicketStats]:
+        """
+        Agrégats par service en une requête
+
+        Args:
+            db: Session database
+            service_id: Limiter à un service (optionnel)
+            day: Journée locale (aujourd'hui par défaut)
+
+        Returns:
+            {service_id: ServiceTicketStats}
+        """
+        today = day_window(day)
+        called_today = in_window(Ticket.called_at, today)
+        completed_today = in_window(Ticket.completed_at, today)
+        wait = wait_minutes_expression(db.get_bind().dialect.name)
+
+        stmt = (
+            select(
+                Ticket.service_id,
+                Ticket.status,
+                func.count(Ticket.id),
+                func.count(case((completed_today, Ticket.id))),
+                func.sum(case((called_today, wait))),
+                func.count(case((called_today, Ticket.id)))
+            )
+            .where(or_(Ticket.status.in_(OPEN_STATUSES), called_today, completed_today))
+            .group_by(Ticket.service_id, Ticket.status)
+        )
+        if service_id:
+            stmt = stmt.where(Ticket.service_id == service_id)
+
+        result = await db.execute(stmt)
+
+        stats: Dict[str, ServiceTicketStats] = {}
+        for row_service_id, status, count, completed, wait_total, wait_samples in result.all():
+            service_stats = stats.get(row_service_id)
+            if service_stats is None:
+                service_stats = stats[row_service_id] = ServiceTicketStats(row_service_id)
+
+            if status == TicketStatus.PENDING_VALIDATION:
+                service_stats.pending_validation += count
+            elif status == TicketStatus.WAITING:
+                service_stats.waiting += count
+            elif status == TicketStatus.CALLED:
+                service_stats.called += count
+            elif status == TicketStatus.SERVING:
+                service_stats.serving += count
+            elif status == TicketStatus.COMPLETED:
+                service_stats.served_today += completed
+
+            service_stats.wait_total += float(wait_total or 0.0)
+            service_stats.wait_samples += wait_samples or 0
+
+        return stats
+
+    @staticmethod
+    def totals(stats: Dict[str, ServiceTicketStats]) -> ServiceTicketStats:
+        """Somme des agrégats de tous les services"""
+        total = ServiceTicketStats()
+        for service_stats in stats.values():
+            total.add(service_stats)
+        return total
+
+
+# Instance globale
+ticket_stats_service = TicketStatsService()
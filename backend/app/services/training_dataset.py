@@ -0,0 +1,252 @@
+"""
+ViteviteApp - Training Dataset Builder
+Jeu d'entraînement du QueueTimePredictor construit depuis nos tickets
+
+`QueueTimePredictor.train` n'acceptait qu'un CSV Kaggle ; la vérité terrain
+est dans `tickets` (émission, appel, service). Le builder :
+- lit les tickets en flux (curseur côté serveur, `yield_per`), triés par
+  (service, created_at) grâce à l'index ix_tickets_service_created
+- reconstruit la taille de la file à l'émission par balayage : un tas des
+  heures de sortie (appel, ou fin pour les tickets annulés) des tickets du
+  service ; à chaque émission, les sorties passées sont retirées et la taille
+  du tas est la file devant le ticket. Le balayage repart à zéro chaque jour
+  (heure locale) : un ticket jamais appelé quitte la file à la fin de son
+  jour d'émission. Les tickets jamais validés (en attente de validation,
+  refusés) ne comptent pas dans la file
+- écrit le fichier par blocs (Parquet si pyarrow est installé, sinon CSV),
+  au format attendu par `QueueTimePredictor.prepare_kaggle_data`
+
+La mémoire reste bornée par la taille d'un bloc plus la plus longue file
+d'un service sur une journée, quel que soit le nombre de tickets.
+
+Usage:
+    python -m app.services.training_dataset --output data/queue_data.parquet
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import csv
+import heapq
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.service import AffluenceLevel, Service
+from app.models.ticket import Ticket, TicketStatus
+from app.utils.time_windows import to_local
+
+logger = logging.getLogger(__name__)
+
+
+# Colonnes du fichier (format CSV Kaggle de ml_trainer)
+TRAINING_COLUMNS = (
+    "service_name", "service_category", "timestamp",
+    "queue_size", "wait_time_minutes", "affluence_level"
+)
+
+# Tickets encore dans la file (sortie à la fin du jour d'émission)
+STILL_QUEUED_STATUSES = (TicketStatus.WAITING,)
+
+# Tickets jamais entrés dans la file (validation en attente ou refusée)
+NEVER_QUEUED_STATUSES = (TicketStatus.PENDING_VALIDATION, TicketStatus.REJECTED)
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def affluence_for(queue_size: int, max_queue_size: Optional[int]) -> str:
+    """Niveau d'affluence pour une taille de file (seuils de refresh_affluence_levels)"""
+    if max_queue_size:
+        fill_rate = queue_size / max_queue_size
+        if fill_rate >= 0.8:
+            return AffluenceLevel.VERY_HIGH.value
+        if fill_rate >= 0.6:
+            return AffluenceLevel.HIGH.value
+        if fill_rate >= 0.3:
+            return AffluenceLevel.MODERATE.value
+        return AffluenceLevel.LOW.value
+    if queue_size > 15:
+        return AffluenceLevel.VERY_HIGH.value
+    if queue_size > 8:
+        return AffluenceLevel.HIGH.value
+    if queue_size > 3:
+        return AffluenceLevel.MODERATE.value
+    return AffluenceLevel.LOW.value
+
+
+def _left_queue_at(status, called_at, started_at, completed_at, updated_at) -> Optional[datetime]:
+    """Heure de sortie de la file (None : toujours en attente ce jour-là)"""
+    if called_at is not None:
+        return called_at
+    if status in STILL_QUEUED_STATUSES:
+        return None
+    # Annulé, absent, refusé... : dernière modification connue
+    return started_at or completed_at or updated_at
+
+
+# ========== ÉCRITURE PAR BLOCS ==========
+class CsvDatasetWriter:
+    """CSV (format Kaggle), lignes ajoutées bloc par bloc"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(TRAINING_COLUMNS)
+
+    def write(self, columns: Dict[str, list]) -> None:
+        self._writer.writerows(zip(*(columns[name] for name in TRAINING_COLUMNS)))
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetDatasetWriter:
+    """Parquet (colonnes), un row group par bloc"""
+
+    def __init__(self, path: Path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self._pa = pa
+        self._schema = pa.schema([
+            ("service_name", pa.string()),
+            ("service_category", pa.string()),
+            ("timestamp", pa.timestamp("s")),
+            ("queue_size", pa.int32()),
+            ("wait_time_minutes", pa.float32()),
+            ("affluence_level", pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(str(path), self._schema, compression="zstd")
+
+    def write(self, columns: Dict[str, list]) -> None:
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def open_dataset_writer(path: Path):
+    """
+    Writer selon l'extension (`writer.path` : fichier réellement écrit)
+
+    Sans pyarrow, un chemin .parquet est remplacé par le même chemin en .csv.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".parquet":
+        try:
+            return ParquetDatasetWriter(path)
+        except ImportError:
+            path = path.with_suffix(".csv")
+            logger.warning(f"⚠️ pyarrow non installé, jeu d'entraînement écrit en CSV: {path}")
+    return CsvDatasetWriter(path)
+
+
+# ========== CONSTRUCTION ==========
+async def build_training_dataset(
+    db: AsyncSession,
+    output: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    since: Optional[datetime] = None
+) -> Dict[str, int]:
+    """
+    Écrit le jeu d'entraînement (un ticket appelé = une ligne)
+
+    Args:
+        db: Session (lecture seule)
+        output: Fichier de sortie (.parquet ou .csv ; .csv sans pyarrow)
+        chunk_size: Lignes lues par aller-retour et écrites par bloc
+        since: Tickets émis à partir de cette date (UTC naïf)
+
+    Returns:
+        {"tickets": lus, "rows": écrites, "output": fichier écrit}
+    """
+    query = (
+        select(
+            Ticket.service_id, Ticket.status, Ticket.created_at, Ticket.called_at,
+            Ticket.started_at, Ticket.completed_at, Ticket.updated_at,
+            Service.name, Service.category, Service.max_queue_size
+        )
+        .join(Service, Service.id == Ticket.service_id)
+        .order_by(Ticket.service_id, Ticket.created_at)
+        .execution_options(yield_per=chunk_size)
+    )
+    if since is not None:
+        # Les tickets émis avant `since` ne comptent pas dans la file reconstruite
+        query = query.where(Ticket.created_at >= since)
+
+    writer = open_dataset_writer(Path(output))
+    columns: Dict[str, List] = {name: [] for name in TRAINING_COLUMNS}
+    tickets = rows = 0
+    current_service = current_day = None
+    departures: List[datetime] = []  # Tas des heures de sortie (service et jour courants)
+
+    try:
+        result = await db.stream(query)
+        async for (service_id, status, created_at, called_at, started_at, completed_at,
+                   updated_at, name, category, max_queue_size) in result:
+            tickets += 1
+            local_created_at = to_local(created_at)
+            if service_id != current_service or local_created_at.date() != current_day:
+                current_service, current_day = service_id, local_created_at.date()
+                departures.clear()
+
+            # Balayage : sorties antérieures à l'émission retirées
+            while departures and departures[0] <= created_at:
+                heapq.heappop(departures)
+            queue_size = len(departures)
+
+            if status not in NEVER_QUEUED_STATUSES:
+                left_at = _left_queue_at(status, called_at, started_at, completed_at, updated_at)
+                if left_at is None:
+                    # Jamais appelé : en file jusqu'à la remise à zéro du lendemain
+                    heapq.heappush(departures, datetime.max)
+                elif left_at > created_at:
+                    heapq.heappush(departures, left_at)
+
+            if called_at is None:
+                continue
+
+            columns["service_name"].append(name)
+            columns["service_category"].append(category)
+            columns["timestamp"].append(local_created_at.replace(microsecond=0))
+            columns["queue_size"].append(queue_size)
+            columns["wait_time_minutes"].append(round((called_at - created_at).total_seconds() / 60, 2))
+            columns["affluence_level"].append(affluence_for(queue_size, max_queue_size))
+            rows += 1
+
+            if len(columns["queue_size"]) >= chunk_size:
+                writer.write(columns)
+                columns = {name: [] for name in TRAINING_COLUMNS}
+
+        if columns["queue_size"]:
+            writer.write(columns)
+    finally:
+        writer.close()
+
+    logger.info(f"✅ Jeu d'entraînement: {rows} lignes sur {tickets} tickets ({writer.path})")
+    return {"tickets": tickets, "rows": rows, "output": str(writer.path)}
+
+
+# ========== SCRIPT ==========
+async def _main(output: str, chunk_size: int, since: Optional[datetime]) -> None:
+    from app.core.database import ReadSessionLocal
+
+    async with ReadSessionLocal() as db:
+        stats = await build_training_dataset(db, output, chunk_size=chunk_size, since=since)
+    print(f"✅ {stats['rows']} lignes écrites ({stats['tickets']} tickets lus) : {stats['output']}")
+    print(f"   Entraînement : QueueTimePredictor().train('{stats['output']}')")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="data/queue_data.parquet", help="Fichier .parquet (pyarrow) ou .csv")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="Date ISO (UTC)")
+    args = parser.parse_args()
+
+    asyncio.run(_main(args.output, args.chunk_size, args.since))
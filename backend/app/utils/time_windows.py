@@ -0,0 +1,144 @@
+"""
+ViteviteApp - Time Windows
+Fenêtres temporelles pour les requêtes SQL (jour, semaine, mois)
+
+Les timestamps sont stockés en UTC naïf (`datetime.utcnow()`). Filtrer avec
+`func.date(colonne) == jour` empêche l'usage des index : on compare donc la
+colonne brute à un intervalle semi-ouvert [début, fin) calculé dans le fuseau
+local du service puis converti en UTC.
+
+Les expressions de regroupement (heure, jour, semaine, mois) fonctionnent
+sous SQLite et Postgres ; elles sont destinées aux GROUP BY, pas aux WHERE.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import and_, cast, func, Integer
+
+from app.core.config import settings
+
+
+Window = Tuple[datetime, datetime]
+
+BUCKET_UNITS = ("hour", "day", "week", "month")
+
+
+# ========== FUSEAU ==========
+def local_timezone(tz: Optional[str] = None) -> ZoneInfo:
+    """Fuseau du service (TIMEZONE par défaut)"""
+    return ZoneInfo(tz or settings.TIMEZONE)
+
+
+def local_now(tz: Optional[str] = None) -> datetime:
+    return datetime.now(local_timezone(tz))
+
+
+def local_today(tz: Optional[str] = None) -> date:
+    return local_now(tz).date()
+
+
+def to_utc(local: datetime, tz: Optional[str] = None) -> datetime:
+    """Heure locale (naïve ou non) -> UTC naïf, comme en base"""
+    if local.tzinfo is None:
+        local = local.replace(tzinfo=local_timezone(tz))
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def to_local(utc: datetime, tz: Optional[str] = None) -> datetime:
+    """UTC naïf (comme en base) -> heure locale naïve"""
+    if utc.tzinfo is None:
+        utc = utc.replace(tzinfo=timezone.utc)
+    return utc.astimezone(local_timezone(tz)).replace(tzinfo=None)
+
+
+# ========== FENÊTRES [début, fin) ==========
+def day_window(day: Optional[date] = None, tz: Optional[str] = None) -> Window:
+    """Journée locale en UTC naïf"""
+    day = day or local_today(tz)
+    return days_window(day, day, tz)
+
+
+def days_window(first_day: date, last_day: date, tz: Optional[str] = None) -> Window:
+    """Du premier jour (inclus) au dernier jour (inclus)"""
+    start = to_utc(datetime.combine(first_day, time.min), tz)
+    end = to_utc(datetime.combine(last_day + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def week_window(day: Optional[date] = None, tz: Optional[str] = None) -> Window:
+    """Semaine locale (lundi -> dimanche) contenant le jour"""
+    day = day or local_today(tz)
+    monday = day - timedelta(days=day.weekday())
+    return days_window(monday, monday + timedelta(days=6), tz)
+
+
+def month_window(day: Optional[date] = None, tz: Optional[str] = None) -> Window:
+    """Mois local contenant le jour"""
+    day = day or local_today(tz)
+    first = day.replace(day=1)
+    next_month = (first + timedelta(days=32)).replace(day=1)
+    return days_window(first, next_month - timedelta(days=1), tz)
+
+
+def in_window(column, window: Window):
+    """Prédicat indexable : début <= colonne < fin"""
+    start, end = window
+    return and_(column >= start, column < end)
+
+
+def on_day(column, day: Optional[date] = None, tz: Optional[str] = None):
+    """Remplace `func.date(colonne) == jour`"""
+    return in_window(column, day_window(day, tz))
+
+
+# ========== REGROUPEMENTS ==========
+def _utc_offset_minutes(tz: Optional[str] = None) -> int:
+    offset = local_now(tz).utcoffset() or timedelta(0)
+    return int(offset.total_seconds() // 60)
+
+
+def _local_column(column, dialect: str, tz: Optional[str] = None):
+    if dialect == "postgresql":
+        return func.timezone(local_timezone(tz).key, func.timezone("UTC", column))
+    return column
+
+
+def bucket(column, unit: str, dialect: str, tz: Optional[str] = None):
+    """
+    Expression de regroupement en heure locale
+
+    Args:
+        column: Colonne DateTime (UTC naïf)
+        unit: "hour", "day", "week" (lundi) ou "month"
+        dialect: Nom du dialecte (`db.get_bind().dialect.name`)
+        tz: Fuseau (TIMEZONE par défaut)
+
+    Returns:
+        Début du créneau : timestamp sous Postgres, texte ISO sous SQLite
+    """
+    if unit not in BUCKET_UNITS:
+        raise ValueError(f"Unité de regroupement inconnue: {unit}")
+
+    if dialect == "postgresql":
+        return func.date_trunc(unit, _local_column(column, dialect, tz))
+
+    # SQLite : décalage fixe du fuseau (pas de base de fuseaux côté SQL)
+    shift = f"{_utc_offset_minutes(tz):+d} minutes"
+    if unit == "hour":
+        return func.strftime("%Y-%m-%d %H:00:00", column, shift)
+    if unit == "day":
+        return func.date(column, shift)
+    if unit == "week":
+        return func.date(column, shift, "-6 days", "weekday 1")
+    return func.strftime("%Y-%m-01", column, shift)
+
+
+def hour_of_day(column, dialect: str, tz: Optional[str] = None):
+    """Heure locale (0-23) pour les distributions horaires"""
+    if dialect == "postgresql":
+        return cast(func.extract("hour", _local_column(column, dialect, tz)), Integer)
+
+    shift = f"{_utc_offset_minutes(tz):+d} minutes"
+    return cast(func.strftime("%H", column, shift), Integer)
@@ -0,0 +1,163 @@
+"""
+ViteviteApp - Benchmark du group commit
+Mesure le débit d'émission de tickets (écritures/s) sur SQLite fichier :
+- direct : une transaction et un COMMIT par requête (comportement par défaut)
+- group  : unités confiées à GroupCommitWriter, un COMMIT par lot
+
+Chaque écriture reprend l'émission de ticket : numéro de séquence du jour,
+rang dans la file, INSERT du ticket et mise à jour du service.
+
+Usage:
+    python -m scripts.benchmark_group_commit
+    python -m scripts.benchmark_group_commit --clients 1 8 64 --duration 10 --window-ms 2
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+import app.models  # noqa: F401
+from app.core.config import settings
+from app.core.database import Base, create_sqlite_engine, sqlite_pragmas
+from app.models.service import Service
+from app.models.ticket import Ticket, TicketStatus
+from app.services.group_commit import GroupCommitWriter
+from app.services.queue_engine import SQLQueueEngine
+from app.services.ticket_sequence import TicketSequenceAllocator
+
+SERVICES = 10
+
+
+def make_issue(services, queue: SQLQueueEngine, sequences: TicketSequenceAllocator):
+    """Unité d'écriture équivalente à POST /tickets (sans COMMIT)"""
+    async def issue(db: AsyncSession) -> str:
+        service = await db.get(Service, random.choice(services))
+        number = await sequences.next_number(db, service.id)
+        ticket = Ticket(
+            service_id=service.id,
+            ticket_number=f"N-{number:03d}",
+            position_in_queue=await queue.tail_position(db, service.id),
+            queue_rank=await queue.next_rank(db, service.id),
+            status=TicketStatus.WAITING,
+            user_name="Bench"
+        )
+        db.add(ticket)
+        queue.track(db, ticket)
+        service.current_queue_size += 1
+        await db.flush()
+        return ticket.id
+    return issue
+
+
+async def drive(submit, clients: int, duration: float):
+    """Lance `clients` boucles d'écriture pendant `duration` secondes"""
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                await submit()
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception:
+                errors += 1
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies, errors
+
+
+def report(label: str, latencies, errors: int, duration: float) -> None:
+    if not latencies:
+        print(f"  {label:<14} aucune écriture réussie ({errors} erreurs)")
+        return
+    latencies.sort()
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(
+        f"  {label:<14} {len(latencies) / duration:>8.0f} écritures/s"
+        f"  p50={statistics.median(latencies):.1f}ms  p95={p95:.1f}ms  erreurs={errors}"
+    )
+
+
+async def run_mode(mode: str, clients: int, duration: float, pragmas: dict, max_batch: int, window: float) -> None:
+    path = os.path.join(tempfile.mkdtemp(), f"{mode}-{clients}.db")
+    engine = create_sqlite_engine(f"sqlite+aiosqlite:///{path}", pragmas=pragmas)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with factory() as db:
+        for index in range(SERVICES):
+            db.add(Service(name=f"Service {index}", slug=f"bench-{index}", category="mairie"))
+        await db.commit()
+        services = list((await db.execute(select(Service.id))).scalars().all())
+
+    issue = make_issue(services, SQLQueueEngine(), TicketSequenceAllocator(block_size=1))
+
+    if mode == "group":
+        writer = GroupCommitWriter(max_batch=max_batch, window=window, session_factory=factory)
+        writer.start()
+
+        async def submit():
+            return await writer.submit(issue)
+    else:
+        writer = None
+
+        async def submit():
+            async with factory() as db:
+                result = await issue(db)
+                await db.commit()
+                return result
+
+    latencies, errors = await drive(submit, clients, duration)
+    label = f"{mode} x{clients}"
+    report(label, latencies, errors, duration)
+
+    if writer is not None:
+        await writer.stop()
+        metrics = writer.metrics()
+        print(f"  {'':<14} lots={metrics['batches']}  taille moyenne={metrics['average_batch_size'] or 0:.1f}")
+    await engine.dispose()
+
+
+async def run(clients_list, modes, duration: float, synchronous: str, max_batch: int, window_ms: float) -> None:
+    random.seed(42)
+    pragmas = {**sqlite_pragmas(), "synchronous": synchronous}
+    print(f"Durée / mesure : {duration:.0f}s")
+    print(f"PRAGMA         : {pragmas}")
+    print(f"Group commit   : lots de {max_batch}, fenêtre {window_ms} ms")
+    for clients in clients_list:
+        print(f"\n===== {clients} client(s) =====")
+        for mode in modes:
+            await run_mode(mode, clients, duration, pragmas, max_batch, window_ms / 1000)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--duration", type=float, default=5.0, help="Secondes par mesure")
+    parser.add_argument("--mode", choices=["direct", "group"], action="append", help="Mode(s) à mesurer (tous par défaut)")
+    parser.add_argument("--synchronous", default="FULL", help="PRAGMA synchronous (FULL : un fsync par COMMIT)")
+    parser.add_argument("--max-batch", type=int, default=settings.GROUP_COMMIT_MAX_BATCH)
+    parser.add_argument("--window-ms", type=float, default=settings.GROUP_COMMIT_WINDOW_MS)
+    args = parser.parse_args()
+
+    asyncio.run(run(
+        args.clients,
+        args.mode or ["direct", "group"],
+        args.duration,
+        args.synchronous,
+        args.max_batch,
+        args.window_ms
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+ViteviteApp - Benchmark d'une vague de connexions
+Mesure la latence d'un endpoint sans rapport (GET /services) pendant que des
+clients enchaînent les POST /auth/login (bcrypt) :
+- inline : hash calculé dans la boucle asyncio (PASSWORD_HASH_WORKERS=0)
+- pool   : hash calculé dans le pool de threads dédié
+
+Usage:
+    python -m scripts.benchmark_login_storm
+    python -m scripts.benchmark_login_storm --logins 32 --workers 2 4 --rounds 12 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+import app.models  # noqa: F401
+from app.api.v1.endpoints import auth, services
+from app.core import security
+from app.core.config import settings
+from app.core.database import Base, create_sqlite_engine, get_db, get_read_db
+from app.models.service import Service
+from app.models.user import User
+from app.services.response_cache import response_cache
+
+EMAIL = "bench@vitevite.ci"
+PASSWORD = "Bench2024!"
+
+
+def percentile(values, ratio: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+async def build_app(path: str):
+    engine = create_sqlite_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with factory() as db:
+        db.add(User(email=EMAIL, hashed_password=security.get_password_hash(PASSWORD)))
+        for index in range(10):
+            db.add(Service(name=f"Service {index}", slug=f"bench-{index}", category="mairie"))
+        await db.commit()
+
+    async def override_get_db():
+        async with factory() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/auth")
+    app.include_router(services.router, prefix="/services")
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    return app, engine
+
+
+async def run_mode(label: str, workers: int, logins: int, duration: float) -> None:
+    settings.PASSWORD_HASH_WORKERS = workers
+    security.shutdown_password_hashing()
+    await response_cache.backend.clear()
+
+    app, engine = await build_app(os.path.join(tempfile.mkdtemp(), "login.db"))
+    transport = httpx.ASGITransport(app=app)
+    probe_latencies, login_latencies, failures = [], [], 0
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def login():
+            nonlocal failures
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+                if response.status_code != 200:
+                    failures += 1
+                login_latencies.append((time.perf_counter() - start) * 1000)
+
+        async def probe():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                await client.get("/services")
+                probe_latencies.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(probe(), *(login() for _ in range(logins)))
+
+    await engine.dispose()
+    security.shutdown_password_hashing()
+
+    print(
+        f"  {label:<10} GET /services p50={statistics.median(probe_latencies):>7.1f}ms"
+        f"  p99={percentile(probe_latencies, 0.99):>7.1f}ms"
+        f"  max={max(probe_latencies):>7.1f}ms"
+        f"  | logins {len(login_latencies) / duration:>5.1f}/s"
+        f"  p99={percentile(login_latencies, 0.99):>7.0f}ms  échecs={failures}"
+    )
+
+
+async def run(logins: int, workers_list, rounds: int, duration: float) -> None:
+    security.pwd_context.update(
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds
+    )
+    print(f"Coût bcrypt     : {rounds}")
+    print(f"Clients login   : {logins}")
+    print(f"Durée / mesure  : {duration:.0f}s\n")
+
+    await run_mode("inline", 0, logins, duration)
+    for workers in workers_list:
+        await run_mode(f"pool x{workers}", workers, logins, duration)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=16, help="Clients enchaînant les connexions")
+    parser.add_argument("--workers", type=int, nargs="+", default=[settings.PASSWORD_HASH_WORKERS or 2])
+    parser.add_argument("--rounds", type=int, default=settings.PASSWORD_BCRYPT_ROUNDS)
+    parser.add_argument("--duration", type=float, default=5.0, help="Secondes par mesure")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.logins, args.workers, args.rounds, args.duration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+ViteviteApp - Benchmark de l'inférence QueueTimePredictor
+
+Entraîne un modèle XGBoost sur un jeu synthétique (même format que le CSV
+Kaggle) puis compare :
+- ligne à ligne : ancienne méthode (DataFrame d'une ligne + deux
+  LabelEncoder.transform + XGBRegressor.predict) contre predict()
+- lot de N lignes : boucle sur l'ancienne méthode contre predict_many()
+  (matrice NumPy, codes par dictionnaire, inplace_predict)
+Les prédictions des deux méthodes sont comparées avant la mesure.
+
+Usage:
+    python -m scripts.benchmark_ml_inference
+    python -m scripts.benchmark_ml_inference --rows 1000 --calls 2000 --samples 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from app.services.ml_trainer import QueueTimePredictor
+
+CATEGORIES = ["Administration", "Banque", "Mairie", "Santé"]
+AFFLUENCE_LEVELS = ["faible", "modérée", "élevée", "très_élevée"]
+
+
+# ========== DONNÉES ==========
+def write_dataset(path: str, samples: int) -> None:
+    """CSV synthétique : temps d'attente ~ file x catégorie x heure + bruit"""
+    start = datetime(2025, 1, 1)
+    rows = []
+    for _ in range(samples):
+        timestamp = start + timedelta(minutes=random.randint(0, 365 * 24 * 60))
+        category = random.choice(CATEGORIES)
+        queue_size = random.randint(0, 60)
+        peak = 1.4 if 9 <= timestamp.hour <= 12 else 1.0
+        wait = queue_size * (8 + CATEGORIES.index(category) * 2) / 3 * peak + random.gauss(10, 5)
+        rows.append({
+            "service_name": f"{category} {random.randint(1, 20)}",
+            "service_category": category,
+            "timestamp": timestamp.isoformat(),
+            "queue_size": queue_size,
+            "wait_time_minutes": max(1, wait),
+            "affluence_level": AFFLUENCE_LEVELS[min(3, queue_size // 15)],
+        })
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+def random_features(count: int):
+    return [
+        {
+            "queue_size": random.randint(0, 60),
+            "service_category": random.choice(CATEGORIES + ["Inconnue"]),
+            "affluence_level": random.choice(AFFLUENCE_LEVELS),
+        }
+        for _ in range(count)
+    ]
+
+
+# ========== ANCIENNE MÉTHODE ==========
+def legacy_predict(predictor: QueueTimePredictor, features: dict, now: datetime) -> dict:
+    """QueueTimePredictor.predict avant l'inférence par lot (une ligne)"""
+    feature_vector = {
+        'queue_size': features.get('queue_size', 0),
+        'hour': now.hour,
+        'day_of_week': now.weekday(),
+        'day_of_month': now.day,
+        'is_salary_day': 1 if now.day in [1, 5, 10, 15, 20, 25] else 0,
+        'is_start_of_month': 1 if now.day <= 7 else 0,
+        'is_peak_hour': 1 if 9 <= now.hour <= 12 else 0,
+    }
+    try:
+        feature_vector['service_category_encoded'] = \
+            predictor.label_encoders['service_category'].transform([features.get('service_category', 'Administration')])[0]
+        feature_vector['affluence_level_encoded'] = \
+            predictor.label_encoders['affluence_level'].transform([features.get('affluence_level', 'modérée')])[0]
+    except Exception:
+        feature_vector['service_category_encoded'] = 0
+        feature_vector['affluence_level_encoded'] = 0
+
+    X = pd.DataFrame([feature_vector])[predictor.feature_columns]
+    prediction = predictor.model.predict(X)[0]
+    confidence = min(0.95, 0.75 + (0.20 if features.get('queue_size', 0) > 0 else 0))
+    return {'predicted_time': int(max(5, prediction)), 'confidence': confidence}
+
+
+# ========== MESURES ==========
+def measure(label: str, rows_per_call: int, calls: int, func) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    elapsed = time.perf_counter() - start
+    rate = rows_per_call * calls / elapsed
+    print(f"  {label:<34} {elapsed / calls * 1e6:>10.1f} µs/appel  {rate:>12,.0f} lignes/s")
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=10000, help="Lignes d'entraînement")
+    parser.add_argument("--rows", type=int, default=1000, help="Taille du lot")
+    parser.add_argument("--calls", type=int, default=1000, help="Appels ligne à ligne")
+    parser.add_argument("--repeat", type=int, default=20, help="Répétitions du lot")
+    args = parser.parse_args()
+
+    random.seed(42)
+    directory = tempfile.mkdtemp()
+    csv_path = os.path.join(directory, "queue_data.csv")
+    write_dataset(csv_path, args.samples)
+
+    predictor = QueueTimePredictor(model_path=os.path.join(directory, "queue_predictor.pkl"))
+    predictor.train(csv_path)
+    predictor = QueueTimePredictor(model_path=predictor.model_path)
+    predictor.load_model()
+
+    now = datetime.now()
+    batch = random_features(args.rows)
+    single = batch[0]
+
+    expected = [legacy_predict(predictor, features, now) for features in batch]
+    assert predictor.predict_many(batch, now) == expected, "Prédictions différentes de l'ancienne méthode"
+
+    print(f"Modèle : {args.samples} lignes d'entraînement, lot de {args.rows} services\n")
+    print("Ligne à ligne")
+    legacy_single = measure("ancienne méthode", 1, args.calls, lambda: legacy_predict(predictor, single, now))
+    batch_single = measure("predict_many (1 ligne)", 1, args.calls, lambda: predictor.predict_many([single], now))
+
+    print(f"\nLot de {args.rows} lignes")
+    legacy_batch = measure("ancienne méthode (boucle)", args.rows, max(1, args.repeat // 10),
+                           lambda: [legacy_predict(predictor, features, now) for features in batch])
+    vector_batch = measure("predict_many", args.rows, args.repeat, lambda: predictor.predict_many(batch, now))
+
+    print(f"\nGain : x{batch_single / legacy_single:.1f} ligne à ligne, x{vector_batch / legacy_batch:.0f} par lot")
+
+
+if __name__ == "__main__":
+    main()
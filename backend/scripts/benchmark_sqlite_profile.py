@@ -0,0 +1,152 @@
+"""
+ViteviteApp - Benchmark du profil SQLite
+
+Compare l'ancien moteur (NullPool : une connexion et un thread aiosqlite par
+session, journal rollback) au profil SQLite de `core/database.py` (pool
+borné, WAL et PRAGMA de Settings) sur trois charges :
+- issue : émission de tickets (numéro de séquence + INSERT + COMMIT)
+- read  : lecture d'un ticket et de la file active d'un service
+- mixed : moitié émissions, moitié lectures en parallèle
+
+Usage:
+    python -m scripts.benchmark_sqlite_profile
+    python -m scripts.benchmark_sqlite_profile --concurrency 32 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import NullPool
+
+import app.models  # noqa: F401
+from app.core.database import Base, create_sqlite_engine, sqlite_pragmas
+from app.crud.ticket import ticket_crud
+from app.models.service import Service
+from app.models.ticket import Ticket
+from app.schemas.ticket import TicketCreate
+
+SERVICES = 10
+SEED_TICKETS = 2000
+
+
+def legacy_engine(url: str):
+    """Moteur d'origine : NullPool, sans PRAGMA"""
+    return create_async_engine(url, connect_args={"check_same_thread": False}, poolclass=NullPool)
+
+
+PROFILES = {
+    "nullpool": legacy_engine,
+    "tuned": create_sqlite_engine,
+}
+
+
+# ========== CHARGES ==========
+async def issue_ticket(factory, services, ticket_ids):
+    async with factory() as db:
+        service = random.choice(services)
+        ticket = await ticket_crud.create_with_service(
+            db, obj_in=TicketCreate(service_id=service.id, user_name="Bench"), service=service
+        )
+        await db.commit()
+        ticket_ids.append(ticket.id)
+
+
+async def read_ticket(factory, services, ticket_ids):
+    async with factory() as db:
+        await db.get(Ticket, random.choice(ticket_ids))
+        await ticket_crud.get_active_by_service(db, service_id=random.choice(services).id)
+
+
+async def drive(factory, services, ticket_ids, operation, clients: int, duration: float):
+    """Lance `clients` boucles pendant `duration` secondes"""
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                await operation(factory, services, ticket_ids)
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception:
+                errors += 1
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies, errors
+
+
+def report(label: str, latencies, errors: int, duration: float) -> None:
+    if not latencies:
+        print(f"  {label:<12} aucune opération réussie ({errors} erreurs)")
+        return
+    latencies.sort()
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(
+        f"  {label:<12} {len(latencies) / duration:>8.0f} req/s"
+        f"  p50={statistics.median(latencies):.1f}ms  p95={p95:.1f}ms  erreurs={errors}"
+    )
+
+
+async def run_profile(name: str, concurrency: int, duration: float) -> None:
+    path = os.path.join(tempfile.mkdtemp(), f"{name}.db")
+    engine = PROFILES[name](f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with factory() as db:
+        for index in range(SERVICES):
+            db.add(Service(name=f"Service {index}", slug=f"bench-{name}-{index}", category="mairie"))
+        await db.commit()
+        services = list((await db.execute(select(Service))).scalars().all())
+
+    ticket_ids = []
+    for _ in range(SEED_TICKETS // 50):
+        await asyncio.gather(*(issue_ticket(factory, services, ticket_ids) for _ in range(50)))
+
+    print(f"\n===== {name} =====")
+    latencies, errors = await drive(factory, services, ticket_ids, issue_ticket, concurrency, duration)
+    report("issue", latencies, errors, duration)
+
+    latencies, errors = await drive(factory, services, ticket_ids, read_ticket, concurrency, duration)
+    report("read", latencies, errors, duration)
+
+    half = max(1, concurrency // 2)
+    (write_latencies, write_errors), (read_latencies, read_errors) = await asyncio.gather(
+        drive(factory, services, ticket_ids, issue_ticket, half, duration),
+        drive(factory, services, ticket_ids, read_ticket, half, duration),
+    )
+    report("mixed/issue", write_latencies, write_errors, duration)
+    report("mixed/read", read_latencies, read_errors, duration)
+
+    await engine.dispose()
+
+
+async def run(profiles, concurrency: int, duration: float) -> None:
+    random.seed(42)
+    print(f"Clients        : {concurrency}")
+    print(f"Durée / charge : {duration:.0f}s")
+    print(f"PRAGMA (tuned) : {sqlite_pragmas()}")
+    for name in profiles:
+        await run_profile(name, concurrency, duration)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="Secondes par charge")
+    parser.add_argument("--profile", choices=sorted(PROFILES), action="append", help="Profil(s) à mesurer (tous par défaut)")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.profile or list(PROFILES), args.concurrency, args.duration))
+
+
+if __name__ == "__main__":
+    main()
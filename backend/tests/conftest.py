@@ -0,0 +1,40 @@
+import os
+
+# Chaque test tourne dans sa propre boucle asyncio : les connexions aiosqlite
+# du pool de l'application ne peuvent pas passer d'une boucle à l'autre
+os.environ.setdefault("SQLITE_POOL_SIZE", "0")
+
+import pytest_asyncio  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession  # noqa: E402
+from sqlalchemy.pool import NullPool, StaticPool  # noqa: E402
+
+import app.models  # noqa: E402,F401 - enregistre toutes les tables
+from app.core.database import Base  # noqa: E402
+
+
+async def _create_engine(url: str, poolclass):
+    engine = create_async_engine(url, connect_args={"check_same_thread": False}, poolclass=poolclass)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine
+
+
+@pytest_asyncio.fixture
+async def db_engine():
+    """Base SQLite en mémoire (une connexion partagée), tables créées"""
+    engine = await _create_engine("sqlite+aiosqlite:///:memory:", StaticPool)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def session_factory(db_engine):
+    return async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest_asyncio.fixture
+async def file_session_factory(tmp_path):
+    """Base SQLite fichier, une connexion par session (accès concurrents réels)"""
+    engine = await _create_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", NullPool)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
@@ -0,0 +1,106 @@
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.models.analytics import Analytics
+from app.models.service import Service
+from app.models.ticket import Ticket, TicketStatus
+from app.api.v1.endpoints.tickets import complete_ticket
+from app.services.analytics_rollup import AnalyticsRollup, TicketEvent, analytics_rollup
+from app.services.queue_engine import MemoryQueueEngine
+from app.utils.time_windows import to_local
+
+
+@pytest_asyncio.fixture
+async def factory(session_factory):
+    factory = session_factory
+    async with factory() as db:
+        db.add(Service(id="svc-1", name="Service 1", slug="svc-1", category="mairie", status="ouvert"))
+        await db.commit()
+
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_transitions_are_rolled_up_in_batches(factory):
+    rollup = AnalyticsRollup(session_factory=factory)
+    created_at = datetime.utcnow() - timedelta(minutes=30)
+
+    async with factory() as db:
+        tickets = [
+            Ticket(service_id="svc-1", ticket_number=f"N-{n}", position_in_queue=n,
+                   status=TicketStatus.WAITING, created_at=created_at)
+            for n in range(1, 4)
+        ]
+        db.add_all(tickets)
+        for ticket in tickets:
+            rollup.record(db, TicketEvent.ISSUED, ticket)
+        await db.commit()
+        last_id = tickets[2].id
+
+        # Transaction annulée : aucun événement retenu
+        tickets[2].status = TicketStatus.CANCELLED
+        rollup.record(db, TicketEvent.CANCELLED, tickets[2], TicketStatus.WAITING)
+        await db.rollback()
+
+        for ticket, wait in zip(tickets[:2], (10, 20)):
+            ticket.status = TicketStatus.CALLED
+            ticket.called_at = created_at + timedelta(minutes=wait)
+            rollup.record(db, TicketEvent.CALLED, ticket, TicketStatus.WAITING)
+        await db.commit()
+
+        tickets[0].status = TicketStatus.COMPLETED
+        tickets[0].completed_at = tickets[0].called_at + timedelta(minutes=5)
+        rollup.record(db, TicketEvent.COMPLETED, tickets[0], TicketStatus.CALLED)
+        await db.commit()
+
+    assert rollup.pending_events == 6
+    assert await rollup.flush() == 6
+    assert rollup.pending_events == 0
+
+    async with factory() as db:
+        analytics = (await db.execute(select(Analytics))).scalar_one()
+
+    hour = f"{to_local(created_at).hour:02d}:00"
+    assert analytics.date == to_local(created_at).date()
+    assert analytics.total_tickets == 3
+    assert analytics.pending_tickets == 1
+    assert analytics.completed_tickets == 1
+    assert analytics.cancelled_tickets == 0
+    assert analytics.wait_time_samples == 2
+    assert analytics.average_wait_time == pytest.approx(15)
+    assert (analytics.min_wait_time, analytics.max_wait_time) == pytest.approx((10, 20))
+    assert analytics.average_service_time == pytest.approx(5)
+    assert analytics.hourly_distribution[hour]["tickets"] == 3
+    assert analytics.hourly_distribution[hour]["avg_wait"] == pytest.approx(15)
+    assert analytics.peak_hours == [{"hour": hour, "tickets": 3}]
+
+    # Le lot suivant s'ajoute à la même ligne
+    async with factory() as db:
+        ticket = await db.get(Ticket, last_id)
+        ticket.status = TicketStatus.CANCELLED
+        rollup.record(db, TicketEvent.CANCELLED, ticket, TicketStatus.WAITING)
+        await db.commit()
+    await rollup.flush()
+
+    async with factory() as db:
+        analytics = (await db.execute(select(Analytics))).scalar_one()
+    assert analytics.cancelled_tickets == 1
+    assert analytics.pending_tickets == 0
+    assert analytics.total_tickets == 3
+
+
+@pytest.mark.asyncio
+async def test_completing_a_terminal_ticket_records_nothing(factory):
+    async with factory() as db:
+        ticket = Ticket(service_id="svc-1", ticket_number="N-1", position_in_queue=1, status=TicketStatus.CANCELLED)
+        db.add(ticket)
+        await db.commit()
+
+        with pytest.raises(HTTPException) as exc:
+            await complete_ticket(ticket.id, db=db, current_user=None, queue=MemoryQueueEngine())
+        assert exc.value.status_code == 400
+        assert analytics_rollup.pending_events == 0
+        assert (await db.get(Ticket, ticket.id)).status == TicketStatus.CANCELLED
@@ -0,0 +1,64 @@
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from sqlalchemy import event
+
+from app.api.v1.deps import authenticate_token, get_current_admin
+from app.core import security
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models.user import User, UserRole
+
+
+@pytest.mark.asyncio
+async def test_principal_is_cached_until_the_user_changes(db_engine, session_factory):
+    async with session_factory() as db:
+        user = User(email="agent@vitevite.ci", hashed_password="x", role=UserRole.ADMIN.value)
+        db.add(user)
+        await db.commit()
+    token = create_access_token({"sub": str(user.id)})
+
+    queries = []
+    event.listen(db_engine.sync_engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+
+    async with session_factory() as db:
+        first = await authenticate_token(token, db)
+        second = await authenticate_token(token, db)
+        assert await get_current_admin(second) is second
+    assert first is second
+    assert len(queries) == 1
+
+    # Rôle retiré : le cache est invalidé au COMMIT
+    async with session_factory() as db:
+        row = await db.get(User, user.id)
+        row.role = UserRole.CITOYEN.value
+        await db.commit()
+    async with session_factory() as db:
+        principal = await authenticate_token(token, db)
+        assert (await principal.load(db)).email == "agent@vitevite.ci"
+    with pytest.raises(HTTPException) as error:
+        await get_current_admin(principal)
+    assert error.value.status_code == 403
+
+    async with session_factory() as db:
+        row = await db.get(User, user.id)
+        row.is_active = False
+        await db.commit()
+    async with session_factory() as db:
+        with pytest.raises(HTTPException) as error:
+            await authenticate_token(token, db)
+    assert error.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_password_is_rehashed_when_the_cost_changes(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 1)
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("Secret123")
+
+    assert await security.verify_password_async("Wrong123", old_hash) == (False, None)
+    valid, new_hash = await security.verify_password_async("Secret123", old_hash)
+    assert valid and new_hash.startswith(f"$2b${settings.PASSWORD_BCRYPT_ROUNDS:02d}$")
+    assert security.verify_password("Secret123", new_hash)
+    assert await security.verify_password_async("Secret123", new_hash) == (True, None)
+    assert await security.verify_password_async("Secret123", None) == (False, None)
+    security.shutdown_password_hashing()
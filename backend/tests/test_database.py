@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+
+from app.core.config import Settings, settings
+from app.core.database import create_sqlite_engine, pool_metrics, postgres_pool_options
+
+
+def test_postgres_pool_is_sized_per_worker(monkeypatch):
+    monkeypatch.setattr(settings, "POSTGRES_MAX_CONNECTIONS", 100)
+    monkeypatch.setattr(settings, "POSTGRES_RESERVED_CONNECTIONS", 10)
+    monkeypatch.setattr(settings, "WORKERS", 4)
+
+    options = postgres_pool_options()
+    assert (options["pool_size"], options["max_overflow"]) == (11, 11)
+    assert 4 * (options["pool_size"] + options["max_overflow"]) <= 90
+
+    monkeypatch.setattr(settings, "POSTGRES_POOL_SIZE", 5)
+    monkeypatch.setattr(settings, "POSTGRES_MAX_OVERFLOW", 0)
+    options = postgres_pool_options()
+    assert (options["pool_size"], options["max_overflow"]) == (5, 0)
+
+
+@pytest.mark.asyncio
+async def test_pool_budget_counts_every_worker(tmp_path, monkeypatch, caplog):
+    from app.core import database
+
+    # WORKERS absent : nombre de workers d'uvicorn (WEB_CONCURRENCY)
+    monkeypatch.delenv("WORKERS", raising=False)
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert Settings().WORKERS == 4
+
+    # Pools écriture + lecture de 5 + 5 connexions chacun
+    monkeypatch.setattr(settings, "SQLITE_POOL_SIZE", 5)
+    monkeypatch.setattr(settings, "SQLITE_MAX_OVERFLOW", 5)
+    monkeypatch.setattr(settings, "DATABASE_READ_URL", None)
+    monkeypatch.setattr(settings, "POSTGRES_MAX_CONNECTIONS", 100)
+    monkeypatch.setattr(settings, "POSTGRES_RESERVED_CONNECTIONS", 10)
+    writer = create_sqlite_engine(f"sqlite+aiosqlite:///{tmp_path / 'w.db'}")
+    reader = create_sqlite_engine(f"sqlite+aiosqlite:///{tmp_path / 'r.db'}")
+    monkeypatch.setattr(database, "DATABASE_URL", "postgresql+asyncpg://db/vitevite")
+    monkeypatch.setattr(database, "engine", writer)
+    monkeypatch.setattr(database, "read_engine", reader)
+    try:
+        monkeypatch.setattr(settings, "WORKERS", 4)
+        assert database.check_pool_budget() == {"workers": 4, "per_worker": 20, "total": 80, "budget": 90}
+        assert "Pools PostgreSQL" not in caplog.text
+
+        monkeypatch.setattr(settings, "WORKERS", 5)
+        assert database.check_pool_budget()["total"] == 100
+        assert "Pools PostgreSQL" in caplog.text
+    finally:
+        await reader.dispose()
+        await writer.dispose()
+
+
+@pytest.mark.asyncio
+async def test_pool_reports_checkout_wait_and_utilization(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQLITE_POOL_SIZE", 2)
+    monkeypatch.setattr(settings, "SQLITE_MAX_OVERFLOW", 0)
+    engine = create_sqlite_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}")
+
+    async def query():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await asyncio.sleep(0.02)
+
+    await asyncio.gather(*(query() for _ in range(6)))
+    metrics = pool_metrics(engine)
+    await engine.dispose()
+
+    assert (metrics["capacity"], metrics["checked_out"], metrics["peak_checked_out"]) == (2, 0, 2)
+    assert metrics["checkouts"] == 6
+    assert metrics["max_wait_ms"] >= 15
+
+
+@pytest.mark.asyncio
+async def test_read_session_routing_and_read_only(tmp_path):
+    from starlette.requests import Request
+    from sqlalchemy.exc import OperationalError
+    from app.core import database
+
+    def request(headers):
+        return Request({"type": "http", "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]})
+
+    async for db in database.get_read_db(request({})):
+        assert db.info.get("read_only") is True
+    async for db in database.get_read_db(request({database.READ_YOUR_WRITES_HEADER: "1"})):
+        assert not db.info.get("read_only")
+
+    url = f"sqlite+aiosqlite:///{tmp_path / 'read.db'}"
+    writer = create_sqlite_engine(url)
+    async with writer.begin() as conn:
+        await conn.execute(text("CREATE TABLE t (x INTEGER)"))
+    reader = create_sqlite_engine(url, pragmas={**database.sqlite_pragmas(), "query_only": "ON"})
+    try:
+        async with reader.connect() as conn:
+            assert (await conn.execute(text("SELECT COUNT(*) FROM t"))).scalar() == 0
+            with pytest.raises(OperationalError):
+                await conn.execute(text("INSERT INTO t VALUES (1)"))
+    finally:
+        await reader.dispose()
+        await writer.dispose()
@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app.models.service import Service
+from app.models.ticket import Ticket, TicketStatus
+from app.services.group_commit import GroupCommitWriter
+from app.services.queue_engine import MemoryQueueEngine
+
+
+@pytest.mark.asyncio
+async def test_writes_are_committed_in_batches_with_isolated_failures(file_session_factory):
+    engine = MemoryQueueEngine()
+    async with file_session_factory() as db:
+        db.add(Service(id="svc", name="Mairie", slug="mairie", category="mairie"))
+        await db.commit()
+        await engine.load(db)
+
+    writer = GroupCommitWriter(max_batch=16, window=0.05, session_factory=file_session_factory)
+    writer.start()
+
+    def issue(number: int):
+        async def work(db):
+            ticket = Ticket(service_id="svc", ticket_number=f"N-{number:03d}", position_in_queue=number,
+                            status=TicketStatus.WAITING)
+            db.add(ticket)
+            engine.track(db, ticket)
+            await db.flush()
+            if number == 3:
+                raise HTTPException(status_code=400, detail="Refusé")
+            return ticket.ticket_number
+        return work
+
+    results = await asyncio.gather(*(writer.submit(issue(n)) for n in range(1, 9)), return_exceptions=True)
+    await writer.stop()
+
+    assert isinstance(results[2], HTTPException)
+    assert [r for r in results if not isinstance(r, Exception)] == [f"N-{n:03d}" for n in range(1, 9) if n != 3]
+    assert writer.batches == 1
+    assert (writer.writes, writer.failures) == (7, 1)
+
+    async with file_session_factory() as db:
+        numbers = (await db.execute(select(Ticket.ticket_number).order_by(Ticket.ticket_number))).scalars().all()
+        assert "N-003" not in numbers and len(numbers) == 7
+        # L'unité annulée n'est pas publiée dans la file
+        assert len(await engine.active_entries(db, "svc")) == 7
+        assert (await db.execute(select(func.count(Ticket.id)))).scalar() == 7
@@ -0,0 +1,138 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from starlette.websockets import WebSocketDisconnect
+
+from app.api.v1.endpoints import live, tickets
+from app.core.database import get_db
+from app.core.security import create_access_token
+from app.models.service import Service
+from app.models.ticket import Ticket, TicketStatus
+from app.models.user import User, UserRole
+from app.services.queue_broadcaster import queue_broadcaster
+from app.services.queue_engine import queue_engine
+
+
+@pytest_asyncio.fixture
+async def live_db(file_session_factory, monkeypatch):
+    """Base fichier partagée par les endpoints live, le diffuseur et le moteur de file"""
+    async with file_session_factory() as db:
+        admin = User(email="admin@vitevite.ci", hashed_password="x", role=UserRole.ADMIN.value)
+        citizen = User(email="citoyen@vitevite.ci", hashed_password="x", role=UserRole.CITOYEN.value)
+        db.add_all([admin, citizen, Service(id="svc", name="Mairie", slug="mairie", category="mairie")])
+        await db.commit()
+
+        ticket = Ticket(service_id="svc", ticket_number="N-001", position_in_queue=1, status=TicketStatus.WAITING)
+        db.add(ticket)
+        queue_engine.track(db, ticket)
+        await db.commit()
+        await queue_engine.load(db)
+
+        tokens = {
+            "admin": create_access_token({"sub": str(admin.id)}),
+            "citizen": create_access_token({"sub": str(citizen.id)}),
+        }
+
+    async def override_get_db():
+        async with file_session_factory() as session:
+            yield session
+
+    monkeypatch.setattr(live, "AsyncSessionLocal", file_session_factory)
+    monkeypatch.setattr(queue_broadcaster, "_session_factory", file_session_factory)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await queue_broadcaster.close()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(live.router, prefix="/live")
+    app.include_router(tickets.router, prefix="/tickets")
+    app.dependency_overrides[get_db] = override_get_db
+
+    yield app, file_session_factory, tokens, ticket.id
+    assert queue_broadcaster.subscriber_count() == 0
+
+
+def test_websocket_rejects_missing_or_non_admin_token(live_db):
+    app, _, tokens, _ = live_db
+    with TestClient(app) as client:
+        for query in ("", f"?token={tokens['citizen']}"):
+            with pytest.raises(WebSocketDisconnect) as exc:
+                with client.websocket_connect(f"/live/ws/services/svc{query}"):
+                    pass
+            assert exc.value.code == 1008
+
+
+def test_websocket_snapshot_then_diff_after_call_next(live_db):
+    app, _, tokens, ticket_id = live_db
+    with TestClient(app) as client:
+        with client.websocket_connect(f"/live/ws/services/svc?token={tokens['admin']}") as service_ws, \
+                client.websocket_connect(f"/live/ws/tickets/{ticket_id}") as ticket_ws:
+            snapshot = service_ws.receive_json()
+            assert snapshot["type"] == "snapshot"
+            assert snapshot["data"]["waiting_count"] == 1
+            assert ticket_ws.receive_json()["data"]["rank"] == 1
+
+            response = client.post(
+                "/tickets/call-next/svc", headers={"Authorization": f"Bearer {tokens['admin']}"}
+            )
+            assert response.status_code == 200
+
+            diff = service_ws.receive_json()
+            assert diff["type"] == "diff"
+            assert diff["changes"]["waiting_count"] == 0
+            assert diff["changes"]["updated"][0]["status"] == TicketStatus.CALLED.value
+
+            ticket_diff = ticket_ws.receive_json()
+            assert ticket_diff["changes"]["status"] == TicketStatus.CALLED.value
+            assert ticket_diff["changes"]["rank"] is None
+
+
+class FakeRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+async def next_event(body) -> dict:
+    chunk = await asyncio.wait_for(body.__anext__(), timeout=1)
+    event, data = chunk.strip().split("\n")
+    assert event.startswith("event: ")
+    return json.loads(data[len("data: "):])
+
+
+@pytest.mark.asyncio
+async def test_sse_auth_snapshot_and_diff(live_db):
+    _, factory, tokens, ticket_id = live_db
+
+    async with factory() as db:
+        for token, code in ((None, 401), (tokens["citizen"], 403)):
+            with pytest.raises(HTTPException) as exc:
+                await live.service_queue_events("svc", FakeRequest(), token=token, db=db)
+            assert exc.value.status_code == code
+
+        service_body = (await live.service_queue_events("svc", FakeRequest(), token=tokens["admin"], db=db)).body_iterator
+        ticket_body = (await live.ticket_events(ticket_id, FakeRequest(), db=db)).body_iterator
+
+    snapshot = await next_event(service_body)
+    assert snapshot["type"] == "snapshot"
+    assert snapshot["data"]["waiting_count"] == 1
+    assert (await next_event(ticket_body))["data"]["rank"] == 1
+
+    async with factory() as db:
+        admin = (await db.execute(select(User).where(User.email == "admin@vitevite.ci"))).scalar_one()
+        await tickets.call_next_ticket("svc", db=db, current_user=admin, queue=queue_engine)
+
+    diff = await next_event(service_body)
+    assert diff["type"] == "diff"
+    assert diff["changes"]["waiting_count"] == 0
+    assert (await next_event(ticket_body))["changes"]["status"] == TicketStatus.CALLED.value
+
+    await service_body.aclose()
+    await ticket_body.aclose()
+    await queue_broadcaster.close()
@@ -0,0 +1,53 @@
+import pytest
+
+from app.ai import ai_pharmacy_service as pharmacy_module
+from app.ai.ai_pharmacy_service import ai_pharmacy_service
+from app.ai.llm_cache import LLMResponseCache
+from app.ai.llm_client import CircuitBreaker, FakeLLMProvider, llm_client
+
+
+@pytest.fixture
+def fake_provider(monkeypatch):
+    provider = FakeLLMProvider(responder=lambda prompt: '{"alternatives": [{"name": "Doliprane"}], "advice": "ok"}')
+    monkeypatch.setattr(llm_client, "provider", provider)
+    monkeypatch.setattr(llm_client, "breaker", CircuitBreaker())
+    monkeypatch.setattr(llm_client, "retries", 0)
+    return provider
+
+
+@pytest.mark.asyncio
+async def test_responses_are_cached_on_normalized_inputs_and_persisted(fake_provider, monkeypatch, tmp_path):
+    path = str(tmp_path / "llm.db")
+    cache = LLMResponseCache(maxsize=2, ttl=60, path=path)
+    monkeypatch.setattr(pharmacy_module, "llm_response_cache", cache)
+
+    first = await ai_pharmacy_service.find_alternatives("Paracétamol", "500mg")
+    first["alternatives"].clear()  # L'appelant reçoit une copie
+    second = await ai_pharmacy_service.find_alternatives("  paracétamol ", "500MG")
+    assert second["alternatives"] == [{"name": "Doliprane"}]
+    assert len(fake_provider.calls) == 1
+
+    # Fallback jamais mis en cache
+    fake_provider.fail_next = 1
+    assert (await ai_pharmacy_service.find_alternatives("Amoxicilline", "1g"))["is_fallback"]
+    await ai_pharmacy_service.find_alternatives("Amoxicilline", "1g")
+    assert len(fake_provider.calls) == 3
+    assert (cache.hits, cache.misses, cache.stores) == (1, 3, 2)
+
+    # Nouveau worker / redémarrage : entrées relues depuis le fichier
+    cache.close()
+    restarted = LLMResponseCache(maxsize=2, ttl=60, path=path)
+    monkeypatch.setattr(pharmacy_module, "llm_response_cache", restarted)
+    await ai_pharmacy_service.find_alternatives("Paracétamol", "500mg")
+    assert len(fake_provider.calls) == 3
+
+    # LRU borné, éviction répercutée sur le fichier
+    await ai_pharmacy_service.find_alternatives("Ibuprofène", "400mg")
+    assert restarted.evictions == 1 and restarted.metrics()["size"] == 2
+
+    assert await restarted.purge("pharmacy.alternatives") == 2
+    restarted.close()
+    reloaded = LLMResponseCache(maxsize=2, ttl=60, path=path)
+    await reloaded._ensure_loaded()
+    assert reloaded.metrics()["size"] == 0
+    reloaded.close()
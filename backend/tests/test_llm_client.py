@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+import pytest
+
+from app.ai.gemini_service import gemini_service
+from app.ai.llm_client import CircuitBreaker, FakeLLMProvider, LLMClient, LLMUnavailable, llm_client
+
+SERVICE = {
+    "id": "svc",
+    "name": "Mairie",
+    "category": "mairie",
+    "current_queue_size": 4,
+    "estimated_wait_time": 20,
+    "affluence_level": "modérée",
+}
+
+
+@pytest.fixture
+def fake_provider(monkeypatch):
+    provider = FakeLLMProvider()
+    monkeypatch.setattr(llm_client, "provider", provider)
+    monkeypatch.setattr(llm_client, "breaker", CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    monkeypatch.setattr(llm_client, "retries", 0)
+    monkeypatch.setattr(llm_client, "timeout", 0.05)
+    return provider
+
+
+@pytest.mark.asyncio
+async def test_services_use_the_shared_client_and_fall_back_when_the_breaker_opens(fake_provider):
+    fake_provider.responder = lambda prompt: '```json\n{"predicted_wait_time": 42, "confidence": 0.9}\n```'
+    prediction = await gemini_service.predict_wait_time(SERVICE)
+    assert prediction["predicted_wait_time"] == 42
+
+    # Fournisseur trop lent : timeout, puis circuit ouvert après 2 échecs
+    fake_provider.delay = 1.0
+    for _ in range(2):
+        assert (await gemini_service.predict_wait_time(SERVICE))["confidence"] == 0.6
+    assert not gemini_service.enabled
+
+    calls = len(fake_provider.calls)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    assert (await gemini_service.predict_wait_time(SERVICE))["confidence"] == 0.6
+    assert loop.time() - start < 0.05
+    assert len(fake_provider.calls) == calls
+
+
+@pytest.mark.asyncio
+async def test_client_retries_limits_concurrency_and_probes_after_reset():
+    now = [0.0]
+    provider = FakeLLMProvider(responder=lambda prompt: json.dumps({"ok": prompt}), delay=0.01)
+    client = LLMClient(
+        provider,
+        timeout=1,
+        max_concurrency=2,
+        retries=1,
+        backoff=0,
+        breaker=CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=lambda: now[0])
+    )
+
+    provider.fail_next = 1
+    assert await client.generate("a") == '{"ok": "a"}'
+    assert client.failures == 1 and client.breaker.state == CircuitBreaker.CLOSED
+
+    active, peak = 0, 0
+    original = provider.generate
+
+    async def tracked(prompt, **options):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        try:
+            return await original(prompt, **options)
+        finally:
+            active -= 1
+
+    provider.generate = tracked
+    await asyncio.gather(*(client.generate(str(i)) for i in range(6)))
+    assert peak == 2
+
+    provider.fail_next = 4
+    with pytest.raises(RuntimeError):
+        await client.generate("b")
+    with pytest.raises(LLMUnavailable):
+        await client.generate("c")
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    now[0] += 10
+    assert client.available
+    with pytest.raises(LLMUnavailable):
+        await client.generate("d")  # L'appel d'essai échoue : circuit rouvert
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.asyncio
+async def test_cancelled_trial_call_does_not_wedge_the_breaker():
+    now = [0.0]
+    provider = FakeLLMProvider(delay=1.0)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    client = LLMClient(provider, timeout=5, retries=0, backoff=0, breaker=breaker)
+
+    breaker.record_failure()
+    now[0] = 10.0
+    assert client.available
+
+    # Appel d'essai annulé (client déconnecté) : ni succès ni échec
+    trial = asyncio.get_running_loop().create_task(client.generate("essai"))
+    await asyncio.sleep(0.01)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert client.available
+    provider.delay = 0
+    assert await client.generate("essai") == "{}"
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -7,4 +7,6 @@ client = TestClient(app)
 def test_health_check():
     response = client.get(f"{settings.API_V1_PREFIX}/health")
     assert response.status_code == 200
-    assert response.json() == {"status": "healthy", "version": "1.0.0"}
+    body = response.json()
+    assert {key: body[key] for key in ("status", "version")} == {"status": "healthy", "version": "1.0.0"}
+    assert body["ml_model"]["ready"] is False  # Pas de modèle entraîné dans le dépôt
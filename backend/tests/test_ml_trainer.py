@@ -0,0 +1,26 @@
+import importlib.util
+from datetime import datetime
+
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    any(importlib.util.find_spec(name) is None for name in ("xgboost", "sklearn", "pandas")),
+    reason="xgboost, scikit-learn et pandas requis"
+)
+
+
+def test_batch_inference_matches_row_by_row_predictions(tmp_path):
+    from app.services.ml_trainer import QueueTimePredictor
+    from scripts.benchmark_ml_inference import legacy_predict, random_features, write_dataset
+
+    csv_path = str(tmp_path / "queue_data.csv")
+    write_dataset(csv_path, 2000)
+    QueueTimePredictor(model_path=str(tmp_path / "model.pkl")).train(csv_path)
+
+    predictor = QueueTimePredictor(model_path=str(tmp_path / "model.pkl"))
+    predictor.load_model()
+    now = datetime(2025, 3, 10, 10, 30)
+    features = random_features(200)  # Dont catégories inconnues
+
+    assert predictor.predict_many(features, now) == [legacy_predict(predictor, f, now) for f in features]
+    assert predictor.predict_many([], now) == []
@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.model_registry import ModelRegistry
+
+
+class SlowPredictor:
+    def predict_many(self, features_list):
+        return [{"predicted_time": 5, "confidence": 0.75} for _ in features_list]
+
+
+@pytest.mark.asyncio
+async def test_model_is_loaded_once_in_background_and_reports_readiness(tmp_path, monkeypatch):
+    assert ModelRegistry(str(tmp_path / "absent.pkl")).state == ModelRegistry.ABSENT
+    assert await ModelRegistry(str(tmp_path / "absent.pkl")).predict_many([{}]) is None
+
+    path = tmp_path / "queue_predictor.pkl"
+    path.write_bytes(b"")
+    registry = ModelRegistry(str(path))
+    loads = []
+
+    def load_sync():
+        loads.append(1)
+        time.sleep(0.05)  # Import + désérialisation, hors de la boucle
+        return SlowPredictor()
+
+    monkeypatch.setattr(registry, "_load_sync", load_sync)
+    assert registry.status()["state"] == ModelRegistry.COLD
+
+    registry.warm_up()
+    assert registry.state == ModelRegistry.LOADING and not registry.ready
+    results = await asyncio.gather(*(registry.predict_many([{}, {}]) for _ in range(5)))
+    assert len(loads) == 1 and all(len(r) == 2 for r in results)
+    assert registry.status()["ready"] and registry.load_seconds >= 0.05
+
+    broken = ModelRegistry(str(path))
+    monkeypatch.setattr(broken, "_load_sync", lambda: 1 / 0)
+    assert await broken.get_predictor() is None
+    assert broken.state == ModelRegistry.FAILED and broken.warm_up() is None
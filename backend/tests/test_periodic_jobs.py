@@ -0,0 +1,103 @@
+import asyncio
+import os
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+
+from app.models.administration import Administration
+from app.models.counter import Counter, CounterStatus
+from app.models.service import Service, AffluenceLevel
+from app.models.ticket import Ticket, TicketStatus
+from app.core.config import settings
+from app.services.job_runner import FileLeaderLock, PeriodicJob, create_leader_lock
+from app.services.periodic_jobs import (
+    refresh_affluence_levels,
+    refresh_administration_totals,
+    refresh_best_visit_times,
+    rollover_counter_stats,
+)
+
+
+@pytest_asyncio.fixture
+async def factory(session_factory):
+    factory = session_factory
+    now = datetime.utcnow()
+    async with factory() as db:
+        db.add(Service(id="busy", name="Busy", slug="busy", category="mairie", max_queue_size=10))
+        db.add(Service(id="calm", name="Calm", slug="calm", category="mairie", max_queue_size=None,
+                       affluence_level=AffluenceLevel.HIGH))
+        db.add(Counter(id="c-1", service_id="busy", counter_number=1, status=CounterStatus.OPEN,
+                       tickets_processed_today=7))
+        db.add(Counter(id="c-2", service_id="calm", counter_number=1, status=CounterStatus.CLOSED))
+        for n in range(9):
+            db.add(Ticket(service_id="busy", ticket_number=f"B-{n}", position_in_queue=n + 1,
+                          status=TicketStatus.WAITING, created_at=now))
+        db.add(Ticket(service_id="busy", counter_id="c-1", ticket_number="B-X", position_in_queue=10,
+                      status=TicketStatus.COMPLETED, created_at=now - timedelta(minutes=30),
+                      called_at=now - timedelta(minutes=10), completed_at=now))
+        for days_ago in (1, 2):
+            db.add(Ticket(service_id="calm", ticket_number=f"C-{days_ago}", position_in_queue=1,
+                          status=TicketStatus.COMPLETED, created_at=now - timedelta(days=days_ago)))
+        db.add(Administration(id="adm", name="Mairie", slug="mairie", type="mairie", service_ids=["busy", "calm"]))
+        await db.commit()
+
+    return factory
+
+
+@pytest.mark.asyncio
+async def test_materializations(factory):
+    async with factory() as db:
+        assert await refresh_affluence_levels(db) == 2
+        assert await refresh_best_visit_times(db) == 1
+        assert await refresh_administration_totals(db) == 1
+        assert await rollover_counter_stats(db) == 1
+        await db.commit()
+
+        # Deuxième passage : rien ne change
+        assert await refresh_affluence_levels(db) == 0
+        assert await rollover_counter_stats(db) == 0
+
+    async with factory() as db:
+        busy = await db.get(Service, "busy")
+        calm = await db.get(Service, "calm")
+        administration = await db.get(Administration, "adm")
+        counter = await db.get(Counter, "c-1")
+
+    assert busy.affluence_level == AffluenceLevel.VERY_HIGH
+    assert calm.affluence_level == AffluenceLevel.LOW
+    assert len(calm.best_visit_times) == 3
+    assert all(slot["hour"].endswith(":00") for slot in calm.best_visit_times)
+    assert administration.total_queue_size == 9
+    assert administration.average_wait_time == 20
+    assert administration.total_active_counters == 1
+    assert counter.tickets_processed_today == 1
+
+
+@pytest.mark.asyncio
+async def test_job_overlap_and_leader_lock(tmp_path, monkeypatch):
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+
+    job = PeriodicJob("slow", slow, interval=60, jitter=0.1)
+    first = asyncio.create_task(job.run())
+    await asyncio.sleep(0)
+    assert await job.run() is False
+    release.set()
+    assert await first is True
+    assert (job.runs, job.skipped, job.failures) == (1, 1, 0)
+    assert 54 <= job.next_delay() <= 66
+
+    path = os.path.join(tmp_path, "jobs.lock")
+    leader, follower = FileLeaderLock(path), FileLeaderLock(path)
+    assert await leader.acquire() is True
+    assert await follower.acquire() is False
+    await leader.release()
+    assert await follower.acquire() is True
+    await follower.release()
+
+    # Un seul worker déclaré n'exclut pas plusieurs process : verrou réel quand même
+    monkeypatch.setattr(settings, "WORKERS", 1)
+    monkeypatch.setattr(settings, "JOBS_LOCK_FILE", path)
+    assert isinstance(create_leader_lock(), FileLeaderLock)
@@ -0,0 +1,133 @@
+import asyncio
+import pytest
+
+from app.models.service import Service
+from app.models.ticket import Ticket, TicketStatus
+from app.services.queue_engine import MemoryQueueEngine, SQLQueueEngine
+from app.services.queue_broadcaster import QueueBroadcaster
+
+
+async def next_message(subscription):
+    return await asyncio.wait_for(subscription.get(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_sends_snapshot_then_diffs(session_factory):
+    engine = MemoryQueueEngine()
+    broadcaster = QueueBroadcaster(engine, session_factory=session_factory)
+
+    async with session_factory() as db:
+        db.add(Service(id="svc", name="Mairie", slug="mairie", category="mairie"))
+        await db.commit()
+        await engine.load(db)
+
+        first = Ticket(service_id="svc", ticket_number="N-001", position_in_queue=1, status=TicketStatus.WAITING)
+        db.add(first)
+        engine.track(db, first)
+        await db.commit()
+
+        service_sub = await broadcaster.subscribe_service(db, "svc")
+        ticket_sub = await broadcaster.subscribe_ticket(db, first)
+
+        snapshot = await next_message(service_sub)
+        assert snapshot["type"] == "snapshot"
+        assert snapshot["data"]["waiting_count"] == 1
+        assert (await next_message(ticket_sub))["data"]["rank"] == 1
+
+        second = Ticket(service_id="svc", ticket_number="N-002", position_in_queue=2, status=TicketStatus.WAITING)
+        db.add(second)
+        engine.track(db, second)
+        await db.commit()
+
+        diff = await next_message(service_sub)
+        assert diff["type"] == "diff"
+        assert diff["changes"]["waiting_count"] == 2
+        assert [t["id"] for t in diff["changes"]["added"]] == [second.id]
+
+        first.status = TicketStatus.CALLED
+        engine.track(db, first)
+        await db.commit()
+
+        ticket_diff = await next_message(ticket_sub)
+        assert ticket_diff["changes"]["status"] == TicketStatus.CALLED.value
+        assert ticket_diff["changes"]["rank"] is None
+
+    broadcaster.unsubscribe(service_sub)
+    broadcaster.unsubscribe(ticket_sub)
+    assert broadcaster.subscriber_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_flushes_commits_made_during_a_flush(session_factory):
+    engine = MemoryQueueEngine()
+    broadcaster = QueueBroadcaster(engine, session_factory=session_factory)
+
+    async with session_factory() as db:
+        db.add_all([
+            Service(id="a", name="A", slug="a", category="mairie"),
+            Service(id="b", name="B", slug="b", category="mairie"),
+        ])
+        await db.commit()
+        await engine.load(db)
+        sub_a = await broadcaster.subscribe_service(db, "a")
+        sub_b = await broadcaster.subscribe_service(db, "b")
+    await next_message(sub_a)
+    await next_message(sub_b)
+
+    async def add_ticket(service_id, number):
+        async with session_factory() as db:
+            ticket = Ticket(service_id=service_id, ticket_number=number, position_in_queue=1,
+                            status=TicketStatus.WAITING)
+            db.add(ticket)
+            engine.track(db, ticket)
+            await db.commit()
+
+    # Un commit sur B arrive pendant que le flush calcule l'état de A
+    active_entries = engine.active_entries
+
+    async def slow_active_entries(db, service_id):
+        if service_id == "a":
+            await add_ticket("b", "B-001")
+        return await active_entries(db, service_id)
+
+    engine.active_entries = slow_active_entries
+    await add_ticket("a", "A-001")
+
+    assert (await next_message(sub_a))["changes"]["waiting_count"] == 1
+    assert (await next_message(sub_b))["changes"]["waiting_count"] == 1
+
+    broadcaster.unsubscribe(sub_a)
+    broadcaster.unsubscribe(sub_b)
+
+
+@pytest.mark.asyncio
+async def test_resync_picks_up_commits_from_other_workers(session_factory):
+    # Deux workers : seul le second voit ses commits dans son listener
+    broadcaster = QueueBroadcaster(SQLQueueEngine(), session_factory=session_factory, resync_interval=0.05)
+    other_worker = SQLQueueEngine()
+
+    async with session_factory() as db:
+        db.add(Service(id="svc", name="Mairie", slug="mairie", category="mairie"))
+        ticket = Ticket(service_id="svc", ticket_number="N-001", position_in_queue=1, status=TicketStatus.WAITING)
+        db.add(ticket)
+        await db.commit()
+        service_sub = await broadcaster.subscribe_service(db, "svc")
+        ticket_sub = await broadcaster.subscribe_ticket(db, ticket)
+    await next_message(service_sub)
+    await next_message(ticket_sub)
+
+    async with session_factory() as db:
+        db.add(Ticket(service_id="svc", ticket_number="N-002", position_in_queue=2, status=TicketStatus.WAITING))
+        ticket = await db.get(Ticket, ticket.id)
+        ticket.status = TicketStatus.COMPLETED
+        other_worker.track(db, ticket)
+        await db.commit()
+
+    changes = (await next_message(service_sub))["changes"]
+    assert changes["removed"] == [ticket.id]
+    assert [t["ticket_number"] for t in changes["added"]] == ["N-002"]
+    assert (await next_message(ticket_sub))["changes"]["status"] == TicketStatus.COMPLETED.value
+
+    broadcaster.unsubscribe(service_sub)
+    broadcaster.unsubscribe(ticket_sub)
+    await broadcaster.close()
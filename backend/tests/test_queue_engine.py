@@ -0,0 +1,187 @@
+import pytest
+from sqlalchemy import select
+from datetime import datetime, timedelta
+
+from app.models.service import Service
+from app.models.ticket import Ticket, TicketStatus, QUEUE_RANK_GAP
+from app.services.queue_engine import (
+    MemoryQueueEngine, QueueEntry, SQLQueueEngine, ServiceQueue, dense_ranks, plan_ranks, rebalance_queue, with_pending
+)
+
+
+def make_entry(ticket_id, position, status=TicketStatus.WAITING, minutes=0):
+    return QueueEntry(
+        id=ticket_id,
+        service_id="svc",
+        ticket_number=ticket_id.upper(),
+        status=status,
+        position_in_queue=position,
+        created_at=datetime(2025, 1, 1, 8, 0) + timedelta(minutes=minutes),
+    )
+
+
+def test_service_queue_orders_waiting_tickets():
+    queue = ServiceQueue("svc")
+    queue.upsert(make_entry("b", 2))
+    queue.upsert(make_entry("a", 1))
+    queue.upsert(make_entry("c", 3))
+    queue.upsert(make_entry("x", 0, status=TicketStatus.CALLED))
+
+    assert queue.size == 4
+    assert queue.waiting_count == 3
+    assert queue.next_waiting_id() == "a"
+    assert queue.rank("c") == 3
+    assert queue.rank("x") is None
+    assert queue.tail_position == 4
+    assert [e.id for e in queue.ordered_entries()] == ["x", "a", "b", "c"]
+
+
+def test_service_queue_removes_finished_tickets():
+    queue = ServiceQueue("svc")
+    queue.upsert(make_entry("a", 1))
+    queue.upsert(make_entry("b", 2))
+
+    queue.upsert(make_entry("a", 1, status=TicketStatus.CALLED))
+    assert queue.next_waiting_id() == "b"
+    assert queue.rank("b") == 1
+
+    queue.upsert(make_entry("a", 1, status=TicketStatus.COMPLETED))
+    queue.upsert(make_entry("b", 2, status=TicketStatus.CANCELLED))
+    assert queue.size == 0
+    assert queue.tail_position == 1
+
+
+@pytest.mark.asyncio
+async def test_memory_engine_applies_changes_on_commit_only(session_factory):
+    engine = MemoryQueueEngine()
+
+    async with session_factory() as db:
+        db.add(Service(id="svc", name="Mairie", slug="mairie", category="mairie"))
+        await db.commit()
+        await engine.load(db)
+
+        ticket = Ticket(
+            service_id="svc",
+            ticket_number="N-001",
+            position_in_queue=await engine.tail_position(db, "svc"),
+            status=TicketStatus.WAITING,
+        )
+        db.add(ticket)
+        engine.track(db, ticket)
+        await db.rollback()
+        assert await engine.active_count(db, "svc") == 0
+
+        db.add(ticket)
+        engine.track(db, ticket)
+        await db.commit()
+        assert await engine.active_count(db, "svc") == 1
+        assert (await engine.next_waiting(db, "svc")).id == ticket.id
+
+        ticket.status = TicketStatus.COMPLETED
+        engine.track(db, ticket)
+        await db.commit()
+        assert await engine.active_count(db, "svc") == 0
+
+    reloaded = MemoryQueueEngine()
+    async with session_factory() as db:
+        await reloaded.load(db)
+        assert await reloaded.active_count(db, "svc") == 0
+
+
+@pytest.mark.asyncio
+async def test_memory_engine_load_keeps_ranks_reserved_by_pending_tickets(session_factory):
+    async with session_factory() as db:
+        db.add(Service(id="svc", name="Mairie", slug="mairie", category="mairie"))
+        db.add(Ticket(service_id="svc", ticket_number="N-001", position_in_queue=1,
+                      queue_rank=5 * QUEUE_RANK_GAP, status=TicketStatus.PENDING_VALIDATION))
+        await db.commit()
+
+        engine = MemoryQueueEngine()
+        await engine.load(db)
+        assert await engine.next_rank(db, "svc") == 6 * QUEUE_RANK_GAP
+
+
+
+@pytest.mark.asyncio
+async def test_sql_engine_position_matches_memory_order(session_factory):
+    created_at = datetime(2025, 1, 1, 8, 0)
+    async with session_factory() as db:
+        db.add(Service(id="svc", name="Mairie", slug="mairie", category="mairie"))
+        db.add_all([
+            # Rangs égaux : départage par date de création puis par ID
+            Ticket(id="b", service_id="svc", ticket_number="B", position_in_queue=0, queue_rank=1.0, created_at=created_at),
+            Ticket(id="a", service_id="svc", ticket_number="A", position_in_queue=0, queue_rank=1.0, created_at=created_at),
+            Ticket(id="c", service_id="svc", ticket_number="C", position_in_queue=0, queue_rank=1.0,
+                   created_at=created_at - timedelta(minutes=1)),
+            Ticket(id="d", service_id="svc", ticket_number="D", position_in_queue=0, queue_rank=0.5,
+                   status=TicketStatus.CALLED, created_at=created_at),
+        ])
+        await db.commit()
+
+        sql_engine, memory_engine = SQLQueueEngine(), MemoryQueueEngine()
+        await memory_engine.load(db)
+        tickets = {t.id: t for t in (await db.execute(select(Ticket))).scalars().all()}
+        for ticket_id, position in {"c": 1, "a": 2, "b": 3, "d": None}.items():
+            assert await sql_engine.position(db, tickets[ticket_id]) == position
+            assert await memory_engine.position(db, tickets[ticket_id]) == position
+
+
+def make_ranked(ticket_id, rank):
+    entry = make_entry(ticket_id, 0)
+    entry.queue_rank = rank
+    return entry
+
+
+def test_plan_ranks_moves_a_single_ticket():
+    order = [make_ranked(t_id, rank) for t_id, rank in [("a", 1024.0), ("b", 2048.0), ("c", 3072.0)]]
+
+    # "c" remonte en tête : seul son rang change
+    ranks, _ = plan_ranks([order[2], order[0], order[1]])
+    assert list(ranks) == ["c"]
+    assert ranks["c"] < 1024.0
+
+    # Échange de "a" et "b" : une seule ligne réécrite, ordre respecté
+    new_order = [order[1], order[0], order[2]]
+    ranks, _ = plan_ranks(new_order)
+    assert len(ranks) == 1
+    for entry in new_order:
+        entry.queue_rank = ranks.get(entry.id, entry.queue_rank)
+    assert sorted(new_order, key=lambda e: e.sort_key) == new_order
+
+
+def test_plan_ranks_requests_rebalance_when_gap_exhausted():
+    order = [make_ranked("a", 1.0), make_ranked("b", 1.0 + 1e-9), make_ranked("c", 5.0)]
+
+    ranks, _ = plan_ranks([order[0], order[2], order[1]])
+    assert ranks is None
+
+    # Rangs réespacés sous le plus grand rang réservé, ticket en attente de
+    # validation ("p", derrière "a") gardé à sa place
+    pending = make_ranked("p", 1.0 + 5e-10)
+    dense = dense_ranks(with_pending([order[0], order[2], order[1]], [pending]))
+    assert dense == {"a": 5.0 - 3 * QUEUE_RANK_GAP, "p": 5.0 - 2 * QUEUE_RANK_GAP, "c": 5.0 - QUEUE_RANK_GAP, "b": 5.0}
+
+
+@pytest.mark.asyncio
+async def test_rebalance_keeps_pending_tickets_and_reserved_ranks(session_factory):
+    ranks = {"A": 1.0, "B": 1.0 + 1e-9, "P": 2.0, "C": 5.0}
+    async with session_factory() as db:
+        db.add(Service(id="svc", name="Mairie", slug="mairie", category="mairie"))
+        db.add_all([
+            Ticket(id=number, service_id="svc", ticket_number=number, position_in_queue=0, queue_rank=rank,
+                   status=TicketStatus.PENDING_VALIDATION if number == "P" else TicketStatus.WAITING)
+            for number, rank in ranks.items()
+        ])
+        await db.commit()
+
+    engine = MemoryQueueEngine()
+    assert await rebalance_queue("svc", engine, session_factory=session_factory) == 3
+
+    async with session_factory() as db:
+        await engine.load(db)
+        tickets = sorted((await db.execute(select(Ticket))).scalars().all(), key=lambda t: t.queue_rank)
+        assert [t.id for t in tickets] == ["A", "B", "P", "C"]
+        assert tickets[-1].queue_rank == 5.0
+        assert tickets[1].queue_rank - tickets[0].queue_rank == QUEUE_RANK_GAP
+        # Un ticket émis pendant le rééquilibrage reste en fin de file
+        assert await engine.next_rank(db, "svc") > 5.0
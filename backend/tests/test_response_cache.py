@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import pytest
+
+from app.api.v1.endpoints import services as services_endpoints
+from app.models.service import Service
+from app.services import response_cache as cache_module
+from app.services.response_cache import MemoryCacheBackend, ResponseCache, service_tags
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ResponseCache(MemoryCacheBackend(maxsize=16), ttl=60)
+    monkeypatch.setattr(cache_module, "response_cache", cache)
+    monkeypatch.setattr(services_endpoints, "response_cache", cache)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_expires_and_invalidates_by_tag(cache):
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return {"n": len(loads)}
+
+    assert await cache.get_or_load("a", loader, tags=("t1",)) == {"n": 1}
+    assert await cache.get_or_load("a", loader, tags=("t1",)) == {"n": 1}
+    assert await cache.get_or_load("b", loader, tags=("t2",), ttl=0.01) == {"n": 2}
+
+    await cache.invalidate("t1")
+    await asyncio.sleep(0.02)
+    assert await cache.get_or_load("a", loader) == {"n": 3}
+    assert await cache.get_or_load("b", loader) == {"n": 4}
+
+    async def missing():
+        return None
+
+    assert await cache.get_or_load("c", missing) is None
+    assert await cache.backend.get("c") is None
+    assert (cache.hits, cache.misses) == (1, 5)
+
+
+@pytest.mark.asyncio
+async def test_service_list_is_invalidated_after_commit_only(cache, session_factory):
+    async with session_factory() as db:
+        service = Service(name="Mairie", slug="mairie", category="mairie")
+        db.add(service)
+        await db.commit()
+
+    async def catalog():
+        async with session_factory() as db:
+            response = await services_endpoints.get_services(category=None, status=None, db=db)
+        return [(s["name"], s["current_queue_size"]) for s in json.loads(response.body)["services"]]
+
+    assert await catalog() == [("Mairie", 0)]
+
+    # Écriture sans invalidation (autre worker) : catalogue en cache,
+    # mais l'état de la file est relu en base
+    async with session_factory() as db:
+        row = await db.get(Service, service.id)
+        row.name = "Mairie du Plateau"
+        row.current_queue_size = 3
+        await db.commit()
+    assert await catalog() == [("Mairie", 3)]
+
+    # Transaction annulée : les tags ne sont pas invalidés
+    async with session_factory() as db:
+        cache.invalidate_on_commit(db, *service_tags(service.id))
+        await db.rollback()
+    await cache.drain()
+    assert await catalog() == [("Mairie", 3)]
+
+    async with session_factory() as db:
+        cache.invalidate_on_commit(db, *service_tags(service.id))
+        await db.commit()
+    await cache.drain()
+    assert await catalog() == [("Mairie du Plateau", 3)]
+
+    # Filtre de statut appliqué sur le statut courant
+    async with session_factory() as db:
+        row = await db.get(Service, service.id)
+        row.status = "fermé"
+        await db.commit()
+    async with session_factory() as db:
+        response = await services_endpoints.get_services(category=None, status="ouvert", db=db)
+    assert json.loads(response.body)["total"] == 0
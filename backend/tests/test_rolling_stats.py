@@ -0,0 +1,131 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from app.api.v1.endpoints import tickets as tickets_endpoints
+from app.models.counter import Counter, CounterStatus
+from app.models.service import Service
+from app.models.ticket import Ticket, TicketStatus
+from app.services import smart_prediction
+from app.services.queue_engine import MemoryQueueEngine
+from app.services.analytics_rollup import AnalyticsRollup, TicketEvent
+from app.services.rolling_stats import RollingStatsStore
+
+# Lundi 2 juin 2025, 10h (Abidjan = UTC)
+MONDAY_10H = datetime(2025, 6, 2, 10, 0, tzinfo=timezone.utc).timestamp()
+
+
+def completed(service_id, counter_id, minutes):
+    called_at = datetime(2025, 6, 2, 9, 0)
+    return {
+        "service_id": service_id,
+        "counter_id": counter_id,
+        "called_at": called_at,
+        "completed_at": called_at + timedelta(minutes=minutes),
+    }
+
+
+def test_sliding_windows_and_same_weekday():
+    now = [MONDAY_10H]
+    store = RollingStatsStore(weekly_weight=0.5, min_samples=2, clock=lambda: now[0])
+
+    for _ in range(3):
+        store.observe(TicketEvent.ISSUED, {"service_id": "svc-1"})
+    store.observe(TicketEvent.COMPLETED, completed("svc-1", "c-1", 6), TicketStatus.CALLED)
+    store.observe(TicketEvent.COMPLETED, completed("svc-1", "c-2", 10), TicketStatus.CALLED)
+
+    snapshot = store.snapshot("svc-1")
+    assert snapshot["15m"]["arrivals_per_hour"] == 12
+    assert snapshot["15m"]["served_per_hour"] == 8
+    assert snapshot["15m"]["average_service_time"] == 8
+    assert snapshot["15m"]["open_counters"] == 2
+    assert snapshot["60m"]["arrivals_per_hour"] == 3
+    assert store.average_service_time("svc-1") == 8
+    # Un seul ticket servi par guichet : pas assez d'échantillons
+    assert store.average_service_time(counter_id="c-1") is None
+
+    # 20 minutes plus tard : hors de la fenêtre de 15 minutes
+    now[0] += 20 * 60
+    snapshot = store.snapshot("svc-1")
+    assert snapshot["15m"]["average_service_time"] is None
+    assert snapshot["15m"]["open_counters"] == 0
+    assert snapshot["60m"]["average_service_time"] == 8
+
+    # Lundi suivant, même heure : repli sur le même créneau hebdomadaire
+    now[0] = MONDAY_10H + 7 * 86400 + 5 * 60
+    snapshot = store.snapshot("svc-1")
+    assert snapshot["60m"]["samples"] == 0
+    assert snapshot["same_weekday"]["average_service_time"] == 8
+    assert snapshot["same_weekday"]["arrivals_per_hour"] == 3
+    assert store.average_service_time("svc-1") == 8
+
+    # Nouvelle semaine intégrée à la moyenne (poids 0.5)
+    store.observe(TicketEvent.COMPLETED, completed("svc-1", "c-1", 12), TicketStatus.CALLED)
+    store.observe(TicketEvent.COMPLETED, completed("svc-1", "c-1", 12), TicketStatus.CALLED)
+    assert store.average_service_time("svc-1") == 12
+    now[0] += 7 * 86400
+    assert store.snapshot("svc-1")["same_weekday"]["served_per_hour"] == 2
+    assert store.snapshot("svc-1")["same_weekday"]["average_service_time"] == 10
+
+
+@pytest.mark.asyncio
+async def test_committed_completions_drive_smart_prediction(session_factory, monkeypatch):
+    store = RollingStatsStore(min_samples=3)
+    rollup = AnalyticsRollup(session_factory=session_factory)
+    rollup.listeners.append(store.observe)
+    monkeypatch.setattr(smart_prediction, "rolling_stats", store)
+
+    service_data = {"id": "svc-1", "type": "Mairie", "total_queue_size": 5, "total_active_counters": 2}
+    reference = smart_prediction.smart_prediction_service.predict_wait_time(service_data)
+    assert reference["factors"]["pace"] == "reference"
+
+    called_at = datetime.utcnow() - timedelta(minutes=30)
+    async with session_factory() as db:
+        db.add(Service(id="svc-1", name="Service 1", slug="svc-1", category="mairie", status="ouvert"))
+        tickets = [
+            Ticket(service_id="svc-1", ticket_number=f"N-{n}", position_in_queue=n,
+                   status=TicketStatus.COMPLETED, called_at=called_at,
+                   completed_at=called_at + timedelta(minutes=12))
+            for n in range(1, 4)
+        ]
+        db.add_all(tickets)
+        for ticket in tickets:
+            rollup.record(db, TicketEvent.COMPLETED, ticket, TicketStatus.CALLED)
+        await db.rollback()
+        assert store.snapshot("svc-1") is None
+
+        db.add(Service(id="svc-1", name="Service 1", slug="svc-1", category="mairie", status="ouvert"))
+        db.add_all(tickets)
+        for ticket in tickets:
+            rollup.record(db, TicketEvent.COMPLETED, ticket, TicketStatus.CALLED)
+        await db.commit()
+
+    assert store.average_service_time("svc-1") == 12
+    prediction = smart_prediction.smart_prediction_service.predict_wait_time(service_data)
+    assert prediction["factors"]["pace"] == "live"
+    assert prediction["factors"]["final_multiplier"] == 1
+    assert prediction["predicted_wait_time"] == 30  # 5 personnes x 12 min / 2 guichets
+
+
+@pytest.mark.asyncio
+async def test_call_next_with_counter_feeds_counter_stats(session_factory, monkeypatch):
+    store = RollingStatsStore()
+    rollup = AnalyticsRollup(session_factory=session_factory)
+    rollup.listeners.append(store.observe)
+    monkeypatch.setattr(tickets_endpoints, "analytics_rollup", rollup)
+
+    async with session_factory() as db:
+        db.add(Service(id="svc-1", name="Service 1", slug="svc-1", category="mairie", status="ouvert"))
+        db.add(Counter(id="c-1", service_id="svc-1", counter_number=1, status=CounterStatus.OPEN))
+        db.add(Ticket(service_id="svc-1", ticket_number="N-1", position_in_queue=1, status=TicketStatus.WAITING))
+        await db.commit()
+
+        queue = MemoryQueueEngine()
+        await queue.load(db)
+        response = await tickets_endpoints.call_next_ticket(
+            "svc-1", counter_id="c-1", db=db, current_user=None, queue=queue
+        )
+        ticket = await db.get(Ticket, response["ticket"].id)
+        assert ticket.counter_id == "c-1"
+        assert (await db.get(Counter, "c-1")).current_ticket_id == ticket.id
+
+    assert store.snapshot(counter_id="c-1")["15m"]["open_counters"] == 1
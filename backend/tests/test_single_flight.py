@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app.api.v1.endpoints import predictions
+from app.models.service import Service
+from app.services.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_predictions_share_one_computation(session_factory, monkeypatch):
+    async with session_factory() as db:
+        service = Service(name="Mairie", slug="mairie", category="mairie")
+        db.add(service)
+        await db.commit()
+
+    calls = []
+
+    async def predict_wait_time(service_dict):
+        calls.append(service_dict["id"])
+        await asyncio.sleep(0.05)
+        return {
+            "predicted_wait_time": 75,
+            "confidence": 0.8,
+            "recommendation": "Venez tôt",
+            "best_time_to_visit": "08:00",
+            "method": "test",
+        }
+
+    flight = SingleFlight()
+    monkeypatch.setattr(predictions, "single_flight", flight)
+    monkeypatch.setattr(predictions.ml_service, "predict_wait_time", predict_wait_time)
+
+    async def request():
+        async with session_factory() as db:
+            return await predictions.get_prediction(service.id, db=db)
+
+    responses = await asyncio.gather(*(request() for _ in range(20)))
+    assert len(calls) == 1
+    assert {r["message"] for r in responses} == {"Temps d'attente estimé : 1h 15. Venez tôt"}
+    assert flight.metrics() == {"inflight": 0, "executions": 1, "coalesced": 19}
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_cancelled_callers_do_not_cancel_others():
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def failing():
+        started.set()
+        await asyncio.sleep(0.02)
+        raise RuntimeError("amont indisponible")
+
+    first = asyncio.create_task(flight.run("k", failing))
+    await started.wait()
+    second = asyncio.create_task(flight.run("k", failing))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    with pytest.raises(RuntimeError):
+        await second
+    assert first.cancelled()
+
+    async def ok():
+        return 1
+
+    assert await flight.run("k", ok) == 1
+    assert flight.executions == 2
@@ -0,0 +1,42 @@
+import json
+from datetime import datetime
+
+from app.services.smart_prediction import SmartPredictionService, load_holidays, smart_prediction_service
+
+
+def service(category, queue_size, counters=1, is_open=True):
+    return {
+        "id": category,
+        "name": category,
+        "type": category,
+        "total_queue_size": queue_size,
+        "total_active_counters": counters,
+        "is_open": is_open
+    }
+
+
+def test_batch_matches_single_predictions_with_multi_year_holidays():
+    # Mercredi 14 octobre 2026 à 9h : pas de veille de jour férié
+    now = datetime(2026, 10, 14, 9, 30)
+    services = [service("mairie", 10), service("banque", 4, 2), service("inconnu", 0), service("impots", 30, 3, False)]
+
+    batch = smart_prediction_service.predict_many(services, now)
+    assert batch == [smart_prediction_service.predict_wait_time(s, now) for s in services]
+    # 10 personnes x 12 min x 1.5 (matin) x 1.0 (mercredi, mi-mois)
+    assert batch[0]["predicted_wait_time"] == 180
+    assert batch[2]["predicted_wait_time"] == batch[3]["predicted_wait_time"] == 0
+
+    # Veille de Toussaint 2026 (calendrier data/holidays_ci.json)
+    eve = smart_prediction_service.predict_wait_time(service("mairie", 10), datetime(2026, 10, 31, 15))
+    assert eve["factors"]["special_multiplier"] == 1.5
+    assert smart_prediction_service.predict_many([]) == []
+
+
+def test_holiday_calendar_file_is_configurable(tmp_path):
+    path = tmp_path / "holidays.json"
+    path.write_text(json.dumps({"holidays": {"2031-06-02": "Férié de test"}}))
+
+    predictor = SmartPredictionService(holidays=load_holidays(str(path)))
+    prediction = predictor.predict_wait_time(service("police", 5), datetime(2031, 6, 1, 15))
+    assert prediction["factors"]["special_multiplier"] == 1.5
+    assert load_holidays(str(tmp_path / "absent.json")) == frozenset()
@@ -0,0 +1,44 @@
+import pytest
+from datetime import date, datetime, timedelta
+
+from app.crud.ticket import ticket_crud
+from app.models.service import Service
+from app.models.ticket import Ticket, TicketStatus
+from app.utils.time_windows import day_window
+
+
+@pytest.mark.asyncio
+async def test_wait_time_stats_are_aggregated_in_sql(session_factory):
+    today = date.today()
+    opened = datetime.combine(today, datetime.min.time()) + timedelta(hours=8)
+
+    async with session_factory() as db:
+        db.add(Service(id="svc", name="Mairie", slug="mairie", category="mairie"))
+        for index, wait in enumerate([10, 20, 30, 60]):
+            db.add(Ticket(
+                service_id="svc",
+                ticket_number=f"N-{index:03d}",
+                position_in_queue=index + 1,
+                status=TicketStatus.COMPLETED,
+                created_at=opened,
+                called_at=opened + timedelta(minutes=wait),
+            ))
+        # Jamais appelé : ignoré
+        db.add(Ticket(service_id="svc", ticket_number="N-099", position_in_queue=5, created_at=opened))
+        await db.commit()
+
+        stats = await ticket_crud.get_wait_time_stats(db, day=today, service_id="svc")
+
+    assert stats["count"] == 4
+    assert stats["average"] == pytest.approx(30.0, abs=0.01)
+    assert stats["min"] == pytest.approx(10.0, abs=0.01)
+    assert stats["max"] == pytest.approx(60.0, abs=0.01)
+    assert stats["median"] == pytest.approx(25.0, abs=0.01)
+
+
+def test_day_window_is_half_open_in_local_time():
+    start, end = day_window(date(2025, 3, 10), tz="Europe/Paris")
+
+    # Minuit à Paris (UTC+1 en mars avant le changement d'heure)
+    assert start == datetime(2025, 3, 9, 23, 0)
+    assert end == datetime(2025, 3, 10, 23, 0)
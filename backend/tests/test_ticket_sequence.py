@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from datetime import date
+
+from app.models.service import Service
+from app.services.ticket_sequence import TicketSequenceAllocator
+
+
+@pytest_asyncio.fixture
+async def session_factory(file_session_factory):
+    async with file_session_factory() as db:
+        db.add(Service(id="svc", name="Mairie", slug="mairie", category="mairie"))
+        await db.commit()
+    return file_session_factory
+
+
+async def issue(factory, allocator, day=None):
+    async with factory() as db:
+        number = await allocator.next_number(db, "svc", day)
+        await db.commit()
+        return number
+
+
+@pytest.mark.asyncio
+async def test_concurrent_issuance_has_no_duplicates(session_factory):
+    allocator = TicketSequenceAllocator()
+
+    numbers = await asyncio.gather(*(issue(session_factory, allocator) for _ in range(100)))
+
+    assert sorted(numbers) == list(range(1, 101))
+
+
+@pytest.mark.asyncio
+async def test_block_allocation_has_no_duplicates_across_workers(session_factory):
+    workers = [TicketSequenceAllocator(block_size=7, session_factory=session_factory) for _ in range(3)]
+
+    numbers = await asyncio.gather(*(
+        issue(session_factory, workers[i % 3]) for i in range(90)
+    ))
+
+    assert len(set(numbers)) == 90
+
+
+@pytest.mark.asyncio
+async def test_sequence_restarts_each_day(session_factory):
+    allocator = TicketSequenceAllocator()
+
+    assert await issue(session_factory, allocator, date(2025, 1, 1)) == 1
+    assert await issue(session_factory, allocator, date(2025, 1, 1)) == 2
+    assert await issue(session_factory, allocator, date(2025, 1, 2)) == 1
@@ -0,0 +1,80 @@
+import pytest
+import pytest_asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import event
+
+from app.models.counter import Counter, CounterStatus
+from app.models.service import Service
+from app.models.ticket import Ticket, TicketStatus
+from app.services.ticket_stats import ticket_stats_service
+from app.api.v1.endpoints.admin import get_dashboard_stats, get_admin_alerts
+from app.api.v1.endpoints.admin_dashboard import get_dashboard_overview
+
+SERVICES = 6
+
+
+@pytest_asyncio.fixture
+async def stats_db(session_factory):
+    """Services avec tickets en attente et servis (base partagée des fixtures)"""
+    now = datetime.utcnow()
+    async with session_factory() as db:
+        for index in range(SERVICES):
+            service_id = f"svc-{index}"
+            db.add(Service(id=service_id, name=f"Service {index}", slug=service_id, category="mairie", status="ouvert"))
+            db.add(Counter(service_id=service_id, counter_number=1, status=CounterStatus.OPEN))
+            for number in range(3):
+                db.add(Ticket(service_id=service_id, ticket_number=f"W-{number}", position_in_queue=number + 1,
+                              status=TicketStatus.WAITING, created_at=now))
+            db.add(Ticket(service_id=service_id, ticket_number="C-1", position_in_queue=4,
+                          status=TicketStatus.COMPLETED, created_at=now - timedelta(minutes=30),
+                          called_at=now - timedelta(minutes=10), completed_at=now))
+        await db.commit()
+
+    return session_factory
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine.sync_engine
+        self.count = 0
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+@pytest.mark.asyncio
+async def test_stats_are_aggregated_per_service(stats_db):
+    async with stats_db() as db:
+        stats = await ticket_stats_service.by_service(db)
+
+    assert len(stats) == SERVICES
+    assert stats["svc-0"].waiting == 3
+    assert stats["svc-0"].served_today == 1
+    assert stats["svc-0"].average_wait_time == pytest.approx(20.0, abs=0.01)
+    assert ticket_stats_service.totals(stats).waiting == 3 * SERVICES
+
+
+@pytest.mark.asyncio
+async def test_dashboard_endpoints_query_count_is_bounded(stats_db, db_engine):
+    async with stats_db() as db:
+        with QueryCounter(db_engine) as counter:
+            overview = await get_dashboard_overview(service_id=None, db=db, admin=None)
+        assert counter.count <= 3
+        assert overview["overview"]["total_waiting"] == 3 * SERVICES
+        assert len(overview["services"]) == SERVICES
+
+        with QueryCounter(db_engine) as counter:
+            dashboard = await get_dashboard_stats(service_id=None, db=db, current_user=None)
+        assert counter.count <= 3
+        assert dashboard["overview"]["completed_today"] == SERVICES
+
+        with QueryCounter(db_engine) as counter:
+            await get_admin_alerts(service_id=None, db=db, current_user=None)
+        assert counter.count <= 2
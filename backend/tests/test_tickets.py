@@ -1,7 +1,14 @@
 import pytest
+from fastapi import HTTPException
 from httpx import AsyncClient
 from app.main import app
+from app.api.v1.endpoints.tickets import cancel_ticket, get_my_tickets
 from app.core.config import settings
+from app.models.service import Service
+from app.models.ticket import Ticket, TicketStatus
+from app.models.user import User, UserRole
+from app.services.principal_cache import Principal
+from app.services.queue_engine import MemoryQueueEngine
 
 @pytest.mark.asyncio
 async def test_get_tickets_admin_unauthorized():
@@ -14,3 +21,28 @@ async def test_get_pending_tickets_unauthorized():
     async with AsyncClient(app=app, base_url="http://test") as ac:
         response = await ac.get(f"{settings.API_V1_PREFIX}/tickets/pending-validation")
     assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_owner_can_cancel_own_ticket(session_factory):
+    async with session_factory() as db:
+        owner = User(email="owner@vitevite.ci", hashed_password="x", role=UserRole.CITOYEN.value)
+        other = User(email="other@vitevite.ci", hashed_password="x", role=UserRole.CITOYEN.value)
+        db.add_all([owner, other, Service(id="svc", name="Mairie", slug="mairie", category="mairie", current_queue_size=1)])
+        await db.commit()
+        ticket = Ticket(service_id="svc", ticket_number="N-001", position_in_queue=1,
+                        status=TicketStatus.WAITING, user_id=str(owner.id))
+        db.add(ticket)
+        await db.commit()
+
+        with pytest.raises(HTTPException) as exc:
+            await cancel_ticket(ticket.id, db=db, current_user=Principal.from_user(other), queue=MemoryQueueEngine())
+        assert exc.value.status_code == 403
+
+        mine = await get_my_tickets(db=db, current_user=Principal.from_user(owner))
+        assert mine["total"] == 1
+
+        response = await cancel_ticket(ticket.id, db=db, current_user=Principal.from_user(owner), queue=MemoryQueueEngine())
+        assert response["success"] is True
+        await db.refresh(ticket)
+        assert ticket.status == TicketStatus.CANCELLED
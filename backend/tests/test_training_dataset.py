@@ -0,0 +1,87 @@
+import csv
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.service import Service
+from app.models.ticket import Ticket, TicketStatus
+from app.services.training_dataset import build_training_dataset
+
+
+@pytest.mark.asyncio
+async def test_queue_size_at_issue_is_rebuilt_from_issue_and_call_events(session_factory, tmp_path):
+    t0 = datetime(2025, 3, 10, 8, 0)
+    minutes = lambda m: t0 + timedelta(minutes=m)
+
+    async with session_factory() as db:
+        db.add(Service(id="mairie", name="Mairie", slug="mairie", category="mairie", max_queue_size=None))
+        db.add(Service(id="banque", name="Banque", slug="banque", category="banque", max_queue_size=4))
+        tickets = [
+            # (service, émis, appelé, statut)
+            ("mairie", 0, 20, TicketStatus.COMPLETED),
+            ("mairie", 5, 30, TicketStatus.COMPLETED),
+            ("mairie", 10, None, TicketStatus.CANCELLED),  # Sorti à 12 (updated_at)
+            ("mairie", 15, None, TicketStatus.WAITING),  # Toujours en file
+            ("mairie", 25, 40, TicketStatus.COMPLETED),
+            ("banque", 0, 5, TicketStatus.COMPLETED),
+            ("banque", 1, 9, TicketStatus.COMPLETED),
+            ("banque", 2, 10, TicketStatus.COMPLETED),
+        ]
+        for number, (service_id, issued, called, status) in enumerate(tickets):
+            db.add(Ticket(
+                service_id=service_id, ticket_number=f"T-{number}", position_in_queue=number + 1, status=status,
+                created_at=minutes(issued), called_at=minutes(called) if called is not None else None,
+                updated_at=minutes(12 if status == TicketStatus.CANCELLED else issued)
+            ))
+        await db.commit()
+
+    output = tmp_path / "queue_data.csv"
+    async with session_factory() as db:
+        stats = await build_training_dataset(db, str(output), chunk_size=2)
+    assert stats == {"tickets": 8, "rows": 6, "output": str(output)}
+
+    with open(output, encoding="utf-8") as f:
+        rows = [(r["service_name"], r["queue_size"], r["wait_time_minutes"], r["affluence_level"]) for r in csv.DictReader(f)]
+    assert rows == [
+        ("Banque", "0", "5.0", "faible"),
+        ("Banque", "1", "8.0", "faible"),
+        ("Banque", "2", "8.0", "modérée"),  # 2/4 = 50 % de la capacité
+        ("Mairie", "0", "20.0", "faible"),
+        ("Mairie", "1", "25.0", "faible"),
+        ("Mairie", "2", "15.0", "faible"),  # Appelé à 20, annulé à 12 : restent 5 et 15
+    ]
+
+
+@pytest.mark.asyncio
+async def test_unresolved_tickets_leave_the_queue_at_the_end_of_their_day(session_factory, tmp_path, monkeypatch):
+    day1 = datetime(2025, 3, 10, 8, 0)
+    day2 = day1 + timedelta(days=1)
+
+    async with session_factory() as db:
+        db.add(Service(id="mairie", name="Mairie", slug="mairie", category="mairie", max_queue_size=None))
+        tickets = [
+            # (émis, appelé, statut)
+            (day1, None, TicketStatus.WAITING),  # Jamais appelé
+            (day1 + timedelta(minutes=1), None, TicketStatus.PENDING_VALIDATION),
+            (day1 + timedelta(minutes=2), day1 + timedelta(minutes=10), TicketStatus.COMPLETED),
+            (day2, None, TicketStatus.PENDING_VALIDATION),  # Pas encore dans la file
+            (day2 + timedelta(minutes=1), None, TicketStatus.REJECTED),
+            (day2 + timedelta(minutes=2), day2 + timedelta(minutes=5), TicketStatus.COMPLETED),
+        ]
+        for number, (issued, called, status) in enumerate(tickets):
+            db.add(Ticket(
+                service_id="mairie", ticket_number=f"T-{number}", position_in_queue=number + 1, status=status,
+                created_at=issued, called_at=called, updated_at=issued + timedelta(minutes=30)
+            ))
+        await db.commit()
+
+    # Sans pyarrow, le fichier .parquet demandé est écrit en CSV
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    async with session_factory() as db:
+        stats = await build_training_dataset(db, str(tmp_path / "queue_data.parquet"))
+    assert stats["output"] == str(tmp_path / "queue_data.csv")
+
+    with open(stats["output"], encoding="utf-8") as f:
+        rows = [(r["timestamp"][:10], r["queue_size"]) for r in csv.DictReader(f)]
+    assert rows == [("2025-03-10", "1"), ("2025-03-11", "0")]